@@ -1,4 +1,4 @@
-from flask import Flask, send_from_directory
+from flask import Flask, jsonify, send_from_directory
 from werkzeug.middleware.proxy_fix import ProxyFix
 from .extensions import db
 from .routes import bp as main_bp
@@ -6,6 +6,8 @@ from .api_v2 import api_v2
 import datetime
 import os
 import atexit
+import threading
+import time
 
 
 def _seed_team_members():
@@ -134,6 +136,48 @@ def ensure_schedule_horizon():
     print(f"[Horizon] Done — created {total_created} events across horizon")
 
 
+def run_startup_tasks(app):
+    """Seed an empty database, sync the roster and top up the schedule horizon.
+
+    Runs once per deploy on the scheduler-owning process (or in a background
+    thread when the scheduler is disabled), never on the request path.
+    """
+    state = app.extensions["startup_tasks"]
+    state.update(status="running", started_at=datetime.datetime.utcnow().isoformat(), error=None)
+    started = time.perf_counter()
+    with app.app_context():
+        try:
+            # Seed database with schedule data if empty
+            from .seed_data import seed_database
+            seed_database()
+
+            # Seed TeamMember table with current roster if empty
+            from .models import TeamMember
+            if TeamMember.query.count() == 0:
+                _seed_team_members()
+            else:
+                # Top up known Telegram IDs on existing rows (idempotent)
+                sync_telegram_ids()
+            sync_team_scheduling_defaults()
+
+            # Keep the schedule generated through the active schedule year.
+            ensure_schedule_horizon()
+        except Exception as e:
+            db.session.rollback()
+            state.update(status="failed", error=str(e), finished_at=datetime.datetime.utcnow().isoformat())
+            print(f"[Startup] Startup tasks failed: {e}")
+            return False
+        finally:
+            db.session.remove()
+    state.update(status="ready", finished_at=datetime.datetime.utcnow().isoformat())
+    print(f"[Startup] Startup tasks done in {time.perf_counter() - started:.1f}s")
+    return True
+
+
+def _run_startup_tasks_in_background(app):
+    threading.Thread(target=run_startup_tasks, args=(app,), name="startup-tasks", daemon=True).start()
+
+
 def create_app(config_class='config.Config'):
     app = Flask(__name__)
     app.config.from_object(config_class)
@@ -141,7 +185,11 @@ def create_app(config_class='config.Config'):
     # Honor reverse-proxy headers from the live stack (for example Cloudflare/Nginx).
     app.wsgi_app = ProxyFix(app.wsgi_app, x_for=1, x_proto=1, x_host=1, x_prefix=1)
 
+    # SQLite WAL/busy_timeout profile + thread-sized pool (no-op on Postgres).
+    from . import storage
+    storage.configure(app)
     db.init_app(app)
+    storage.install(app)
 
     # ── Serve React frontend at / (main) and /v2 (back-compat) ──
     react_dist = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'scheduler-site', 'dist')
@@ -173,74 +221,58 @@ def create_app(config_class='config.Config'):
     app.register_blueprint(main_bp)
     app.register_blueprint(api_v2)  # v2 REST API at /api/v2/
 
-    with app.app_context():
-        # Create tables if they don't exist (covers new models like SwapRequest)
-        db.create_all()
-
-        # Auto-migrate: add columns that db.create_all() won't add to existing tables
-        from sqlalchemy import text, inspect
-        insp = inspect(db.engine)
-        cols = [c['name'] for c in insp.get_columns('assignment')]
-        if 'telegram_message_id' not in cols:
-            db.session.execute(text('ALTER TABLE assignment ADD COLUMN telegram_message_id INTEGER'))
-            db.session.commit()
-        if 'locked' not in cols:
-            db.session.execute(text('ALTER TABLE assignment ADD COLUMN locked BOOLEAN DEFAULT false NOT NULL'))
-            db.session.commit()
-        if 'redeemed_for_id' not in cols:
-            db.session.execute(text('ALTER TABLE assignment ADD COLUMN redeemed_for_id INTEGER REFERENCES assignment(id) ON DELETE SET NULL'))
-            db.session.commit()
-        if 'orphan_dismissed_at' not in cols:
-            db.session.execute(text('ALTER TABLE assignment ADD COLUMN orphan_dismissed_at TIMESTAMP'))
-            db.session.commit()
-
-        team_member_cols = [c['name'] for c in insp.get_columns('team_member')]
-        if '_role_preferences_json' not in team_member_cols:
-            db.session.execute(text("ALTER TABLE team_member ADD COLUMN _role_preferences_json TEXT DEFAULT '{}'"))
-            db.session.commit()
-
-        swap_request_cols = [c['name'] for c in insp.get_columns('swap_request')]
-        if 'future_assignment_id' not in swap_request_cols:
-            db.session.execute(text('ALTER TABLE swap_request ADD COLUMN future_assignment_id INTEGER REFERENCES assignment(id) ON DELETE SET NULL'))
-            db.session.commit()
-
-        event_cols = [c['name'] for c in insp.get_columns('event')]
-        if 'telegram_message_id' not in event_cols:
-            db.session.execute(text('ALTER TABLE event ADD COLUMN telegram_message_id INTEGER'))
-            db.session.execute(text('ALTER TABLE event ADD COLUMN telegram_chat_id VARCHAR(30)'))
-            db.session.commit()
-        if 'start_time' not in event_cols:
-            db.session.execute(text('ALTER TABLE event ADD COLUMN start_time TIME'))
-            db.session.commit()
-        if 'cancelled' not in event_cols:
-            db.session.execute(text('ALTER TABLE event ADD COLUMN cancelled BOOLEAN DEFAULT false NOT NULL'))
-            db.session.commit()
-        if 'location' not in event_cols:
-            db.session.execute(text('ALTER TABLE event ADD COLUMN location VARCHAR(120)'))
-            db.session.commit()
-        if 'updated_at' not in event_cols:
-            db.session.execute(text('ALTER TABLE event ADD COLUMN updated_at TIMESTAMP'))
-            db.session.execute(text('UPDATE event SET updated_at = CURRENT_TIMESTAMP WHERE updated_at IS NULL'))
-            db.session.commit()
-        else:
-            db.session.execute(text('UPDATE event SET updated_at = CURRENT_TIMESTAMP WHERE updated_at IS NULL'))
-            db.session.commit()
-
-        # Seed database with schedule data if empty
-        from .seed_data import seed_database
-        seed_database()
-
-        # Seed TeamMember table with current roster if empty
-        from .models import TeamMember
-        if TeamMember.query.count() == 0:
-            _seed_team_members()
-        else:
-            # Top up known Telegram IDs on existing rows (idempotent)
-            sync_telegram_ids()
-        sync_team_scheduling_defaults()
-
-        # Keep the schedule generated through the active schedule year.
-        ensure_schedule_horizon()
+    # Per-request SQL query counts, N+1 warnings, optional Server-Timing and
+    # latency metrics for /metrics.
+    from . import metrics, sqlstats
+    sqlstats.init_app(app)
+    metrics.init_app(app)
+
+    # Versioned schema migrations: a no-op single SELECT once the DB is current.
+    from . import migrations
+    migrations.init_app(app)
+
+    # Cross-worker invalidation for in-process caches (data_version counters).
+    from . import invalidation
+    invalidation.init_app(app)
+
+    # `flask archive-events` / `flask restore-archive` (cold archive tier).
+    from . import archive
+    archive.init_app(app)
+
+    # `flask stats-rollup-rebuild` (leaderboard / year overview counts).
+    from . import rollup
+    rollup.init_app(app)
+
+    # Telegram message refs (weekly schedule / reminder / swap notice pointers)
+    # and `flask message-refs-backfill`.
+    from . import message_refs
+    message_refs.init_app(app)
+
+    # Tap-only InteractionLog rows are buffered and bulk-inserted off the
+    # webhook thread; whatever is still queued is written at exit.
+    from . import audit_log
+    atexit.register(audit_log.init_app(app).stop)
+
+    # Seeding, roster sync and the horizon top-up run as a deferred startup job
+    # so gunicorn can serve requests right away; /healthz reports progress.
+    app.extensions["startup_tasks"] = {
+        "status": "pending",
+        "started_at": None,
+        "finished_at": None,
+        "error": None,
+    }
+
+    @app.route('/healthz')
+    def healthz():
+        state = dict(app.extensions["startup_tasks"])
+        ready = state["status"] in ("ready", "delegated")
+        lease = app.extensions.get("scheduler_lease")
+        return jsonify({
+            "status": "ok" if ready else "starting" if state["status"] in ("pending", "running") else "degraded",
+            "pid": os.getpid(),
+            "scheduler_leader": bool(lease and lease.is_leader),
+            "startup_tasks": state,
+        }), 200 if ready else 503
 
     # ── Start the daily-reminder scheduler (9 AM Vancouver time) ──
     _start_daily_scheduler(app)
@@ -251,12 +283,16 @@ def create_app(config_class='config.Config'):
 def _start_daily_scheduler(app):
     """Start an APScheduler that fires send_daily_reminders_v2() at 9 AM Vancouver.
 
-    Uses a pid-lock file so that only ONE gunicorn worker owns the scheduler
-    (otherwise every worker would fire the job and we'd send duplicate messages).
+    Uses a database leader lease (app/leader.py) so that only ONE worker across
+    all processes/hosts runs the scheduler (otherwise every worker would fire
+    the job and we'd send duplicate messages). The lease holder also runs
+    run_startup_tasks() once right after boot; without a scheduler this process
+    runs them in a background thread instead.
     """
     # Allow disabling via env var (useful for local dev)
     if os.environ.get("DISABLE_SCHEDULER", "").lower() in ("1", "true", "yes"):
         print("[Scheduler] Disabled via DISABLE_SCHEDULER env var")
+        _run_startup_tasks_in_background(app)
         return
 
     try:
@@ -264,42 +300,9 @@ def _start_daily_scheduler(app):
         from apscheduler.triggers.cron import CronTrigger
     except ImportError:
         print("[Scheduler] APScheduler not installed — skipping automatic reminders")
+        _run_startup_tasks_in_background(app)
         return
 
-    # Single-worker lock: only the first process to grab this lock starts the scheduler.
-    # This avoids duplicate reminders when running with multiple gunicorn workers.
-    lock_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), ".scheduler.lock")
-    try:
-        # O_CREAT | O_EXCL so exactly one process can create it
-        lock_fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
-        os.write(lock_fd, str(os.getpid()).encode())
-        os.close(lock_fd)
-    except FileExistsError:
-        # Another worker already owns the scheduler. Check if that pid is still alive;
-        # if not, steal the lock.
-        try:
-            with open(lock_path) as f:
-                other_pid = int(f.read().strip() or 0)
-            if other_pid and _pid_alive(other_pid):
-                print(f"[Scheduler] Another worker (pid {other_pid}) owns the scheduler — skipping")
-                return
-            # Stale lock — overwrite
-            with open(lock_path, "w") as f:
-                f.write(str(os.getpid()))
-        except Exception as e:
-            print(f"[Scheduler] Could not resolve lock file: {e}")
-            return
-
-    # Clean up lock file on exit
-    def _cleanup_lock():
-        try:
-            with open(lock_path) as f:
-                if int(f.read().strip() or 0) == os.getpid():
-                    os.remove(lock_path)
-        except Exception:
-            pass
-    atexit.register(_cleanup_lock)
-
     def _fire_daily_reminders():
         """Run send_daily_reminders_v2() inside app context at 8 AM Vancouver."""
         with app.app_context():
@@ -358,6 +361,16 @@ def _start_daily_scheduler(app):
             except Exception as e:
                 print(f"[Scheduler] Event reminder cleanup failed: {e}")
 
+    def _fire_interaction_log_retention():
+        """Fold interaction_log rows past retention into daily counts."""
+        with app.app_context():
+            try:
+                from .audit_log import roll_up
+                folded = roll_up()
+                print(f"[Scheduler] Interaction log retention fired — rolled up {folded} row(s)")
+            except Exception as e:
+                print(f"[Scheduler] Interaction log retention failed: {e}")
+
     def _fire_horizon_topup():
         """Daily check: keep the schedule generated through the active schedule year."""
         with app.app_context():
@@ -366,74 +379,125 @@ def _start_daily_scheduler(app):
             except Exception as e:
                 print(f"[Scheduler] Horizon top-up failed: {e}")
 
-    scheduler = BackgroundScheduler(timezone="America/Vancouver", daemon=True)
-    weekly_schedule_hour = int(app.config.get("WEEKLY_SCHEDULE_HOUR", 8))
-    scheduler.add_job(
-        _fire_daily_reminders,
-        trigger=CronTrigger(hour=8, minute=0, timezone="America/Vancouver"),
-        id="daily_reminder_v2",
-        replace_existing=True,
-        misfire_grace_time=3600,  # If server was down, still fire if within an hour
-    )
-    scheduler.add_job(
-        _fire_weekday_5pm_reminders,
-        trigger=CronTrigger(hour=17, minute=0, timezone="America/Vancouver"),
-        id="weekday_5pm_reminder_v2",
-        replace_existing=True,
-        misfire_grace_time=3600,
+    from apscheduler.events import EVENT_JOB_MISSED
+    from . import metrics, sqlstats
+
+    def _job(job_id, fn):
+        """Wrap a job with duration/error metrics and per-job SQL stats."""
+        def _run(*args, **kwargs):
+            started = time.perf_counter()
+            with sqlstats.track(f"job:{job_id}") as stats:
+                try:
+                    return fn(*args, **kwargs)
+                except Exception:
+                    metrics.JOB_ERRORS.inc(job=job_id)
+                    raise
+                finally:
+                    metrics.JOB_SECONDS.observe(time.perf_counter() - started, job=job_id)
+                    metrics.JOB_SQL_QUERIES.observe(stats.count, job=job_id)
+                    sqlstats.log_if_slow(stats, app.config)
+        return _run
+
+    def _build_scheduler():
+        scheduler = BackgroundScheduler(timezone="America/Vancouver", daemon=True)
+        scheduler.add_listener(lambda event: metrics.JOB_MISFIRES.inc(job=event.job_id), EVENT_JOB_MISSED)
+        weekly_schedule_hour = int(app.config.get("WEEKLY_SCHEDULE_HOUR", 8))
+        scheduler.add_job(
+            _job("daily_reminder_v2", _fire_daily_reminders),
+            trigger=CronTrigger(hour=8, minute=0, timezone="America/Vancouver"),
+            id="daily_reminder_v2",
+            replace_existing=True,
+            misfire_grace_time=3600,  # If server was down, still fire if within an hour
+        )
+        scheduler.add_job(
+            _job("weekday_5pm_reminder_v2", _fire_weekday_5pm_reminders),
+            trigger=CronTrigger(hour=17, minute=0, timezone="America/Vancouver"),
+            id="weekday_5pm_reminder_v2",
+            replace_existing=True,
+            misfire_grace_time=3600,
+        )
+        scheduler.add_job(
+            _job("noon_response_followup", _fire_noon_response_followups),
+            trigger=CronTrigger(hour=12, minute=0, timezone="America/Vancouver"),
+            id="noon_response_followup",
+            replace_existing=True,
+            misfire_grace_time=3600,
+        )
+        scheduler.add_job(
+            _job("weekly_schedule", _fire_weekly_schedule),
+            trigger=CronTrigger(day_of_week="mon,tue", hour=weekly_schedule_hour, minute=0, timezone="America/Vancouver"),
+            id="weekly_schedule",
+            replace_existing=True,
+            misfire_grace_time=3600,
+        )
+        scheduler.add_job(
+            _job("deadline_sweep", _fire_deadline_sweep),
+            trigger=CronTrigger(minute=5, timezone="America/Vancouver"),  # hourly at :05
+            id="deadline_sweep",
+            replace_existing=True,
+            misfire_grace_time=1800,
+        )
+        scheduler.add_job(
+            _job("event_reminder_cleanup", _fire_event_reminder_cleanup),
+            trigger=CronTrigger(hour=0, minute=5, timezone="America/Vancouver"),
+            id="event_reminder_cleanup",
+            replace_existing=True,
+            misfire_grace_time=21600,
+        )
+        scheduler.add_job(
+            _job("horizon_topup", _fire_horizon_topup),
+            trigger=CronTrigger(hour=2, minute=0, timezone="America/Vancouver"),
+            id="horizon_topup",
+            replace_existing=True,
+            misfire_grace_time=7200,
+        )
+        scheduler.add_job(
+            _job("interaction_log_retention", _fire_interaction_log_retention),
+            trigger=CronTrigger(hour=3, minute=15, timezone="America/Vancouver"),
+            id="interaction_log_retention",
+            replace_existing=True,
+            misfire_grace_time=21600,
+        )
+        return scheduler
+
+    # Leader lease: every worker heartbeats a row in scheduler_lease and only the
+    # live holder runs APScheduler, so extra workers never send duplicate reminders.
+    # If the holder dies, a standby takes over once the lease expires.
+    running = {"scheduler": None, "startup_scheduled": False}
+
+    def _on_elected():
+        scheduler = _build_scheduler()
+        if not running["startup_scheduled"]:
+            # One-shot: seeding, roster sync and horizon top-up right after boot.
+            app.extensions["startup_tasks"]["status"] = "pending"
+            scheduler.add_job(
+                _job("startup_tasks", run_startup_tasks),
+                args=(app,),
+                id="startup_tasks",
+                replace_existing=True,
+                misfire_grace_time=None,
+            )
+            running["startup_scheduled"] = True
+        scheduler.start()
+        running["scheduler"] = scheduler
+        print(f"[Scheduler] Started (pid {os.getpid()}) — daily reminders at 8:00 AM America/Vancouver")
+
+    def _on_demoted():
+        scheduler, running["scheduler"] = running["scheduler"], None
+        if scheduler is not None:
+            scheduler.shutdown(wait=False)
+            print(f"[Scheduler] Stopped (pid {os.getpid()}) — no longer the lease holder")
+
+    from .leader import LeaderLease
+    lease = LeaderLease(
+        app,
+        "scheduler",
+        ttl=int(app.config.get("LEADER_LEASE_TTL", 60)),
+        on_elected=_on_elected,
+        on_demoted=_on_demoted,
     )
-    scheduler.add_job(
-        _fire_noon_response_followups,
-        trigger=CronTrigger(hour=12, minute=0, timezone="America/Vancouver"),
-        id="noon_response_followup",
-        replace_existing=True,
-        misfire_grace_time=3600,
-    )
-    scheduler.add_job(
-        _fire_weekly_schedule,
-        trigger=CronTrigger(day_of_week="mon,tue", hour=weekly_schedule_hour, minute=0, timezone="America/Vancouver"),
-        id="weekly_schedule",
-        replace_existing=True,
-        misfire_grace_time=3600,
-    )
-    scheduler.add_job(
-        _fire_deadline_sweep,
-        trigger=CronTrigger(minute=5, timezone="America/Vancouver"),  # hourly at :05
-        id="deadline_sweep",
-        replace_existing=True,
-        misfire_grace_time=1800,
-    )
-    scheduler.add_job(
-        _fire_event_reminder_cleanup,
-        trigger=CronTrigger(hour=0, minute=5, timezone="America/Vancouver"),
-        id="event_reminder_cleanup",
-        replace_existing=True,
-        misfire_grace_time=21600,
-    )
-    scheduler.add_job(
-        _fire_horizon_topup,
-        trigger=CronTrigger(hour=2, minute=0, timezone="America/Vancouver"),
-        id="horizon_topup",
-        replace_existing=True,
-        misfire_grace_time=7200,
-    )
-    scheduler.start()
-    atexit.register(lambda: scheduler.shutdown(wait=False))
-    print(f"[Scheduler] Started (pid {os.getpid()}) — daily reminders at 8:00 AM America/Vancouver")
-
-
-def _pid_alive(pid):
-    """Return True if a process with this pid is currently running."""
-    try:
-        if os.name == "nt":
-            # Windows: use tasklist
-            import subprocess
-            out = subprocess.check_output(["tasklist", "/FI", f"PID eq {pid}"],
-                                          stderr=subprocess.DEVNULL).decode(errors="ignore")
-            return str(pid) in out
-        else:
-            # POSIX: signal 0 raises if the pid is gone
-            os.kill(pid, 0)
-            return True
-    except Exception:
-        return False
+    app.extensions["scheduler_lease"] = lease
+    if not lease.start():
+        print(f"[Scheduler] Standby (pid {os.getpid()}) — another worker holds the scheduler lease")
+        app.extensions["startup_tasks"]["status"] = "delegated"
+    atexit.register(lease.stop)
@@ -0,0 +1,228 @@
+"""
+Non-blocking, batched admin DMs.
+
+``_notify_admin`` / ``_notify_admin_text`` / ``_notify_name_tap`` used to make
+a synchronous ``sendMessage`` inside request handlers and webhook callbacks,
+adding a Telegram round-trip to every tap. They now hand the text to an
+``AdminNotifier``: ``notify`` only appends to an in-memory buffer, and a
+daemon thread delivers it.
+
+Delivery merges bursts. When nothing was sent during the last ``window``
+seconds the first notification goes out right away; anything arriving
+within ``window`` of a send is held and then sent as one digest message
+("5 confirms within 30 s" -> one DM), split only to stay under Telegram's
+message length. If Telegram is down the batch is kept and retried with
+exponential backoff; the buffer holds at most ``max_buffered`` entries and
+drops the oldest beyond that, counting what it dropped. A message Telegram
+rejects outright (``send`` raises ``Undeliverable``, e.g. an HTML parse error)
+is dropped and counted instead, so it can't hold up every later DM; a rejected
+digest is resent entry by entry so only the bad entry is lost. Over-long
+entries are shortened with ``clip``, which keeps their HTML well-formed.
+"""
+import re
+import threading
+import time
+
+from . import metrics
+
+TELEGRAM_TEXT_LIMIT = 4096
+DEFAULT_WINDOW_SECONDS = 30.0
+DEFAULT_MAX_BUFFERED = 200
+MAX_BACKOFF_SECONDS = 300.0
+
+
+_TAG = re.compile(r"<(/?)([a-zA-Z][\w-]*)[^>]*>")
+
+
+def clip(text, limit):
+    """Shorten HTML ``text`` to at most ``limit`` characters without breaking its markup.
+
+    The cut never lands inside a tag or entity, and tags left open are
+    closed, so Telegram can still parse the result.
+    """
+    if len(text) <= limit:
+        return text
+    marker = "…"
+    cut = text[:max(limit - len(marker), 0)]
+    while True:
+        if cut.rfind("<") > cut.rfind(">"):
+            cut = cut[:cut.rfind("<")]
+        elif cut.rfind("&") > cut.rfind(";"):
+            cut = cut[:cut.rfind("&")]
+        else:
+            open_tags = []
+            for match in _TAG.finditer(cut):
+                closing, name = match.group(1), match.group(2).lower()
+                if not closing:
+                    open_tags.append(name)
+                elif name in open_tags:
+                    del open_tags[len(open_tags) - 1 - open_tags[::-1].index(name)]
+            closing_tags = "".join(f"</{name}>" for name in reversed(open_tags))
+            if len(cut) + len(marker) + len(closing_tags) <= limit or not cut:
+                return cut + marker + closing_tags
+            # Make room for the closing tags and look again.
+            cut = cut[:limit - len(marker) - len(closing_tags)]
+
+
+def digest(entries, limit=TELEGRAM_TEXT_LIMIT):
+    """Pack ``(text, silent)`` entries into as few ``(text, silent, count)`` messages as fit."""
+    messages = []
+    chunk = []
+
+    def _close():
+        if not chunk:
+            return
+        texts = [text for text, _silent in chunk]
+        body = texts[0] if len(texts) == 1 else f"🗂 <b>{len(texts)} updates</b>\n\n" + "\n\n".join(texts)
+        messages.append((body, all(silent for _text, silent in chunk), len(chunk)))
+        chunk.clear()
+
+    size = 0
+    for text, silent in entries:
+        text = clip(text, limit - 100)
+        if chunk and size + len(text) + 2 > limit - 100:
+            _close()
+            size = 0
+        chunk.append((text, silent))
+        size += len(text) + 2
+    _close()
+    return messages
+
+
+class Undeliverable(Exception):
+    """Raised by ``send`` when retrying the same message can't succeed."""
+
+
+class AdminNotifier:
+    def __init__(self, send, window=DEFAULT_WINDOW_SECONDS, max_buffered=DEFAULT_MAX_BUFFERED,
+                 max_backoff=MAX_BACKOFF_SECONDS, clock=time.monotonic):
+        self.send = send  # send(text, silent) -> bool
+        self.window = max(float(window), 0.0)
+        self.max_buffered = max(int(max_buffered), 1)
+        self.max_backoff = max_backoff
+        self.clock = clock
+        self.sent = 0       # Telegram messages delivered
+        self.merged = 0     # notifications folded into a digest with others
+        self.dropped = 0    # notifications discarded because the buffer was full
+        self.rejected = 0   # notifications Telegram refused (not retried)
+        self.failures = 0   # failed deliveries (retried)
+        self._pending = []
+        self._cond = threading.Condition()
+        self._next_send_at = 0.0
+        self._backoff = 0.0
+        self._stop = False
+        self._thread = None
+
+    def notify(self, text, silent=False):
+        """Buffer one notification; never blocks on Telegram."""
+        with self._cond:
+            self._pending.append((text, bool(silent)))
+            self._trim()
+            self._cond.notify()
+
+    def pending(self):
+        with self._cond:
+            return len(self._pending)
+
+    def _trim(self):
+        overflow = len(self._pending) - self.max_buffered
+        if overflow > 0:
+            del self._pending[:overflow]
+            self.dropped += overflow
+            metrics.ADMIN_NOTIFICATIONS.inc(overflow, outcome="dropped")
+
+    def _send(self, text, silent):
+        """Try one message: "sent", "rejected" (don't retry) or "failed" (retry later)."""
+        try:
+            return "sent" if self.send(text, silent) else "failed"
+        except Undeliverable as e:
+            print(f"[Telegram] Admin notification rejected: {e}")
+            return "rejected"
+        except Exception as e:
+            print(f"[Telegram] Admin notification failed: {e}")
+            return "failed"
+
+    def _count(self, outcome, count):
+        if outcome == "rejected":
+            self.rejected += count
+            metrics.ADMIN_NOTIFICATIONS.inc(count, outcome="rejected")
+            return
+        self.sent += 1
+        if count > 1:
+            self.merged += count
+        metrics.ADMIN_NOTIFICATIONS.inc(count, outcome="merged" if count > 1 else "sent")
+
+    def _deliver(self, batch):
+        """Send ``batch``; returns the entries that still need sending."""
+        remaining = list(batch)
+        for text, silent, count in digest(batch):
+            outcome = self._send(text, silent)
+            if outcome == "rejected" and count > 1:
+                # Find the bad entry: resend the digest's entries one at a time.
+                for entry in list(remaining[:count]):
+                    single_text, single_silent, _count = digest([entry])[0]
+                    outcome = self._send(single_text, single_silent)
+                    if outcome == "failed":
+                        self.failures += 1
+                        return remaining
+                    self._count(outcome, 1)
+                    del remaining[0]
+                continue
+            if outcome == "failed":
+                self.failures += 1
+                return remaining
+            self._count(outcome, count)
+            del remaining[:count]
+        return remaining
+
+    def run_once(self):
+        """Deliver whatever is due now. Returns seconds until the next attempt, or None when idle."""
+        with self._cond:
+            if not self._pending:
+                return None
+            now = self.clock()
+            if now < self._next_send_at:
+                return self._next_send_at - now
+            batch, self._pending = self._pending, []
+        unsent = self._deliver(batch)
+        with self._cond:
+            now = self.clock()
+            if unsent:
+                self._pending[:0] = unsent
+                self._trim()
+                self._backoff = min(max(self._backoff * 2, 1.0), self.max_backoff)
+                self._next_send_at = now + self._backoff
+            else:
+                self._backoff = 0.0
+                self._next_send_at = now + self.window
+            return (self._next_send_at - now) if self._pending else None
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if self._stop:
+                    return
+            wait = self.run_once()
+            with self._cond:
+                # A notify() between run_once() and here found no waiter; don't sleep on it.
+                if self._stop or (wait is None and self._pending):
+                    continue
+                self._cond.wait(wait)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="admin-notifier", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=5):
+        """Stop the thread and make one last attempt at anything still buffered."""
+        with self._cond:
+            self._stop = True
+            self._cond.notify()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=timeout)
+        self._thread = None
+        with self._cond:
+            batch, self._pending = self._pending, []
+        if batch:
+            self._pending = self._deliver(batch)
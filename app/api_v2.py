@@ -13,12 +13,14 @@ import time
 import html
 from itsdangerous import BadSignature, URLSafeSerializer
 from flask import Blueprint, request, jsonify, session, current_app
-from .models import DEFAULT_EVENT_LOCATION, Event, Assignment, TeamMember, Availability, SwapRequest, TempChat, EventSuggestion, SchedulingSnapshot, SchedulingPreset, InteractionLog
+from .models import DEFAULT_EVENT_LOCATION, Event, Assignment, AssignmentArchive, AssignmentHistory, TeamMember, Availability, SwapRequest, TempChat, EventSuggestion, SchedulingSnapshot, SchedulingPreset, InteractionLog
 from .extensions import db
 from .utils import (
     ALL_NAMES, ROLES_CONFIG, is_available, get_history_stats,
     vancouver_today, vancouver_now, is_real_person
 )
+from . import archive, audit_log, identity, metrics, profiling, rollup
+from .repository import load_event_graph
 from . import telegram_v2 as tg
 
 api_v2 = Blueprint('api_v2', __name__, url_prefix='/api/v2')
@@ -73,6 +75,7 @@ def _normalize_event_location(value):
     return normalized
 
 
+@profiling.spanned("telegram_refresh")
 def _refresh_telegram_for_events(events, dates=None):
     seen_event_ids = set()
     for event in events or []:
@@ -136,19 +139,20 @@ def _validate_telegram_login(data):
     return hmac.compare_digest(expected, received_hash)
 
 
-def _team_member_from_telegram(data):
+def _team_member_name_from_telegram(data):
+    """Member name for a Telegram login payload, from the cached identity map."""
     tg_id = str(data.get("id", "")).strip()
     first_name = (data.get("first_name") or "").strip()
+    identities = identity.identity_map()
     if tg_id:
-        member = TeamMember.query.filter_by(telegram_user_id=tg_id).first()
-        if member:
-            return member
+        name = identities.name_for(tg_id)
+        if name:
+            return name
     if first_name:
-        member = TeamMember.query.filter(db.func.lower(TeamMember.name) == first_name.lower()).first()
-        if member and tg_id and not member.telegram_user_id:
-            member.telegram_user_id = tg_id
-            db.session.commit()
-        return member
+        name = identities.name_match(first_name)
+        if name and tg_id and identities.unlinked_match(name) == name:
+            identity.link(name, tg_id)
+        return name
     return None
 
 
@@ -217,27 +221,27 @@ def telegram_login():
     data = request.json or {}
     if not _validate_telegram_login(data):
         return jsonify({"error": "Invalid Telegram login"}), 401
-    member = _team_member_from_telegram(data)
-    if not member:
+    member_name = _team_member_name_from_telegram(data)
+    if not member_name:
         return jsonify({"error": "Telegram user is not linked to the team"}), 403
     telegram_user_id = str(data.get("id", "")).strip()
     first_name = (data.get("first_name") or "").strip()
     username = (data.get("username") or "").strip()
     suffix = f" (@{html.escape(username)})" if username else ""
-    if member.name != "Florian":
+    if member_name != "Florian":
         tg._notify_admin_text(
             f"👀 <b>Schedule opened</b>{tg._admin_source_tag('telegram_login_url')}\n"
-            f"{html.escape(member.name)}{suffix}"
+            f"{html.escape(member_name)}{suffix}"
         )
     db.session.add(InteractionLog(
         telegram_user_id=telegram_user_id,
         first_name=first_name,
         action="schedule_opened",
-        person_name=member.name,
+        person_name=member_name,
         details="telegram_login_url",
     ))
     db.session.commit()
-    return _auth_response(member.name, manager=False)
+    return _auth_response(member_name, manager=False)
 
 
 @api_v2.route("/auth/logout", methods=["POST"])
@@ -277,7 +281,7 @@ def toggle_manager():
 @api_v2.route("/schedule")
 def get_schedule():
     """Get all events with assignments."""
-    events = Event.query.order_by(Event.date).all()
+    events = load_event_graph()
     today = vancouver_today()
 
     result = []
@@ -291,7 +295,6 @@ def get_schedule():
                 "status": a.status,
                 "cover": a.cover,
                 "swapped_with": a.swapped_with,
-                "history": a.history,
                 "locked": bool(getattr(a, "locked", False)),
             })
 
@@ -326,9 +329,7 @@ def get_upcoming():
     """Get upcoming events (next 12 weeks)."""
     today = vancouver_today()
     end = today + datetime.timedelta(weeks=12)
-    events = Event.query.filter(
-        Event.date >= today, Event.date <= end
-    ).order_by(Event.date).all()
+    events = load_event_graph(today, end)
 
     return jsonify([_event_to_dict(e) for e in events])
 
@@ -340,9 +341,7 @@ def get_month(year, month):
     _, num_days = calendar.monthrange(year, month)
     end = datetime.date(year, month, num_days)
 
-    events = Event.query.filter(
-        Event.date >= start, Event.date <= end
-    ).order_by(Event.date).all()
+    events = load_event_graph(start, end)
 
     return jsonify([_event_to_dict(e) for e in events])
 
@@ -372,13 +371,11 @@ def do_action():
     actor = curr or assignment.person
 
     def push_history():
-        h = assignment.history
-        h.append({
+        assignment.add_history({
             "action": action, "by": curr,
             "prev_status": assignment.status,
             "ts": str(vancouver_now())
         })
-        assignment.history = h
 
     def log_web_action(log_action=None):
         tg._log_interaction(
@@ -525,6 +522,7 @@ def do_action():
 # ═══════════════════════════════════════════════════════════════════
 
 @api_v2.route("/generate", methods=["POST"])
+@profiling.profiled_view
 def generate():
     """Generate schedule for a month using the v2 fairness algorithm."""
     if not session.get("manager"):
@@ -543,6 +541,7 @@ def generate():
 
 
 @api_v2.route("/generate/year", methods=["POST"])
+@profiling.profiled_view
 def generate_year():
     """Generate schedule for remaining months of the year."""
     if not session.get("manager"):
@@ -562,6 +561,7 @@ def generate_year():
 
 
 @api_v2.route("/generate/range", methods=["POST"])
+@profiling.profiled_view
 def generate_range():
     if not session.get("manager"):
         return jsonify({"error": "Manager only"}), 403
@@ -814,9 +814,7 @@ def update_assignment(assignment_id):
 
     if new_person:
         if is_mgr or (assignment.person == "Select Helper" and new_person == curr):
-            h = assignment.history
-            h.append({"from": assignment.person, "to": new_person, "by": curr, "ts": str(vancouver_now())})
-            assignment.history = h
+            assignment.add_history({"from": assignment.person, "to": new_person, "by": curr, "ts": str(vancouver_now())})
             assignment.person = new_person
             assignment.cover = None
             assignment.swapped_with = None
@@ -851,6 +849,20 @@ def toggle_assignment_lock(assignment_id):
     return jsonify(_assignment_to_dict(assignment))
 
 
+@api_v2.route("/assignment/<int:assignment_id>/history")
+def assignment_history(assignment_id):
+    """Full action history of one assignment, oldest first (not included in /schedule)."""
+    if not db.session.get(Assignment, assignment_id):
+        return jsonify({"error": "Not found"}), 404
+    entries = (
+        AssignmentHistory.query
+        .filter_by(assignment_id=assignment_id)
+        .order_by(AssignmentHistory.id)
+        .all()
+    )
+    return jsonify({"assignment_id": assignment_id, "history": [entry.to_entry() for entry in entries]})
+
+
 # ═══════════════════════════════════════════════════════════════════
 #  Orphan Shifts (cancelled-event assignments waiting for redeployment)
 # ═══════════════════════════════════════════════════════════════════
@@ -1019,6 +1031,9 @@ def _rename_worker_references(old_name, new_name):
         (Assignment, "person"),
         (Assignment, "cover"),
         (Assignment, "swapped_with"),
+        (AssignmentArchive, "person"),
+        (AssignmentArchive, "cover"),
+        (AssignmentArchive, "swapped_with"),
         (Availability, "person"),
         (SwapRequest, "requestor"),
         (SwapRequest, "accepted_by"),
@@ -1033,9 +1048,21 @@ def _rename_worker_references(old_name, new_name):
             .filter(field == old_name)
             .update({field_name: new_name}, synchronize_session=False)
         )
+    total += audit_log.rename_person(old_name, new_name)
     return total
 
 
+def _rebuild_fairness_baseline():
+    """Re-scan archived events after a roster change.
+
+    The baseline is keyed by name and its expected shares come from the
+    roster at rebuild time, so renames, removals and eligibility changes
+    must be reflected in it within the same transaction.
+    """
+    db.session.flush()
+    archive.rebuild_baseline()
+
+
 def _empty_repair_result():
     return {
         "future_assignments_replaced": 0,
@@ -1161,9 +1188,7 @@ def redeem_orphan_shift(orphan_id):
     else:
         return jsonify({"error": "Target is neither swap_needed nor unfilled"}), 400
 
-    h = target.history
-    h.append(history_entry)
-    target.history = h
+    target.add_history(history_entry)
 
     orphan.redeemed_for_id = target.id
     db.session.commit()
@@ -1226,6 +1251,7 @@ def add_team_member():
     member.active_from = datetime.date.fromisoformat(active_from) if active_from else vancouver_today()
 
     db.session.add(member)
+    _rebuild_fairness_baseline()
     db.session.commit()
 
     # Also ensure they're in the seed data / roster
@@ -1245,6 +1271,8 @@ def update_team_member(member_id):
         return jsonify({"error": "Not found"}), 404
 
     data = request.json or {}
+    roster_fields = ("name", "sunday_roles", "friday_roles", "role_preferences", "caps", "active", "active_from")
+    roster_changed = any(field in data for field in roster_fields)
     if "name" in data:
         old_name = member.name
         new_name = (data["name"] or "").strip()
@@ -1281,11 +1309,14 @@ def update_team_member(member_id):
     if "active_from" in data:
         member.active_from = datetime.date.fromisoformat(data["active_from"]) if data["active_from"] else None
 
+    if roster_changed:
+        _rebuild_fairness_baseline()
     db.session.commit()
     return jsonify(member.to_dict())
 
 
 @api_v2.route("/team/apply-role-settings", methods=["POST"])
+@profiling.profiled_view
 def apply_team_role_settings():
     if not _is_admin_or_manager():
         return jsonify({"error": "Admin only"}), 403
@@ -1436,6 +1467,8 @@ def apply_team_role_settings():
                 roster_or_rules_changed = True
 
         db.session.flush()
+        if roster_or_rules_changed or renamed:
+            _rebuild_fairness_baseline()
 
         if roster_or_rules_changed:
             from .scheduler_v2 import repair_future_assignments_for_roster
@@ -1487,8 +1520,10 @@ def delete_team_member(member_id):
         return jsonify({"error": "Not found"}), 404
 
     from .scheduler_v2 import rebalance_future_after_member_removal
-    rebalance_result = rebalance_future_after_member_removal(member.name, vancouver_today())
+    removed_name = member.name
     db.session.delete(member)
+    _rebuild_fairness_baseline()
+    rebalance_result = rebalance_future_after_member_removal(removed_name, vancouver_today())
     db.session.commit()
     return jsonify({"ok": True, **rebalance_result})
 
@@ -1497,6 +1532,7 @@ SNAPSHOT_RETENTION = 50
 
 
 @api_v2.route("/scheduling-controls/apply", methods=["POST"])
+@profiling.profiled_view
 def apply_scheduling_controls():
     if not session.get("manager"):
         return jsonify({"error": "Manager only"}), 403
@@ -1546,6 +1582,7 @@ def apply_scheduling_controls():
 
 
 @api_v2.route("/scheduling-controls/preview", methods=["POST"])
+@profiling.profiled_view
 def preview_scheduling_controls():
     if not session.get("manager"):
         return jsonify({"error": "Manager only"}), 403
@@ -1572,6 +1609,7 @@ def preview_scheduling_controls():
 
 
 @api_v2.route("/scheduling-controls/refresh-reminders", methods=["POST"])
+@profiling.profiled_view
 def refresh_scheduling_reminders():
     if not session.get("manager"):
         return jsonify({"error": "Manager only"}), 403
@@ -1584,6 +1622,7 @@ def refresh_scheduling_reminders():
 
 
 @api_v2.route("/scheduling-controls/presets")
+@profiling.profiled_view
 def list_scheduling_presets():
     if not session.get("manager"):
         return jsonify({"error": "Manager only"}), 403
@@ -1592,6 +1631,7 @@ def list_scheduling_presets():
 
 
 @api_v2.route("/scheduling-controls/presets", methods=["POST"])
+@profiling.profiled_view
 def create_scheduling_preset():
     if not session.get("manager"):
         return jsonify({"error": "Manager only"}), 403
@@ -1612,6 +1652,7 @@ def create_scheduling_preset():
 
 
 @api_v2.route("/scheduling-controls/presets/<int:preset_id>", methods=["DELETE"])
+@profiling.profiled_view
 def delete_scheduling_preset(preset_id):
     if not session.get("manager"):
         return jsonify({"error": "Manager only"}), 403
@@ -1624,6 +1665,7 @@ def delete_scheduling_preset(preset_id):
 
 
 @api_v2.route("/scheduling-controls/snapshots")
+@profiling.profiled_view
 def list_scheduling_snapshots():
     if not session.get("manager"):
         return jsonify({"error": "Manager only"}), 403
@@ -1634,6 +1676,7 @@ def list_scheduling_snapshots():
 
 
 @api_v2.route("/scheduling-controls/undo", methods=["POST"])
+@profiling.profiled_view
 def undo_scheduling_controls():
     if not session.get("manager"):
         return jsonify({"error": "Manager only"}), 403
@@ -1689,6 +1732,46 @@ def leaderboard():
     })
 
 
+@api_v2.route("/stats/overview")
+def stats_overview():
+    """Year overview counts from stats_rollup: {"year", "years", "months": {"YYYY-MM": {name: {"Sunday:Computer": n}}}}."""
+    years = rollup.years()
+    default_year = vancouver_today().year
+    if years and default_year not in years:
+        default_year = years[-1]
+    try:
+        year = int(request.args.get("year") or default_year)
+    except ValueError:
+        return jsonify({"error": "year must be a number"}), 400
+    return jsonify({"year": year, "years": years, "months": rollup.year_overview(year)})
+
+
+@api_v2.route("/stats/interactions")
+def interaction_stats():
+    """Admin: per-day button/interaction counts over raw rows and the daily rollup.
+
+    Query args: ``start`` / ``end`` (ISO dates, default the last 30 days),
+    optional ``action`` and ``person``.
+    """
+    if not _is_admin_or_manager():
+        return jsonify({"error": "Admin only"}), 403
+    try:
+        end = datetime.date.fromisoformat(request.args["end"]) if request.args.get("end") else vancouver_today()
+        start = (
+            datetime.date.fromisoformat(request.args["start"]) if request.args.get("start")
+            else end - datetime.timedelta(days=29)
+        )
+    except ValueError:
+        return jsonify({"error": "start/end must be YYYY-MM-DD"}), 400
+    counts = audit_log.interaction_counts(
+        start, end, action=request.args.get("action") or None, person_name=request.args.get("person") or None,
+    )
+    return jsonify([
+        {"date": day.isoformat(), "action": action, "person": person, "count": count}
+        for (day, action, person), count in sorted(counts.items())
+    ])
+
+
 @api_v2.route("/fairness")
 def fairness_report():
     """Get the fairness deficit report."""
@@ -1778,7 +1861,9 @@ def telegram_webhook():
     # Handle callback queries (inline button presses)
     callback_query = update.get("callback_query")
     if callback_query:
-        tg.handle_callback_query(callback_query)
+        action = (callback_query.get("data") or "").split(":", 1)[0] or "unknown"
+        with metrics.timed(metrics.TELEGRAM_CALLBACK_SECONDS, action=action):
+            tg.handle_callback_query(callback_query)
         return jsonify({"ok": True})
 
     return jsonify({"ok": True})
@@ -1989,7 +2074,6 @@ def _assignment_to_dict(assignment):
         "status": assignment.status,
         "cover": assignment.cover,
         "swapped_with": assignment.swapped_with,
-        "history": assignment.history,
         "locked": bool(getattr(assignment, "locked", False)),
     }
 
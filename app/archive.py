@@ -0,0 +1,227 @@
+"""
+Cold archive for past events.
+
+Events older than the cutoff (``ARCHIVE_AFTER_DAYS``, default two years) are
+moved with their assignments, history rows and swap requests into the
+``*_archive`` tables, so the hot tables — and every list view, calendar feed
+and ``_build_history`` scan over them — only hold recent and upcoming events.
+
+Rows keep their ids and move with INSERT ... SELECT / DELETE in a single
+transaction; ``restore_events`` is the exact inverse. Temp chat rows still
+pointing at archived assignments are stale by then and are dropped.
+
+Fairness: after every archive/restore the archived events are scanned once
+into the single-row ``fairness_baseline`` that ``_build_history`` folds in,
+so deficits, lifetime counts and month caps come out as if the events were
+still live. Expected shares in the baseline use the roster and availability
+at rebuild time, exactly like a live scan at that moment would.
+
+Read paths that should include archived events opt in explicitly: the
+leaderboard's "All Time" column and the ``?archive=1`` calendar feeds.
+
+    flask archive-events [--before YYYY-MM-DD] [--dry-run]
+    flask restore-archive [--since YYYY-MM-DD]
+"""
+import datetime
+
+import click
+from sqlalchemy.orm import aliased
+
+from .extensions import db
+from .models import (
+    Assignment, AssignmentArchive, AssignmentHistory, AssignmentHistoryArchive,
+    Event, EventArchive, FairnessBaseline, SwapRequest, SwapRequestArchive, TempChat,
+)
+from .repository import _IN_CHUNK, load_archived_events
+
+DEFAULT_ARCHIVE_AFTER_DAYS = 730
+
+# (live model, archive model, column tying a row to the batch), parents first.
+_TABLES = (
+    (Event, EventArchive, "id"),
+    (Assignment, AssignmentArchive, "event_id"),
+    (AssignmentHistory, AssignmentHistoryArchive, "assignment_id"),
+    (SwapRequest, SwapRequestArchive, "assignment_id"),
+)
+
+
+def _chunks(ids):
+    ids = sorted(ids)
+    for offset in range(0, len(ids), _IN_CHUNK):
+        yield ids[offset:offset + _IN_CHUNK]
+
+
+def _ids(model, column, values):
+    table = model.__table__
+    found = set()
+    for chunk in _chunks(values):
+        found.update(db.session.execute(db.select(table.c.id).where(table.c[column].in_(chunk))).scalars())
+    return found
+
+
+def _move(direction, event_ids, assignment_ids):
+    """Copy the batch parents-first, then delete it children-first."""
+    batch = {"id": event_ids, "event_id": event_ids, "assignment_id": assignment_ids}
+    pairs = [(live, cold, link) if direction == "archive" else (cold, live, link) for live, cold, link in _TABLES]
+    now = datetime.datetime.utcnow()
+
+    for source, target, link in pairs:
+        target_names = set(target.__table__.c.keys())
+        columns = [column for column in source.__table__.columns if column.name in target_names]
+        names = [column.name for column in columns]
+        if target is EventArchive:
+            columns.append(db.literal(now, db.DateTime).label("archived_at"))
+            names.append("archived_at")
+        for chunk in _chunks(batch[link]):
+            db.session.execute(target.__table__.insert().from_select(
+                names, db.select(*columns).where(source.__table__.c[link].in_(chunk))
+            ))
+
+    for source, _target, link in reversed(pairs):
+        for chunk in _chunks(batch[link]):
+            db.session.execute(source.__table__.delete().where(source.__table__.c[link].in_(chunk)))
+
+
+def default_cutoff():
+    from flask import current_app
+    from .utils import vancouver_today
+
+    days = int(current_app.config.get("ARCHIVE_AFTER_DAYS") or DEFAULT_ARCHIVE_AFTER_DAYS)
+    return vancouver_today() - datetime.timedelta(days=days)
+
+
+def _archivable_event_ids(cutoff):
+    """Events before ``cutoff`` whose assignments no live row outside the batch points at."""
+    event_ids = set(db.session.execute(db.select(Event.id).where(Event.date < cutoff)).scalars())
+    while event_ids:
+        pinned = set()
+        for chunk in _chunks(_ids(Assignment, "event_id", event_ids)):
+            # Redeemed orphans and auto-swap targets reference assignments by id.
+            pinned.update(db.session.execute(
+                db.select(Assignment.redeemed_for_id)
+                .where(Assignment.redeemed_for_id.in_(chunk), Assignment.event_id.not_in(event_ids))
+            ).scalars())
+            pinned.update(db.session.execute(
+                db.select(SwapRequest.future_assignment_id)
+                .join(Assignment, Assignment.id == SwapRequest.assignment_id)
+                .where(SwapRequest.future_assignment_id.in_(chunk), Assignment.event_id.not_in(event_ids))
+            ).scalars())
+        if not pinned:
+            break
+        keep = set(db.session.execute(
+            db.select(Assignment.event_id).where(Assignment.id.in_(sorted(pinned)))
+        ).scalars())
+        print(f"[Archive] Keeping {len(keep)} event(s) still referenced by live assignments")
+        event_ids -= keep
+    return event_ids
+
+
+def rebuild_baseline(roster=None):
+    """Recompute the fairness baseline from the archive tables (one scan)."""
+    from .scheduler_v2 import _new_history, _scan_events, get_roster
+
+    baseline = db.session.get(FairnessBaseline, 1)
+    events = load_archived_events()
+    if not events:
+        if baseline is not None:
+            db.session.delete(baseline)
+        return None
+
+    roster = roster if roster is not None else get_roster()
+    role_tracking, overall = _new_history(roster)
+    _scan_events(events, roster, role_tracking, overall, track_all=True)
+
+    if baseline is None:
+        baseline = FairnessBaseline(id=1)
+        db.session.add(baseline)
+    baseline.history = (role_tracking, overall)
+    baseline.archived_through = events[-1].date
+    baseline.event_count = len(events)
+    baseline.built_at = datetime.datetime.utcnow()
+    return baseline
+
+
+def archive_events(cutoff, dry_run=False):
+    """Move every event dated before ``cutoff`` into the archive. Returns the event count."""
+    try:
+        event_ids = _archivable_event_ids(cutoff)
+        if dry_run or not event_ids:
+            db.session.rollback()
+            return len(event_ids)
+
+        assignment_ids = _ids(Assignment, "event_id", event_ids)
+        swap_ids = _ids(SwapRequest, "assignment_id", assignment_ids)
+        for chunk in _chunks(assignment_ids):
+            db.session.execute(TempChat.__table__.delete().where(TempChat.assignment_id.in_(chunk)))
+        for chunk in _chunks(swap_ids):
+            db.session.execute(TempChat.__table__.delete().where(TempChat.swap_request_id.in_(chunk)))
+
+        _move("archive", event_ids, assignment_ids)
+        db.session.expire_all()
+        rebuild_baseline()
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    print(f"[Archive] Archived {len(event_ids)} event(s) / {len(assignment_ids)} assignment(s) before {cutoff}")
+    return len(event_ids)
+
+
+def restore_events(since=None):
+    """Move archived events dated on/after ``since`` (all when None) back. Returns the event count."""
+    try:
+        query = db.select(EventArchive.id)
+        if since is not None:
+            query = query.where(EventArchive.date >= since)
+        event_ids = set(db.session.execute(query).scalars())
+        if not event_ids:
+            return 0
+        assignment_ids = _ids(AssignmentArchive, "event_id", event_ids)
+
+        _move("restore", event_ids, assignment_ids)
+
+        # Assignments deleted while these were archived can't be referenced again.
+        live = aliased(Assignment)
+        for chunk in _chunks(assignment_ids):
+            db.session.execute(
+                Assignment.__table__.update()
+                .where(Assignment.id.in_(chunk), Assignment.redeemed_for_id.is_not(None),
+                       Assignment.redeemed_for_id.not_in(db.select(live.id)))
+                .values(redeemed_for_id=None)
+            )
+            db.session.execute(
+                SwapRequest.__table__.update()
+                .where(SwapRequest.assignment_id.in_(chunk), SwapRequest.future_assignment_id.is_not(None),
+                       SwapRequest.future_assignment_id.not_in(db.select(live.id)))
+                .values(future_assignment_id=None)
+            )
+        db.session.expire_all()
+        rebuild_baseline()
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    print(f"[Archive] Restored {len(event_ids)} event(s) / {len(assignment_ids)} assignment(s)")
+    return len(event_ids)
+
+
+def init_app(app):
+    """Register ``flask archive-events`` and ``flask restore-archive``."""
+
+    @app.cli.command("archive-events")
+    @click.option("--before", type=click.DateTime(formats=["%Y-%m-%d"]),
+                  help="Archive events dated before this day (default: ARCHIVE_AFTER_DAYS ago).")
+    @click.option("--dry-run", is_flag=True, help="Only report how many events would move.")
+    def archive_events_command(before, dry_run):
+        """Move old events into the cold archive tables."""
+        cutoff = before.date() if before else default_cutoff()
+        count = archive_events(cutoff, dry_run=dry_run)
+        if dry_run:
+            print(f"[Archive] {count} event(s) before {cutoff} would be archived")
+
+    @app.cli.command("restore-archive")
+    @click.option("--since", type=click.DateTime(formats=["%Y-%m-%d"]),
+                  help="Only restore events dated on/after this day (default: everything).")
+    def restore_archive_command(since):
+        """Move archived events back into the live tables."""
+        restore_events(since.date() if since else None)
@@ -0,0 +1,311 @@
+"""
+Buffered InteractionLog writer for audit rows that ride on no state change.
+
+Taps like ``noop``, ``weekly_back`` or ``weekly_confirm_tap`` only record that
+a button was pressed, yet each used to cost its own commit (an fsync on
+SQLite) on the webhook thread. ``AuditLogWriter.write`` queues the row in
+memory; a background thread inserts the queue with ``bulk_insert_mappings``
+every ``AUDIT_LOG_BATCH_SIZE`` rows or ``AUDIT_LOG_FLUSH_MS`` milliseconds,
+whichever comes first, and once more at shutdown.
+
+Rows that accompany a state change (confirm, decline, pickup, ...) still go
+through ``db.session`` and the caller's commit, so they can't outlive or
+precede the change they describe.
+
+``AUDIT_LOG_SYNC`` (on under ``TESTING``) writes each row immediately on the
+calling thread instead, and apps that never called ``init_app`` get that same
+synchronous path. When the queue is full (``AUDIT_LOG_MAX_PENDING``) or a
+batch insert fails, rows are dropped and counted rather than blocking a
+callback.
+
+Retention: ``roll_up`` folds raw rows older than
+``INTERACTION_LOG_RETENTION_DAYS`` into per-day ``(day, action, person)``
+counts in ``interaction_log_daily`` and deletes them, a few days per commit.
+It runs as the nightly ``interaction_log_retention`` job and as
+``flask interaction-log-rollup``; ``interaction_counts`` reads both tiers.
+"""
+import datetime
+import threading
+
+from sqlalchemy import bindparam, func
+
+from . import metrics
+from .extensions import db
+from .models import InteractionLog, InteractionLogDaily
+
+DEFAULT_BATCH_SIZE = 50
+DEFAULT_FLUSH_MS = 500
+DEFAULT_MAX_PENDING = 10000
+DEFAULT_RETENTION_DAYS = 180
+# Days folded per transaction, so a first run over a large backlog doesn't
+# hold the write lock for the whole table.
+ROLLUP_CHUNK_DAYS = 7
+
+
+class AuditLogWriter:
+    def __init__(self, app, batch_size=DEFAULT_BATCH_SIZE, flush_ms=DEFAULT_FLUSH_MS,
+                 max_pending=DEFAULT_MAX_PENDING, synchronous=False):
+        self.app = app
+        self.batch_size = max(int(batch_size), 1)
+        self.flush_interval = max(float(flush_ms), 1.0) / 1000
+        self.max_pending = max(int(max_pending), self.batch_size)
+        self.synchronous = synchronous
+        self.flushed = 0
+        self.dropped = 0
+        self._pending = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def write(self, **fields):
+        """Queue one InteractionLog row (``timestamp`` defaults to now)."""
+        fields.setdefault("timestamp", datetime.datetime.utcnow())
+        if self.synchronous:
+            self._insert([fields])
+            return
+        with self._lock:
+            if len(self._pending) >= self.max_pending:
+                self._count_dropped(1, "queue_full")
+                return
+            self._pending.append(fields)
+            full = len(self._pending) >= self.batch_size
+        if full:
+            self._wake.set()
+
+    def pending(self):
+        with self._lock:
+            return len(self._pending)
+
+    def flush(self):
+        """Insert everything queued so far. Returns the number of rows written."""
+        with self._flush_lock:
+            with self._lock:
+                rows, self._pending = self._pending, []
+            if not rows:
+                return 0
+            with self.app.app_context():
+                try:
+                    return self._insert(rows)
+                finally:
+                    db.session.remove()
+
+    def _insert(self, rows):
+        try:
+            db.session.bulk_insert_mappings(InteractionLog, rows)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            self._count_dropped(len(rows), "insert_failed")
+            print(f"[AuditLog] Dropped {len(rows)} interaction log row(s): {e}")
+            return 0
+        self.flushed += len(rows)
+        metrics.AUDIT_LOG_FLUSHED.inc(len(rows))
+        return len(rows)
+
+    def _count_dropped(self, count, reason):
+        self.dropped += count
+        metrics.AUDIT_LOG_DROPPED.inc(count, reason=reason)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def start(self):
+        if self.synchronous or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="audit-log", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the flush thread and write whatever is still queued."""
+        self._stop.set()
+        self._wake.set()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=5)
+        self._thread = None
+        self.flush()
+
+
+def get_writer(app):
+    return app.extensions.get("audit_log")
+
+
+def write(app=None, **fields):
+    """Record an InteractionLog row through the app's writer.
+
+    Without a writer (``init_app`` not called) the row is inserted and
+    committed right away, as before buffering existed.
+    """
+    from flask import current_app
+
+    app = app or current_app._get_current_object()
+    writer = get_writer(app)
+    if writer is None:
+        db.session.add(InteractionLog(**fields))
+        db.session.commit()
+        return
+    writer.write(**fields)
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# Retention
+# ═══════════════════════════════════════════════════════════════════════════
+
+def _as_date(value):
+    # func.date() is a string on SQLite and a date on PostgreSQL.
+    return value if isinstance(value, datetime.date) else datetime.date.fromisoformat(str(value))
+
+
+def retention_cutoff(retention_days=None, today=None):
+    """Midnight (UTC) before which raw rows are rolled up."""
+    from flask import current_app
+
+    if retention_days is None:
+        retention_days = int(current_app.config.get("INTERACTION_LOG_RETENTION_DAYS", DEFAULT_RETENTION_DAYS))
+    today = today or datetime.datetime.utcnow().date()
+    return datetime.datetime.combine(today - datetime.timedelta(days=retention_days), datetime.time.min)
+
+
+def _roll_up_range(start, end):
+    day = func.date(InteractionLog.timestamp)
+    in_range = (InteractionLog.timestamp >= start, InteractionLog.timestamp < end)
+    counts = {}
+    grouped = (
+        db.session.query(day, InteractionLog.action, InteractionLog.person_name, func.count())
+        .filter(*in_range)
+        .group_by(day, InteractionLog.action, InteractionLog.person_name)
+    )
+    for day_value, action, person_name, count in grouped:
+        key = (_as_date(day_value), action or "", person_name or "")
+        counts[key] = counts.get(key, 0) + count
+    if not counts:
+        return 0
+
+    existing = {
+        (row.day, row.action, row.person_name): (row.id, row.count)
+        for row in db.session.query(
+            InteractionLogDaily.id, InteractionLogDaily.day, InteractionLogDaily.action,
+            InteractionLogDaily.person_name, InteractionLogDaily.count,
+        ).filter(InteractionLogDaily.day >= start.date(), InteractionLogDaily.day < end.date())
+    }
+    table = InteractionLogDaily.__table__
+    inserts, updates = [], []
+    for (day_value, action, person_name), count in counts.items():
+        if (day_value, action, person_name) in existing:
+            row_id, previous = existing[(day_value, action, person_name)]
+            updates.append({"row_id": row_id, "new_count": previous + count})
+        else:
+            inserts.append({"day": day_value, "action": action, "person_name": person_name, "count": count})
+    if inserts:
+        db.session.execute(table.insert(), inserts)
+    if updates:
+        db.session.execute(
+            table.update().where(table.c.id == bindparam("row_id")).values(count=bindparam("new_count")),
+            updates,
+        )
+    return InteractionLog.query.filter(*in_range).delete(synchronize_session=False)
+
+
+def roll_up(before=None, chunk_days=ROLLUP_CHUNK_DAYS):
+    """Fold raw rows older than ``before`` into daily counts and delete them.
+
+    ``before`` defaults to ``retention_cutoff()``. Each chunk of days is
+    counted and deleted in one transaction, so an interrupted run never
+    double-counts. Returns the number of raw rows folded.
+    """
+    before = before or retention_cutoff()
+    first = db.session.query(func.min(InteractionLog.timestamp)).filter(InteractionLog.timestamp < before).scalar()
+    if first is None:
+        return 0
+    folded = 0
+    start = datetime.datetime.combine(first.date(), datetime.time.min)
+    while start < before:
+        end = min(start + datetime.timedelta(days=chunk_days), before)
+        try:
+            folded += _roll_up_range(start, end)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        start = end
+    return folded
+
+
+def rename_person(old_name, new_name):
+    """Move ``old_name``'s daily counts to ``new_name``. Returns the rows touched.
+
+    Where ``new_name`` already has a row for the same (day, action) — e.g. a
+    first-name fallback logged before a member was renamed to it — the counts
+    are added to that row instead, since the key is unique.
+    """
+    source = InteractionLogDaily.query.filter(InteractionLogDaily.person_name == old_name).all()
+    if not source:
+        return 0
+    targets = {
+        (row.day, row.action): row
+        for row in InteractionLogDaily.query.filter(
+            InteractionLogDaily.person_name == new_name,
+            InteractionLogDaily.day.in_({row.day for row in source}),
+        )
+    }
+    for row in source:
+        target = targets.get((row.day, row.action))
+        if target is not None:
+            target.count += row.count
+            db.session.delete(row)
+        else:
+            row.person_name = new_name
+    return len(source)
+
+
+def interaction_counts(start, end, action=None, person_name=None):
+    """``{(day, action, person_name): count}`` for ``start..end`` (UTC days, inclusive).
+
+    Reads raw rows and the daily rollup; a day is only ever in one of them.
+    """
+    counts = {}
+    day = func.date(InteractionLog.timestamp)
+    raw = db.session.query(day, InteractionLog.action, InteractionLog.person_name, func.count()).filter(
+        InteractionLog.timestamp >= datetime.datetime.combine(start, datetime.time.min),
+        InteractionLog.timestamp < datetime.datetime.combine(end + datetime.timedelta(days=1), datetime.time.min),
+    )
+    rolled = db.session.query(
+        InteractionLogDaily.day, InteractionLogDaily.action, InteractionLogDaily.person_name, InteractionLogDaily.count,
+    ).filter(InteractionLogDaily.day >= start, InteractionLogDaily.day <= end)
+    if action is not None:
+        raw = raw.filter(InteractionLog.action == action)
+        rolled = rolled.filter(InteractionLogDaily.action == action)
+    if person_name is not None:
+        raw = raw.filter(InteractionLog.person_name == person_name)
+        rolled = rolled.filter(InteractionLogDaily.person_name == person_name)
+    raw = raw.group_by(day, InteractionLog.action, InteractionLog.person_name)
+    for day_value, row_action, row_person, count in list(raw) + list(rolled):
+        key = (_as_date(day_value), row_action or "", row_person or "")
+        counts[key] = counts.get(key, 0) + count
+    return counts
+
+
+def init_app(app):
+    """Start the buffered writer and register ``flask interaction-log-rollup``."""
+
+    @app.cli.command("interaction-log-rollup")
+    def rollup_command():
+        """Fold interaction_log rows past retention into interaction_log_daily."""
+        folded = roll_up()
+        print(f"[AuditLog] Rolled up {folded} interaction log row(s)")
+
+    synchronous = bool(app.config.get("AUDIT_LOG_SYNC") or app.config.get("TESTING"))
+    writer = AuditLogWriter(
+        app,
+        batch_size=app.config.get("AUDIT_LOG_BATCH_SIZE", DEFAULT_BATCH_SIZE),
+        flush_ms=app.config.get("AUDIT_LOG_FLUSH_MS", DEFAULT_FLUSH_MS),
+        max_pending=app.config.get("AUDIT_LOG_MAX_PENDING", DEFAULT_MAX_PENDING),
+        synchronous=synchronous,
+    )
+    app.extensions["audit_log"] = writer
+    writer.start()
+    return writer
@@ -0,0 +1,79 @@
+"""
+In-process Telegram identity map: telegram_user_id -> TeamMember name.
+
+Every webhook callback and every ``/auth/telegram-login`` resolves the
+sender. Instead of querying ``team_member`` per request, one query loads every
+member's (name, telegram_user_id) into a ``VersionedCache`` on the
+``team_member`` key, so any committed TeamMember write — apply-role-settings,
+a rename, a delete, an auto-link below — drops it in this worker and, via
+``data_version``, in the others. Unknown ids are answered from the same map,
+so a negative lookup costs no query either.
+
+Without the ``data_version`` table nothing would invalidate the map, so it's
+rebuilt per call in that case (the old per-request cost, never stale).
+"""
+from flask import current_app
+
+from .extensions import db
+from .invalidation import VersionedCache, get_bus
+from .models import TeamMember
+
+
+class IdentityMap:
+    """Snapshot of who is linked to which Telegram account."""
+
+    def __init__(self, rows):
+        self.by_telegram_id = {}
+        self.members = []  # (name, linked) in id order
+        for name, telegram_user_id in rows:
+            if telegram_user_id:
+                self.by_telegram_id.setdefault(str(telegram_user_id), name)
+            self.members.append((name, bool(telegram_user_id)))
+
+    def name_for(self, telegram_user_id):
+        return self.by_telegram_id.get(str(telegram_user_id)) if telegram_user_id else None
+
+    def unlinked_match(self, name):
+        """An unlinked member called ``name``: exact match first, then case-insensitive."""
+        unlinked = [member for member, linked in self.members if not linked]
+        if name in unlinked:
+            return name
+        lowered = name.lower()
+        return next((member for member in unlinked if member.lower() == lowered), None)
+
+    def name_match(self, name):
+        """Any member whose name matches ``name`` case-insensitively."""
+        lowered = name.lower()
+        return next((member for member, _linked in self.members if member.lower() == lowered), None)
+
+
+def _load():
+    rows = db.session.query(TeamMember.name, TeamMember.telegram_user_id).order_by(TeamMember.id).all()
+    return IdentityMap(rows)
+
+
+def _cache():
+    app = current_app._get_current_object()
+    cache = app.extensions.get("identity_cache")
+    if cache is None:
+        bus = get_bus(app)
+        cache = VersionedCache(app, "team_member") if bus._versions is not None else False
+        app.extensions["identity_cache"] = cache
+    return cache
+
+
+def identity_map():
+    cache = _cache()
+    if not cache:
+        return _load()
+    return cache.get_or_set("identity", _load)
+
+
+def link(name, telegram_user_id):
+    """Link an unlinked member to ``telegram_user_id`` and commit; the commit drops the map."""
+    member = TeamMember.query.filter_by(name=name, telegram_user_id=None).first()
+    if not member:
+        return False
+    member.telegram_user_id = str(telegram_user_id)
+    db.session.commit()
+    return True
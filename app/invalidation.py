@@ -0,0 +1,302 @@
+"""
+Cross-worker invalidation for in-process caches.
+
+Every committed write bumps a per-table counter in the ``data_version`` table
+inside the writer's own transaction (no extra commit). Each process keeps an
+``InvalidationBus`` that notices those bumps and clears the caches registered
+for the affected keys:
+
+- SQLite: ``PRAGMA data_version`` on a dedicated read-only connection tells us
+  cheaply whether *any* connection committed; only then is the counter table
+  read to see which keys moved.
+- PostgreSQL: writers also ``pg_notify`` the key and a listener thread applies
+  it immediately (falls back to polling the table if LISTEN isn't available).
+- Anything else: the counter table is polled at most every
+  ``CACHE_POLL_INTERVAL`` seconds.
+
+Keys are table names (``team_member``, ``event``, ``assignment``, ...). Cache
+consumers register by key prefix:
+
+    roster_cache = VersionedCache(app, "team_member")
+    names = roster_cache.get_or_set("names", lambda: [...])
+
+Commits in the same process invalidate local caches immediately via the
+``after_commit`` hook.
+"""
+import select
+import sqlite3
+import threading
+import time
+
+from sqlalchemy import event as sa_event
+from sqlalchemy.orm import Session
+
+from .extensions import db
+
+NOTIFY_CHANNEL = "data_version"
+
+# Bookkeeping tables whose writes never invalidate cached data.
+_IGNORED_TABLES = {"data_version", "schema_version", "scheduler_lease"}
+
+_buses = {}  # engine -> InvalidationBus
+_listeners_installed = False
+
+
+def _data_version_table():
+    from .models import DataVersion
+    return DataVersion.__table__
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# Writer side: bump counters in the writing transaction
+# ═══════════════════════════════════════════════════════════════════════════
+
+def _pending(session):
+    return session.info.setdefault("data_version_pending", set())
+
+
+def _bumped(session):
+    return session.info.setdefault("data_version_bumped", set())
+
+
+def _bump_pending(session):
+    pending = _pending(session) - _bumped(session)
+    session.info["data_version_pending"] = set()
+    if not pending:
+        return
+    conn = session.connection()
+    table = _data_version_table()
+    conn.execute(
+        table.update()
+        .where(table.c.key.in_(sorted(pending)))
+        .values(version=table.c.version + 1)
+    )
+    if conn.dialect.name == "postgresql":
+        for key in sorted(pending):
+            conn.exec_driver_sql("SELECT pg_notify(%s, %s)", (NOTIFY_CHANNEL, key))
+    _bumped(session).update(pending)
+    session.info["data_version_engine"] = conn.engine
+
+
+def _after_flush(session, flush_context):
+    touched = _pending(session)
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        table = getattr(obj, "__table__", None)
+        if table is not None and table.name not in _IGNORED_TABLES:
+            touched.add(table.name)
+    _bump_pending(session)
+
+
+def _do_orm_execute(orm_execute_state):
+    # Query.update()/delete() and bulk statements bypass the flush.
+    if orm_execute_state.is_update or orm_execute_state.is_delete:
+        table = getattr(orm_execute_state.statement, "table", None)
+        if table is not None and table.name not in _IGNORED_TABLES:
+            _pending(orm_execute_state.session).add(table.name)
+
+
+def _before_commit(session):
+    if session.info.get("data_version_pending"):
+        _bump_pending(session)
+
+
+def _after_commit(session):
+    keys = session.info.pop("data_version_bumped", set())
+    engine = session.info.pop("data_version_engine", None)
+    session.info.pop("data_version_pending", None)
+    bus = _buses.get(engine)
+    if keys and bus is not None:
+        bus.invalidate(keys)
+
+
+def _after_rollback(session):
+    session.info.pop("data_version_bumped", None)
+    session.info.pop("data_version_engine", None)
+    session.info.pop("data_version_pending", None)
+
+
+def _install_listeners():
+    global _listeners_installed
+    if _listeners_installed:
+        return
+    sa_event.listen(Session, "after_flush", _after_flush)
+    sa_event.listen(Session, "do_orm_execute", _do_orm_execute)
+    sa_event.listen(Session, "before_commit", _before_commit)
+    sa_event.listen(Session, "after_commit", _after_commit)
+    sa_event.listen(Session, "after_soft_rollback", lambda session, previous_transaction: _after_rollback(session))
+    _listeners_installed = True
+
+
+def seed_keys(table_names=None):
+    """Make sure every table has a counter row (run by migrations)."""
+    table = _data_version_table()
+    names = set(table_names or db.metadata.tables) - _IGNORED_TABLES
+    existing = {row.key for row in db.session.execute(db.select(table.c.key))}
+    missing = sorted(names - existing)
+    if missing:
+        db.session.execute(table.insert(), [{"key": key, "version": 0} for key in missing])
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# Reader side
+# ═══════════════════════════════════════════════════════════════════════════
+
+class InvalidationBus:
+    """Per-process hub: detects remote bumps and fans out to registered caches."""
+
+    def __init__(self, app, engine):
+        self.app = app
+        self.engine = engine
+        self.poll_interval = float(app.config.get("CACHE_POLL_INTERVAL", 1.0))
+        self._callbacks = []
+        self._lock = threading.Lock()
+        self._versions = None
+        self._last_poll = 0.0
+        self._sqlite_conn = None
+        self._sqlite_data_version = None
+        self._listening = False
+        self.invalidations = 0
+
+        if engine.dialect.name == "sqlite" and engine.url.database not in (None, "", ":memory:"):
+            self._sqlite_conn = sqlite3.connect(engine.url.database, check_same_thread=False)
+            self._sqlite_changed()
+        elif engine.dialect.name == "postgresql":
+            self._start_pg_listener()
+        self._versions = self._read_versions()
+
+    # ── registration ──
+    def register(self, prefix, callback):
+        """Call `callback(keys)` whenever a key starting with `prefix` changes."""
+        prefixes = (prefix,) if isinstance(prefix, str) else tuple(prefix)
+        with self._lock:
+            self._callbacks.append((prefixes, callback))
+
+    def invalidate(self, keys):
+        keys = set(keys)
+        with self._lock:
+            callbacks = list(self._callbacks)
+        for prefixes, callback in callbacks:
+            if any(key.startswith(prefix) for key in keys for prefix in prefixes):
+                self.invalidations += 1
+                try:
+                    callback(keys)
+                except Exception as e:
+                    print(f"[Cache] Invalidation callback failed: {e}")
+
+    # ── polling ──
+    def _read_versions(self):
+        table = _data_version_table()
+        try:
+            with self.engine.connect() as conn:
+                return {row.key: row.version for row in conn.execute(db.select(table.c.key, table.c.version))}
+        except Exception as e:
+            print(f"[Cache] Could not read data_version: {e}")
+            return None
+
+    def _sqlite_changed(self):
+        with self._lock:
+            value = self._sqlite_conn.execute("PRAGMA data_version").fetchone()[0]
+            changed = value != self._sqlite_data_version
+            self._sqlite_data_version = value
+        return changed
+
+    def check(self):
+        """Apply invalidations committed by other processes since the last check."""
+        if self._listening:
+            return
+        if self._sqlite_conn is not None:
+            if not self._sqlite_changed():
+                return
+        else:
+            now = time.monotonic()
+            if now - self._last_poll < self.poll_interval:
+                return
+            self._last_poll = now
+
+        versions = self._read_versions()
+        if versions is None:
+            return
+        previous, self._versions = self._versions or {}, versions
+        changed = {key for key, version in versions.items() if previous.get(key) != version}
+        if changed:
+            self.invalidate(changed)
+
+    # ── PostgreSQL LISTEN/NOTIFY ──
+    def _start_pg_listener(self):
+        try:
+            raw = self.engine.raw_connection()
+            driver_conn = raw.driver_connection
+            driver_conn.autocommit = True
+            cursor = driver_conn.cursor()
+            cursor.execute(f"LISTEN {NOTIFY_CHANNEL}")
+        except Exception as e:
+            print(f"[Cache] LISTEN unavailable, polling data_version instead: {e}")
+            return
+
+        def _listen():
+            while True:
+                try:
+                    if select.select([driver_conn], [], [], 30) == ([], [], []):
+                        continue
+                    driver_conn.poll()
+                    keys = set()
+                    while driver_conn.notifies:
+                        keys.add(driver_conn.notifies.pop(0).payload)
+                    if keys:
+                        self.invalidate(keys)
+                except Exception as e:
+                    print(f"[Cache] LISTEN connection lost, falling back to polling: {e}")
+                    self._listening = False
+                    return
+
+        self._listening = True
+        threading.Thread(target=_listen, name="cache-invalidation", daemon=True).start()
+
+
+class VersionedCache:
+    """Thread-safe dict cache cleared whenever its key prefix is invalidated."""
+
+    def __init__(self, app, prefix):
+        self.bus = get_bus(app)
+        self._data = {}
+        self._lock = threading.Lock()
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.bus.register(prefix, lambda keys: self.clear())
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._generation += 1
+
+    def get_or_set(self, key, factory):
+        self.bus.check()
+        with self._lock:
+            if key in self._data:
+                self.hits += 1
+                return self._data[key]
+            generation = self._generation
+        value = factory()
+        with self._lock:
+            self.misses += 1
+            # Don't store a value computed across an invalidation.
+            if generation == self._generation:
+                self._data[key] = value
+        return value
+
+
+def init_app(app):
+    with app.app_context():
+        bus = InvalidationBus(app, db.engine)
+    if bus._versions is None:
+        print("[Cache] data_version table missing — run `flask db-upgrade`; cache invalidation disabled")
+    else:
+        _install_listeners()
+    _buses[bus.engine] = bus
+    app.extensions["invalidation_bus"] = bus
+    return bus
+
+
+def get_bus(app):
+    return app.extensions.get("invalidation_bus") or init_app(app)
@@ -0,0 +1,39 @@
+"""
+Import-on-first-use module proxies.
+
+The web process imports ``app`` on every boot, even when Telegram, temp groups
+or the scheduler are switched off. Heavy optional modules are bound through
+``lazy_module`` so their import cost is only paid by code paths that use them:
+
+    requests = lazy_module("requests")
+    requests.post(...)  # imports requests here, once
+"""
+import importlib
+import threading
+
+
+class LazyModule:
+    """Stand-in for a module that imports it on first attribute access."""
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __repr__(self):
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<lazy module {self._name!r} ({state})>"
+
+
+def lazy_module(name):
+    return LazyModule(name)
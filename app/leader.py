@@ -0,0 +1,188 @@
+"""
+Database-backed leader lease for background jobs.
+
+Every worker (on any host) pointing at the same database competes for a
+named row in ``scheduler_lease``. The holder renews it on a heartbeat; if the
+holder dies, the lease expires after ``ttl`` seconds and the next heartbeat
+from another worker takes it over. Only the current holder runs APScheduler,
+so any number of gunicorn workers can serve requests without duplicate
+reminders.
+
+Acquire and renew are a single conditional UPDATE (plus an INSERT the very
+first time), so the database arbitrates races between workers.
+"""
+import datetime
+import os
+import socket
+import threading
+import uuid
+
+from sqlalchemy import case, or_, select
+from sqlalchemy.exc import IntegrityError
+
+from .extensions import db
+
+DEFAULT_TTL_SECONDS = 60
+
+
+def make_holder_id():
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def _utcnow():
+    return datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+
+
+def _lease_table():
+    from .models import SchedulerLease
+    return SchedulerLease.__table__
+
+
+def try_acquire(name, holder, ttl=DEFAULT_TTL_SECONDS):
+    """Acquire or renew lease `name` for `holder`. Returns True if `holder` owns it."""
+    lease = _lease_table()
+    now = _utcnow()
+    expires_at = now + datetime.timedelta(seconds=ttl)
+    with db.engine.begin() as conn:
+        updated = conn.execute(
+            lease.update()
+            .where(lease.c.name == name)
+            .where(or_(lease.c.holder == holder, lease.c.expires_at < now))
+            .values(
+                acquired_at=case((lease.c.holder == holder, lease.c.acquired_at), else_=now),
+                holder=holder,
+                renewed_at=now,
+                expires_at=expires_at,
+            )
+        ).rowcount
+    if updated:
+        return True
+    try:
+        with db.engine.begin() as conn:
+            conn.execute(lease.insert().values(
+                name=name, holder=holder, acquired_at=now, renewed_at=now, expires_at=expires_at,
+            ))
+        return True
+    except IntegrityError:
+        # Row exists and is held by someone else.
+        return False
+
+
+def release(name, holder):
+    """Expire the lease now if `holder` owns it, so a standby can take over immediately."""
+    lease = _lease_table()
+    with db.engine.begin() as conn:
+        conn.execute(
+            lease.update()
+            .where(lease.c.name == name, lease.c.holder == holder)
+            .values(expires_at=_utcnow())
+        )
+
+
+def current_holder(name):
+    """Return the live holder id for lease `name`, or None if it is free or expired."""
+    lease = _lease_table()
+    with db.engine.connect() as conn:
+        row = conn.execute(
+            select(lease.c.holder, lease.c.expires_at).where(lease.c.name == name)
+        ).first()
+    if row is None or row.expires_at < _utcnow():
+        return None
+    return row.holder
+
+
+class LeaderLease:
+    """Heartbeat thread that keeps (or waits for) a named lease.
+
+    `on_elected` runs when this process becomes the holder and `on_demoted`
+    when it loses the lease (renewal failed or another holder took over).
+    Both run on the heartbeat thread inside an app context. If `on_elected`
+    raises, this process steps down and releases the lease so another worker
+    can take over; exceptions never escape the heartbeat.
+    """
+
+    def __init__(self, app, name, ttl=DEFAULT_TTL_SECONDS, on_elected=None, on_demoted=None, holder=None):
+        self.app = app
+        self.name = name
+        self.ttl = ttl
+        self.holder = holder or make_holder_id()
+        self.on_elected = on_elected
+        self.on_demoted = on_demoted
+        self.is_leader = False
+        self._held_until = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _heartbeat(self):
+        attempt_started = _utcnow()
+        with self.app.app_context():
+            try:
+                acquired = try_acquire(self.name, self.holder, self.ttl)
+            except Exception as e:
+                print(f"[Lease] Heartbeat for {self.name} failed: {e}")
+                # Keep leadership only while our last renewal is still valid.
+                acquired = self.is_leader and self._held_until is not None and _utcnow() < self._held_until
+            finally:
+                db.session.remove()
+
+            if acquired:
+                self._held_until = attempt_started + datetime.timedelta(seconds=self.ttl)
+            if acquired and not self.is_leader:
+                self.is_leader = True
+                print(f"[Lease] {self.holder} elected for {self.name}")
+                if not self._callback(self.on_elected, "on_elected"):
+                    self._step_down()
+            elif not acquired and self.is_leader:
+                self.is_leader = False
+                self._held_until = None
+                print(f"[Lease] {self.holder} lost {self.name}")
+                self._callback(self.on_demoted, "on_demoted")
+        return self.is_leader
+
+    def _callback(self, fn, label):
+        if fn is None:
+            return True
+        try:
+            fn()
+            return True
+        except Exception as e:
+            print(f"[Lease] {label} for {self.name} failed: {e}")
+            return False
+
+    def _step_down(self):
+        """Give up a lease we can't serve (the elected callback failed)."""
+        self.is_leader = False
+        self._held_until = None
+        # Undo whatever on_elected got through before failing.
+        self._callback(self.on_demoted, "on_demoted")
+        try:
+            release(self.name, self.holder)
+        except Exception as e:
+            print(f"[Lease] Release of {self.name} failed: {e}")
+        print(f"[Lease] {self.holder} stepped down from {self.name}")
+
+    def _run(self):
+        interval = max(self.ttl / 3, 0.05)
+        while not self._stop.wait(interval):
+            self._heartbeat()
+
+    def start(self):
+        """Try once synchronously, then keep heartbeating. Returns whether we lead now."""
+        leading = self._heartbeat()
+        self._thread = threading.Thread(target=self._run, name=f"lease-{self.name}", daemon=True)
+        self._thread.start()
+        return leading
+
+    def stop(self, release_lease=True):
+        self._stop.set()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=self.ttl)
+        if self.is_leader:
+            self.is_leader = False
+            self._callback(self.on_demoted, "on_demoted")
+            if release_lease:
+                try:
+                    with self.app.app_context():
+                        release(self.name, self.holder)
+                except Exception as e:
+                    print(f"[Lease] Release of {self.name} failed: {e}")
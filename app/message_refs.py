@@ -0,0 +1,225 @@
+"""
+Stored references to the Telegram messages the bot keeps editing.
+
+One ``telegram_message_ref`` row per (kind, anchor_date, entity_id):
+
+    weekly_schedule  the week's group schedule post, anchored on its Monday
+    event_reminder   an event's 9 AM group post (entity = Event id)
+    swap_notice      a coverage request / auto-swap notice (entity = SwapRequest id)
+
+Weekly schedule refs are written by ``register``. Event reminders and swap
+notices keep their ``telegram_message_id`` / ``telegram_chat_id`` columns
+(the callback handlers read those directly); mapper events mirror every
+change of those columns into this table at flush, the same coalesced
+session-level pattern as the rollup in rollup.py, so there's no call site to
+forget.
+
+``content_hash`` is the sha256 of the text + keyboard the message was sent
+with (NULL for backfilled rows and pointers set without a render). Refresh
+edits don't touch it: callback paths edit these messages without a commit
+of their own, so it can't be kept exact after sending.
+"""
+import datetime
+import hashlib
+import json
+
+from sqlalchemy import event as sa_event
+from sqlalchemy import inspect as sa_inspect
+from sqlalchemy.orm import Session
+
+from .extensions import db
+from .models import Event, InteractionLog, SwapRequest, TelegramMessageRef
+
+WEEKLY_SCHEDULE = "weekly_schedule"
+EVENT_REMINDER = "event_reminder"
+SWAP_NOTICE = "swap_notice"
+
+# Refs anchored further back than this are dropped by prune().
+KEEP_DAYS = 60
+
+_POINTER_FIELDS = ("telegram_message_id", "telegram_chat_id")
+
+
+def content_hash(text, reply_markup=None):
+    payload = json.dumps([text or "", reply_markup], sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def get(kind, anchor_date=None, entity_id=None):
+    """The ref for an entity (by id) or for a weekly anchor date; None if never sent."""
+    query = TelegramMessageRef.query.filter(TelegramMessageRef.kind == kind)
+    if entity_id is not None:
+        query = query.filter(TelegramMessageRef.entity_id == entity_id)
+    else:
+        query = query.filter(TelegramMessageRef.anchor_date == anchor_date, TelegramMessageRef.entity_id == 0)
+    return query.first()
+
+
+def register(kind, anchor_date, chat_id, message_id, text=None, reply_markup=None):
+    """Point the ``(kind, anchor_date)`` ref at a freshly sent message."""
+    ref = get(kind, anchor_date=anchor_date)
+    if ref is None:
+        ref = TelegramMessageRef(kind=kind, anchor_date=anchor_date, entity_id=0)
+        db.session.add(ref)
+    ref.chat_id = str(chat_id)
+    ref.message_id = int(message_id)
+    ref.content_hash = content_hash(text, reply_markup) if text is not None else None
+    return ref
+
+
+def note_content(chat_id, message_id, text, reply_markup=None):
+    """Content of a just-sent message whose ref the pointer mirror creates at the next flush."""
+    if chat_id and message_id:
+        db.session.info.setdefault("message_ref_content", {})[(str(chat_id), int(message_id))] = \
+            content_hash(text, reply_markup)
+
+
+def prune(before=None):
+    """Drop refs anchored before ``before`` (default: KEEP_DAYS ago). Returns the count."""
+    from .utils import vancouver_today
+
+    before = before or vancouver_today() - datetime.timedelta(days=KEEP_DAYS)
+    return TelegramMessageRef.query.filter(TelegramMessageRef.anchor_date < before) \
+        .delete(synchronize_session=False)
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# Event / SwapRequest pointer mirror
+# ═══════════════════════════════════════════════════════════════════════════
+
+def _kind_and_anchor(target):
+    if isinstance(target, Event):
+        return EVENT_REMINDER, target.date
+    return SWAP_NOTICE, target.event_date
+
+
+def _mark(target, deleted=False):
+    session = sa_inspect(target).session
+    if session is None or target.id is None:
+        return
+    kind, anchor_date = _kind_and_anchor(target)
+    pointer = None
+    if not deleted and target.telegram_message_id and target.telegram_chat_id and anchor_date:
+        pointer = (anchor_date, str(target.telegram_chat_id), int(target.telegram_message_id))
+    session.info.setdefault("message_ref_sync", {})[(kind, target.id)] = pointer
+
+
+def _mark_inserted(mapper, connection, target):
+    if target.telegram_message_id:
+        _mark(target)
+
+
+def _mark_updated(mapper, connection, target):
+    state = sa_inspect(target)
+    if any(state.attrs[field].history.has_changes() for field in _POINTER_FIELDS):
+        _mark(target)
+
+
+def _mark_deleted(mapper, connection, target):
+    _mark(target, deleted=True)
+
+
+def _after_flush(session, flush_context):
+    pending = session.info.pop("message_ref_sync", None)
+    if not pending:
+        return
+    hashes = session.info.get("message_ref_content", {})
+    table = TelegramMessageRef.__table__
+    connection = session.connection()
+    now = datetime.datetime.utcnow()
+    for (kind, entity_id), pointer in sorted(pending.items()):
+        connection.execute(table.delete().where(table.c.kind == kind, table.c.entity_id == entity_id))
+        if pointer is None:
+            continue
+        anchor_date, chat_id, message_id = pointer
+        connection.execute(table.insert().values(
+            kind=kind, anchor_date=anchor_date, entity_id=entity_id, chat_id=chat_id,
+            message_id=message_id, content_hash=hashes.pop((chat_id, message_id), None), updated_at=now,
+        ))
+
+
+def _discard(session, *args):
+    session.info.pop("message_ref_sync", None)
+    session.info.pop("message_ref_content", None)
+
+
+for _model in (Event, SwapRequest):
+    sa_event.listen(_model, "after_insert", _mark_inserted)
+    sa_event.listen(_model, "after_update", _mark_updated)
+    sa_event.listen(_model, "after_delete", _mark_deleted)
+sa_event.listen(Session, "after_flush", _after_flush)
+sa_event.listen(Session, "after_commit", _discard)
+sa_event.listen(Session, "after_soft_rollback", _discard)
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# Backfill
+# ═══════════════════════════════════════════════════════════════════════════
+
+def parse_weekly_schedule_details(details):
+    """(monday, chat_id, message_id) from a legacy ``weekly_schedule_sent`` log line."""
+    parts = {}
+    monday = None
+    for chunk in (details or "").split("|"):
+        if chunk.startswith("weekly_schedule:"):
+            try:
+                monday = datetime.date.fromisoformat(chunk.split(":", 1)[1].strip())
+            except ValueError:
+                monday = None
+        elif "=" in chunk:
+            key, value = chunk.split("=", 1)
+            parts[key.strip()] = value.strip()
+    try:
+        message_id = int(parts["message_id"]) if parts.get("message_id") else None
+    except (TypeError, ValueError):
+        message_id = None
+    return monday, parts.get("chat_id"), message_id
+
+
+def backfill():
+    """Create refs for messages recorded before this table existed. Returns the count."""
+    rows = {}
+    logs = (
+        db.session.query(InteractionLog.event_date, InteractionLog.details)
+        .filter(InteractionLog.action == "weekly_schedule_sent")
+        .order_by(InteractionLog.id)
+    )
+    for event_date, details in logs:
+        monday, chat_id, message_id = parse_weekly_schedule_details(details)
+        monday = monday or event_date
+        if monday and chat_id and message_id:
+            rows[(WEEKLY_SCHEDULE, monday, 0)] = (chat_id, message_id)
+
+    for model in (Event, SwapRequest):
+        anchor = model.date if model is Event else model.event_date
+        pointers = db.session.query(model.id, anchor, model.telegram_chat_id, model.telegram_message_id).filter(
+            model.telegram_message_id.isnot(None), model.telegram_chat_id.isnot(None), anchor.isnot(None),
+        )
+        kind = EVENT_REMINDER if model is Event else SWAP_NOTICE
+        for entity_id, anchor_date, chat_id, message_id in pointers:
+            rows[(kind, anchor_date, entity_id)] = (str(chat_id), message_id)
+
+    existing = set(db.session.query(
+        TelegramMessageRef.kind, TelegramMessageRef.anchor_date, TelegramMessageRef.entity_id,
+    ))
+    now = datetime.datetime.utcnow()
+    values = [
+        {"kind": kind, "anchor_date": anchor_date, "entity_id": entity_id,
+         "chat_id": chat_id, "message_id": message_id, "updated_at": now}
+        for (kind, anchor_date, entity_id), (chat_id, message_id) in sorted(rows.items())
+        if (kind, anchor_date, entity_id) not in existing
+    ]
+    if values:
+        db.session.execute(TelegramMessageRef.__table__.insert(), values)
+    return len(values)
+
+
+def init_app(app):
+    """Register ``flask message-refs-backfill``."""
+
+    @app.cli.command("message-refs-backfill")
+    def backfill_command():
+        """Create refs for weekly logs, event reminders and swap notices without one."""
+        created = backfill()
+        db.session.commit()
+        print(f"[MessageRefs] Backfilled {created} ref(s)")
@@ -0,0 +1,218 @@
+"""
+In-process metrics registry exposed in Prometheus text format at /metrics.
+
+No external service: counters and histograms live in this process and are
+rendered on scrape. With several gunicorn workers each worker keeps its own
+numbers, so a scrape reports the worker that answered it.
+
+    from . import metrics
+    metrics.TELEGRAM_API_SECONDS.observe(0.21, method="sendMessage")
+    with metrics.timed(metrics.SCHEDULER_PHASE_SECONDS, phase="build_history"):
+        ...
+"""
+import bisect
+import contextlib
+import functools
+import threading
+import time
+
+from flask import g, request
+
+from . import profiling
+
+# Latency buckets in seconds, from fast SQL to slow Telegram round-trips.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(key, extra=None):
+    pairs = list(key) + (list(extra.items()) if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, documentation):
+        self.name = name
+        self.documentation = documentation
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(_label_key(labels), 0)
+
+    def render(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(key)} {value}" for key, value in items]
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, documentation, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        self._series = {}  # label key -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = _label_key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def count(self, **labels):
+        series = self._series.get(_label_key(labels))
+        return series[-1] if series else 0
+
+    def render(self):
+        with self._lock:
+            items = sorted((key, list(series)) for key, series in self._series.items())
+        lines = []
+        for key, series in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, series):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{_format_labels(key, {'le': bound})} {cumulative}")
+            lines.append(f"{self.name}_bucket{_format_labels(key, {'le': '+Inf'})} {series[-1]}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {series[-2]:.6f}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {series[-1]}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def counter(name, documentation):
+    return REGISTRY.register(Counter(name, documentation))
+
+
+def histogram(name, documentation, buckets=DEFAULT_BUCKETS):
+    return REGISTRY.register(Histogram(name, documentation, buckets))
+
+
+# ── Metrics ──────────────────────────────────────────────────────────
+HTTP_REQUEST_SECONDS = histogram(
+    "livestream_http_request_duration_seconds", "HTTP request latency by route, method and status.")
+HTTP_SQL_SECONDS = histogram(
+    "livestream_http_sql_duration_seconds", "Total SQL time per HTTP request by route.")
+HTTP_SQL_QUERIES = histogram(
+    "livestream_http_sql_queries", "SQL statements per HTTP request by route.", COUNT_BUCKETS)
+TELEGRAM_API_SECONDS = histogram(
+    "livestream_telegram_api_duration_seconds", "Telegram Bot API call latency by method.")
+TELEGRAM_API_ERRORS = counter(
+    "livestream_telegram_api_errors_total", "Failed Telegram Bot API calls by method and error code.")
+TELEGRAM_CALLBACK_SECONDS = histogram(
+    "livestream_telegram_callback_duration_seconds", "Webhook callback handling time by button action.")
+JOB_SECONDS = histogram(
+    "livestream_job_duration_seconds", "APScheduler job run time by job id.")
+JOB_SQL_QUERIES = histogram(
+    "livestream_job_sql_queries", "SQL statements per APScheduler job run.", COUNT_BUCKETS)
+JOB_MISFIRES = counter(
+    "livestream_job_misfires_total", "APScheduler runs skipped because they missed their grace time.")
+JOB_ERRORS = counter(
+    "livestream_job_errors_total", "APScheduler job runs that raised.")
+SCHEDULER_PHASE_SECONDS = histogram(
+    "livestream_scheduler_phase_duration_seconds", "Scheduling engine phase timings.")
+SWEEP_SECONDS = histogram(
+    "livestream_sweep_duration_seconds", "Telegram sweep run time by sweep and phase (prefetch, telegram, commit, total).")
+SWEEP_ITEMS = counter(
+    "livestream_sweep_items_total", "Messages / swaps handled by Telegram sweeps.")
+ADMIN_NOTIFICATIONS = counter(
+    "livestream_admin_notifications_total", "Admin DM notifications by outcome (sent, merged, dropped, rejected).")
+AUDIT_LOG_FLUSHED = counter(
+    "livestream_audit_log_flushed_total", "InteractionLog rows written by the buffered audit-log writer.")
+AUDIT_LOG_DROPPED = counter(
+    "livestream_audit_log_dropped_total", "Buffered InteractionLog rows dropped, by reason.")
+
+
+@contextlib.contextmanager
+def timed(metric, **labels):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metric.observe(time.perf_counter() - started, **labels)
+
+
+def timed_phase(phase):
+    """Decorator: record a scheduling engine entry point under `phase`.
+
+    Also opens a profiling span of the same name when a profile is active.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with timed(SCHEDULER_PHASE_SECONDS, phase=phase), profiling.span(phase):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def render():
+    return REGISTRY.render()
+
+
+def init_app(app):
+    """Record latency, SQL time and SQL count for every request."""
+
+    @app.before_request
+    def _start_request_timer():
+        g._metrics_started = time.perf_counter()
+
+    @app.after_request
+    def _observe_request(response):
+        started = g.pop("_metrics_started", None)
+        if started is None:
+            return response
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        HTTP_REQUEST_SECONDS.observe(
+            time.perf_counter() - started,
+            route=route, method=request.method, status=response.status_code,
+        )
+        stats = g.get("sqlstats")
+        if stats is not None:
+            HTTP_SQL_SECONDS.observe(stats.total_ms / 1000, route=route)
+            HTTP_SQL_QUERIES.observe(stats.count, route=route)
+        return response
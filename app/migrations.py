@@ -0,0 +1,251 @@
+"""
+Versioned schema migrations.
+
+Every step in MIGRATIONS runs exactly once, in order, and the last applied
+step is stored in the single-row ``schema_version`` table. A boot against an
+up-to-date database only reads that row; introspection, ALTERs and backfills
+happen while upgrading.
+
+Upgrades run automatically on the first boot after a deploy (under a file
+lock so concurrent workers don't race) or explicitly via ``flask db-upgrade``.
+
+Adding a migration: append ``(next_number, "description", function)`` to
+MIGRATIONS. ``db.create_all()`` runs before pending steps, so brand-new tables
+already exist when a step runs; steps only need to handle existing tables.
+"""
+import contextlib
+import json
+import os
+from datetime import datetime
+
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import OperationalError, ProgrammingError
+
+from .extensions import db
+
+LOCK_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), ".migrate.lock")
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# Steps
+# ═══════════════════════════════════════════════════════════════════════════
+
+def _column_names(table):
+    return {c["name"] for c in inspect(db.engine).get_columns(table)}
+
+
+def _add_missing_columns(table, columns):
+    existing = _column_names(table)
+    for name, ddl in columns:
+        if name not in existing:
+            db.session.execute(text(f"ALTER TABLE {table} ADD COLUMN {name} {ddl}"))
+            print(f"[Migrate]   {table}.{name} added")
+
+
+def _m001_legacy_columns():
+    """Columns that used to be auto-added on every boot by create_app()."""
+    _add_missing_columns("assignment", [
+        ("telegram_message_id", "INTEGER"),
+        ("locked", "BOOLEAN DEFAULT false NOT NULL"),
+        ("redeemed_for_id", "INTEGER REFERENCES assignment(id) ON DELETE SET NULL"),
+        ("orphan_dismissed_at", "TIMESTAMP"),
+    ])
+    _add_missing_columns("team_member", [
+        ("_role_preferences_json", "TEXT DEFAULT '{}'"),
+    ])
+    _add_missing_columns("swap_request", [
+        ("future_assignment_id", "INTEGER REFERENCES assignment(id) ON DELETE SET NULL"),
+    ])
+    _add_missing_columns("event", [
+        ("telegram_message_id", "INTEGER"),
+        ("telegram_chat_id", "VARCHAR(30)"),
+        ("start_time", "TIME"),
+        ("cancelled", "BOOLEAN DEFAULT false NOT NULL"),
+        ("location", "VARCHAR(120)"),
+        ("updated_at", "TIMESTAMP"),
+    ])
+
+
+def _m002_backfill_event_updated_at():
+    db.session.execute(text("UPDATE event SET updated_at = CURRENT_TIMESTAMP WHERE updated_at IS NULL"))
+
+
+def _m003_scheduler_lease():
+    """New table only; db.create_all() has already created scheduler_lease."""
+
+
+def _m004_data_version():
+    """New table only; counter rows are seeded after every upgrade."""
+
+
+def _m005_assignment_history():
+    """Copy every assignment's _history_json list into assignment_history rows."""
+    from .models import AssignmentHistory
+
+    already = {
+        row[0] for row in db.session.execute(text("SELECT DISTINCT assignment_id FROM assignment_history"))
+    }
+    rows = []
+    result = db.session.execute(text(
+        "SELECT id, _history_json FROM assignment WHERE _history_json IS NOT NULL "
+        "AND _history_json NOT IN ('', '[]') ORDER BY id"
+    ))
+    for assignment_id, raw in result:
+        if assignment_id in already:
+            continue
+        try:
+            entries = json.loads(raw)
+        except (ValueError, TypeError):
+            print(f"[Migrate]   assignment {assignment_id}: unreadable history skipped")
+            continue
+        for entry in entries if isinstance(entries, list) else []:
+            if not isinstance(entry, dict):
+                continue
+            row = AssignmentHistory.from_entry(entry)
+            rows.append({
+                "assignment_id": assignment_id,
+                "ts": row.ts,
+                "action": row.action,
+                "by": row.by,
+                "_details_json": row._details_json,
+            })
+    if rows:
+        db.session.execute(AssignmentHistory.__table__.insert(), rows)
+    print(f"[Migrate]   {len(rows)} history entries backfilled")
+
+
+def _m006_cold_archive():
+    """New tables only (event/assignment/history/swap archives + fairness_baseline)."""
+
+
+def _m007_stats_rollup():
+    """Count every existing assignment into the new stats_rollup table."""
+    from .rollup import _recount
+
+    _recount(db.session.connection())
+
+
+def _m008_telegram_message_refs():
+    """Refs for weekly schedule logs and stored reminder / swap notice message ids."""
+    from .message_refs import backfill
+
+    print(f"[Migrate]   {backfill()} message refs backfilled")
+
+
+def _m009_interaction_log_retention():
+    """Composite indexes on the existing interaction_log (create_all skips existing tables)."""
+    from .models import InteractionLog
+
+    for index in InteractionLog.__table__.indexes:
+        index.create(db.session.connection(), checkfirst=True)
+
+
+MIGRATIONS = [
+    (1, "legacy column catch-up", _m001_legacy_columns),
+    (2, "backfill event.updated_at", _m002_backfill_event_updated_at),
+    (3, "scheduler_lease table", _m003_scheduler_lease),
+    (4, "data_version table", _m004_data_version),
+    (5, "assignment_history table + backfill", _m005_assignment_history),
+    (6, "cold archive tables", _m006_cold_archive),
+    (7, "stats_rollup table + backfill", _m007_stats_rollup),
+    (8, "telegram_message_ref table + backfill", _m008_telegram_message_refs),
+    (9, "interaction_log indexes + interaction_log_daily table", _m009_interaction_log_retention),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# Runner
+# ═══════════════════════════════════════════════════════════════════════════
+
+def current_version():
+    """Return the applied schema version, or 0 for a database that predates versioning."""
+    try:
+        with db.engine.connect() as conn:
+            version = conn.execute(text("SELECT version FROM schema_version WHERE id = 1")).scalar()
+    except (OperationalError, ProgrammingError):
+        return 0
+    return version or 0
+
+
+@contextlib.contextmanager
+def _migration_lock():
+    """Exclusive cross-process lock so only one worker upgrades at a time."""
+    try:
+        import fcntl
+    except ImportError:  # Windows dev boxes: single process, nothing to serialize
+        yield
+        return
+    with open(LOCK_PATH, "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _stamp(version):
+    from .models import SchemaVersion
+
+    row = db.session.get(SchemaVersion, 1)
+    if row is None:
+        row = SchemaVersion(id=1)
+        db.session.add(row)
+    row.version = version
+    row.applied_at = datetime.utcnow()
+
+
+def upgrade():
+    """Apply pending migrations. Returns the number of steps applied."""
+    if current_version() >= LATEST_VERSION:
+        return 0
+
+    with _migration_lock():
+        # Another worker may have finished the upgrade while we waited.
+        version = current_version()
+        if version >= LATEST_VERSION:
+            return 0
+
+        from . import models  # noqa: F401  (register every table with db.metadata)
+        db.create_all()
+
+        applied = 0
+        for number, description, step in MIGRATIONS:
+            if number <= version:
+                continue
+            print(f"[Migrate] {number:03d} {description}")
+            try:
+                step()
+                _stamp(number)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+            applied += 1
+
+        # Every table (including ones added by this upgrade) needs a counter row
+        # for cross-worker cache invalidation.
+        from .invalidation import seed_keys
+        seed_keys()
+        db.session.commit()
+
+    print(f"[Migrate] Schema at version {LATEST_VERSION} ({applied} step(s) applied)")
+    return applied
+
+
+def init_app(app):
+    """Register ``flask db-upgrade`` and upgrade on boot unless AUTO_MIGRATE is off."""
+
+    @app.cli.command("db-upgrade")
+    def db_upgrade_command():
+        """Apply pending schema migrations."""
+        upgrade()
+        print(f"[Migrate] Current schema version: {current_version()}")
+
+    with app.app_context():
+        if app.config.get("AUTO_MIGRATE", True):
+            upgrade()
+        elif current_version() < LATEST_VERSION:
+            print(f"[Migrate] Schema is behind (version {current_version()} < {LATEST_VERSION}) "
+                  f"— run `flask db-upgrade`")
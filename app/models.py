@@ -1,11 +1,45 @@
 from .extensions import db
-from datetime import datetime
+from datetime import date, datetime, timezone
 import json
+from zoneinfo import ZoneInfo
 from sqlalchemy import event as sa_event
+from sqlalchemy.orm import Session, object_session
 
 DEFAULT_EVENT_LOCATION = "The Landing Church"
 
 
+def _decoded_json(obj, column, default):
+    """Decode a JSON text column once per raw value and return a shallow copy.
+
+    The decoded value is memoized on the instance keyed on the raw string, so
+    repeated property reads (roster building, role pools, serialization) skip
+    json.loads. Returning a copy keeps the old "fresh object per read"
+    behaviour for callers that append to the list and assign it back.
+    """
+    raw = getattr(obj, column)
+    cache = obj.__dict__.setdefault("_decoded_json", {})
+    hit = cache.get(column)
+    if hit is not None and (hit[0] is raw or hit[0] == raw):
+        value = hit[1]
+    else:
+        try:
+            value = json.loads(raw) if raw else default()
+        except (ValueError, TypeError):
+            value = default()
+        cache[column] = (raw, value)
+    return value.copy() if isinstance(value, (list, dict)) else value
+
+
+def _store_json(obj, column, value):
+    setattr(obj, column, json.dumps(value))
+    obj.__dict__.get("_decoded_json", {}).pop(column, None)
+
+
+def _drop_decoded_json(target, *args):
+    if target is not None:  # expire can fire for instances already garbage-collected
+        target.__dict__.pop("_decoded_json", None)
+
+
 class TeamMember(db.Model):
     """Tracks team members and their eligible roles."""
     id = db.Column(db.Integer, primary_key=True)
@@ -20,36 +54,27 @@ class TeamMember(db.Model):
 
     @property
     def sunday_roles(self):
-        try:
-            return json.loads(self._sunday_roles_json or '[]')
-        except (json.JSONDecodeError, TypeError):
-            return []
+        return _decoded_json(self, "_sunday_roles_json", list)
 
     @sunday_roles.setter
     def sunday_roles(self, value):
-        self._sunday_roles_json = json.dumps(value)
+        _store_json(self, "_sunday_roles_json", value)
 
     @property
     def friday_roles(self):
-        try:
-            return json.loads(self._friday_roles_json or '[]')
-        except (json.JSONDecodeError, TypeError):
-            return []
+        return _decoded_json(self, "_friday_roles_json", list)
 
     @friday_roles.setter
     def friday_roles(self, value):
-        self._friday_roles_json = json.dumps(value)
+        _store_json(self, "_friday_roles_json", value)
 
     @property
     def role_preferences(self):
-        try:
-            return json.loads(self._role_preferences_json or '{}')
-        except (json.JSONDecodeError, TypeError):
-            return {}
+        return _decoded_json(self, "_role_preferences_json", dict)
 
     @role_preferences.setter
     def role_preferences(self, value):
-        self._role_preferences_json = json.dumps(value or {})
+        _store_json(self, "_role_preferences_json", value or {})
 
     def to_dict(self):
         return {
@@ -96,6 +121,7 @@ class Assignment(db.Model):
     status = db.Column(db.String(20), default="pending")  # pending, confirmed, swap_needed
     cover = db.Column(db.String(50))
     swapped_with = db.Column(db.String(50))
+    # Legacy history blob; superseded by AssignmentHistory (migration 005 copied it over).
     _history_json = db.Column(db.Text, default="[]")
     telegram_message_id = db.Column(db.Integer)  # Track Telegram msg for edit/delete
     locked = db.Column(db.Boolean, default=False, nullable=False)  # Manager pin: never auto-replace
@@ -105,16 +131,27 @@ class Assignment(db.Model):
     # Manager-dismissed from the Collected Shifts list. NULL = still listed.
     orphan_dismissed_at = db.Column(db.DateTime)
 
+    history_entries = db.relationship(
+        'AssignmentHistory', backref='assignment',
+        cascade="all, delete-orphan", order_by="AssignmentHistory.id",
+    )
+
     @property
     def history(self):
-        try:
-            return json.loads(self._history_json)
-        except:
-            return []
+        return [entry.to_entry() for entry in self.history_entries]
 
     @history.setter
     def history(self, value):
-        self._history_json = json.dumps(value)
+        self.history_entries = [AssignmentHistory.from_entry(entry) for entry in value or []]
+
+    def add_history(self, entry):
+        """Append one history entry: a single INSERT, earlier entries are not loaded."""
+        row = AssignmentHistory.from_entry(entry)
+        row.assignment = self
+        session = object_session(self)
+        if session is not None:
+            session.add(row)
+        return row
 
     def to_dict(self):
         return {
@@ -123,23 +160,105 @@ class Assignment(db.Model):
             "status": self.status,
             "cover": self.cover,
             "swapped_with": self.swapped_with,
-            "_hist": self.history
         }
 
 
 def _touch_event_for_assignment(mapper, connection, target):
     if not getattr(target, "event_id", None):
         return
-    connection.execute(
+    session = object_session(target)
+    if session is None:
+        return
+    session.info.setdefault("touched_event_ids", set()).add(target.event_id)
+
+
+def _flush_event_touches(session, flush_context):
+    # One UPDATE per flush, however many assignments of an event changed.
+    event_ids = session.info.pop("touched_event_ids", None)
+    if not event_ids:
+        return
+    session.connection().execute(
         Event.__table__
         .update()
-        .where(Event.id == target.event_id)
+        .where(Event.id.in_(sorted(event_ids)))
         .values(updated_at=datetime.utcnow())
     )
 
 
+def _discard_event_touches(session, previous_transaction):
+    session.info.pop("touched_event_ids", None)
+
+
+sa_event.listen(TeamMember, "refresh", _drop_decoded_json)
+sa_event.listen(TeamMember, "expire", _drop_decoded_json)
+
 for _assignment_change in ("after_insert", "after_update", "after_delete"):
     sa_event.listen(Assignment, _assignment_change, _touch_event_for_assignment)
+sa_event.listen(Session, "after_flush", _flush_event_touches)
+sa_event.listen(Session, "after_soft_rollback", _discard_event_touches)
+
+
+_HISTORY_TZ = ZoneInfo("America/Vancouver")
+
+
+class AssignmentHistory(db.Model):
+    """Append-only audit trail: one row per action taken on an assignment.
+
+    ``to_entry()`` rebuilds the dict format the old ``_history_json`` list
+    used ({"action", "by", "ts", ...extra keys}); ``ts`` is stored in UTC and
+    rendered in Vancouver time like ``str(vancouver_now())``.
+    """
+    __tablename__ = "assignment_history"
+    __table_args__ = (
+        db.Index("ix_assignment_history_assignment_ts", "assignment_id", "ts"),
+        db.Index("ix_assignment_history_by_action", "by", "action"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    assignment_id = db.Column(db.Integer, db.ForeignKey('assignment.id', ondelete="CASCADE"), nullable=False)
+    ts = db.Column(db.DateTime)
+    action = db.Column(db.String(40))
+    by = db.Column(db.String(50))
+    _details_json = db.Column(db.Text)  # every other key of the entry
+
+    @staticmethod
+    def _parse_ts(value):
+        if not isinstance(value, str):
+            return None
+        try:
+            parsed = datetime.fromisoformat(value)
+        except ValueError:
+            return None
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=_HISTORY_TZ)
+        return parsed.astimezone(timezone.utc).replace(tzinfo=None)
+
+    @classmethod
+    def from_entry(cls, entry):
+        details = dict(entry or {})
+        ts = cls._parse_ts(details.get("ts"))
+        if ts is not None:
+            details.pop("ts")
+        action = details.pop("action", None)
+        by = details.pop("by", None)
+        return cls(
+            ts=ts,
+            action=action,
+            by=by,
+            _details_json=json.dumps(details) if details else None,
+        )
+
+    def to_entry(self):
+        entry = {}
+        if self.action is not None:
+            entry["action"] = self.action
+        if self.by is not None:
+            entry["by"] = self.by
+        if self._details_json:
+            entry.update(json.loads(self._details_json))
+        if self.ts is not None:
+            entry["ts"] = str(self.ts.replace(tzinfo=timezone.utc).astimezone(_HISTORY_TZ))
+        return entry
 
 
 class Availability(db.Model):
@@ -164,7 +283,17 @@ class Availability(db.Model):
             "pattern": self.pattern
         }
 class InteractionLog(db.Model):
-    """Logs every Telegram button press for the admin stats page."""
+    """Logs every Telegram button press for the admin stats page.
+
+    Rows older than ``INTERACTION_LOG_RETENTION_DAYS`` are folded into
+    ``interaction_log_daily`` and deleted (see app/audit_log.py).
+    """
+    __table_args__ = (
+        db.Index("ix_interaction_log_action_timestamp", "action", "timestamp"),
+        db.Index("ix_interaction_log_person_timestamp", "person_name", "timestamp"),
+        db.Index("ix_interaction_log_event_date_action", "event_date", "action"),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     timestamp = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     telegram_user_id = db.Column(db.String(20))
@@ -177,6 +306,25 @@ class InteractionLog(db.Model):
     details = db.Column(db.Text)            # Extra context
 
 
+class InteractionLogDaily(db.Model):
+    """Per-day InteractionLog counts for rows past retention, see app/audit_log.py.
+
+    ``day`` is the UTC date of the raw rows' ``timestamp``; a missing
+    ``action`` / ``person_name`` is stored as "".
+    """
+    __tablename__ = "interaction_log_daily"
+    __table_args__ = (
+        db.UniqueConstraint("day", "action", "person_name", name="uq_interaction_log_daily_key"),
+        db.Index("ix_interaction_log_daily_person_day", "person_name", "day"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, nullable=False)
+    action = db.Column(db.String(50), nullable=False, default="")
+    person_name = db.Column(db.String(50), nullable=False, default="")
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+
 class SwapRequest(db.Model):
     """An open shift-swap created when someone declines an assignment.
 
@@ -326,3 +474,207 @@ class TempChat(db.Model):
     status = db.Column(db.String(20), default="active", index=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     expires_at = db.Column(db.DateTime, index=True)
+
+
+class SchemaVersion(db.Model):
+    """Single-row record of the last applied migration (see app/migrations.py)."""
+    __tablename__ = "schema_version"
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    applied_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+class SchedulerLease(db.Model):
+    """Named leader lease; the live holder runs background jobs (see app/leader.py)."""
+    __tablename__ = "scheduler_lease"
+    name = db.Column(db.String(50), primary_key=True)
+    holder = db.Column(db.String(120), nullable=False)
+    acquired_at = db.Column(db.DateTime, nullable=False)
+    renewed_at = db.Column(db.DateTime, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False)
+
+
+class DataVersion(db.Model):
+    """Per-table write counter polled by other workers (see app/invalidation.py)."""
+    __tablename__ = "data_version"
+    key = db.Column(db.String(80), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+
+# ── Cold archive (see app/archive.py) ──────────────────────────────────────
+# Rows keep their original ids so restoring puts them back unchanged.
+
+class EventArchive(db.Model):
+    """An Event older than the archive cutoff, moved out of the hot table."""
+    __tablename__ = "event_archive"
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    date = db.Column(db.Date, nullable=False, index=True)
+    day_type = db.Column(db.String(20), nullable=False)
+    custom_title = db.Column(db.String(100))
+    location = db.Column(db.String(120))
+    start_time = db.Column(db.Time)
+    notes = db.Column(db.Text)
+    cancelled = db.Column(db.Boolean, default=False, nullable=False)
+    telegram_message_id = db.Column(db.Integer)
+    telegram_chat_id = db.Column(db.String(30))
+    updated_at = db.Column(db.DateTime)
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow)
+    assignments = db.relationship(
+        'AssignmentArchive', backref='event', lazy=True,
+        cascade="all, delete-orphan", order_by="AssignmentArchive.id",
+    )
+
+
+class AssignmentArchive(db.Model):
+    __tablename__ = "assignment_archive"
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    event_id = db.Column(db.Integer, db.ForeignKey('event_archive.id', ondelete="CASCADE"), nullable=False, index=True)
+    role = db.Column(db.String(50), nullable=False)
+    person = db.Column(db.String(50), nullable=False)
+    status = db.Column(db.String(20))
+    cover = db.Column(db.String(50))
+    swapped_with = db.Column(db.String(50))
+    _history_json = db.Column(db.Text)
+    telegram_message_id = db.Column(db.Integer)
+    locked = db.Column(db.Boolean, default=False, nullable=False)
+    redeemed_for_id = db.Column(db.Integer)
+    orphan_dismissed_at = db.Column(db.DateTime)
+
+
+class AssignmentHistoryArchive(db.Model):
+    __tablename__ = "assignment_history_archive"
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    assignment_id = db.Column(db.Integer, nullable=False, index=True)
+    ts = db.Column(db.DateTime)
+    action = db.Column(db.String(40))
+    by = db.Column(db.String(50))
+    _details_json = db.Column(db.Text)
+
+
+class SwapRequestArchive(db.Model):
+    __tablename__ = "swap_request_archive"
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    assignment_id = db.Column(db.Integer, nullable=False, index=True)
+    requestor = db.Column(db.String(50), nullable=False)
+    event_date = db.Column(db.Date, nullable=False)
+    role = db.Column(db.String(50), nullable=False)
+    created_at = db.Column(db.DateTime)
+    expires_at = db.Column(db.DateTime, nullable=False)
+    status = db.Column(db.String(20))
+    accepted_by = db.Column(db.String(50))
+    accepted_at = db.Column(db.DateTime)
+    telegram_message_id = db.Column(db.Integer)
+    telegram_chat_id = db.Column(db.String(30))
+    reschedule_event_date = db.Column(db.Date)
+    future_assignment_id = db.Column(db.Integer)
+    reschedule_notes = db.Column(db.Text)
+
+
+def _iso_date(value):
+    return value.isoformat() if value else None
+
+
+def _parse_date(value):
+    return date.fromisoformat(value) if value else None
+
+
+class FairnessBaseline(db.Model):
+    """Single-row fairness contribution of every archived event.
+
+    ``_build_history`` starts from this instead of scanning the archive; it is
+    rebuilt whenever events are archived or restored. ``archived_through`` is
+    the newest archived event date: history cut off before that still needs
+    the archive itself.
+    """
+    __tablename__ = "fairness_baseline"
+    id = db.Column(db.Integer, primary_key=True)
+    archived_through = db.Column(db.Date)
+    event_count = db.Column(db.Integer, nullable=False, default=0)
+    built_at = db.Column(db.DateTime, default=datetime.utcnow)
+    _data_json = db.Column(db.Text, default='{}')
+
+    @property
+    def history(self):
+        """``(role_tracking, overall)`` in the shape ``_build_history`` returns."""
+        data = _decoded_json(self, "_data_json", dict)
+        overall = {}
+        for name, raw in data.get("overall", {}).items():
+            entry = dict(raw)
+            for key in ("last_date", "last_sun_date", "last_fri_date", "last_service_date"):
+                entry[key] = _parse_date(raw.get(key))
+            entry["recent_service_dates"] = [_parse_date(d) for d in raw.get("recent_service_dates", [])]
+            entry["month_counts"] = {
+                tuple(int(part) for part in month.split("-")): dict(counts)
+                for month, counts in raw.get("month_counts", {}).items()
+            }
+            overall[name] = entry
+        role_tracking = {
+            key: {name: dict(counts) for name, counts in people.items()}
+            for key, people in data.get("role_tracking", {}).items()
+        }
+        return role_tracking, overall
+
+    @history.setter
+    def history(self, value):
+        role_tracking, overall = value
+        encoded = {}
+        for name, entry in overall.items():
+            raw = dict(entry)
+            for key in ("last_date", "last_sun_date", "last_fri_date", "last_service_date"):
+                raw[key] = _iso_date(entry.get(key))
+            raw["recent_service_dates"] = [_iso_date(d) for d in entry.get("recent_service_dates", [])]
+            raw["month_counts"] = {
+                f"{year:04d}-{month:02d}": counts for (year, month), counts in entry.get("month_counts", {}).items()
+            }
+            encoded[name] = raw
+        _store_json(self, "_data_json", {"role_tracking": role_tracking, "overall": encoded})
+
+
+class StatsRollup(db.Model):
+    """Assignment counts per (month, worker, service:role), see app/rollup.py.
+
+    ``tracking_role`` is ``"Sunday:<role>"`` or ``"Weekday:<role>"`` using the
+    leaderboard/year-overview Sunday rule (Sunday, New Year service or a
+    calendar Sunday). ``friday`` and ``cancelled`` count the subset of
+    ``total`` on Friday events and on cancelled events; ``last_date`` is the
+    latest event in the cell. Archived events are included.
+    """
+    __tablename__ = "stats_rollup"
+    __table_args__ = (
+        db.UniqueConstraint("year", "month", "person", "tracking_role", name="uq_stats_rollup_cell"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    year = db.Column(db.Integer, nullable=False)
+    month = db.Column(db.Integer, nullable=False)
+    person = db.Column(db.String(50), nullable=False)
+    tracking_role = db.Column(db.String(80), nullable=False)
+    total = db.Column(db.Integer, nullable=False, default=0)
+    friday = db.Column(db.Integer, nullable=False, default=0)
+    cancelled = db.Column(db.Integer, nullable=False, default=0)
+    last_date = db.Column(db.Date)
+
+
+class TelegramMessageRef(db.Model):
+    """Where a bot message we keep editing lives, see app/message_refs.py.
+
+    ``kind`` is ``weekly_schedule`` (``anchor_date`` = the week's Monday,
+    ``entity_id`` 0), ``event_reminder`` (entity = Event id) or
+    ``swap_notice`` (entity = SwapRequest id); entity refs carry the
+    event date as ``anchor_date``. ``content_hash`` is the sha256 of the
+    text + keyboard the message was sent with, NULL when unknown.
+    """
+    __tablename__ = "telegram_message_ref"
+    __table_args__ = (
+        db.UniqueConstraint("kind", "anchor_date", "entity_id", name="uq_telegram_message_ref_key"),
+        db.Index("ix_telegram_message_ref_message", "chat_id", "message_id"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(30), nullable=False)
+    anchor_date = db.Column(db.Date, nullable=False)
+    entity_id = db.Column(db.Integer, nullable=False, default=0)
+    chat_id = db.Column(db.String(30), nullable=False)
+    message_id = db.Column(db.Integer, nullable=False)
+    content_hash = db.Column(db.String(64))
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -0,0 +1,255 @@
+"""
+Opt-in profiling for scheduling entry points.
+
+A profile collects ``perf_counter`` spans for the engine phases that run on
+the current thread (``build_history``, ``generate_month``, candidate
+selection, ``is_available``, ORM flushes, Telegram refreshes, ...) plus the
+SQL statements issued, and optionally a cProfile capture. Spans are keyed by
+their nesting path, so ``rebalance_to_targets > select_best > is_available``
+is reported separately from ``is_available`` called elsewhere; an outer span
+includes the time of the spans inside it.
+
+Endpoints decorated with ``@profiling.profiled_view`` return the breakdown
+under a ``"profile"`` key when profiling is requested:
+
+- ``?profile=1`` (spans) or ``?profile=cprofile`` (spans + cProfile) — managers only
+- ``SCHEDULER_PROFILE=1`` / ``SCHEDULER_PROFILE=cprofile`` — every call
+
+cProfile captures are summarized in the response (top functions by cumulative
+time) and, with ``PROFILE_DUMP_DIR`` set, written there as ``.pstats`` files
+for ``python -m pstats`` / snakeviz.
+
+Outside a request:
+
+    with profiling.profile("generate 2026-03") as prof:
+        generate_month_v2(2026, 3)
+    print(prof.breakdown())
+
+When no profile is active a span costs one thread-local lookup.
+"""
+import contextlib
+import functools
+import os
+import threading
+import time
+
+from flask import current_app, request, session
+from sqlalchemy import event as sa_event
+from sqlalchemy.orm import Session
+
+from . import sqlstats
+
+MODES = ("spans", "cprofile")
+TOP_FUNCTIONS = 25
+
+_local = threading.local()
+_flush_hooks_installed = False
+
+
+class Profile:
+    def __init__(self, label, cprofile=False):
+        self.label = label
+        self.spans = {}  # path -> [calls, total seconds]
+        self._stack = []
+        self._started = None
+        self.total_ms = 0.0
+        self.sql = None
+        self.profiler = None
+        self.cprofile_error = None
+        self.dump_path = None
+        if cprofile:
+            import cProfile
+            self.profiler = cProfile.Profile()
+
+    def _record(self, path, elapsed):
+        entry = self.spans.get(path)
+        if entry is None:
+            self.spans[path] = [1, elapsed]
+        else:
+            entry[0] += 1
+            entry[1] += elapsed
+
+    def top_functions(self, limit=TOP_FUNCTIONS):
+        if self.profiler is None or self.cprofile_error:
+            return []
+        import pstats
+        stats = pstats.Stats(self.profiler).stats
+        rows = sorted(stats.items(), key=lambda item: item[1][3], reverse=True)[:limit]
+        return [
+            {
+                "function": f"{os.path.basename(filename)}:{line}({name})",
+                "calls": calls,
+                "total_ms": round(tottime * 1000, 2),
+                "cumulative_ms": round(cumtime * 1000, 2),
+            }
+            for (filename, line, name), (_, calls, tottime, cumtime, _) in rows
+        ]
+
+    def dump(self, directory):
+        """Write the cProfile capture as a .pstats file; returns its path."""
+        if self.profiler is None or self.cprofile_error:
+            return None
+        os.makedirs(directory, exist_ok=True)
+        safe_label = "".join(c if c.isalnum() or c in "-_." else "_" for c in self.label)
+        path = os.path.join(directory, f"{time.strftime('%Y%m%d-%H%M%S')}-{safe_label}.pstats")
+        self.profiler.dump_stats(path)
+        self.dump_path = path
+        return path
+
+    def breakdown(self):
+        spans = [
+            {"span": path, "calls": calls, "total_ms": round(seconds * 1000, 2)}
+            for path, (calls, seconds) in self.spans.items()
+        ]
+        spans.sort(key=lambda item: item["total_ms"], reverse=True)
+        result = {
+            "label": self.label,
+            "total_ms": round(self.total_ms, 2),
+            "spans": spans,
+        }
+        if self.sql is not None:
+            result["sql"] = {"queries": self.sql.count, "total_ms": round(self.sql.total_ms, 2)}
+        if self.profiler is not None:
+            result["cprofile"] = (
+                {"error": self.cprofile_error}
+                if self.cprofile_error
+                else {"top": self.top_functions(), "dump": self.dump_path}
+            )
+        return result
+
+    def summary(self, limit=5):
+        top = ", ".join(
+            f"{item['span']}={item['total_ms']:.1f}ms×{item['calls']}"
+            for item in self.breakdown()["spans"][:limit]
+        )
+        sql = f", {self.sql.count} queries/{self.sql.total_ms:.1f} ms" if self.sql is not None else ""
+        return f"{self.label}: {self.total_ms:.1f} ms{sql} — {top}"
+
+
+def active():
+    """The profile collecting on this thread, or None."""
+    return getattr(_local, "profile", None)
+
+
+@contextlib.contextmanager
+def span(name):
+    """Time the block under `name` when a profile is active on this thread."""
+    prof = getattr(_local, "profile", None)
+    if prof is None:
+        yield
+        return
+    prof._stack.append(name)
+    path = " > ".join(prof._stack)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        prof._record(path, time.perf_counter() - started)
+        prof._stack.pop()
+
+
+def spanned(name):
+    """Decorator form of ``span`` for functions on hot paths."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if getattr(_local, "profile", None) is None:
+                return fn(*args, **kwargs)
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _before_flush(session, flush_context, instances):
+    prof = getattr(_local, "profile", None)
+    if prof is not None:
+        session.info.setdefault("profiling_flush_started", []).append(time.perf_counter())
+
+
+def _after_flush_postexec(session, flush_context):
+    prof = getattr(_local, "profile", None)
+    started = session.info.get("profiling_flush_started")
+    if prof is None or not started:
+        return
+    path = " > ".join(prof._stack + ["flush"])
+    prof._record(path, time.perf_counter() - started.pop())
+
+
+def _install_flush_hooks():
+    global _flush_hooks_installed
+    if _flush_hooks_installed:
+        return
+    sa_event.listen(Session, "before_flush", _before_flush)
+    sa_event.listen(Session, "after_flush_postexec", _after_flush_postexec)
+    _flush_hooks_installed = True
+
+
+@contextlib.contextmanager
+def profile(label, cprofile=False):
+    """Collect spans (and optionally cProfile) for everything run inside the block."""
+    if active() is not None:
+        # Nested entry point (e.g. /generate/year → generate_month): keep one profile.
+        yield active()
+        return
+    _install_flush_hooks()
+    prof = Profile(label, cprofile=cprofile)
+    _local.profile = prof
+    if prof.profiler is not None:
+        try:
+            prof.profiler.enable()
+        except ValueError as e:  # another profiler/debugger already owns the hook
+            prof.cprofile_error = str(e)
+    prof._started = time.perf_counter()
+    try:
+        with sqlstats.track(f"profile {label}") as stats:
+            prof.sql = stats
+            yield prof
+    finally:
+        prof.total_ms = (time.perf_counter() - prof._started) * 1000
+        if prof.profiler is not None and not prof.cprofile_error:
+            prof.profiler.disable()
+        _local.profile = None
+
+
+def requested_mode():
+    """Profiling mode for the current request ("spans"/"cprofile"), or None."""
+    value = (request.args.get("profile") or "").strip().lower()
+    if value and session.get("manager"):
+        return "cprofile" if value == "cprofile" else "spans"
+    configured = str(current_app.config.get("SCHEDULER_PROFILE") or "").strip().lower()
+    if configured in ("", "0", "false", "no", "off"):
+        return None
+    return "cprofile" if configured == "cprofile" else "spans"
+
+
+def _attach(rv, prof):
+    response = current_app.make_response(rv)
+    if not response.is_json:
+        return response
+    data = response.get_json(silent=True)
+    if not isinstance(data, dict):
+        return response
+    data["profile"] = prof.breakdown()
+    response.set_data(current_app.json.dumps(data))
+    return response
+
+
+def profiled_view(fn):
+    """Attach a timing breakdown to the view's JSON response when profiling is requested."""
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        mode = requested_mode()
+        if mode is None:
+            return fn(*args, **kwargs)
+        with profile(request.endpoint or fn.__name__, cprofile=(mode == "cprofile")) as prof:
+            rv = fn(*args, **kwargs)
+        dump_dir = current_app.config.get("PROFILE_DUMP_DIR")
+        if dump_dir and prof.profiler is not None:
+            try:
+                prof.dump(dump_dir)
+            except OSError as e:
+                print(f"[Profile] Could not write pstats dump: {e}")
+        print(f"[Profile] {prof.summary()}")
+        return _attach(rv, prof)
+    return wrapper
@@ -0,0 +1,151 @@
+"""
+Shared loaders for the event → assignment → swap request graph.
+
+List views, calendar feeds and the scheduling engine all walk events and
+their assignments. Iterating ``Event.assignments`` (and
+``Assignment.swap_requests``) lazily costs one SELECT per event and per
+assignment; ``load_event_graph`` loads the same graph in a fixed number of
+statements regardless of how many events are in range:
+
+1. events
+2. their assignments (``selectinload``; the legacy ``_history_json`` blob is deferred)
+3. optionally every SwapRequest of those assignments
+4. optionally every AssignmentHistory row of those assignments
+
+Relationships are populated in place, so existing code that iterates
+``event.assignments`` or ``assignment.swap_requests`` works unchanged.
+
+Events moved to the cold archive (app/archive.py) are never returned here;
+read paths that want them call ``load_archived_events`` explicitly.
+"""
+from sqlalchemy.orm import defer, selectinload
+from sqlalchemy.orm.attributes import instance_state
+
+from .extensions import db
+from .models import (
+    Assignment, AssignmentArchive, AssignmentHistory, Event, EventArchive,
+    FairnessBaseline, SwapRequest,
+)
+
+# Stay well under SQLite's bound-parameter limit for IN (...) lists.
+_IN_CHUNK = 500
+
+
+def load_event_graph(start=None, end=None, include_swaps=False, include_history=False,
+                     day_types=None, person=None):
+    """Events in ``[start, end]`` (inclusive, either bound optional) ordered by date.
+
+    ``include_swaps`` also loads ``Assignment.swap_requests`` (see
+    ``latest_swap_request``); ``include_history`` loads ``Assignment.history``
+    up front instead of on first access. ``day_types`` restricts ``Event.day_type``;
+    ``person`` keeps events where that person is assigned or covering.
+    """
+    children = [defer(Assignment._history_json)]
+    if include_swaps:
+        children.append(selectinload(Assignment.swap_requests))
+    if include_history:
+        children.append(selectinload(Assignment.history_entries))
+    assignments = selectinload(Event.assignments).options(*children)
+
+    query = Event.query.options(assignments)
+    if start is not None:
+        query = query.filter(Event.date >= start)
+    if end is not None:
+        query = query.filter(Event.date <= end)
+    if day_types:
+        query = query.filter(Event.day_type.in_(list(day_types)))
+    if person is not None:
+        query = query.filter(Event.assignments.any(
+            (Assignment.person == person) | (Assignment.cover == person)
+        ))
+    return query.order_by(Event.date).all()
+
+
+OPEN_SWAP_STATUSES = ("pending", "confirmed")
+
+
+def load_swap_targets(people, day_type, after):
+    """Live, uncancelled ``day_type`` events after ``after`` where one of ``people``
+    holds an open slot (pending/confirmed, uncovered, unlocked).
+
+    One query for the events plus one for all their assignments, whatever the
+    number of people — the auto-swap search tests every pool member at once.
+    """
+    people = sorted(set(people))
+    if not people:
+        return []
+    open_slot = (
+        Assignment.person.in_(people)
+        & Assignment.status.in_(OPEN_SWAP_STATUSES)
+        & Assignment.cover.is_(None)
+        & Assignment.locked.is_(False)
+    )
+    return (
+        Event.query
+        .options(selectinload(Event.assignments).options(defer(Assignment._history_json)))
+        .filter(
+            Event.date > after,
+            Event.day_type == day_type,
+            Event.cancelled.is_(False),
+            Event.assignments.any(open_slot),
+        )
+        .order_by(Event.date)
+        .all()
+    )
+
+
+def latest_swap_request(assignment):
+    """Most recent SwapRequest for ``assignment``, from the loaded graph when available."""
+    if assignment is None:
+        return None
+    if "swap_requests" not in instance_state(assignment).unloaded:
+        swaps = assignment.swap_requests
+        return max(swaps, key=lambda swap: swap.id or 0) if swaps else None
+    return (
+        SwapRequest.query
+        .filter_by(assignment_id=assignment.id)
+        .order_by(SwapRequest.id.desc())
+        .first()
+    )
+
+
+def declined_names_by_assignment(assignment_ids):
+    """{assignment_id: {names that declined it}} from history, in one grouped query per 500 ids."""
+    ids = sorted({assignment_id for assignment_id in assignment_ids if assignment_id is not None})
+    declined = {}
+    for offset in range(0, len(ids), _IN_CHUNK):
+        rows = db.session.execute(
+            db.select(AssignmentHistory.assignment_id, AssignmentHistory.by)
+            .where(
+                AssignmentHistory.assignment_id.in_(ids[offset:offset + _IN_CHUNK]),
+                AssignmentHistory.action == "decline",
+                AssignmentHistory.by.is_not(None),
+            )
+            .group_by(AssignmentHistory.assignment_id, AssignmentHistory.by)
+        )
+        for assignment_id, name in rows:
+            declined.setdefault(assignment_id, set()).add(name)
+    return declined
+
+
+def load_archived_events(start=None, end=None, person=None):
+    """Archived events in ``[start, end]`` with their assignments, in two queries.
+
+    The rows quack like Event/Assignment for read-only consumers (calendar
+    feeds, history scans).
+    """
+    query = EventArchive.query.options(selectinload(EventArchive.assignments))
+    if start is not None:
+        query = query.filter(EventArchive.date >= start)
+    if end is not None:
+        query = query.filter(EventArchive.date <= end)
+    if person is not None:
+        query = query.filter(EventArchive.assignments.any(
+            (AssignmentArchive.person == person) | (AssignmentArchive.cover == person)
+        ))
+    return query.order_by(EventArchive.date).all()
+
+
+def fairness_baseline():
+    """The persisted FairnessBaseline row, or None when nothing is archived."""
+    return db.session.get(FairnessBaseline, 1)
@@ -0,0 +1,269 @@
+"""
+Precomputed monthly assignment counts (``stats_rollup``).
+
+The leaderboard used to walk every event and assignment per request. It
+now reads ``stats_rollup``: one row per (year, month, worker, tracking_role) —
+a few hundred rows however many years of history exist. So does
+``/api/v2/stats/overview``, for the year overview modal to switch to.
+
+Maintenance is incremental and coalesced per flush, like the event touches in
+models.py: mapper events on Event/Assignment record which months a change
+affects (only when date, type, title, cancelled, role, person, cover or
+event_id changed — confirm clicks don't count) and the months are recounted
+from scratch at the end of the flush. Bulk UPDATE/DELETE statements on those
+tables can't say which months they hit, so they trigger a full rebuild at
+the next flush or commit; so does ``flask stats-rollup-rebuild``.
+"""
+import calendar
+import datetime
+
+from sqlalchemy import event as sa_event
+from sqlalchemy import inspect as sa_inspect
+from sqlalchemy.orm import Session
+
+from .extensions import db
+from .models import Assignment, AssignmentArchive, Event, EventArchive, StatsRollup
+from .repository import _IN_CHUNK
+
+_EVENT_FIELDS = ("date", "day_type", "custom_title", "cancelled")
+_ASSIGNMENT_FIELDS = ("event_id", "role", "person", "cover")
+_SOURCE_TABLES = {"event", "assignment", "event_archive", "assignment_archive"}
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# Counting
+# ═══════════════════════════════════════════════════════════════════════════
+
+def is_sunday_service(date_obj, day_type, custom_title):
+    """Sunday column rule shared by the leaderboard and the year overview."""
+    return day_type == "Sunday" or "new year" in (custom_title or "").lower() or date_obj.weekday() == 6
+
+
+def _source_rows(connection, months=None):
+    """(date, day_type, custom_title, cancelled, role, person, cover) from live + archive."""
+    rows = []
+    for event_model, assignment_model in ((Event, Assignment), (EventArchive, AssignmentArchive)):
+        query = (
+            db.select(
+                event_model.date, event_model.day_type, event_model.custom_title, event_model.cancelled,
+                assignment_model.role, assignment_model.person, assignment_model.cover,
+            )
+            .join(assignment_model, assignment_model.event_id == event_model.id)
+        )
+        if months is not None:
+            query = query.where(db.or_(*[
+                event_model.date.between(
+                    datetime.date(year, month, 1),
+                    datetime.date(year, month, calendar.monthrange(year, month)[1]),
+                )
+                for year, month in sorted(months)
+            ]))
+        rows.extend(connection.execute(query))
+    return rows
+
+
+def _count(rows):
+    cells = {}
+    for date_obj, day_type, custom_title, cancelled, role, person, cover in rows:
+        worker = cover if cover else person
+        if not worker or worker in ("TBD", "Select Helper"):
+            continue
+        service = "Sunday" if is_sunday_service(date_obj, day_type, custom_title) else "Weekday"
+        key = (date_obj.year, date_obj.month, worker, f"{service}:{role}")
+        cell = cells.setdefault(key, {"total": 0, "friday": 0, "cancelled": 0, "last_date": date_obj})
+        cell["total"] += 1
+        cell["last_date"] = max(cell["last_date"], date_obj)
+        if day_type == "Friday" or date_obj.weekday() == 4:
+            cell["friday"] += 1
+        if cancelled:
+            cell["cancelled"] += 1
+    return [
+        {"year": year, "month": month, "person": person, "tracking_role": tracking_role, **counts}
+        for (year, month, person, tracking_role), counts in sorted(cells.items())
+    ]
+
+
+def _recount(connection, months=None):
+    """Replace the rollup rows of ``months`` (every month when None)."""
+    table = StatsRollup.__table__
+    if months is None:
+        connection.execute(table.delete())
+    else:
+        for year, month in sorted(months):
+            connection.execute(table.delete().where(table.c.year == year, table.c.month == month))
+    cells = _count(_source_rows(connection, months))
+    if cells:
+        connection.execute(table.insert(), cells)
+    return len(cells)
+
+
+def rebuild():
+    """Recount every month from scratch. Returns the number of rollup rows."""
+    cells = _recount(db.session.connection())
+    db.session.info.pop("rollup_months", None)
+    db.session.info.pop("rollup_event_ids", None)
+    db.session.info.pop("rollup_rebuild", None)
+    db.session.commit()
+    print(f"[Rollup] Rebuilt stats_rollup ({cells} row(s))")
+    return cells
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# Incremental maintenance
+# ═══════════════════════════════════════════════════════════════════════════
+
+def _changed(target, fields):
+    state = sa_inspect(target)
+    return any(state.attrs[field].history.has_changes() for field in fields)
+
+
+def _old_values(target, field):
+    history = sa_inspect(target).attrs[field].history
+    return [value for value in (history.deleted or ()) if value is not None]
+
+
+def _mark_event(mapper, connection, target):
+    session = sa_inspect(target).session
+    if session is None or target.date is None:
+        return
+    if not _changed(target, _EVENT_FIELDS):
+        return
+    months = session.info.setdefault("rollup_months", set())
+    months.add((target.date.year, target.date.month))
+    for old_date in _old_values(target, "date"):
+        months.add((old_date.year, old_date.month))
+
+
+def _mark_event_deleted(mapper, connection, target):
+    session = sa_inspect(target).session
+    if session is not None and target.date is not None:
+        session.info.setdefault("rollup_months", set()).add((target.date.year, target.date.month))
+
+
+def _mark_assignment(mapper, connection, target):
+    session = sa_inspect(target).session
+    if session is None:
+        return
+    if not _changed(target, _ASSIGNMENT_FIELDS):
+        return
+    event_ids = session.info.setdefault("rollup_event_ids", set())
+    if target.event_id:
+        event_ids.add(target.event_id)
+    event_ids.update(_old_values(target, "event_id"))
+
+
+def _mark_assignment_row(mapper, connection, target):
+    session = sa_inspect(target).session
+    if session is not None and target.event_id:
+        session.info.setdefault("rollup_event_ids", set()).add(target.event_id)
+
+
+def _mark_bulk(orm_execute_state):
+    if orm_execute_state.is_update or orm_execute_state.is_delete:
+        table = getattr(orm_execute_state.statement, "table", None)
+        if table is not None and table.name in _SOURCE_TABLES:
+            orm_execute_state.session.info["rollup_rebuild"] = True
+
+
+def _apply(session):
+    info = session.info
+    rebuild_all = info.pop("rollup_rebuild", False)
+    months = info.pop("rollup_months", set())
+    event_ids = info.pop("rollup_event_ids", set())
+    if not (rebuild_all or months or event_ids):
+        return
+    connection = session.connection()
+    if rebuild_all:
+        _recount(connection)
+        return
+    for offset in range(0, len(event_ids), _IN_CHUNK):
+        chunk = sorted(event_ids)[offset:offset + _IN_CHUNK]
+        for (date_obj,) in connection.execute(db.select(Event.date).where(Event.id.in_(chunk))):
+            months.add((date_obj.year, date_obj.month))
+    if months:
+        _recount(connection, months)
+
+
+def _after_flush(session, flush_context):
+    _apply(session)
+
+
+def _before_commit(session):
+    # Bulk statements without a following flush still need their recount.
+    if session.info.get("rollup_rebuild") or session.info.get("rollup_months") \
+            or session.info.get("rollup_event_ids"):
+        _apply(session)
+
+
+def _discard(session, previous_transaction):
+    for key in ("rollup_months", "rollup_event_ids", "rollup_rebuild"):
+        session.info.pop(key, None)
+
+
+sa_event.listen(Event, "after_update", _mark_event)
+sa_event.listen(Event, "after_delete", _mark_event_deleted)
+sa_event.listen(Assignment, "after_insert", _mark_assignment_row)
+sa_event.listen(Assignment, "after_update", _mark_assignment)
+sa_event.listen(Assignment, "after_delete", _mark_assignment_row)
+sa_event.listen(Session, "do_orm_execute", _mark_bulk)
+sa_event.listen(Session, "after_flush", _after_flush)
+sa_event.listen(Session, "before_commit", _before_commit)
+sa_event.listen(Session, "after_soft_rollback", _discard)
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# Readers
+# ═══════════════════════════════════════════════════════════════════════════
+
+def _rows(year=None):
+    query = StatsRollup.query
+    if year is not None:
+        query = query.filter(StatsRollup.year == year)
+    return query.order_by(StatsRollup.year, StatsRollup.month, StatsRollup.person).all()
+
+
+def leaderboard(names):
+    """``get_history_stats`` shape: ({"All Time": {...}, "January 2026": {...}, ...}, {name: last date worked})."""
+    empty = lambda: {n: {"total": 0, "sunday": 0, "friday": 0} for n in names}
+    all_time = empty()
+    monthly = {}
+    last_date = {}
+    for row in _rows():
+        if row.person not in all_time:
+            continue
+        month_key = datetime.date(row.year, row.month, 1).strftime("%B %Y")
+        sunday = row.total if row.tracking_role.startswith("Sunday:") else 0
+        for bucket in (all_time, monthly.setdefault(month_key, empty())):
+            bucket[row.person]["total"] += row.total
+            bucket[row.person]["sunday"] += sunday
+            bucket[row.person]["friday"] += row.friday
+        if row.person not in last_date or row.last_date > last_date[row.person]:
+            last_date[row.person] = row.last_date
+    stats = {"All Time": all_time}
+    stats.update(monthly)
+    return stats, last_date
+
+
+def year_overview(year):
+    """Compact year-overview counts: {"YYYY-MM": {person: {"Sunday:Computer": n, ...}}}, cancelled excluded."""
+    months = {}
+    for row in _rows(year):
+        count = row.total - row.cancelled
+        if count <= 0:
+            continue
+        people = months.setdefault(f"{row.year:04d}-{row.month:02d}", {})
+        people.setdefault(row.person, {})[row.tracking_role] = count
+    return months
+
+
+def years():
+    return [year for (year,) in db.session.query(StatsRollup.year).distinct().order_by(StatsRollup.year)]
+
+
+def init_app(app):
+    """Register ``flask stats-rollup-rebuild``."""
+
+    @app.cli.command("stats-rollup-rebuild")
+    def rebuild_command():
+        """Recount stats_rollup from every live and archived assignment."""
+        rebuild()
@@ -3,7 +3,7 @@ import hashlib
 from collections import defaultdict
 
 from flask import Blueprint, current_app, make_response, request
-from .models import Event, Assignment
+from .repository import load_archived_events, load_event_graph
 from .utils import VANCOUVER_TZ, vancouver_today
 
 bp = Blueprint('main', __name__)
@@ -346,27 +346,24 @@ def _calendar_start_date():
     return vancouver_today() - datetime.timedelta(days=14)
 
 
+def _calendar_events(person=None):
+    start = _calendar_start_date()
+    events = load_event_graph(start, person=person)
+    if start is None:
+        # ?archive=1 is the full history, including the cold archive.
+        events = load_archived_events(person=person) + events
+    return events
+
+
 @bp.route("/calendar.ics")
 def calendar_full():
-    query = Event.query
-    start_date = _calendar_start_date()
-    if start_date:
-        query = query.filter(Event.date >= start_date)
-    events = query.order_by(Event.date).all()
+    events = _calendar_events()
     return _calendar_response(generate_ical(events), "livestream_schedule.ics")
 
 
 @bp.route("/calendar/<person>.ics")
 def calendar_person(person):
-    assignment_query = Assignment.query.filter(
-        (Assignment.person == person) | (Assignment.cover == person)
-    )
-    start_date = _calendar_start_date()
-    if start_date:
-        assignment_query = assignment_query.join(Event).filter(Event.date >= start_date)
-    assignments = assignment_query.all()
-    event_ids = {assignment.event_id for assignment in assignments}
-    events = Event.query.filter(Event.id.in_(event_ids)).order_by(Event.date).all() if event_ids else []
+    events = _calendar_events(person)
     filename = f"{_uid_token(person)}_schedule.ics"
     return _calendar_response(generate_ical(events, person), filename)
 
@@ -391,3 +388,25 @@ def cron_daily_reminder():
         "reminders_sent_v2": sent,
         "message": f"Sent {sent} v2 reminder(s)",
     }
+
+
+@bp.route("/metrics")
+def metrics_endpoint():
+    """Prometheus text exposition. Requires METRICS_SECRET (or CRON_SECRET)."""
+    import hmac
+    import os
+    from . import metrics
+
+    secret = os.environ.get("METRICS_SECRET", "") or os.environ.get("CRON_SECRET", "")
+    auth = request.headers.get("Authorization", "")
+    provided = (
+        auth[len("Bearer "):] if auth.startswith("Bearer ")
+        else request.args.get("secret", "") or request.headers.get("X-Cron-Secret", "")
+    )
+    if not secret or not hmac.compare_digest(provided.encode(), secret.encode()):
+        return {"error": "Unauthorized"}, 401
+
+    response = make_response(metrics.render())
+    response.headers["Content-Type"] = "text/plain; version=0.0.4; charset=utf-8"
+    response.headers["Cache-Control"] = "no-store"
+    return response
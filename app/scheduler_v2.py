@@ -15,6 +15,10 @@ import calendar
 import datetime
 from .models import Event, Assignment, TeamMember, Availability
 from .extensions import db
+from . import metrics, profiling
+from .repository import (
+    declined_names_by_assignment, fairness_baseline, load_archived_events, load_event_graph,
+)
 from .utils import vancouver_today, is_available
 
 # ── Caps & constraints ──────────────────────────────────────────────
@@ -197,19 +201,21 @@ def _person_is_active(name, date_obj, roster):
     return True
 
 
-def _build_history(roster, end_before=None):
-    """
-    Scan existing events to build per-role and overall assignment tracking.
+def _empty_overall():
+    return {
+        "total": 0,
+        "last_date": None,
+        "lifetime": 0,
+        "month_counts": {},
+        "last_sun_date": None,
+        "last_fri_date": None,
+        "last_service_date": None,
+        "recent_service_dates": [],
+    }
 
-    Returns:
-        role_tracking: {role: {person: {'assigned': int, 'expected': float}}}
-        overall: {person: {'total': int, 'last_date': date|None, 'lifetime': int,
-                           'month_counts': {(year,month): {'sun': int, 'fri': int, 'total': int}},
-                           'last_sun_date': date|None}}
-    """
-    all_names = list(roster.keys())
 
-    # Per-role tracking
+def _new_history(roster):
+    """Empty ``(role_tracking, overall)`` for everyone in ``roster``."""
     role_tracking = {}
     for day_type, role in [
         ("Sunday", "Computer"),
@@ -223,32 +229,25 @@ def _build_history(roster, end_before=None):
         role_tracking[tracking_key] = {
             name: {"assigned": 0, "expected": 0.0} for name in pool
         }
+    overall = {name: _empty_overall() for name in roster}
+    return role_tracking, overall
 
-    # Overall tracking
-    overall = {
-        name: {
-            "total": 0,
-            "last_date": None,
-            "lifetime": 0,
-            "month_counts": {},
-            "last_sun_date": None,
-            "last_fri_date": None,
-            "last_service_date": None,
-            "recent_service_dates": [],
-        }
-        for name in all_names
-    }
 
-    query = Event.query
-    if end_before is not None:
-        query = query.filter(Event.date < end_before)
-    events = query.order_by(Event.date).all()
+def _scan_events(events, roster, role_tracking, overall, track_all=False):
+    """Accumulate ``events`` (in date order) into the tracking structures.
+
+    Expected shares go to the role pools already in ``role_tracking``. With
+    ``track_all`` (used for the archive baseline) workers outside the roster
+    get entries too, so a later roster change still sees their past work.
+    """
+    pools = {key: list(people) for key, people in role_tracking.items()}
 
     for event in events:
         d = event.date
         is_sunday = event.day_type == "Sunday" or d.weekday() == 6
         is_friday = event.day_type == "Friday" or d.weekday() == 4
         month_key = (d.year, d.month)
+        event_day_type = "Friday" if is_friday else "Sunday" if is_sunday else event.day_type
 
         # Determine which roles were needed for this event
         roles_in_event = set()
@@ -257,11 +256,10 @@ def _build_history(roster, end_before=None):
 
         # Update per-role expected for all eligible available people
         for role in roles_in_event:
-            event_day_type = "Friday" if is_friday else "Sunday" if is_sunday else event.day_type
             tracking_key = _tracking_role(event_day_type, role)
             if tracking_key not in role_tracking:
                 continue
-            pool = [n for n in role_tracking[tracking_key] if is_available(n, d) and _person_is_active(n, d, roster)]
+            pool = [n for n in pools[tracking_key] if is_available(n, d) and _person_is_active(n, d, roster)]
             if pool:
                 fair_share = 1.0 / len(pool)
                 for n in pool:
@@ -274,12 +272,15 @@ def _build_history(roster, end_before=None):
                 continue
 
             # Per-role assigned
-            event_day_type = "Friday" if is_friday else "Sunday" if is_sunday else event.day_type
             tracking_key = _tracking_role(event_day_type, a.role)
+            if track_all and tracking_key in role_tracking:
+                role_tracking[tracking_key].setdefault(worker, {"assigned": 0, "expected": 0.0})
             if tracking_key in role_tracking and worker in role_tracking[tracking_key]:
                 role_tracking[tracking_key][worker]["assigned"] += 1
 
             # Overall
+            if track_all and worker not in overall:
+                overall[worker] = _empty_overall()
             if worker in overall:
                 overall[worker]["total"] += 1
                 overall[worker]["lifetime"] += 1
@@ -299,6 +300,61 @@ def _build_history(roster, end_before=None):
                     overall[worker]["month_counts"][month_key]["fri"] += 1
                     overall[worker]["last_fri_date"] = d
 
+
+def _fold_baseline(role_tracking, overall, baseline):
+    """Add the archived events' contribution (a FairnessBaseline) to live tracking."""
+    base_tracking, base_overall = baseline.history
+    for tracking_key, people in base_tracking.items():
+        tracked = role_tracking.get(tracking_key, {})
+        for name, counts in people.items():
+            if name in tracked:
+                tracked[name]["assigned"] += counts.get("assigned", 0)
+                tracked[name]["expected"] += counts.get("expected", 0.0)
+
+    for name, base in base_overall.items():
+        ov = overall.get(name)
+        if ov is None:
+            continue
+        ov["total"] += base.get("total", 0)
+        ov["lifetime"] += base.get("lifetime", 0)
+        for key in ("last_date", "last_sun_date", "last_fri_date", "last_service_date"):
+            if base.get(key) and (ov[key] is None or base[key] > ov[key]):
+                ov[key] = base[key]
+        for month_key, counts in base.get("month_counts", {}).items():
+            mc = ov["month_counts"].setdefault(month_key, {"sun": 0, "fri": 0, "total": 0})
+            for key in ("sun", "fri", "total"):
+                mc[key] += counts.get(key, 0)
+        ov["recent_service_dates"] = sorted(base.get("recent_service_dates", []) + ov["recent_service_dates"])
+
+
+@metrics.timed_phase("build_history")
+def _build_history(roster, end_before=None):
+    """
+    Scan existing events to build per-role and overall assignment tracking.
+
+    Archived events are covered by the persisted FairnessBaseline; only when
+    ``end_before`` cuts into the archived range is the archive itself scanned.
+
+    Returns:
+        role_tracking: {role: {person: {'assigned': int, 'expected': float}}}
+        overall: {person: {'total': int, 'last_date': date|None, 'lifetime': int,
+                           'month_counts': {(year,month): {'sun': int, 'fri': int, 'total': int}},
+                           'last_sun_date': date|None}}
+    """
+    role_tracking, overall = _new_history(roster)
+
+    end = end_before - datetime.timedelta(days=1) if end_before is not None else None
+    events = load_event_graph(end=end)
+
+    baseline = fairness_baseline()
+    if baseline is not None and baseline.archived_through is not None and end is not None \
+            and end < baseline.archived_through:
+        events = sorted(load_archived_events(end=end) + events, key=lambda event: event.date)
+        baseline = None
+
+    _scan_events(events, roster, role_tracking, overall)
+    if baseline is not None:
+        _fold_baseline(role_tracking, overall, baseline)
     return role_tracking, overall
 
 
@@ -436,11 +492,12 @@ def _check_consecutive_event_streak(name, date_obj, overall):
     return last_worked != previous_dates
 
 
-def _assignment_declined_names(assignment):
-    declined = set()
-    for entry in assignment.history or []:
-        if entry.get("action") == "decline" and entry.get("by"):
-            declined.add(entry["by"])
+def _assignment_declined_names(assignment, declined_by_id=None):
+    """Everyone who declined `assignment`. Pass ``declined_names_by_assignment()``
+    output when walking many assignments to avoid one query each."""
+    if declined_by_id is None:
+        declined_by_id = declined_names_by_assignment([assignment.id])
+    declined = set(declined_by_id.get(assignment.id, ()))
     for swap in getattr(assignment, "swap_requests", []) or []:
         if swap.requestor:
             declined.add(swap.requestor)
@@ -461,6 +518,7 @@ def _check_strict_person_caps(name, date_obj, day_type, overall, roster):
     return True
 
 
+@profiling.spanned("select_best")
 def _select_best(pool, role, date_obj, day_type, role_tracking, overall, roster, exclude):
     """
     Select the best candidate from a pool using the fairness-deficit algorithm.
@@ -520,6 +578,7 @@ def _select_best(pool, role, date_obj, day_type, role_tracking, overall, roster,
     return constrained[0]
 
 
+@profiling.spanned("select_relaxed")
 def _select_relaxed(pool, role, date_obj, day_type, role_tracking, overall, roster, exclude):
     candidates = [
         p for p in pool
@@ -537,6 +596,7 @@ def _select_relaxed(pool, role, date_obj, day_type, role_tracking, overall, rost
     return candidates[0]
 
 
+@profiling.spanned("select_available")
 def _select_available(pool, role, date_obj, day_type, role_tracking, overall, roster, exclude):
     """Last-resort fill: keep eligibility/availability, but relax caps and spacing."""
     candidates = [
@@ -599,6 +659,7 @@ def _increment_expected(pool, role, date_obj, role_tracking, roster, exclude, da
             role_tracking[tracking_key][p]["expected"] += fair_share
 
 
+@metrics.timed_phase("generate_month")
 def generate_month_v2(year, month):
     """
     Generate a fair schedule for a given month using the fairness-deficit algorithm.
@@ -717,12 +778,13 @@ def _assignment_pool_role(day_type, role):
     return "Computer"
 
 
+@metrics.timed_phase("rebalance_after_member_removal")
 def rebalance_future_after_member_removal(removed_name, start_date=None):
     start_date = start_date or vancouver_today()
     roster = get_roster()
     roster.pop(removed_name, None)
     role_tracking, overall = _build_history(roster, end_before=start_date)
-    events = Event.query.filter(Event.date >= start_date).order_by(Event.date).all()
+    events = load_event_graph(start_date)
     replaced = 0
     tbd = 0
     locked = 0
@@ -782,11 +844,13 @@ def rebalance_future_after_member_removal(removed_name, start_date=None):
     }
 
 
+@metrics.timed_phase("repair_future_assignments")
 def repair_future_assignments_for_roster(start_date=None, refill_pending=False):
     start_date = start_date or vancouver_today()
     roster = get_roster()
     role_tracking, overall = _build_history(roster, end_before=start_date)
-    events = Event.query.filter(Event.date >= start_date).order_by(Event.date).all()
+    events = load_event_graph(start_date, include_swaps=True)
+    declined = declined_names_by_assignment(a.id for event in events for a in event.assignments)
     replaced = 0
     tbd = 0
     kept = 0
@@ -829,7 +893,7 @@ def repair_future_assignments_for_roster(start_date=None, refill_pending=False):
                 kept += 1
                 continue
 
-            excluded = assigned_today + list(_assignment_declined_names(assignment))
+            excluded = assigned_today + list(_assignment_declined_names(assignment, declined))
             replacement = _select_best(pool, pool_role, event.date, day_type, role_tracking, overall, roster, exclude=excluded)
             if replacement == "TBD":
                 replacement = _select_relaxed(pool, pool_role, event.date, day_type, role_tracking, overall, roster, exclude=excluded)
@@ -868,17 +932,17 @@ def repair_future_assignments_for_roster(start_date=None, refill_pending=False):
     }
 
 
+@metrics.timed_phase("rebalance_to_targets")
 def rebalance_future_to_targets(targets, start_date=None, end_date=None, lock_confirmed=True):
     start_date = start_date or vancouver_today()
     roster = get_roster()
     roster_names = set(roster.keys())
-    query = Event.query.filter(
-        Event.date >= start_date,
-        Event.day_type.in_(["Sunday", "Friday"]),
+    events = load_event_graph(
+        start_date, end_date,
+        include_swaps=True,
+        day_types=["Sunday", "Friday"],
     )
-    if end_date is not None:
-        query = query.filter(Event.date <= end_date)
-    events = query.order_by(Event.date).all()
+    declined = declined_names_by_assignment(a.id for event in events for a in event.assignments)
 
     slot_totals = {}
     for event in events:
@@ -956,7 +1020,7 @@ def rebalance_future_to_targets(targets, start_date=None, end_date=None, lock_co
             ]
 
             _increment_expected(pool, pool_role, event.date, role_tracking, roster, exclude=assigned_today, day_type=day_type)
-            excluded = assigned_today + list(_assignment_declined_names(assignment))
+            excluded = assigned_today + list(_assignment_declined_names(assignment, declined))
             replacement = _select_best(pool, pool_role, event.date, day_type, role_tracking, overall, roster, exclude=excluded)
             if replacement == "TBD":
                 replacement = _select_relaxed(pool, pool_role, event.date, day_type, role_tracking, overall, roster, exclude=excluded)
@@ -995,6 +1059,7 @@ def rebalance_future_to_targets(targets, start_date=None, end_date=None, lock_co
     }
 
 
+@metrics.timed_phase("preview_targets")
 def preview_future_targets(targets, start_date=None, end_date=None, lock_confirmed=True):
     """Run rebalance_future_to_targets without committing and return per-event diffs.
 
@@ -1053,6 +1118,7 @@ def preview_future_targets(targets, start_date=None, end_date=None, lock_confirm
         db.session.rollback()
 
 
+@metrics.timed_phase("reschedule_declined")
 def reschedule_declined(requestor, original_event_date, role, max_lookahead_months=6):
     """Perform a two-way swap for someone who declined and wasn't picked up.
 
@@ -1188,6 +1254,7 @@ def reschedule_declined(requestor, original_event_date, role, max_lookahead_mont
     }
 
 
+@metrics.timed_phase("fairness_report")
 def get_fairness_report(roster=None):
     """
     Generate a fairness report showing each person's expected vs assigned.
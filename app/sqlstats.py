@@ -0,0 +1,158 @@
+"""
+Per-request / per-job SQL statistics and N+1 detection.
+
+Engine-level ``before_cursor_execute``/``after_cursor_execute`` hooks feed the
+innermost active ``track()`` scopes on the current thread. Every HTTP request
+and APScheduler job gets a scope; when it ends, scopes over the configured
+query-count or SQL-time thresholds are logged together with statements that
+repeated enough to look like an N+1 pattern:
+
+    [SQL] GET /api/v2/schedule: 183 queries, 41.2 ms — possible N+1: 150× SELECT assignment ... WHERE ? = assignment.event_id
+
+With ``SQL_SERVER_TIMING`` enabled, responses also carry a ``Server-Timing``
+header (``sql;dur=41.2;desc="183 queries"``) that browser devtools display.
+
+Tests use ``assert_query_budget(n)`` to pin the query count of hot endpoints.
+"""
+import contextlib
+import re
+import threading
+import time
+from collections import Counter
+
+from flask import g, request
+from sqlalchemy import event as sa_event
+from sqlalchemy.engine import Engine
+
+_local = threading.local()
+_engine_hooks_installed = False
+
+_LITERAL_RE = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_IN_LIST_RE = re.compile(r"\bIN\s*\((?:\s*(?:\?|%\(\w+\)s|:\w+|__\[POSTCOMPILE_\w+\])\s*,?)+\)", re.IGNORECASE)
+_SPACE_RE = re.compile(r"\s+")
+
+
+def fingerprint(statement):
+    """Normalize a statement so the same query with different values compares equal."""
+    statement = _LITERAL_RE.sub("?", statement)
+    statement = _IN_LIST_RE.sub("IN (…)", statement)
+    return _SPACE_RE.sub(" ", statement).strip()
+
+
+class QueryStats:
+    def __init__(self, label):
+        self.label = label
+        self.count = 0
+        self.total_ms = 0.0
+        self.fingerprints = Counter()
+
+    def record(self, statement, elapsed_ms):
+        self.count += 1
+        self.total_ms += elapsed_ms
+        self.fingerprints[fingerprint(statement)] += 1
+
+    def repeated(self, threshold):
+        return [(fp, n) for fp, n in self.fingerprints.most_common() if n >= threshold]
+
+    def summary(self, repeat_threshold=2):
+        parts = [f"{self.label}: {self.count} queries, {self.total_ms:.1f} ms"]
+        offenders = self.repeated(repeat_threshold)[:3]
+        if offenders:
+            parts.append("possible N+1: " + "; ".join(f"{n}× {fp[:160]}" for fp, n in offenders))
+        return " — ".join(parts)
+
+
+def _stack():
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # On the execution context, not conn.info: it dies with the statement, so a
+    # statement that raises leaves nothing behind on the pooled connection.
+    if context is not None and getattr(_local, "stack", None):
+        context._sqlstats_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stack = getattr(_local, "stack", None)
+    if not stack:
+        return
+    started = getattr(context, "_sqlstats_started", None)
+    elapsed_ms = (time.perf_counter() - started) * 1000 if started is not None else 0.0
+    for stats in stack:
+        stats.record(statement, elapsed_ms)
+
+
+def install_engine_hooks():
+    global _engine_hooks_installed
+    if _engine_hooks_installed:
+        return
+    sa_event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+    sa_event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+    _engine_hooks_installed = True
+
+
+@contextlib.contextmanager
+def track(label):
+    """Collect SQL stats for everything executed on this thread inside the block."""
+    install_engine_hooks()
+    stats = QueryStats(label)
+    stack = _stack()
+    stack.append(stats)
+    try:
+        yield stats
+    finally:
+        stack.remove(stats)
+
+
+def current():
+    """Innermost active stats on this thread, or None."""
+    stack = getattr(_local, "stack", None)
+    return stack[-1] if stack else None
+
+
+def log_if_slow(stats, config):
+    count_limit = int(config.get("SQL_QUERY_LOG_THRESHOLD", 50))
+    time_limit = float(config.get("SQL_TIME_LOG_THRESHOLD_MS", 200))
+    repeat_limit = int(config.get("SQL_REPEAT_THRESHOLD", 10))
+    if stats.count > count_limit or stats.total_ms > time_limit or stats.repeated(repeat_limit):
+        print(f"[SQL] {stats.summary(repeat_limit)}")
+
+
+@contextlib.contextmanager
+def assert_query_budget(max_queries, label="query budget"):
+    """Fail if the block runs more than `max_queries` SQL statements."""
+    with track(label) as stats:
+        yield stats
+    assert stats.count <= max_queries, f"over budget ({max_queries}): {stats.summary()}"
+
+
+def init_app(app):
+    install_engine_hooks()
+
+    @app.before_request
+    def _start_sql_stats():
+        scope = track(f"{request.method} {request.path}")
+        g._sqlstats_scope = scope
+        g.sqlstats = scope.__enter__()
+
+    @app.after_request
+    def _server_timing(response):
+        stats = g.get("sqlstats")
+        if stats is not None and app.config.get("SQL_SERVER_TIMING"):
+            response.headers.add(
+                "Server-Timing", f'sql;dur={stats.total_ms:.1f};desc="{stats.count} queries"'
+            )
+        return response
+
+    @app.teardown_request
+    def _finish_sql_stats(exc):
+        scope = g.pop("_sqlstats_scope", None)
+        stats = g.pop("sqlstats", None)
+        if scope is None:
+            return
+        scope.__exit__(None, None, None)
+        log_if_slow(stats, app.config)
@@ -0,0 +1,77 @@
+"""
+SQLite storage profile.
+
+Production runs on a single SQLite file written concurrently by web threads,
+webhook callbacks and APScheduler jobs. With SQLite's defaults (rollback
+journal, no busy timeout) a writer that collides with another transaction
+fails immediately with "database is locked". The "performance" profile:
+
+- journal_mode=WAL: readers never block the writer and vice versa
+- synchronous=NORMAL: fsync at checkpoints instead of every commit (safe in WAL)
+- busy_timeout: wait for the write lock instead of raising
+- cache_size / mmap_size / temp_store: keep hot pages and temp b-trees in memory
+
+PRAGMAs are applied on every new DBAPI connection through a SQLAlchemy
+``connect`` event, and the pool is sized for gunicorn threads plus scheduler
+jobs. Other backends are left untouched.
+"""
+from sqlalchemy import event as sa_event
+
+from .extensions import db
+
+PROFILES = ("performance", "default")
+
+
+def _is_sqlite(app):
+    return app.config.get("SQLALCHEMY_DATABASE_URI", "").startswith("sqlite")
+
+
+def sqlite_pragmas(config):
+    """PRAGMA statements for the configured profile, in application order."""
+    if config.get("SQLITE_PROFILE", "performance") != "performance":
+        return []
+    return [
+        "PRAGMA journal_mode=WAL",
+        f"PRAGMA synchronous={config.get('SQLITE_SYNCHRONOUS', 'NORMAL')}",
+        f"PRAGMA busy_timeout={int(config.get('SQLITE_BUSY_TIMEOUT_MS', 5000))}",
+        # Negative cache_size is KiB, per connection.
+        f"PRAGMA cache_size=-{int(config.get('SQLITE_CACHE_SIZE_KB', 4096))}",
+        f"PRAGMA mmap_size={int(config.get('SQLITE_MMAP_SIZE_MB', 64)) * 1024 * 1024}",
+        "PRAGMA temp_store=MEMORY",
+    ]
+
+
+def configure(app):
+    """Set pool/connect options. Call before ``db.init_app(app)``."""
+    if not _is_sqlite(app) or app.config.get("SQLITE_PROFILE", "performance") != "performance":
+        return
+    options = app.config.setdefault("SQLALCHEMY_ENGINE_OPTIONS", {})
+    # One connection per gunicorn thread plus room for scheduler jobs and the
+    # lease heartbeat; connections are cheap for SQLite, waiting on the pool isn't.
+    options.setdefault("pool_size", int(app.config.get("SQLITE_POOL_SIZE", 8)))
+    options.setdefault("max_overflow", 4)
+    options.setdefault("pool_timeout", 30)
+    connect_args = options.setdefault("connect_args", {})
+    connect_args.setdefault("check_same_thread", False)
+    # sqlite3's own lock wait (seconds); matches busy_timeout.
+    connect_args.setdefault("timeout", int(app.config.get("SQLITE_BUSY_TIMEOUT_MS", 5000)) / 1000)
+
+
+def install(app):
+    """Apply the PRAGMA profile to every new connection. Call after ``db.init_app(app)``."""
+    if not _is_sqlite(app):
+        return
+    pragmas = sqlite_pragmas(app.config)
+    if not pragmas:
+        return
+
+    def _apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+
+    with app.app_context():
+        sa_event.listen(db.engine, "connect", _apply_pragmas)
@@ -0,0 +1,100 @@
+"""
+Bounded-concurrency Telegram calls for the scheduled sweeps.
+
+``delete_past_event_reminders`` and ``sweep_expired_swaps`` are split into
+three steps:
+
+1. prefetch: one query for everything the sweep touches, and render every
+   message text on the calling thread (the session isn't thread-safe);
+2. ``run_parallel``: the Telegram calls on a small thread pool, each call
+   first taking a token from ``TELEGRAM_LIMITER`` so a large backlog after
+   downtime doesn't trip Telegram's flood limits;
+3. one commit for all resulting DB changes.
+
+Worker functions must not touch ``db.session``. Each phase's duration is
+recorded in ``livestream_sweep_duration_seconds``.
+"""
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from . import metrics
+
+SWEEP_WORKERS = int(os.environ.get("TELEGRAM_SWEEP_WORKERS", "4"))
+# Telegram allows ~30 bot API calls per second overall; stay under it.
+SWEEP_RATE_PER_SECOND = float(os.environ.get("TELEGRAM_SWEEP_RATE", "20"))
+
+
+class RateLimiter:
+    """Thread-safe token bucket: ``acquire()`` blocks until a call is allowed."""
+
+    def __init__(self, rate, burst=None, clock=time.monotonic, sleep=time.sleep):
+        self.rate = float(rate)
+        self.burst = float(burst if burst is not None else max(rate, 1))
+        self.clock = clock
+        self.sleep = sleep
+        self._tokens = self.burst
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = self.clock()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            self.sleep(wait)
+
+
+TELEGRAM_LIMITER = RateLimiter(SWEEP_RATE_PER_SECOND)
+
+
+def run_parallel(items, fn, max_workers=None, limiter=None):
+    """``[(item, result, error)]`` for ``fn(item)`` over ``items``, in input order.
+
+    At most ``max_workers`` calls run at once and each waits for the rate
+    limiter first. Exceptions are returned, not raised, so one bad message
+    doesn't abort the sweep.
+    """
+    items = list(items)
+    if not items:
+        return []
+    limiter = limiter or TELEGRAM_LIMITER
+
+    def _call(item):
+        limiter.acquire()
+        try:
+            return item, fn(item), None
+        except Exception as e:
+            return item, None, e
+
+    workers = max(1, min(max_workers or SWEEP_WORKERS, len(items)))
+    if workers == 1:
+        return [_call(item) for item in items]
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="telegram-sweep") as pool:
+        return list(pool.map(_call, items))
+
+
+class SweepTimer:
+    """Record each phase of one sweep run under ``sweep`` / ``phase`` labels."""
+
+    def __init__(self, sweep):
+        self.sweep = sweep
+        self._started = time.perf_counter()
+        self._phase_started = self._started
+
+    def phase(self, name):
+        now = time.perf_counter()
+        metrics.SWEEP_SECONDS.observe(now - self._phase_started, sweep=self.sweep, phase=name)
+        self._phase_started = now
+
+    def done(self, items):
+        metrics.SWEEP_SECONDS.observe(time.perf_counter() - self._started, sweep=self.sweep, phase="total")
+        metrics.SWEEP_ITEMS.inc(items, sweep=self.sweep)
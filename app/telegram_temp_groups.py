@@ -1,33 +1,38 @@
+"""
+Telethon-backed temp groups, run by one asyncio service.
+
+``TempGroupService`` owns the Telethon client and an event loop thread. Group
+operations are put on an ``asyncio.Queue`` and handled one at a time by a
+worker coroutine, so the client is never driven from two places at once (this
+replaces the old global ``RLock``). ``create_temp_group`` / ``delete_group``
+return ``concurrent.futures.Future`` objects right away; Flask threads only
+wait if they call ``.result()`` themselves, instead of blocking for up to 30 s
+on every call.
+
+Resolved entities (users and the bot) are cached for
+``TELETHON_ENTITY_TTL_SECONDS``. Creating a group resolves only the ones
+missing from the cache, concurrently, and invites everyone in batches of
+``INVITE_BATCH_SIZE`` per ``InviteToChannelRequest``.
+
+All Telethon calls go through ``TelethonGateway``. Tests hand the service a
+stub with the same async methods.
+"""
 import asyncio
+import concurrent.futures
 import os
 import shutil
 import threading
+import time
 
-_client = None
-_loop = None
-_thread = None
-_telethon_lock = threading.RLock()
-
-
-def _ensure_loop():
-    global _loop, _thread
-    if _loop and _loop.is_running():
-        return _loop
-    _loop = asyncio.new_event_loop()
+ENTITY_TTL_SECONDS = float(os.environ.get("TELETHON_ENTITY_TTL_SECONDS", "3600"))
+OPERATION_TIMEOUT_SECONDS = 30.0
+# Telegram accepts at most 200 users per InviteToChannelRequest.
+INVITE_BATCH_SIZE = 200
+# Don't retry a failed login more than once per this many seconds.
+CONNECT_RETRY_SECONDS = 300.0
 
-    def _run():
-        asyncio.set_event_loop(_loop)
-        _loop.run_forever()
-
-    _thread = threading.Thread(target=_run, daemon=True)
-    _thread.start()
-    return _loop
-
-
-def _run_sync(coro):
-    loop = _ensure_loop()
-    future = asyncio.run_coroutine_threadsafe(coro, loop)
-    return future.result(timeout=30)
+_service = None
+_service_lock = threading.Lock()
 
 
 def _session_path():
@@ -49,123 +54,333 @@ def _session_path():
     return runtime
 
 
-def get_client():
-    global _client
-    with _telethon_lock:
-        if _client is not None:
-            return _client
-        api_id = os.environ.get("TELETHON_API_ID")
-        api_hash = os.environ.get("TELETHON_API_HASH")
-        if not api_id or not api_hash:
+def channel_chat_id(channel_id):
+    """Bot API chat id (``-100…``) for a Telethon channel id."""
+    return -1000000000000 - int(channel_id)
+
+
+def channel_id_from_chat_id(chat_id):
+    numeric_chat_id = int(chat_id)
+    return -(numeric_chat_id + 1000000000000) if numeric_chat_id < -1000000000000 else abs(numeric_chat_id)
+
+
+class TelethonGateway:
+    """The handful of Telethon calls the service makes, on one connected client."""
+
+    def __init__(self, client):
+        self.client = client
+
+    @classmethod
+    async def connect(cls, api_id, api_hash):
+        from telethon import TelegramClient
+
+        client = TelegramClient(_session_path(), int(api_id), api_hash)
+        await client.connect()
+        if not await client.is_user_authorized():
+            await client.disconnect()
             return None
+        return cls(client)
+
+    async def get_entity(self, ref):
+        return await self.client.get_entity(ref)
+
+    async def create_channel(self, title, about):
+        from telethon.tl.functions.channels import CreateChannelRequest
+
+        result = await self.client(CreateChannelRequest(title=title, about=about, megagroup=True))
+        return result.chats[0]
+
+    async def invite(self, channel, entities):
+        from telethon.tl.functions.channels import InviteToChannelRequest
+
+        await self.client(InviteToChannelRequest(channel, entities))
+
+    async def promote_bot(self, channel, bot_entity):
+        from telethon.tl.functions.channels import EditAdminRequest
+        from telethon.tl.types import ChatAdminRights
+
+        await self.client(EditAdminRequest(
+            channel,
+            bot_entity,
+            admin_rights=ChatAdminRights(
+                post_messages=True,
+                edit_messages=True,
+                delete_messages=True,
+                ban_users=True,
+            ),
+            rank="Bot",
+        ))
+
+    async def delete_channel(self, channel_id):
+        from telethon.tl.functions.channels import DeleteChannelRequest
+        from telethon.tl.types import PeerChannel
+
+        entity = await self.client.get_entity(PeerChannel(channel_id))
+        await self.client(DeleteChannelRequest(entity))
+
+    async def disconnect(self):
+        await self.client.disconnect()
+
+
+class TempGroupService:
+    def __init__(self, connect, entity_ttl=ENTITY_TTL_SECONDS, invite_batch=INVITE_BATCH_SIZE,
+                 timeout=OPERATION_TIMEOUT_SECONDS, clock=time.monotonic):
+        self.connect = connect  # async () -> gateway or None
+        self.entity_ttl = entity_ttl
+        self.invite_batch = max(int(invite_batch), 1)
+        self.timeout = timeout
+        self.clock = clock
+        self.gateway = None
+        self.resolved = 0   # get_entity calls actually made
+        self._entities = {}  # ref -> (entity, expires_at)
+        self._connect_failed_at = None
+        self._loop = None
+        self._queue = None
+        self._thread = None
+        self._ready = threading.Event()
+        self._start_lock = threading.Lock()
+
+    # ── Thread-side API ────────────────────────────────────────────────
+
+    def start(self):
+        with self._start_lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name="telethon", daemon=True)
+            self._thread.start()
+        self._ready.wait()
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._queue = asyncio.Queue()
+        worker = self._loop.create_task(self._worker())
+        self._ready.set()
         try:
-            from telethon import TelegramClient
-        except ImportError:
-            return None
-        loop = _ensure_loop()
+            self._loop.run_forever()
+        finally:
+            worker.cancel()
+            self._loop.run_until_complete(asyncio.gather(worker, return_exceptions=True))
+            self._loop.close()
 
-        async def _connect():
-            client = TelegramClient(_session_path(), int(api_id), api_hash, loop=loop)
-            await client.connect()
-            if not await client.is_user_authorized():
-                await client.disconnect()
-                return None
-            return client
+    def submit(self, operation, *args):
+        """Queue ``operation(*args)`` (a coroutine function) and return its Future."""
+        self.start()
+        future = concurrent.futures.Future()
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, (operation, args, future))
+        return future
 
+    def stop(self, timeout=5):
+        """Finish queued operations, disconnect and stop the loop thread."""
+        if self._thread is None:
+            return
+        done = self.submit(self._disconnect)
         try:
-            _client = _run_sync(_connect())
-            return _client
-        except Exception as e:
-            print(f"[TempGroup] Connect failed: {e}")
-            _client = None
-            return None
+            done.result(timeout=timeout)
+        except Exception:
+            pass
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        if self._thread is not threading.current_thread():
+            self._thread.join(timeout=timeout)
+        self._thread = None
 
+    def available(self):
+        return self.submit(self._available)
 
-def is_available():
-    return get_client() is not None
+    def create_temp_group(self, title, user_ids, bot_ref=None):
+        return self.submit(self._create, title, list(user_ids), bot_ref)
 
+    def delete_group(self, chat_id):
+        return self.submit(self._delete, chat_id)
 
-def create_temp_group(title, user_ids, bot_token=None, bot_username=None):
-    with _telethon_lock:
-        client = get_client()
-        if not client:
-            return None
-        bot_id = bot_token.split(":")[0] if bot_token else None
-
-        async def _create():
-            from telethon.tl.functions.channels import CreateChannelRequest, EditAdminRequest, InviteToChannelRequest
-            from telethon.tl.types import ChatAdminRights
-
-            result = await client(CreateChannelRequest(title=title, about="Temporary livestream reminder", megagroup=True))
-            channel = result.chats[0]
-            chat_id = -1000000000000 - channel.id
-            entities = []
-            for uid in user_ids:
-                try:
-                    entities.append(await client.get_entity(int(uid)))
-                except Exception as e:
-                    print(f"[TempGroup] Could not resolve user {uid}: {e}")
-            bot_entity = None
-            if bot_username:
-                try:
-                    bot_entity = await client.get_entity(bot_username)
-                except Exception as e:
-                    print(f"[TempGroup] Could not resolve bot @{bot_username}: {e}")
-            elif bot_id:
-                try:
-                    bot_entity = await client.get_entity(int(bot_id))
-                except Exception as e:
-                    print(f"[TempGroup] Could not resolve bot {bot_id}: {e}")
-            if bot_entity:
-                entities.append(bot_entity)
-            if entities:
-                await client(InviteToChannelRequest(channel, entities))
-            if bot_entity:
-                try:
-                    await client(EditAdminRequest(
-                        channel,
-                        bot_entity,
-                        admin_rights=ChatAdminRights(
-                            post_messages=True,
-                            edit_messages=True,
-                            delete_messages=True,
-                            ban_users=True,
-                        ),
-                        rank="Bot",
-                    ))
-                except Exception as e:
-                    print(f"[TempGroup] Could not promote bot: {e}")
-            return chat_id
+    # ── Loop side ──────────────────────────────────────────────────────
+
+    async def _worker(self):
+        while True:
+            operation, args, future = await self._queue.get()
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                result = await asyncio.wait_for(operation(*args), self.timeout)
+            except BaseException as e:
+                if isinstance(e, asyncio.CancelledError):
+                    future.cancel()
+                    raise
+                future.set_exception(e)
+            else:
+                future.set_result(result)
 
+    async def _client(self):
+        if self.gateway is not None:
+            return self.gateway
+        if self._connect_failed_at is not None and self.clock() - self._connect_failed_at < CONNECT_RETRY_SECONDS:
+            return None
         try:
-            return _run_sync(_create())
+            self.gateway = await self.connect()
         except Exception as e:
-            print(f"[TempGroup] Create failed: {e}")
-            return None
+            print(f"[TempGroup] Connect failed: {e}")
+            self.gateway = None
+        self._connect_failed_at = None if self.gateway else self.clock()
+        return self.gateway
 
+    async def _available(self):
+        return await self._client() is not None
 
-def delete_group(chat_id):
-    with _telethon_lock:
-        client = get_client()
-        if not client:
-            return False
+    async def _disconnect(self):
+        if self.gateway is not None:
+            try:
+                await self.gateway.disconnect()
+            except Exception as e:
+                print(f"[TempGroup] Disconnect failed: {e}")
+            self.gateway = None
 
-        async def _delete():
-            from telethon.tl.functions.channels import DeleteChannelRequest
-            from telethon.tl.types import PeerChannel
+    async def _resolve(self, gateway, refs):
+        """``{ref: entity}`` for ``refs``, from the cache or one concurrent round of lookups."""
+        now = self.clock()
+        found, missing = {}, []
+        for ref in refs:
+            cached = self._entities.get(ref)
+            if cached and cached[1] > now:
+                found[ref] = cached[0]
+            elif ref not in missing:
+                missing.append(ref)
+        if missing:
+            self.resolved += len(missing)
+            results = await asyncio.gather(*(gateway.get_entity(ref) for ref in missing), return_exceptions=True)
+            expires_at = self.clock() + self.entity_ttl
+            for ref, entity in zip(missing, results):
+                if isinstance(entity, Exception):
+                    print(f"[TempGroup] Could not resolve {ref}: {entity}")
+                    continue
+                self._entities[ref] = (entity, expires_at)
+                found[ref] = entity
+        return found
 
-            numeric_chat_id = int(chat_id)
-            channel_id = -(numeric_chat_id + 1000000000000) if numeric_chat_id < -1000000000000 else abs(numeric_chat_id)
+    async def _create(self, title, user_ids, bot_ref):
+        gateway = await self._client()
+        if gateway is None:
+            return None
+        channel = await gateway.create_channel(title, "Temporary livestream reminder")
+        try:
+            await self._populate(gateway, channel, user_ids, bot_ref)
+        except BaseException:
+            # Failed or timed out (cancelled) after the group exists: nothing will
+            # record it, so don't leave an orphaned megagroup behind.
             try:
-                entity = await client.get_entity(PeerChannel(channel_id))
-                await client(DeleteChannelRequest(entity))
-                return True
+                await gateway.delete_channel(channel.id)
             except Exception as e:
-                print(f"[TempGroup] Delete failed for {chat_id}: {e}")
-                return False
+                print(f"[TempGroup] Could not delete unfinished group {channel.id}: {e}")
+            raise
+        return channel_chat_id(channel.id)
+
+    async def _populate(self, gateway, channel, user_ids, bot_ref):
+        user_refs = [int(uid) for uid in user_ids]
+        entities = await self._resolve(gateway, user_refs + ([bot_ref] if bot_ref else []))
+        bot_entity = entities.get(bot_ref) if bot_ref else None
+        invitees = [entities[ref] for ref in user_refs if ref in entities]
+        if bot_entity is not None:
+            invitees.append(bot_entity)
+        for start in range(0, len(invitees), self.invite_batch):
+            await gateway.invite(channel, invitees[start:start + self.invite_batch])
+        if bot_entity is not None:
+            try:
+                await gateway.promote_bot(channel, bot_entity)
+            except Exception as e:
+                print(f"[TempGroup] Could not promote bot: {e}")
+
+    async def _delete(self, chat_id):
+        gateway = await self._client()
+        if gateway is None:
+            return False
+        await gateway.delete_channel(channel_id_from_chat_id(chat_id))
+        return True
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# Module-level API used by telegram_v2
+# ═══════════════════════════════════════════════════════════════════════════
+
+def _credentials():
+    api_id = os.environ.get("TELETHON_API_ID")
+    api_hash = os.environ.get("TELETHON_API_HASH")
+    if not api_id or not api_hash:
+        return None
+    try:
+        import telethon  # noqa: F401
+    except ImportError:
+        return None
+    return api_id, api_hash
+
 
+def get_service():
+    """The process-wide service, or None when Telethon isn't configured."""
+    global _service
+    with _service_lock:
+        if _service is None:
+            credentials = _credentials()
+            if credentials is None:
+                return None
+            import atexit
+
+            _service = TempGroupService(lambda: TelethonGateway.connect(*credentials))
+            _service.start()
+            atexit.register(_service.stop)
+        return _service
+
+
+def _done(value):
+    future = concurrent.futures.Future()
+    future.set_result(value)
+    return future
+
+
+def _logged(future, fallback, label):
+    """``future``, but failures are printed and resolve to ``fallback``."""
+    result = concurrent.futures.Future()
+
+    def _settle(done):
         try:
-            return _run_sync(_delete())
+            result.set_result(done.result())
         except Exception as e:
-            print(f"[TempGroup] Delete failed for {chat_id}: {e}")
-            return False
+            print(f"[TempGroup] {label} failed: {e}")
+            result.set_result(fallback)
+
+    future.add_done_callback(_settle)
+    return result
+
+
+def wait(future, fallback, timeout=OPERATION_TIMEOUT_SECONDS):
+    """``future.result()`` for callers that need the outcome; ``fallback`` after ``timeout`` seconds."""
+    try:
+        return future.result(timeout=timeout)
+    except concurrent.futures.TimeoutError:
+        print(f"[TempGroup] Gave up waiting after {timeout:g}s")
+        return fallback
+
+
+def is_available(timeout=OPERATION_TIMEOUT_SECONDS):
+    service = get_service()
+    if service is None:
+        return False
+    try:
+        return service.available().result(timeout=timeout)
+    except Exception as e:
+        print(f"[TempGroup] Connect failed: {e}")
+        return False
+
+
+def create_temp_group(title, user_ids, bot_token=None, bot_username=None):
+    """Future resolving to the new group's chat id, or None."""
+    service = get_service()
+    if service is None:
+        return _done(None)
+    bot_ref = bot_username or (int(bot_token.split(":")[0]) if bot_token else None)
+    return _logged(service.create_temp_group(title, user_ids, bot_ref), None, "Create")
+
+
+def delete_group(chat_id):
+    """Future resolving to True once the group is gone, False if it couldn't be deleted."""
+    service = get_service()
+    if service is None:
+        return _done(False)
+    return _logged(service.delete_group(chat_id), False, f"Delete for {chat_id}")
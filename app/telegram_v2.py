@@ -11,6 +11,8 @@ Features:
 - Swap request/accept workflow
 - Test messages to personal chat ID
 """
+import contextlib
+import contextvars
 import os
 import uuid
 import datetime
@@ -19,19 +21,30 @@ import html
 import threading
 import time
 from urllib.parse import urlencode
-import requests
 from itsdangerous import URLSafeSerializer
+from sqlalchemy.orm import defer, joinedload, selectinload
 from flask import current_app
 from .models import DEFAULT_EVENT_LOCATION, Event, Assignment, TeamMember, InteractionLog, SwapRequest, TempChat
 from .extensions import db
-from .utils import is_available, vancouver_today, vancouver_now, VANCOUVER_TZ
-from . import telegram_temp_groups
+from . import audit_log, identity, message_refs, metrics, sweeps
+from .lazy import lazy_module
+from .repository import OPEN_SWAP_STATUSES, latest_swap_request, load_event_graph, load_swap_targets
+from .utils import is_available, preloaded_availability, vancouver_today, vancouver_now, VANCOUVER_TZ
+
+# Only imported when a Telegram call / temp group actually happens.
+requests = lazy_module("requests")
+telegram_temp_groups = lazy_module(f"{__package__}.telegram_temp_groups")
 
 # ── Configuration ────────────────────────────────────────────────────
 TELEGRAM_BOT_TOKEN = os.environ.get("TELEGRAM_BOT_TOKEN", "")
 TELEGRAM_CHAT_ID = os.environ.get("TELEGRAM_CHAT_ID", "")
 PERSONAL_CHAT_ID = os.environ.get("TELEGRAM_PERSONAL_CHAT_ID", "27859948")
 WEBHOOK_SECRET = os.environ.get("TELEGRAM_WEBHOOK_SECRET", "")
+# Admin DMs are merged into one digest per window (app/admin_notifier.py);
+# ADMIN_NOTIFY_SYNC=true sends each one inline instead, as tests do.
+ADMIN_NOTIFY_WINDOW_SECONDS = float(os.environ.get("ADMIN_NOTIFY_WINDOW_SECONDS", "30"))
+ADMIN_NOTIFY_MAX_BUFFERED = int(os.environ.get("ADMIN_NOTIFY_MAX_BUFFERED", "200"))
+ADMIN_NOTIFY_SYNC = os.environ.get("ADMIN_NOTIFY_SYNC", "").lower() in ("1", "true", "yes")
 
 BASE_API = "https://api.telegram.org/bot"
 REMINDER_CUSTOM_EMOJI_ID = "5314354612357055779"
@@ -113,9 +126,15 @@ def _admin_source_tag(source):
 
 
 def _log_interaction(telegram_user_id, first_name, action, person_name,
-                     assignment=None, event=None, details=None):
-    """Log a Telegram interaction to the database."""
-    log = InteractionLog(
+                     assignment=None, event=None, details=None, buffered=False):
+    """Log a Telegram interaction to the database.
+
+    By default the row joins the caller's session and commit. Taps that
+    change nothing else pass ``buffered=True`` to hand the row to the
+    background audit-log writer (app/audit_log.py) instead of paying for a
+    commit of their own.
+    """
+    fields = dict(
         telegram_user_id=telegram_user_id,
         first_name=first_name,
         action=action,
@@ -125,7 +144,10 @@ def _log_interaction(telegram_user_id, first_name, action, person_name,
         role=assignment.role if assignment else None,
         details=details,
     )
-    db.session.add(log)
+    if buffered:
+        audit_log.write(**fields)
+        return
+    db.session.add(InteractionLog(**fields))
     # Don't commit here — let the caller's commit include this
 
 
@@ -148,17 +170,67 @@ def _notify_admin(action, person_name, assignment=None, event=None, source=None)
     if assignment:
         icon = ROLE_EMOJI.get(assignment.role, "")
         parts.append(f"{icon} {html.escape(assignment.role or '', quote=False)}")
-    text = "\n".join(parts)
-    # Fire-and-forget to personal chat
+    _queue_admin_dm("\n".join(parts), silent=action not in ("confirm", "decline"))
+
+
+def _send_admin_dm(text, silent=False):
+    """Deliver one admin DM now.
+
+    Returns True on success and False when worth retrying; raises
+    ``Undeliverable`` when Telegram rejected the message itself.
+    """
+    result, error = _api_call_result("sendMessage", {
+        "chat_id": PERSONAL_CHAT_ID,
+        "text": text,
+        "parse_mode": "HTML",
+        "disable_web_page_preview": True,
+        "disable_notification": bool(silent),
+    })
+    if result is not None:
+        return True
+    if _is_permanent_api_error(error):
+        from .admin_notifier import Undeliverable
+        raise Undeliverable(error)
+    return False
+
+
+_admin_notifier = None
+_admin_notifier_lock = threading.Lock()
+
+
+def get_admin_notifier():
+    """The process-wide AdminNotifier, started on first use and drained at exit."""
+    global _admin_notifier
+    with _admin_notifier_lock:
+        if _admin_notifier is None:
+            import atexit
+            from .admin_notifier import AdminNotifier
+
+            _admin_notifier = AdminNotifier(
+                lambda text, silent: _send_admin_dm(text, silent),
+                window=ADMIN_NOTIFY_WINDOW_SECONDS,
+                max_buffered=ADMIN_NOTIFY_MAX_BUFFERED,
+            )
+            _admin_notifier.start()
+            atexit.register(_admin_notifier.stop)
+        return _admin_notifier
+
+
+def _queue_admin_dm(text, silent=False):
+    """Hand an admin DM to the background notifier (inline under TESTING / ADMIN_NOTIFY_SYNC)."""
+    if not PERSONAL_CHAT_ID:
+        return
     try:
-        _api_call("sendMessage", {
-            "chat_id": PERSONAL_CHAT_ID,
-            "text": text,
-            "parse_mode": "HTML",
-            "disable_notification": action not in ("confirm", "decline"),
-        })
-    except Exception as e:
-        print(f"[Telegram] Admin notification failed: {e}")
+        testing = bool(current_app.config.get("TESTING"))
+    except RuntimeError:
+        testing = False
+    if ADMIN_NOTIFY_SYNC or testing:
+        try:
+            _send_admin_dm(text, silent)
+        except Exception as e:
+            print(f"[Telegram] Admin notification failed: {e}")
+        return
+    get_admin_notifier().notify(text, silent)
 
 
 # ═══════════════════════════════════════════════════════════════════
@@ -171,17 +243,22 @@ def _api_call_result(method, payload, timeout=10):
         print("[Telegram v2] No bot token configured")
         return None, "No bot token configured"
     url = f"{BASE_API}{TELEGRAM_BOT_TOKEN}/{method}"
+    started = time.perf_counter()
     try:
         resp = requests.post(url, json=payload, timeout=timeout)
         data = resp.json()
         if data.get("ok"):
             return data.get("result"), None
         description = data.get("description", "Unknown")
+        metrics.TELEGRAM_API_ERRORS.inc(method=method, code=data.get("error_code", resp.status_code))
         print(f"[Telegram v2] API error: {description}")
         return None, description
     except requests.RequestException as e:
+        metrics.TELEGRAM_API_ERRORS.inc(method=method, code=type(e).__name__)
         print(f"[Telegram v2] Request error: {e}")
         return None, str(e)
+    finally:
+        metrics.TELEGRAM_API_SECONDS.observe(time.perf_counter() - started, method=method)
 
 
 def _api_call(method, payload, timeout=10):
@@ -190,6 +267,18 @@ def _api_call(method, payload, timeout=10):
     return result
 
 
+def _is_permanent_api_error(error):
+    """Bot API rejections that a retry won't fix: 400/401/403/404, or no token.
+
+    Network errors, 429 (Too Many Requests) and 5xx are transient.
+    """
+    if not error:
+        return False
+    return error.startswith((
+        "Bad Request", "Unauthorized", "Forbidden", "Not Found", "No bot token configured",
+    ))
+
+
 def _is_not_modified_error(error):
     return bool(error and "message is not modified" in error.lower())
 
@@ -206,6 +295,48 @@ def _is_missing_message_error(error):
     )
 
 
+# ═══════════════════════════════════════════════════════════════════
+#  Coalesced message refreshes
+# ═══════════════════════════════════════════════════════════════════
+
+_pending_refreshes = contextvars.ContextVar("telegram_pending_refreshes", default=None)
+
+
+@contextlib.contextmanager
+def coalesced_refreshes():
+    """Defer weekly schedule / event reminder refreshes to the end of the block.
+
+    A confirm tap used to edit the weekly message, then the event reminder,
+    then the weekly message again. Inside this block each refresh only marks
+    its (chat_id, message_id) dirty; on exit every dirty message is rendered
+    once and edited once, with the last refresh requested for it — the state
+    the sequential edits would have ended in. Nested blocks join the outer one.
+    """
+    if _pending_refreshes.get() is not None:
+        yield
+        return
+    pending = {}
+    token = _pending_refreshes.set(pending)
+    try:
+        yield
+    finally:
+        _pending_refreshes.reset(token)
+        for (chat_id, message_id), refresh in pending.items():
+            try:
+                refresh()
+            except Exception as e:
+                print(f"[Telegram] Failed to refresh message {message_id} in {chat_id}: {e}")
+
+
+def _queue_refresh(chat_id, message_id, refresh):
+    """Run ``refresh`` now, or mark the message dirty inside coalesced_refreshes()."""
+    pending = _pending_refreshes.get()
+    if pending is None or not message_id:
+        return refresh()
+    pending[(str(chat_id), int(message_id))] = refresh
+    return True
+
+
 def edit_message_with_error(chat_id, message_id, text, reply_markup=None):
     """Edit an existing message. Returns (ok, error_description)."""
     payload = {
@@ -475,12 +606,7 @@ def _worker_name(assignment):
 
 
 def _notify_admin_text(text):
-    if not PERSONAL_CHAT_ID:
-        return
-    try:
-        send_message(text, chat_id=PERSONAL_CHAT_ID)
-    except Exception as e:
-        print(f"[Telegram] Admin notification failed: {e}")
+    _queue_admin_dm(text)
 
 
 def _notify_name_tap(person_name, assignment, event):
@@ -535,21 +661,56 @@ def send_suggestion_alert(suggestion):
     return msg_id
 
 
+# TempChat ids whose group delete is queued or scheduled but not yet settled;
+# sweep_expired_temp_chats leaves these "deleting" rows alone.
+_temp_deletes_in_flight = set()
+_temp_deletes_lock = threading.Lock()
+
+
+def _track_temp_delete(temp_chat_id):
+    with _temp_deletes_lock:
+        _temp_deletes_in_flight.add(temp_chat_id)
+
+
+def _settle_temp_delete(app, temp_chat_id, ok):
+    try:
+        _record_temp_group_deleted(app, temp_chat_id, ok)
+    finally:
+        with _temp_deletes_lock:
+            _temp_deletes_in_flight.discard(temp_chat_id)
+
+
+def _temp_delete_in_flight(temp_chat_id):
+    with _temp_deletes_lock:
+        return temp_chat_id in _temp_deletes_in_flight
+
+
+def _record_temp_group_deleted(app, temp_chat_id, ok):
+    """Settle a TempChat left in "deleting" once its group delete has finished."""
+    if not app:
+        return
+    with app.app_context():
+        try:
+            temp_chat = TempChat.query.get(temp_chat_id)
+            if temp_chat and temp_chat.status == "deleting":
+                temp_chat.status = "deleted" if ok else "delete_failed"
+                db.session.commit()
+        finally:
+            db.session.remove()
+
+
 def _delete_temp_group_later(temp_chat_id, chat_id, delay=5, app=None):
+    _track_temp_delete(temp_chat_id)
+
     def _delete():
         time.sleep(delay)
         ok = False
         for attempt in range(3):
-            ok = telegram_temp_groups.delete_group(chat_id)
+            ok = telegram_temp_groups.wait(telegram_temp_groups.delete_group(chat_id), False)
             if ok:
                 break
             time.sleep(5 * (attempt + 1))
-        if app:
-            with app.app_context():
-                temp_chat = TempChat.query.get(temp_chat_id)
-                if temp_chat:
-                    temp_chat.status = "deleted" if ok else "delete_failed"
-                    db.session.commit()
+        _settle_temp_delete(app, temp_chat_id, ok)
         if not ok:
             print(f"[TempGroup] Scheduled delete failed for {chat_id}")
     threading.Thread(target=_delete, daemon=True).start()
@@ -624,19 +785,37 @@ def _delete_temp_chat(temp_chat, delay=0):
         return True
 
     # No siblings: tear down the whole group as before.
-    temp_chat.status = "deleting" if delay else temp_chat.status
-    db.session.commit()
+    try:
+        app = current_app._get_current_object()
+    except RuntimeError:
+        app = None
     if delay:
-        try:
-            app = current_app._get_current_object()
-        except RuntimeError:
-            app = None
+        temp_chat.status = "deleting"
+        db.session.commit()
         _delete_temp_group_later(temp_chat.id, temp_chat.chat_id, delay=delay, app=app)
         return True
-    ok = telegram_temp_groups.delete_group(temp_chat.chat_id)
-    temp_chat.status = "deleted" if ok else "delete_failed"
+    deleted = telegram_temp_groups.delete_group(temp_chat.chat_id)
+    if deleted.done():
+        ok = deleted.result()
+        temp_chat.status = "deleted" if ok else "delete_failed"
+        db.session.commit()
+        return ok
+    # Still queued on the Telethon service: don't hold the request thread.
+    # The row stays "deleting" (which sweep_expired_temp_chats retries) until
+    # the delete settles it.
+    temp_chat.status = "deleting"
     db.session.commit()
-    return ok
+    temp_chat_id = temp_chat.id
+    _track_temp_delete(temp_chat_id)
+
+    def _settle(done):
+        # Runs on the Telethon loop thread; keep the DB write off it.
+        threading.Thread(
+            target=_settle_temp_delete, args=(app, temp_chat_id, done.result()), daemon=True,
+        ).start()
+
+    deleted.add_done_callback(_settle)
+    return True
 
 
 def _send_temp_group(kind, person, text, buttons, assignment=None, swap_request=None,
@@ -682,12 +861,14 @@ def _send_temp_group(kind, person, text, buttons, assignment=None, swap_request=
         _notify_admin_text(f"⚠️ Temp groups unavailable for {person}")
         return None
     group_title = title or f"🎬 Livestream {person}"
-    chat_id = telegram_temp_groups.create_temp_group(
+    # The first message needs the chat id, so this path does wait for the group.
+    created = telegram_temp_groups.create_temp_group(
         group_title,
         [member.telegram_user_id],
         bot_token=TELEGRAM_BOT_TOKEN,
         bot_username=os.environ.get("TELEGRAM_BOT_USERNAME", ""),
     )
+    chat_id = telegram_temp_groups.wait(created, None)
     if not chat_id:
         _notify_admin_text(f"⚠️ Could not create temp chat for {person}")
         return None
@@ -873,7 +1054,8 @@ def format_event_message(event, header=None):
     return "\n".join(lines)
 
 
-def format_today_group_post(event):
+def format_today_group_post(event, ctx=None):
+    ctx = ctx or RenderContext.for_event(event)
     title = _event_title_without_emoji(event)
     event_line = _reminder_event_line(title, _event_time(event))
     if getattr(event, "cancelled", False):
@@ -889,7 +1071,7 @@ def format_today_group_post(event):
         "",
     ]
     for i, assignment in enumerate(event.assignments):
-        lines.append(_assignment_line(assignment, i))
+        lines.append(_assignment_line(assignment, i, ctx))
     return "\n".join(lines)
 
 
@@ -976,7 +1158,7 @@ def compute_pickup_deadline(event_date, day_type):
     )
 
 
-def format_monthly_schedule(year, month):
+def format_monthly_schedule(year, month, ctx=None):
     """Format a monthly schedule overview message."""
     import calendar as cal
     month_name = cal.month_name[month]
@@ -984,9 +1166,8 @@ def format_monthly_schedule(year, month):
     _, num_days = cal.monthrange(year, month)
     end = datetime.date(year, month, num_days)
 
-    events = Event.query.filter(
-        Event.date >= start, Event.date <= end
-    ).order_by(Event.date).all()
+    ctx = ctx or RenderContext.for_range(start, end)
+    events = ctx.events
 
     lines = [f"📅 <b>{month_name} {year} - Livestream Schedule</b>", ""]
 
@@ -1011,7 +1192,7 @@ def format_monthly_schedule(year, month):
             if is_friday:
                 icon = FRIDAY_ICONS[i] if i < len(FRIDAY_ICONS) else "🙌"
                 if a.status == "swap_needed":
-                    if _is_expired_uncovered_swap(a):
+                    if _is_expired_uncovered_swap(a, ctx):
                         lines.append(f"  {icon} <s>{worker}</s>")
                     else:
                         lines.append(f"  {icon} <b>NEEDED</b>")
@@ -1019,14 +1200,14 @@ def format_monthly_schedule(year, month):
                     lines.append(f"  {icon} <i>TBD</i>")
                 else:
                     confirmed = (
-                        f"{_telegram_confirm_status_icon_for_assignment(a)} "
+                        f"{_telegram_confirm_status_icon_for_assignment(a, ctx)} "
                         if _show_telegram_confirm_icon(a) else ""
                     )
                     lines.append(f"  {icon} {confirmed}{worker}")
             else:
                 role_icon = ROLE_EMOJI.get(a.role, "👤")
                 if a.status == "swap_needed":
-                    if _is_expired_uncovered_swap(a):
+                    if _is_expired_uncovered_swap(a, ctx):
                         lines.append(f"  {role_icon} <s>{worker}</s>")
                     else:
                         lines.append(f"  {role_icon} <b>NEEDED</b>")
@@ -1034,7 +1215,7 @@ def format_monthly_schedule(year, month):
                     lines.append(f"  {role_icon} <i>TBD</i>")
                 else:
                     confirmed = (
-                        f"{_telegram_confirm_status_icon_for_assignment(a)} "
+                        f"{_telegram_confirm_status_icon_for_assignment(a, ctx)} "
                         if _show_telegram_confirm_icon(a) else ""
                     )
                     lines.append(f"  {role_icon} {confirmed}{worker}")
@@ -1043,22 +1224,8 @@ def format_monthly_schedule(year, month):
     return "\n".join(lines)
 
 
-def _weekly_schedule_anchor(today=None):
-    today = today or vancouver_today()
-    monday = today - datetime.timedelta(days=today.weekday())
-    sunday = monday + datetime.timedelta(days=6)
-    monday_events = Event.query.filter(Event.date == monday).all()
-    has_monday_event = bool(monday_events)
-    send_date = monday if has_monday_event else monday + datetime.timedelta(days=1)
-    return monday, sunday, send_date
-
-
-def _weekly_schedule_events(today=None):
-    monday, sunday, _send_date = _weekly_schedule_anchor(today)
-    events = Event.query.filter(
-        Event.date >= monday,
-        Event.date <= sunday,
-    ).order_by(Event.date).all()
+def _weekly_schedule_events(ctx):
+    events = ctx.events
     # Slot regular services by event type first, so a moved Bible Study still
     # renders as this week's Bible Study instead of an extra plus a missing slot.
     # Fall back to weekday for custom services that land on Friday/Sunday.
@@ -1069,7 +1236,7 @@ def _weekly_schedule_events(today=None):
     if sunday_event is None:
         sunday_event = next((e for e in events if e.date.weekday() == 6), None)
     extras = [e for e in events if e is not friday and e is not sunday_event]
-    return monday, sunday, friday, sunday_event, extras
+    return ctx.monday, ctx.sunday, friday, sunday_event, extras
 
 
 def _custom_emoji_html(emoji_id, fallback):
@@ -1099,18 +1266,21 @@ def _telegram_status_icons_for_date(schedule_date):
     return _weekly_confirm_status_icon(), _weekly_decline_status_icon()
 
 
-def _telegram_status_icons_for_assignment(assignment):
+def _telegram_status_icons_for_assignment(assignment, ctx=None):
     event = assignment.event if assignment else None
-    return _telegram_status_icons_for_date(event.date if event else None)
+    schedule_date = event.date if event else None
+    if ctx is not None:
+        return ctx.status_icons(schedule_date)
+    return _telegram_status_icons_for_date(schedule_date)
 
 
-def _telegram_confirm_status_icon_for_assignment(assignment):
-    confirm_icon, _decline_icon = _telegram_status_icons_for_assignment(assignment)
+def _telegram_confirm_status_icon_for_assignment(assignment, ctx=None):
+    confirm_icon, _decline_icon = _telegram_status_icons_for_assignment(assignment, ctx)
     return confirm_icon
 
 
-def _telegram_decline_status_icon_for_assignment(assignment):
-    _confirm_icon, decline_icon = _telegram_status_icons_for_assignment(assignment)
+def _telegram_decline_status_icon_for_assignment(assignment, ctx=None):
+    _confirm_icon, decline_icon = _telegram_status_icons_for_assignment(assignment, ctx)
     return decline_icon
 
 
@@ -1122,44 +1292,99 @@ def _show_telegram_confirm_icon(assignment):
     return bool(assignment and assignment.status == "confirmed")
 
 
-def _is_expired_uncovered_swap(assignment):
+def _is_expired_uncovered_swap(assignment, ctx=None):
     if not assignment or assignment.status != "swap_needed" or assignment.cover:
         return False
-    swap = (
-        SwapRequest.query
-        .filter_by(assignment_id=assignment.id)
-        .order_by(SwapRequest.id.desc())
-        .first()
-    )
+    if ctx is not None:
+        swap, now = ctx.latest_swap.get(assignment.id), ctx.now
+    else:
+        swap, now = latest_swap_request(assignment), datetime.datetime.utcnow()
     if not swap or swap.accepted_by:
         return False
     if swap.status == "expired":
         return True
     if swap.status == "active" and swap.expires_at:
-        return swap.expires_at <= datetime.datetime.utcnow()
+        return swap.expires_at <= now
     return False
 
 
-def _assignment_line(assignment, index=0):
+class RenderContext:
+    """What one schedule render needs, loaded once instead of per line.
+
+    ``events`` carry their assignments, ``latest_swap`` maps assignment id to
+    its newest SwapRequest, and ``today`` / ``now`` are read once so every
+    line of a message agrees on them. Week contexts also carry the week's
+    ``monday`` / ``sunday`` / ``send_date``.
+    """
+
+    def __init__(self, events, latest_swap=None):
+        self.events = events
+        self.today = vancouver_today()
+        self.now = datetime.datetime.utcnow()
+        if latest_swap is None:
+            latest_swap = {
+                assignment.id: swap
+                for event in events for assignment in event.assignments
+                if (swap := latest_swap_request(assignment)) is not None
+            }
+        self.latest_swap = latest_swap
+        self._icons = {
+            True: (_static_confirm_status_icon(), _static_decline_status_icon()),
+            False: (_weekly_confirm_status_icon(), _weekly_decline_status_icon()),
+        }
+
+    @classmethod
+    def for_range(cls, start, end):
+        """Events in ``[start, end]`` with assignments and swap requests (three queries)."""
+        return cls(load_event_graph(start, end, include_swaps=True))
+
+    @classmethod
+    def for_week(cls, today=None):
+        """The Monday-Sunday week containing ``today`` (default: now)."""
+        today = today or vancouver_today()
+        monday = today - datetime.timedelta(days=today.weekday())
+        ctx = cls.for_range(monday, monday + datetime.timedelta(days=6))
+        ctx.monday, ctx.sunday = monday, monday + datetime.timedelta(days=6)
+        has_monday_event = any(event.date == monday for event in ctx.events)
+        ctx.send_date = monday if has_monday_event else monday + datetime.timedelta(days=1)
+        return ctx
+
+    @classmethod
+    def for_event(cls, event):
+        """A single already-loaded event; swap requests are only read for open swaps."""
+        open_swaps = [a.id for a in event.assignments if a.status == "swap_needed" and not a.cover]
+        latest_swap = {}
+        if open_swaps:
+            for swap in SwapRequest.query.filter(SwapRequest.assignment_id.in_(open_swaps)).order_by(SwapRequest.id):
+                latest_swap[swap.assignment_id] = swap
+        return cls([event], latest_swap=latest_swap)
+
+    def status_icons(self, schedule_date):
+        """Animated status icons for active schedules, static marks once past."""
+        return self._icons[bool(schedule_date and schedule_date < self.today)]
+
+
+def _assignment_line(assignment, index=0, ctx=None):
     worker = _worker_name(assignment)
     if not worker or worker in ("TBD", "Select Helper"):
         worker = "TBD"
     icon = _role_icon(assignment, index)
     if assignment.status == "swap_needed":
-        if _is_expired_uncovered_swap(assignment):
+        if _is_expired_uncovered_swap(assignment, ctx):
             return f"{icon} <s>{worker}</s>"
-        return f"{icon}{_telegram_decline_status_icon_for_assignment(assignment)}{worker}"
+        return f"{icon}{_telegram_decline_status_icon_for_assignment(assignment, ctx)}{worker}"
     if assignment.cover:
         cover = assignment.cover
         if _show_telegram_confirm_icon(assignment):
-            cover = f"{_telegram_confirm_status_icon_for_assignment(assignment)}{cover}"
+            cover = f"{_telegram_confirm_status_icon_for_assignment(assignment, ctx)}{cover}"
         return f"{icon} <s>{assignment.person}</s> → {cover}"
     if _show_telegram_confirm_icon(assignment):
-        return f"{icon}{_telegram_confirm_status_icon_for_assignment(assignment)}{worker}"
+        return f"{icon}{_telegram_confirm_status_icon_for_assignment(assignment, ctx)}{worker}"
     return f"{icon} {worker}"
 
 
-def _weekly_event_block(event, default_header=None, default_time=None, missing_label=None, default_day_type=None):
+def _weekly_event_block(event, default_header=None, default_time=None, missing_label=None, default_day_type=None,
+                        ctx=None):
     """Render one event's block in the weekly schedule.
 
     Header rule: when an event has a custom title (e.g. 'Communion'), use it
@@ -1190,16 +1415,17 @@ def _weekly_event_block(event, default_header=None, default_time=None, missing_l
         lines.append("✅ <i>No livestream needed</i>")
     else:
         for index, assignment in enumerate(event.assignments):
-            lines.append(_assignment_line(assignment, index))
+            lines.append(_assignment_line(assignment, index, ctx))
     return lines
 
 
-def format_weekly_schedule(today=None):
-    monday, _sunday, friday, sunday_event, extras = _weekly_schedule_events(today)
+def format_weekly_schedule(today=None, ctx=None):
+    ctx = ctx or RenderContext.for_week(today)
+    monday, _sunday, friday, sunday_event, extras = _weekly_schedule_events(ctx)
     lines = ["\U0001F4C5 <b>Livestream schedule this week</b>", ""]
 
     for event in extras:
-        lines.extend(_weekly_event_block(event))
+        lines.extend(_weekly_event_block(event, ctx=ctx))
         lines.append("")
 
     lines.extend(_weekly_event_block(
@@ -1208,6 +1434,7 @@ def format_weekly_schedule(today=None):
         default_time="7:00 PM",
         missing_label="No Bible Study scheduled.",
         default_day_type="Friday",
+        ctx=ctx,
     ))
     lines.append("")
 
@@ -1217,6 +1444,7 @@ def format_weekly_schedule(today=None):
         default_time="2:30 PM",
         missing_label="No Sunday Service scheduled.",
         default_day_type="Sunday",
+        ctx=ctx,
     ))
 
     return "\n".join(lines).strip()
@@ -1229,7 +1457,7 @@ RICH_WEEKLY_ROLE_ROWS = [
 ]
 
 
-def _weekly_rich_assignment_display(assignment):
+def _weekly_rich_assignment_display(assignment, ctx=None):
     if not assignment:
         return "-"
 
@@ -1239,7 +1467,7 @@ def _weekly_rich_assignment_display(assignment):
     worker = html.escape(worker)
 
     if assignment.status == "swap_needed":
-        if _is_expired_uncovered_swap(assignment):
+        if _is_expired_uncovered_swap(assignment, ctx):
             return f"<s>{worker}</s>"
         return f"<mark>Needs cover</mark> {worker}"
 
@@ -1249,7 +1477,7 @@ def _weekly_rich_assignment_display(assignment):
         return f"<b>{cover}</b> <s>{original}</s>"
 
     if _show_telegram_confirm_icon(assignment):
-        return f"{_telegram_confirm_status_icon_for_assignment(assignment)} <b>{worker}</b>"
+        return f"{_telegram_confirm_status_icon_for_assignment(assignment, ctx)} <b>{worker}</b>"
 
     return worker
 
@@ -1263,19 +1491,19 @@ def _weekly_rich_assignment_for_roles(event, roles):
     return next((assignment for assignment in event.assignments if assignment.role in role_set), None)
 
 
-def _weekly_rich_event_cell(event, roles):
+def _weekly_rich_event_cell(event, roles, ctx=None):
     if event and getattr(event, "cancelled", False):
         return "No live"
-    return _weekly_rich_assignment_display(_weekly_rich_assignment_for_roles(event, roles))
+    return _weekly_rich_assignment_display(_weekly_rich_assignment_for_roles(event, roles), ctx)
 
 
-def _weekly_rich_table_html(friday, sunday_event):
+def _weekly_rich_table_html(friday, sunday_event, ctx=None):
     rows = []
     for role_label, friday_roles, sunday_roles in RICH_WEEKLY_ROLE_ROWS:
         rows.append([
             html.escape(role_label),
-            _weekly_rich_event_cell(friday, friday_roles),
-            _weekly_rich_event_cell(sunday_event, sunday_roles),
+            _weekly_rich_event_cell(friday, friday_roles, ctx),
+            _weekly_rich_event_cell(sunday_event, sunday_roles, ctx),
         ])
 
     table_rows = [
@@ -1318,12 +1546,13 @@ def _weekly_rich_details_html(friday, sunday_event):
     ])
 
 
-def format_weekly_schedule_rich(today=None):
-    monday, sunday, friday, sunday_event, extras = _weekly_schedule_events(today)
+def format_weekly_schedule_rich(today=None, ctx=None):
+    ctx = ctx or RenderContext.for_week(today)
+    monday, sunday, friday, sunday_event, extras = _weekly_schedule_events(ctx)
     lines = [
         "<h3>📅 Livestream schedule this week</h3>",
         f"<p><i>{html.escape(_short_date(monday))} - {html.escape(_short_date(sunday))}</i></p>",
-        _weekly_rich_table_html(friday, sunday_event),
+        _weekly_rich_table_html(friday, sunday_event, ctx),
     ]
 
     details = _weekly_rich_details_html(friday, sunday_event)
@@ -1333,22 +1562,18 @@ def format_weekly_schedule_rich(today=None):
     if extras:
         lines.extend(["<hr/>", "<h4>Also this week</h4>"])
         for event in extras:
-            event_lines = html.escape("\n".join(_weekly_event_block(event)))
+            event_lines = html.escape("\n".join(_weekly_event_block(event, ctx=ctx)))
             lines.append(f"<blockquote>{event_lines}</blockquote>")
 
     return "\n".join(lines).strip()
 
 
-def _weekly_assignments_for_person(person_name, today=None):
+def _weekly_assignments_for_person(person_name, today=None, ctx=None):
     if not person_name:
         return []
-    monday, sunday, _send_date = _weekly_schedule_anchor(today)
+    ctx = ctx or RenderContext.for_week(today)
     rows = []
-    events = Event.query.filter(
-        Event.date >= monday,
-        Event.date <= sunday,
-    ).order_by(Event.date).all()
-    for event in events:
+    for event in ctx.events:
         if getattr(event, "cancelled", False):
             continue
         for index, assignment in enumerate(event.assignments):
@@ -1380,13 +1605,17 @@ def _event_title_without_emoji(event):
 
 def _restore_weekly_message(chat_id, message_id, today=None):
     schedule_date = today or vancouver_today()
-    text = format_weekly_schedule(today=schedule_date)
-    return edit_message(
-        chat_id,
-        message_id,
-        text,
-        reply_markup=_weekly_schedule_reply_markup_for_date(schedule_date),
-    )
+
+    def refresh():
+        text = format_weekly_schedule(today=schedule_date)
+        return edit_message(
+            chat_id,
+            message_id,
+            text,
+            reply_markup=_weekly_schedule_reply_markup_for_date(schedule_date),
+        )
+
+    return _queue_refresh(chat_id, message_id, refresh)
 
 
 def _weekly_select_shift(callback_id, chat_id, message_id, person_name, mode,
@@ -1449,17 +1678,14 @@ def _weekly_confirm_assignment(callback_id, chat_id, message_id, assignment, per
         if assignment.cover and assignment.cover == person_name:
             _log_interaction(
                 telegram_user_id, first_name, "confirm", person_name, assignment, event,
-                details="weekly_button_already_confirmed_cover",
+                details="weekly_button_already_confirmed_cover", buffered=True,
             )
-            db.session.commit()
             answer_callback(callback_id, "Already confirmed.")
             _restore_weekly_message(chat_id, message_id, today=event.date)
             refresh_event_telegram(event)
             return True
         assignment.status = "pending"
-        h = assignment.history
-        h.append({"action": "undo", "by": person_name, "via": "weekly_telegram", "ts": str(vancouver_now())})
-        assignment.history = h
+        assignment.add_history({"action": "undo", "by": person_name, "via": "weekly_telegram", "ts": str(vancouver_now())})
         _log_interaction(telegram_user_id, first_name, "undo", person_name, assignment, event, details="weekly_button")
         db.session.commit()
         _notify_admin("undo", person_name, assignment, event, source="weekly_button")
@@ -1468,9 +1694,7 @@ def _weekly_confirm_assignment(callback_id, chat_id, message_id, assignment, per
         refresh_event_telegram(event)
         return True
     assignment.status = "confirmed"
-    h = assignment.history
-    h.append({"action": "confirm", "by": person_name, "via": "weekly_telegram", "ts": str(vancouver_now())})
-    assignment.history = h
+    assignment.add_history({"action": "confirm", "by": person_name, "via": "weekly_telegram", "ts": str(vancouver_now())})
     _log_interaction(telegram_user_id, first_name, "confirm", person_name, assignment, event, details="weekly_button")
     db.session.commit()
     _notify_admin("confirm", person_name, assignment, event, source="weekly_button")
@@ -1497,7 +1721,9 @@ def _weekly_decline_assignment(callback_id, chat_id, message_id, assignment, per
 
 
 def _restore_event_reminder_message(chat_id, message_id, event):
-    return edit_message(chat_id, message_id, format_today_group_post(event), reply_markup=_event_reminder_buttons(event))
+    return _queue_refresh(chat_id, message_id, lambda: edit_message(
+        chat_id, message_id, format_today_group_post(event), reply_markup=_event_reminder_buttons(event),
+    ))
 
 
 def _event_assignments_for_person(event, person_name):
@@ -1518,9 +1744,8 @@ def _event_confirm_assignment(callback_id, chat_id, message_id, assignment, pers
         if assignment.cover and assignment.cover == person_name:
             _log_interaction(
                 telegram_user_id, first_name, "confirm", person_name, assignment, event,
-                details="event_reminder_already_confirmed_cover",
+                details="event_reminder_already_confirmed_cover", buffered=True,
             )
-            db.session.commit()
             answer_callback(callback_id, "Already confirmed.")
             _restore_event_reminder_message(chat_id, message_id, event)
             update_weekly_schedule_for_event(event)
@@ -1530,9 +1755,7 @@ def _event_confirm_assignment(callback_id, chat_id, message_id, assignment, pers
     else:
         assignment.status = "confirmed"
         action = "confirm"
-    h = assignment.history
-    h.append({"action": action, "by": person_name, "via": "event_reminder", "ts": str(vancouver_now())})
-    assignment.history = h
+    assignment.add_history({"action": action, "by": person_name, "via": "event_reminder", "ts": str(vancouver_now())})
     _log_interaction(telegram_user_id, first_name, action, person_name, assignment, event, details="event_reminder")
     db.session.commit()
     if action == "confirm":
@@ -1590,9 +1813,7 @@ def _event_undo_decline_assignment(callback_id, chat_id, message_id, assignment,
 
     assignment.status = "pending"
     assignment.cover = None
-    h = assignment.history
-    h.append({"action": "undo_decline", "by": person_name, "via": "event_reminder", "ts": str(vancouver_now())})
-    assignment.history = h
+    assignment.add_history({"action": "undo_decline", "by": person_name, "via": "event_reminder", "ts": str(vancouver_now())})
     assignment.telegram_message_id = None
     _log_interaction(telegram_user_id, first_name, "undo_decline", person_name, assignment, event,
                      details="event_reminder")
@@ -1655,35 +1876,25 @@ def _can_undo_event_decline(assignment, person_name):
 
 
 def _weekly_schedule_already_sent(monday):
-    return _weekly_schedule_log(monday) is not None
+    return _weekly_schedule_ref(monday) is not None
 
 
-def _weekly_schedule_log(monday):
-    key = f"weekly_schedule:{monday.isoformat()}"
-    return (
-        InteractionLog.query
-        .filter(
-            InteractionLog.action == "weekly_schedule_sent",
-            InteractionLog.event_date == monday,
-            InteractionLog.details.like(f"{key}%"),
-        )
-        .order_by(InteractionLog.id.desc())
-        .first()
-    )
+def _weekly_schedule_ref(monday):
+    return message_refs.get(message_refs.WEEKLY_SCHEDULE, anchor_date=monday)
 
 
 def send_weekly_schedule(chat_id=None, force=False, today=None):
     today = today or vancouver_today()
-    monday, sunday, send_date = _weekly_schedule_anchor(today)
-    if not force and today != send_date:
+    ctx = RenderContext.for_week(today)
+    monday = ctx.monday
+    if not force and today != ctx.send_date:
         return 0
     if not force and _weekly_schedule_already_sent(monday):
         return 0
-    events_exist = Event.query.filter(Event.date >= monday, Event.date <= sunday).first() is not None
-    if not events_exist:
+    if not ctx.events:
         return 0
 
-    text = format_weekly_schedule(today)
+    text = format_weekly_schedule(today, ctx=ctx)
     buttons = _weekly_schedule_reply_markup_for_date(today)
     target_chat_id = chat_id or TELEGRAM_CHAT_ID
     msg_id = send_message(text, chat_id=target_chat_id, reply_markup=buttons)
@@ -1691,6 +1902,7 @@ def send_weekly_schedule(chat_id=None, force=False, today=None):
         return 0
 
     reason = "weekly_schedule_resent" if force else "weekly_schedule_sent"
+    message_refs.register(message_refs.WEEKLY_SCHEDULE, monday, target_chat_id, msg_id, text, buttons)
     db.session.add(InteractionLog(
         action="weekly_schedule_sent",
         person_name="group",
@@ -1715,6 +1927,7 @@ def send_event_reminder(event, chat_id=None):
     if msg_id:
         event.telegram_message_id = msg_id
         event.telegram_chat_id = str(target)
+        message_refs.note_content(target, msg_id, text, buttons)
         db.session.commit()
 
     return msg_id
@@ -1729,9 +1942,14 @@ def update_event_reminder(event):
     """
     if not event or not event.telegram_message_id or not event.telegram_chat_id:
         return False
-    text = format_today_group_post(event)
-    buttons = _event_reminder_buttons(event)
-    return bool(edit_message(event.telegram_chat_id, event.telegram_message_id, text, reply_markup=buttons))
+    chat_id, message_id = event.telegram_chat_id, event.telegram_message_id
+
+    def refresh():
+        text = format_today_group_post(event)
+        buttons = _event_reminder_buttons(event)
+        return bool(edit_message(chat_id, message_id, text, reply_markup=buttons))
+
+    return _queue_refresh(chat_id, message_id, refresh)
 
 
 def delete_past_event_reminders(today=None):
@@ -1743,31 +1961,47 @@ def delete_past_event_reminders(today=None):
     """
     today = today or vancouver_today()
     yesterday = today - datetime.timedelta(days=1)
-    events = Event.query.filter(
+    timer = sweeps.SweepTimer("past_event_reminders")
+    events = Event.query.options(
+        selectinload(Event.assignments).options(
+            defer(Assignment._history_json), selectinload(Assignment.swap_requests),
+        ),
+    ).filter(
         Event.date < today,
         Event.telegram_message_id.isnot(None),
         Event.telegram_chat_id.isnot(None),
     ).all()
+    ctx = RenderContext(events)
+    buttons = _schedule_only_buttons()
+    jobs = [
+        (event, event.telegram_chat_id, event.telegram_message_id, format_today_group_post(event, ctx))
+        for event in events
+    ]
+    timer.phase("prefetch")
+
+    results = sweeps.run_parallel(
+        jobs, lambda job: edit_message_with_error(job[1], job[2], job[3], reply_markup=buttons),
+    )
+    timer.phase("telegram")
 
     closed = 0
-    for event in events:
-        ok, error = edit_message_with_error(
-            event.telegram_chat_id,
-            event.telegram_message_id,
-            format_today_group_post(event),
-            reply_markup=_schedule_only_buttons(),
-        )
+    for (event, _chat_id, message_id, _text), result, exc in results:
+        ok, error = result if exc is None else (False, str(exc))
         if ok:
             closed += 1
         elif _is_missing_message_error(error):
-            print(f"[cleanup] Past event reminder {event.telegram_message_id} is gone")
+            print(f"[cleanup] Past event reminder {message_id} is gone")
         else:
-            print(f"[cleanup] Failed to close past event reminder {event.telegram_message_id}: {error}")
+            print(f"[cleanup] Failed to close past event reminder {message_id}: {error}")
             continue
         event.telegram_message_id = None
         event.telegram_chat_id = None
-    if events:
+    pruned = message_refs.prune(today - datetime.timedelta(days=message_refs.KEEP_DAYS))
+    if events or pruned:
         db.session.commit()
+    timer.phase("commit")
+    timer.done(len(events))
+    if events:
         print(f"[cleanup] Closed {closed} of {len(events)} past event reminder message(s)")
     if Event.query.filter_by(date=yesterday).first():
         try:
@@ -1777,23 +2011,6 @@ def delete_past_event_reminders(today=None):
     return closed
 
 
-def _parse_weekly_schedule_log(log):
-    """Pull (chat_id, message_id) out of an InteractionLog details string."""
-    if not log or not log.details:
-        return None, None
-    parts = {}
-    for chunk in log.details.split("|"):
-        if "=" in chunk:
-            k, v = chunk.split("=", 1)
-            parts[k.strip()] = v.strip()
-    chat_id = parts.get("chat_id")
-    try:
-        msg_id = int(parts["message_id"]) if parts.get("message_id") else None
-    except (TypeError, ValueError):
-        msg_id = None
-    return chat_id, msg_id
-
-
 def update_weekly_schedule_for_date(date_obj):
     """Re-render and edit the weekly schedule message that contains this date.
 
@@ -1803,19 +2020,23 @@ def update_weekly_schedule_for_date(date_obj):
     if not date_obj:
         return False
     monday = date_obj - datetime.timedelta(days=date_obj.weekday())
-    log = _weekly_schedule_log(monday)
-    chat_id, msg_id = _parse_weekly_schedule_log(log)
-    if not chat_id or not msg_id:
+    ref = _weekly_schedule_ref(monday)
+    if ref is None:
         return False
-    text = format_weekly_schedule(today=monday)
-    buttons = _weekly_schedule_reply_markup_for_date(date_obj)
-    ok, error = edit_message_with_error(chat_id, msg_id, text, reply_markup=buttons)
-    if ok:
-        return True
-    if _is_missing_message_error(error):
-        print(f"[weekly] Stored schedule message {msg_id} is gone; sending replacement for {monday.isoformat()}")
-        return bool(send_weekly_schedule(chat_id=chat_id, force=True, today=monday))
-    return False
+    chat_id, msg_id = ref.chat_id, ref.message_id
+
+    def refresh():
+        text = format_weekly_schedule(today=monday)
+        buttons = _weekly_schedule_reply_markup_for_date(date_obj)
+        ok, error = edit_message_with_error(chat_id, msg_id, text, reply_markup=buttons)
+        if ok:
+            return True
+        if _is_missing_message_error(error):
+            print(f"[weekly] Stored schedule message {msg_id} is gone; sending replacement for {monday.isoformat()}")
+            return bool(send_weekly_schedule(chat_id=chat_id, force=True, today=monday))
+        return False
+
+    return _queue_refresh(chat_id, msg_id, refresh)
 
 
 def update_weekly_schedule_for_event(event):
@@ -1878,30 +2099,46 @@ def _delete_swap_needed_message(swap, assignment=None, chat_id=None, message_id=
 
     cleaned = False
     if target_chat_id and message_id:
-        cleaned, error = delete_message_with_error(target_chat_id, message_id)
-        if not cleaned:
-            print(f"[sweep] Failed to delete swap message {message_id}: {error}")
-            cleaned, edit_error = edit_message_with_error(
-                target_chat_id,
-                message_id,
-                _closed_swap_needed_text(swap, assignment=assignment),
-                reply_markup=_schedule_only_buttons("\U0001F4C5 View Schedule"),
-            )
-            if cleaned:
-                print(f"[sweep] Closed old swap message {message_id} after delete failed")
-            else:
-                print(f"[sweep] Failed to close swap message {message_id}: {edit_error}")
-
+        cleaned = _close_swap_message(
+            target_chat_id, message_id, _closed_swap_needed_text(swap, assignment=assignment),
+            _schedule_only_buttons("\U0001F4C5 View Schedule"),
+        )
     if cleaned:
-        if assignment and assignment.telegram_message_id == message_id:
-            assignment.telegram_message_id = None
-        if swap.telegram_message_id == message_id:
-            swap.telegram_message_id = None
-            swap.telegram_chat_id = None
+        _forget_swap_message(swap, assignment, message_id)
+    return cleaned
+
 
+def _close_swap_message(chat_id, message_id, closed_text, reply_markup):
+    """Delete a coverage request, or edit it to ``closed_text`` if it can't be deleted.
+
+    Telegram calls only (no session, no app context), so sweeps can run it
+    on worker threads.
+    """
+    cleaned, error = delete_message_with_error(chat_id, message_id)
+    if cleaned:
+        return True
+    print(f"[sweep] Failed to delete swap message {message_id}: {error}")
+    cleaned, edit_error = edit_message_with_error(
+        chat_id,
+        message_id,
+        closed_text,
+        reply_markup=reply_markup,
+    )
+    if cleaned:
+        print(f"[sweep] Closed old swap message {message_id} after delete failed")
+    else:
+        print(f"[sweep] Failed to close swap message {message_id}: {edit_error}")
     return cleaned
 
 
+def _forget_swap_message(swap, assignment, message_id):
+    if assignment and assignment.telegram_message_id == message_id:
+        assignment.telegram_message_id = None
+    if swap.telegram_message_id == message_id:
+        swap.telegram_message_id = None
+        swap.telegram_chat_id = None
+
+
 def send_monthly_schedule(year=None, month=None, chat_id=None):
     """Send the monthly schedule overview."""
     today = vancouver_today()
@@ -2006,6 +2243,7 @@ def send_swap_needed(event, assignment, chat_id=None, pickup_url=None, source_me
         if active_swap:
             active_swap.telegram_message_id = msg_id
             active_swap.telegram_chat_id = target_chat_id
+            message_refs.note_content(target_chat_id, msg_id, text, buttons)
         db.session.commit()
     else:
         db.session.commit()
@@ -2040,31 +2278,41 @@ def _compact_date(date_obj):
     return f"{date_obj.strftime('%a %b')} {date_obj.day}"
 
 
-def _find_future_swap_assignment(person, role, day_type, after_date, original_person=None):
-    roster = get_auto_swap_roster()
-    assignments = (
-        Assignment.query.join(Event)
-        .filter(
-            Event.date > after_date,
-            Event.day_type == day_type,
-            Assignment.person == person,
-            Assignment.status.in_(["pending", "confirmed"]),
-            Assignment.cover.is_(None),
-            Assignment.locked.is_(False),
-            Event.cancelled.is_(False),
-        )
-        .order_by(Event.date)
-        .all()
-    )
-    safe = []
-    for assignment in assignments:
-        if original_person and any((a.cover or a.person) == original_person for a in assignment.event.assignments):
-            continue
-        if original_person and not _person_can_take_assignment(original_person, assignment, roster=roster):
+def _find_future_swap_assignments(people, role, day_type, after_date, original_person=None, roster=None):
+    """{person: future assignment they could trade} for every person in ``people``.
+
+    Same choice per person as asking one at a time — the earliest safe slot,
+    matching ``role`` first — but from a single ``load_swap_targets`` call.
+    """
+    people = set(people)
+    if not people:
+        return {}
+    roster = roster or get_auto_swap_roster()
+    safe = {}
+    for event in load_swap_targets(people, day_type, after_date):
+        if original_person and any((a.cover or a.person) == original_person for a in event.assignments):
             continue
-        safe.append(assignment)
-    safe.sort(key=lambda a: (0 if a.role == role else 1, a.event.date))
-    return safe[0] if safe else None
+        for assignment in event.assignments:
+            if (
+                assignment.person not in people
+                or assignment.status not in OPEN_SWAP_STATUSES
+                or assignment.cover
+                or assignment.locked
+            ):
+                continue
+            if original_person and not _person_can_take_assignment(original_person, assignment, roster=roster):
+                continue
+            safe.setdefault(assignment.person, []).append(assignment)
+    return {
+        person: min(options, key=lambda a: (0 if a.role == role else 1, a.event.date))
+        for person, options in safe.items()
+    }
+
+
+def _find_future_swap_assignment(person, role, day_type, after_date, original_person=None):
+    return _find_future_swap_assignments(
+        [person], role, day_type, after_date, original_person=original_person,
+    ).get(person)
 
 
 def get_auto_swap_roster():
@@ -2103,27 +2351,39 @@ def _eligible_swap_members(assignment):
     event = assignment.event
     day_type = event.day_type
     members = TeamMember.query.filter_by(active=True).all()
-    eligible = []
-    for member in members:
-        if member.name == assignment.person or not member.telegram_user_id:
-            continue
-        if not is_available(member.name, event.date):
-            continue
-        if any((a.cover or a.person) == member.name for a in event.assignments):
-            continue
-        future = _find_future_swap_assignment(member.name, assignment.role, day_type, event.date, assignment.person)
-        eligible.append((member.name, future))
-    return eligible
-
-
+    with preloaded_availability():
+        names = []
+        for member in members:
+            if member.name == assignment.person or not member.telegram_user_id:
+                continue
+            if not is_available(member.name, event.date):
+                continue
+            if any((a.cover or a.person) == member.name for a in event.assignments):
+                continue
+            names.append(member.name)
+        futures = _find_future_swap_assignments(names, assignment.role, day_type, event.date, assignment.person)
+    return [(name, futures.get(name)) for name in names]
+
+
+@metrics.timed_phase("auto_swap_candidate")
 def _auto_swap_candidate(assignment):
     event = assignment.event
     if not event or not assignment.person:
         return None
+    from .scheduler_v2 import _assignment_pool_role, _assignment_schedule_type
+
+    roster = get_auto_swap_roster()
+    day_type = _assignment_schedule_type(event, assignment.role)
+    pool_role = _assignment_pool_role(day_type, assignment.role)
+    # One Availability query for the history scan, the pool filter and the
+    # selection below, instead of one per is_available() call.
+    with preloaded_availability():
+        return _pick_auto_swap(assignment, event, roster, day_type, pool_role)
+
+
+def _pick_auto_swap(assignment, event, roster, day_type, pool_role):
     from .scheduler_v2 import (
         _assignment_declined_names,
-        _assignment_pool_role,
-        _assignment_schedule_type,
         _build_history,
         _get_role_pool,
         _schedule_priority,
@@ -2131,30 +2391,21 @@ def _auto_swap_candidate(assignment):
         _select_relaxed,
     )
 
-    roster = get_auto_swap_roster()
-    day_type = _assignment_schedule_type(event, assignment.role)
-    pool_role = _assignment_pool_role(day_type, assignment.role)
     role_tracking, overall = _build_history(roster, end_before=event.date)
     assigned_today = {
         worker for worker in ((a.cover or a.person) for a in event.assignments if a.id != assignment.id)
         if worker and worker not in ("TBD", "Select Helper")
     }
     excluded = assigned_today | {assignment.person} | set(_assignment_declined_names(assignment))
-    futures = {}
-    for name in _get_role_pool(roster, pool_role, day_type=day_type):
-        if name in excluded:
-            continue
-        future = _find_future_swap_assignment(
-            name, assignment.role, day_type, event.date,
-            original_person=assignment.person,
-        )
-        if future:
-            futures[name] = future
-
+    pool = [name for name in _get_role_pool(roster, pool_role, day_type=day_type) if name not in excluded]
+    futures = _find_future_swap_assignments(
+        pool, assignment.role, day_type, event.date,
+        original_person=assignment.person, roster=roster,
+    )
     if not futures:
         return None
 
-    names = list(futures)
+    names = [name for name in pool if name in futures]
     selected = _select_best(
         names, pool_role, event.date, day_type,
         role_tracking, overall, roster, exclude=[],
@@ -2179,6 +2430,7 @@ def _active_or_new_swap_request(assignment, requestor):
     swap = SwapRequest.query.filter_by(assignment_id=assignment.id, status="active").first()
     if not swap:
         swap = SwapRequest(
+            assignment=assignment,
             assignment_id=assignment.id,
             requestor=requestor,
             event_date=event.date,
@@ -2207,15 +2459,13 @@ def _undo_prior_auto_swap(assignment, person_name):
     if future and future.person == person_name and future.cover == assignment.person:
         future.cover = None
         future.status = "pending"
-        h = future.history
-        h.append({
+        future.add_history({
             "action": "auto_swap_undone",
             "by": person_name,
             "via": "auto_swap",
             "ts": str(vancouver_now()),
             "source_assignment_id": assignment.id,
         })
-        future.history = h
     assignment.cover = None
     assignment.status = "swap_needed"
     swap.status = "cancelled"
@@ -2243,21 +2493,18 @@ def _apply_auto_swap(assignment, swap):
     assignment.cover = cover_name
     assignment.status = "pending"
     assignment.telegram_message_id = None
-    h = assignment.history
-    h.append({
+    assignment.add_history({
         "action": "auto_swap_assigned",
         "by": "system",
         "to": cover_name,
         "future_assignment_id": future_assignment.id,
         "ts": str(vancouver_now()),
     })
-    assignment.history = h
 
     future_assignment.cover = original_person
     future_assignment.status = "pending"
     future_assignment.telegram_message_id = None
-    future_history = future_assignment.history
-    future_history.append({
+    future_assignment.add_history({
         "action": "auto_swap_received",
         "by": "system",
         "from": cover_name,
@@ -2265,7 +2512,6 @@ def _apply_auto_swap(assignment, swap):
         "source_assignment_id": assignment.id,
         "ts": str(vancouver_now()),
     })
-    future_assignment.history = future_history
 
     swap.status = "accepted"
     swap.accepted_by = cover_name
@@ -2332,6 +2578,7 @@ def _send_or_edit_auto_swap_notice(assignment, swap, future_assignment, chat_id=
     if msg_id:
         swap.telegram_message_id = msg_id
         swap.telegram_chat_id = target_chat_id
+        message_refs.note_content(target_chat_id, msg_id, text, buttons)
     db.session.commit()
     return msg_id
 
@@ -2356,9 +2603,7 @@ def _decline_assignment_with_auto_swap(assignment, person_name, via,
     prior_swap = _undo_prior_auto_swap(assignment, person_name)
     requestor = assignment.person if prior_swap else person_name
     assignment.status = "swap_needed"
-    h = assignment.history
-    h.append({"action": "decline", "by": person_name, "via": via, "ts": str(vancouver_now())})
-    assignment.history = h
+    assignment.add_history({"action": "decline", "by": person_name, "via": via, "ts": str(vancouver_now())})
     swap = _active_or_new_swap_request(assignment, requestor)
     _log_interaction(
         telegram_user_id, first_name, "decline", person_name, assignment, event,
@@ -2423,7 +2668,15 @@ def handle_callback_query(data):
       noop:{id}            — No action (info-only button)
       expand:{id}          — Expand options for a specific assignment
       collapse:{id}        — Collapse options back to names only
+
+    Schedule/reminder refreshes requested while handling are coalesced:
+    each affected message is rendered and edited once, after the handler.
     """
+    with coalesced_refreshes():
+        _dispatch_callback_query(data)
+
+
+def _dispatch_callback_query(data):
     callback_id = data.get("id")
     callback_data = data.get("data", "")
     message = data.get("message", {})
@@ -2439,8 +2692,7 @@ def handle_callback_query(data):
     action = raw_action[:-8] if compact_callbacks else raw_action
 
     if action == "noop":
-        _log_interaction(telegram_user_id, first_name, "noop", first_name)
-        db.session.commit()
+        _log_interaction(telegram_user_id, first_name, "noop", first_name, buffered=True)
         answer_callback(callback_id, "ℹ️ Tap the buttons below to confirm or decline.")
         return
 
@@ -2454,15 +2706,13 @@ def handle_callback_query(data):
     ):
         person_name = _resolve_person(telegram_user_id, first_name)
         if action == "weekly_back":
-            _log_interaction(telegram_user_id, first_name, "weekly_back", person_name)
-            db.session.commit()
+            _log_interaction(telegram_user_id, first_name, "weekly_back", person_name, buffered=True)
             _restore_weekly_message(chat_id, message_id)
             answer_callback(callback_id, "Cancelled")
             return
 
         if action == "weekly_confirm":
-            _log_interaction(telegram_user_id, first_name, "weekly_confirm_tap", person_name)
-            db.session.commit()
+            _log_interaction(telegram_user_id, first_name, "weekly_confirm_tap", person_name, buffered=True)
             _weekly_select_shift(
                 callback_id, chat_id, message_id, person_name, "confirm",
                 telegram_user_id=telegram_user_id, first_name=first_name,
@@ -2470,8 +2720,7 @@ def handle_callback_query(data):
             return
 
         if action == "weekly_decline":
-            _log_interaction(telegram_user_id, first_name, "weekly_decline_tap", person_name)
-            db.session.commit()
+            _log_interaction(telegram_user_id, first_name, "weekly_decline_tap", person_name, buffered=True)
             _weekly_select_shift(
                 callback_id, chat_id, message_id, person_name, "decline",
                 telegram_user_id=telegram_user_id, first_name=first_name,
@@ -2580,9 +2829,7 @@ def handle_callback_query(data):
         temp_chat = TempChat.query.filter_by(chat_id=str(chat_id), assignment_id=assignment.id, status="active").first()
         if action == "personal_confirm":
             assignment.status = "confirmed"
-            h = assignment.history
-            h.append({"action": "confirm", "by": person_name, "via": "temp_group", "ts": str(vancouver_now())})
-            assignment.history = h
+            assignment.add_history({"action": "confirm", "by": person_name, "via": "temp_group", "ts": str(vancouver_now())})
             _log_interaction(
                 telegram_user_id, first_name, "confirm", person_name, assignment, event,
                 details="temp_group",
@@ -2604,9 +2851,7 @@ def handle_callback_query(data):
         if action == "weekday_ack":
             if assignment.status == "pending":
                 assignment.status = "confirmed"
-            h = assignment.history
-            h.append({"action": "ack", "by": person_name, "via": "temp_group", "ts": str(vancouver_now())})
-            assignment.history = h
+            assignment.add_history({"action": "ack", "by": person_name, "via": "temp_group", "ts": str(vancouver_now())})
             _log_interaction(
                 telegram_user_id, first_name, "ack", person_name, assignment, event,
                 details="temp_group",
@@ -2667,9 +2912,8 @@ def handle_callback_query(data):
         if action == "swap_decline":
             _log_interaction(
                 telegram_user_id, first_name, "swap_decline", person_name, assignment, event,
-                details="telegram_swap",
+                details="telegram_swap", buffered=True,
             )
-            db.session.commit()
             _notify_admin_text(
                 f"👍 {person_name} declined swap{_admin_source_tag('telegram_swap')}\n"
                 f"{_event_title(event)} · {assignment.role}"
@@ -2822,9 +3066,7 @@ def handle_callback_query(data):
             answer_callback(callback_id, "Already confirmed!")
             return
         assignment.status = "confirmed"
-        h = assignment.history
-        h.append({"action": "confirm", "by": person_name, "via": "telegram", "ts": str(vancouver_now())})
-        assignment.history = h
+        assignment.add_history({"action": "confirm", "by": person_name, "via": "telegram", "ts": str(vancouver_now())})
         _log_interaction(
             telegram_user_id, first_name, "confirm", person_name, assignment, event,
             details="telegram",
@@ -2867,9 +3109,7 @@ def handle_callback_query(data):
                         print(f"Temp chat cleanup error: {e}")
         elif assignment.status == "confirmed":
             assignment.status = "pending"
-        h = assignment.history
-        h.append({"action": "undo", "by": person_name, "via": "telegram", "ts": str(vancouver_now())})
-        assignment.history = h
+        assignment.add_history({"action": "undo", "by": person_name, "via": "telegram", "ts": str(vancouver_now())})
         _log_interaction(
             telegram_user_id, first_name, "undo", person_name, assignment, event,
             details="telegram",
@@ -2892,9 +3132,7 @@ def handle_callback_query(data):
             return
         assignment.cover = cover_name
         assignment.status = "confirmed"
-        h = assignment.history
-        h.append({"action": "pickup", "by": cover_name, "via": "telegram", "ts": str(vancouver_now())})
-        assignment.history = h
+        assignment.add_history({"action": "pickup", "by": cover_name, "via": "telegram", "ts": str(vancouver_now())})
 
         active_swap = SwapRequest.query.filter_by(
             assignment_id=assignment.id, status="active"
@@ -2926,9 +3164,7 @@ def handle_callback_query(data):
             return
         assignment.cover = cover_name
         assignment.status = "confirmed"
-        h = assignment.history
-        h.append({"action": "pickup", "by": cover_name, "via": "telegram", "ts": str(vancouver_now())})
-        assignment.history = h
+        assignment.add_history({"action": "pickup", "by": cover_name, "via": "telegram", "ts": str(vancouver_now())})
 
         # Close out any active swap request for this assignment
         active_swap = SwapRequest.query.filter_by(
@@ -2951,17 +3187,15 @@ def handle_callback_query(data):
     elif action == "cancel_pickup":
         _log_interaction(
             telegram_user_id, first_name, "cancel_pickup", person_name, assignment, event,
-            details="telegram",
+            details="telegram", buffered=True,
         )
-        db.session.commit()
         answer_callback(callback_id, "Cancelled.")
 
     elif action == "expand":
         _log_interaction(
             telegram_user_id, first_name, "expand", person_name, assignment, event,
-            details="telegram_event_post",
+            details="telegram_event_post", buffered=True,
         )
-        db.session.commit()
         _notify_name_tap(person_name, assignment, event)
         buttons = _build_event_buttons(
             event,
@@ -2977,9 +3211,8 @@ def handle_callback_query(data):
     elif action == "collapse":
         _log_interaction(
             telegram_user_id, first_name, "collapse", person_name, assignment, event,
-            details="telegram_event_post",
+            details="telegram_event_post", buffered=True,
         )
-        db.session.commit()
         buttons = _build_event_buttons(
             event,
             expanded_id=None,
@@ -3011,31 +3244,26 @@ def _resolve_person(telegram_user_id, fallback_name, use_override=True):
     """Try to match a Telegram user ID to a team member name.
 
     If the user ID isn't linked yet, attempt to auto-link by matching
-    the Telegram first_name to a TeamMember.name.
+    the Telegram first_name to a TeamMember.name. Both lookups read the
+    cached identity map (app/identity.py), so a known or unknown sender
+    costs no query.
     """
     if telegram_user_id:
         override = TELEGRAM_PERSON_OVERRIDE.get(str(telegram_user_id))
         if use_override and override:
             return override
 
-        member = TeamMember.query.filter_by(telegram_user_id=telegram_user_id).first()
-        if member:
-            return member.name
+        identities = identity.identity_map()
+        name = identities.name_for(telegram_user_id)
+        if name:
+            return name
 
         # Auto-link: try matching fallback_name to an unlinked team member
         if fallback_name and fallback_name != "Unknown":
-            candidate = TeamMember.query.filter_by(name=fallback_name, telegram_user_id=None).first()
-            if not candidate:
-                # Try case-insensitive / partial match
-                candidate = TeamMember.query.filter(
-                    TeamMember.telegram_user_id.is_(None),
-                    db.func.lower(TeamMember.name) == fallback_name.lower()
-                ).first()
-            if candidate:
-                candidate.telegram_user_id = telegram_user_id
-                db.session.commit()
-                print(f"[Telegram] Auto-linked user {fallback_name} (ID {telegram_user_id}) to TeamMember '{candidate.name}'")
-                return candidate.name
+            candidate = identities.unlinked_match(fallback_name)
+            if candidate and identity.link(candidate, telegram_user_id):
+                print(f"[Telegram] Auto-linked user {fallback_name} (ID {telegram_user_id}) to TeamMember '{candidate}'")
+                return candidate
 
     # Fallback: use first_name from Telegram
     return fallback_name
@@ -3043,21 +3271,27 @@ def _resolve_person(telegram_user_id, fallback_name, use_override=True):
 
 def _refresh_event_message(event, chat_id, message_id):
     """Re-render the event message with current statuses and buttons."""
-    text = format_today_group_post(event)
-    buttons = _event_reminder_buttons(event)
-    edit_message(chat_id, message_id, text, reply_markup=buttons)
+    def refresh():
+        text = format_today_group_post(event)
+        buttons = _event_reminder_buttons(event)
+        return edit_message(chat_id, message_id, text, reply_markup=buttons)
+
+    _queue_refresh(chat_id, message_id, refresh)
 
 
 def _refresh_interactive_event_message(event, chat_id, message_id):
     """Re-render a compact event post that keeps name/status buttons attached."""
-    text = format_interactive_event_post(event)
-    buttons = _build_event_buttons(
-        event,
-        include_schedule_button=False,
-        inline_assignments=True,
-        compact_callbacks=True,
-    )
-    edit_message(chat_id, message_id, text, reply_markup=buttons)
+    def refresh():
+        text = format_interactive_event_post(event)
+        buttons = _build_event_buttons(
+            event,
+            include_schedule_button=False,
+            inline_assignments=True,
+            compact_callbacks=True,
+        )
+        return edit_message(chat_id, message_id, text, reply_markup=buttons)
+
+    _queue_refresh(chat_id, message_id, refresh)
 
 
 def refresh_event_telegram(event):
@@ -3110,33 +3344,70 @@ def send_daily_reminders_v2(chat_id=None):
 def sweep_expired_swaps(chat_id=None):
     """Expire unresolved swaps after event+2h without auto-swapping."""
     now_utc = datetime.datetime.utcnow()
-    expired = SwapRequest.query.filter(
+    timer = sweeps.SweepTimer("expired_swaps")
+    expired = SwapRequest.query.options(
+        selectinload(SwapRequest.assignment).options(
+            defer(Assignment._history_json), joinedload(Assignment.event),
+        ),
+    ).filter(
         SwapRequest.status == "active",
         SwapRequest.expires_at <= now_utc,
     ).all()
+    if not expired:
+        return 0
+    temp_chats = TempChat.query.filter(
+        TempChat.swap_request_id.in_([swap.id for swap in expired]),
+        TempChat.status == "active",
+    ).all()
 
-    processed = 0
-    cleaned_messages = 0
+    jobs = []
     for swap in expired:
         swap.status = "expired"
+        assignment = swap.assignment
+        target_chat_id = swap.telegram_chat_id or chat_id or TELEGRAM_CHAT_ID
+        message_id = swap.telegram_message_id or (assignment.telegram_message_id if assignment else None)
+        if target_chat_id and message_id:
+            jobs.append((swap, target_chat_id, message_id, _closed_swap_needed_text(swap, assignment=assignment)))
+    timer.phase("prefetch")
+
+    buttons = _schedule_only_buttons("\U0001F4C5 View Schedule")
+    results = sweeps.run_parallel(jobs, lambda job: _close_swap_message(job[1], job[2], job[3], buttons))
+    timer.phase("telegram")
+
+    cleaned_messages = 0
+    for (swap, _chat_id, message_id, _text), cleaned, exc in results:
+        if exc is not None:
+            print(f"[sweep] Failed to close swap message {message_id}: {exc}")
+        elif cleaned:
+            cleaned_messages += 1
+            _forget_swap_message(swap, swap.assignment, message_id)
+    notices = [
+        f"⚠️ No swap accepted\n{swap.requestor} · "
+        f"{_event_title(swap.assignment.event) if swap.assignment and swap.assignment.event else 'Livestream'}"
+        f" · {swap.role}"
+        for swap in expired
+    ]
+    try:
+        db.session.commit()
+    except Exception as e:
+        print(f"[sweep] Failed to expire {len(expired)} swap(s): {e}")
+        db.session.rollback()
+        return 0
+    timer.phase("commit")
+
+    # Temp chat teardown keeps its own per-chat commits (shared groups, delayed deletes).
+    for temp_chat in temp_chats:
         try:
-            assignment = Assignment.query.get(swap.assignment_id)
-            event = assignment.event if assignment else None
-            if _delete_swap_needed_message(swap, assignment=assignment, chat_id=chat_id):
-                cleaned_messages += 1
-            for temp_chat in TempChat.query.filter_by(swap_request_id=swap.id, status="active").all():
-                _delete_temp_chat(temp_chat)
-            db.session.commit()
-            title = _event_title(event) if event else "Livestream"
-            _notify_admin_text(f"⚠️ No swap accepted\n{swap.requestor} · {title} · {swap.role}")
+            _delete_temp_chat(temp_chat)
         except Exception as e:
-            print(f"[sweep] Failed to process swap {swap.id}: {e}")
+            print(f"[sweep] Failed to delete temp chat {temp_chat.chat_id}: {e}")
             db.session.rollback()
-        processed += 1
+    for text in notices:
+        _notify_admin_text(text)
+    timer.done(len(expired))
 
-    if processed:
-        print(f"[sweep] Processed {processed} expired swap(s); cleaned {cleaned_messages} swap message(s)")
-    return processed
+    print(f"[sweep] Processed {len(expired)} expired swap(s); cleaned {cleaned_messages} swap message(s)")
+    return len(expired)
 
 
 def sweep_expired_temp_chats():
@@ -3154,7 +3425,11 @@ def sweep_expired_temp_chats():
 
     processed = 0
     for temp_chat in expired:
-        if _delete_temp_chat(temp_chat):
+        if temp_chat.status == "deleting" and _temp_delete_in_flight(temp_chat.id):
+            continue
+        # A delete still queued on the Telethon service settles later; only
+        # count rows that have actually reached "deleted".
+        if _delete_temp_chat(temp_chat) and temp_chat.status == "deleted":
             processed += 1
 
     if processed:
@@ -1,6 +1,8 @@
+import contextlib
+import contextvars
 import datetime
 from zoneinfo import ZoneInfo
-from .models import Event
+from . import profiling, rollup
 
 # ============================================================
 # Timezone helpers — server runs in UTC, we need Vancouver time
@@ -37,6 +39,38 @@ BLACKOUTS = {
 # ============================================================
 # Helpers
 # ============================================================
+_preloaded_availability = contextvars.ContextVar("preloaded_availability", default=None)
+
+
+@contextlib.contextmanager
+def preloaded_availability(people=None):
+    """Serve is_available() from one Availability query for the duration of the block.
+
+    ``people`` limits the preload (others still query as usual); nested
+    blocks reuse the outer preload. Only use it around read-only work:
+    availability written inside the block isn't seen.
+    """
+    if _preloaded_availability.get() is not None:
+        yield _preloaded_availability.get()
+        return
+    from .models import Availability
+
+    query = Availability.query
+    if people is not None:
+        people = set(people)
+        query = query.filter(Availability.person.in_(sorted(people)))
+    by_person = {name: [] for name in people or ()}
+    for avail in query.all():
+        by_person.setdefault(avail.person, []).append(avail)
+    index = (by_person, people)
+    token = _preloaded_availability.set(index)
+    try:
+        yield index
+    finally:
+        _preloaded_availability.reset(token)
+
+
+@profiling.spanned("is_available")
 def is_available(person, date_obj):
     """Check if a person is available on a given date.
     Checks both hardcoded BLACKOUTS and the Availability database.
@@ -51,7 +85,11 @@ def is_available(person, date_obj):
                 return False
     
     # Check database availability entries
-    avails = Availability.query.filter_by(person=person).all()
+    preloaded = _preloaded_availability.get()
+    if preloaded is not None and (preloaded[1] is None or person in preloaded[1]):
+        avails = preloaded[0].get(person, [])
+    else:
+        avails = Availability.query.filter_by(person=person).all()
     for avail in avails:
         # Check date range
         if avail.start_date <= date_obj <= avail.end_date:
@@ -92,7 +130,8 @@ def is_real_person(p: str) -> bool:
 
 def get_history_stats():
     """
-    Calculate stats for the leaderboard.
+    Calculate stats for the leaderboard from the stats_rollup table (one query,
+    archived events included).
     Returns: (stats_dict, last_worked_dict)
     
     stats_dict is organized as:
@@ -101,53 +140,9 @@ def get_history_stats():
         "January 2026": {"Florian": {"total": 2, "sunday": 1, "friday": 1}, ...},
         ...
     }
+    last_worked_dict maps each name to [most recent date worked] (empty if never).
     """
-    # Initialize all-time stats
-    all_time = {n: {"total": 0, "sunday": 0, "friday": 0} for n in ALL_NAMES if n != "TBD"}
-    last_worked = {n: [] for n in ALL_NAMES}
-    
-    # Per-month stats
-    monthly_stats = {}
-    
-    events = Event.query.order_by(Event.date).all()
-    
-    for event in events:
-        d_obj = event.date
-        month_key = d_obj.strftime("%B %Y")  # e.g., "January 2026"
-        
-        # Initialize month if not exists
-        if month_key not in monthly_stats:
-            monthly_stats[month_key] = {n: {"total": 0, "sunday": 0, "friday": 0} for n in ALL_NAMES if n != "TBD"}
-        
-        title = (event.custom_title or "").lower()
-        is_sun = (event.day_type == "Sunday") or ("new year" in title) or (d_obj.weekday() == 6)
-        is_fri = event.day_type == "Friday" or d_obj.weekday() == 4
-        
-        for a in event.assignments:
-            p = a.person
-            # Count the actual worker (cover or person)
-            worker = a.cover if a.cover else p
-            
-            if worker in all_time and worker not in ("Select Helper", "TBD"):
-                # All-time stats
-                all_time[worker]["total"] += 1
-                if is_sun:
-                    all_time[worker]["sunday"] += 1
-                if is_fri:
-                    all_time[worker]["friday"] += 1
-                
-                # Monthly stats
-                monthly_stats[month_key][worker]["total"] += 1
-                if is_sun:
-                    monthly_stats[month_key][worker]["sunday"] += 1
-                if is_fri:
-                    monthly_stats[month_key][worker]["friday"] += 1
-                
-                last_worked[worker].append(d_obj)
-    
-    # Combine into final stats dict
-    stats = {"All Time": all_time}
-    stats.update(monthly_stats)
-    
+    stats, last_date = rollup.leaderboard([n for n in ALL_NAMES if n != "TBD"])
+    last_worked = {n: [last_date[n]] if n in last_date else [] for n in ALL_NAMES}
     return stats, last_worked
 
@@ -0,0 +1,181 @@
+"""
+Decline -> auto-swap candidate search: per-person queries vs. one batched search.
+
+Seeds a team of N members (every one in the Sunday Computer pool, a few
+availability rows each), a year of past Sundays for the fairness history and
+six months of upcoming ones, then times ``_auto_swap_candidate`` for a
+declined next-Sunday assignment — the work a Telegram decline callback does
+before it can answer. The "per person" row is the previous search: one
+joined query per pool member, lazy event.assignments loads and an
+Availability query per is_available() call.
+
+    python benchmarks/bench_auto_swap.py [team sizes, comma separated] [rounds]
+"""
+import datetime
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from flask import Flask
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app import sqlstats
+from app import telegram_v2 as tg
+from app.extensions import db
+from app.models import Assignment, Availability, Event, TeamMember
+
+ROLES = ("Computer", "Camera 1", "Camera 2")
+FIRST_UPCOMING = datetime.date(2030, 1, 6)
+
+
+def _make_app(db_path):
+    app = Flask(__name__)
+    app.config.update(
+        SQLALCHEMY_DATABASE_URI=f"sqlite:///{db_path.as_posix()}",
+        SQLALCHEMY_TRACK_MODIFICATIONS=False,
+    )
+    db.init_app(app)
+    return app
+
+
+def _populate(team_size):
+    names = [f"Member {i:03d}" for i in range(team_size)]
+    for i, name in enumerate(names):
+        member = TeamMember(name=name, telegram_user_id=f"tg-{i}")
+        member.sunday_roles = list(ROLES)
+        member.friday_roles = ["Computer", "Camera"]
+        db.session.add(member)
+        for block in range(3):
+            start = FIRST_UPCOMING + datetime.timedelta(days=(i * 11 + block * 97) % 180)
+            db.session.add(Availability(person=name, start_date=start,
+                                        end_date=start + datetime.timedelta(days=6), reason="Away"))
+    slot = 0
+    for week in range(-52, 26):
+        event = Event(date=FIRST_UPCOMING + datetime.timedelta(weeks=week), day_type="Sunday")
+        db.session.add(event)
+        db.session.flush()
+        for role in ROLES:
+            db.session.add(Assignment(event_id=event.id, role=role, person=names[slot % team_size],
+                                      status="confirmed" if week < 0 else "pending"))
+            slot += 1
+    db.session.commit()
+
+
+def _legacy_future_assignment(person, role, day_type, after_date, original_person):
+    """The pre-batching search: one query per person."""
+    roster = tg.get_auto_swap_roster()
+    assignments = (
+        Assignment.query.join(Event)
+        .filter(
+            Event.date > after_date,
+            Event.day_type == day_type,
+            Assignment.person == person,
+            Assignment.status.in_(["pending", "confirmed"]),
+            Assignment.cover.is_(None),
+            Assignment.locked.is_(False),
+            Event.cancelled.is_(False),
+        )
+        .order_by(Event.date)
+        .all()
+    )
+    safe = [
+        a for a in assignments
+        if not any((o.cover or o.person) == original_person for o in a.event.assignments)
+        and tg._person_can_take_assignment(original_person, a, roster=roster)
+    ]
+    safe.sort(key=lambda a: (0 if a.role == role else 1, a.event.date))
+    return safe[0] if safe else None
+
+
+def _legacy_candidate(assignment):
+    from app.scheduler_v2 import (
+        _assignment_declined_names, _assignment_pool_role, _assignment_schedule_type,
+        _build_history, _get_role_pool, _schedule_priority, _select_best, _select_relaxed,
+    )
+
+    event = assignment.event
+    roster = tg.get_auto_swap_roster()
+    day_type = _assignment_schedule_type(event, assignment.role)
+    pool_role = _assignment_pool_role(day_type, assignment.role)
+    role_tracking, overall = _build_history(roster, end_before=event.date)
+    excluded = {a.cover or a.person for a in event.assignments} | set(_assignment_declined_names(assignment))
+    futures = {}
+    for name in _get_role_pool(roster, pool_role, day_type=day_type):
+        if name in excluded:
+            continue
+        future = _legacy_future_assignment(name, assignment.role, day_type, event.date, assignment.person)
+        if future:
+            futures[name] = future
+    if not futures:
+        return None
+    names = list(futures)
+    args = (pool_role, event.date, day_type, role_tracking, overall, roster)
+    selected = _select_best(names, *args, exclude=[])
+    if selected == "TBD" or selected not in futures:
+        selected = _select_relaxed(names, *args, exclude=[])
+    if selected == "TBD" or selected not in futures:
+        names.sort(key=lambda name: _schedule_priority(
+            name, pool_role, day_type, role_tracking, overall, roster, event.date,
+        ))
+        selected = names[0]
+    return selected, futures[selected]
+
+
+def _time(search, assignment_id, rounds):
+    samples = []
+    result = None
+    for _ in range(rounds):
+        db.session.expire_all()
+        assignment = db.session.get(Assignment, assignment_id)
+        started = time.perf_counter()
+        result = search(assignment)
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples, result
+
+
+def _bench(team_size, rounds):
+    temp_dir = Path(tempfile.mkdtemp(prefix="livestream-bench-auto-swap-"))
+    app = _make_app(temp_dir / "bench.db")
+    try:
+        with app.app_context():
+            db.create_all()
+            _populate(team_size)
+            declined = (
+                Assignment.query.join(Event)
+                .filter(Event.date == FIRST_UPCOMING, Assignment.role == "Computer")
+                .one()
+            )
+            print(f"team of {team_size}: {Event.query.count()} events, {rounds} rounds each")
+            picks = set()
+            for label, search in (("per person", _legacy_candidate), ("batched", tg._auto_swap_candidate)):
+                _time(search, declined.id, 1)  # warm up
+                with sqlstats.track(label) as stats:
+                    _samples, result = _time(search, declined.id, 1)
+                samples, result = _time(search, declined.id, rounds)
+                picks.add((result[0], result[1].id) if result else None)
+                print(f"  {label:<11} median {statistics.median(samples):8.2f} ms   p95 "
+                      f"{sorted(samples)[max(int(len(samples) * 0.95) - 1, 0)]:8.2f} ms   "
+                      f"{stats.count:4d} queries")
+            assert len(picks) == 1, picks
+    finally:
+        with app.app_context():
+            db.session.remove()
+            db.engine.dispose()
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def main():
+    sizes = [int(size) for size in sys.argv[1].split(",")] if len(sys.argv) > 1 else [7, 50, 200]
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    for team_size in sizes:
+        _bench(team_size, rounds)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""
+InteractionLog at scale: admin stats queries with and without the composite
+indexes, then the retention roll-up.
+
+Seeds N synthetic rows (default 1,000,000) spread over ~400 days, 30 people
+and a dozen actions, then times the admin stats query shapes:
+
+    person   one member's per-day counts over the last 30 days
+    action   one action's per-day counts over the last 30 days
+    event    taps for one event date (event_date + action)
+
+first against a table indexed on ``timestamp`` only (the old schema), then
+with the composite indexes. Finally runs ``roll_up`` with the default
+180-day retention and repeats the person query over a year, which now reads
+the daily rollup for the old part.
+
+    python benchmarks/bench_interaction_log.py [rows] [rounds]
+"""
+import datetime
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from flask import Flask
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app import audit_log
+from app.extensions import db
+from app.models import InteractionLog, InteractionLogDaily
+
+ACTIONS = (
+    "confirm", "decline", "undo", "noop", "expand", "collapse", "weekly_back",
+    "weekly_confirm_tap", "weekly_decline_tap", "schedule_opened", "pickup", "swap_decline",
+)
+PEOPLE = [f"Member {i:02d}" for i in range(30)]
+DAYS = 400
+TODAY = datetime.date(2030, 6, 1)
+
+
+def _make_app(db_path):
+    app = Flask(__name__)
+    app.config.update(
+        SQLALCHEMY_DATABASE_URI=f"sqlite:///{db_path.as_posix()}",
+        SQLALCHEMY_TRACK_MODIFICATIONS=False,
+    )
+    db.init_app(app)
+    return app
+
+
+def _populate(rows):
+    rng = random.Random(47)
+    start = datetime.datetime.combine(TODAY - datetime.timedelta(days=DAYS), datetime.time.min)
+    table = InteractionLog.__table__
+    batch = []
+    for i in range(rows):
+        ts = start + datetime.timedelta(seconds=rng.randrange(DAYS * 86400))
+        batch.append({
+            "timestamp": ts,
+            "telegram_user_id": str(rng.randrange(1000)),
+            "first_name": "Someone",
+            "action": rng.choice(ACTIONS),
+            "person_name": rng.choice(PEOPLE),
+            "event_date": ts.date() + datetime.timedelta(days=rng.randrange(7)),
+            "role": "Computer",
+        })
+        if len(batch) == 50000:
+            db.session.execute(table.insert(), batch)
+            batch = []
+    if batch:
+        db.session.execute(table.insert(), batch)
+    db.session.commit()
+
+
+def _composite_indexes():
+    return [index for index in InteractionLog.__table__.indexes if len(index.columns) > 1]
+
+
+def _time(fn, rounds):
+    samples = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def _report(label, samples):
+    p95 = sorted(samples)[max(int(len(samples) * 0.95) - 1, 0)]
+    print(f"  {label:<34} median {statistics.median(samples):9.2f} ms   p95 {p95:9.2f} ms")
+
+
+def _queries():
+    month_ago = TODAY - datetime.timedelta(days=29)
+    event_date = TODAY - datetime.timedelta(days=10)
+    return (
+        ("person, last 30 days", lambda: audit_log.interaction_counts(month_ago, TODAY, person_name="Member 07")),
+        ("action, last 30 days", lambda: audit_log.interaction_counts(month_ago, TODAY, action="decline")),
+        ("event date + action", lambda: InteractionLog.query.filter(
+            InteractionLog.event_date == event_date, InteractionLog.action == "confirm").count()),
+    )
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    temp_dir = Path(tempfile.mkdtemp(prefix="livestream-bench-interaction-log-"))
+    app = _make_app(temp_dir / "bench.db")
+    try:
+        with app.app_context():
+            db.create_all()
+            connection = db.session.connection()
+            for index in _composite_indexes():
+                index.drop(connection)
+            db.session.commit()
+            started = time.perf_counter()
+            _populate(rows)
+            print(f"{rows} rows over {DAYS} days seeded in {time.perf_counter() - started:.1f}s, {rounds} rounds each")
+
+            print("timestamp index only:")
+            for label, query in _queries():
+                _report(label, _time(query, rounds))
+
+            started = time.perf_counter()
+            for index in _composite_indexes():
+                index.create(db.session.connection())
+            db.session.commit()
+            print(f"composite indexes ({time.perf_counter() - started:.1f}s to build):")
+            for label, query in _queries():
+                _report(label, _time(query, rounds))
+
+            year = (TODAY - datetime.timedelta(days=364), TODAY)
+            before = audit_log.interaction_counts(*year, person_name="Member 07")
+            _report("person, last 365 days (raw)",
+                    _time(lambda: audit_log.interaction_counts(*year, person_name="Member 07"), rounds))
+
+            started = time.perf_counter()
+            folded = audit_log.roll_up(before=audit_log.retention_cutoff(180, today=TODAY))
+            elapsed = time.perf_counter() - started
+            print(f"roll_up(180 days): folded {folded} rows into {InteractionLogDaily.query.count()} daily "
+                  f"rows in {elapsed:.1f}s; {InteractionLog.query.count()} raw rows left")
+            assert audit_log.interaction_counts(*year, person_name="Member 07") == before
+            _report("person, last 365 days (rolled up)",
+                    _time(lambda: audit_log.interaction_counts(*year, person_name="Member 07"), rounds))
+    finally:
+        with app.app_context():
+            db.session.remove()
+            db.engine.dispose()
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
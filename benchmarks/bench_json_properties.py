@@ -0,0 +1,134 @@
+"""
+Decoded-JSON properties: json.loads on every read vs. per-instance memoization.
+
+Loads a 200-member roster (plus a schedule's worth of assignments with
+history) once, then times the property-heavy work done by get_roster(),
+apply_team_role_settings' old/new comparisons and schedule serialization.
+The "decode every read" row swaps in the previous property behaviour.
+
+    python benchmarks/bench_json_properties.py [members] [rounds]
+"""
+import datetime
+import json
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from flask import Flask
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app import models
+from app.extensions import db
+from app.models import Assignment, Event, TeamMember
+from app.scheduler_v2 import _default_friday_roles, _default_role_preferences
+
+ROLE_KEYS = ("Sunday:Computer", "Sunday:Camera 1", "Sunday:Camera 2", "Friday:Computer", "Friday:Camera")
+
+
+def _make_app(db_path):
+    app = Flask(__name__)
+    app.config.update(
+        SQLALCHEMY_DATABASE_URI=f"sqlite:///{db_path.as_posix()}",
+        SQLALCHEMY_TRACK_MODIFICATIONS=False,
+    )
+    db.init_app(app)
+    return app
+
+
+def _populate(member_count):
+    for i in range(member_count):
+        member = TeamMember(name=f"Member {i:03d}")
+        member.sunday_roles = ["Computer", "Camera 1", "Camera 2"]
+        member.friday_roles = ["Computer", "Camera"]
+        member.role_preferences = {key: "normal" for key in ROLE_KEYS} | {"_caps": {"month_total": 4}}
+        db.session.add(member)
+    start = datetime.date(2030, 1, 6)
+    for week in range(member_count):
+        event = Event(date=start + datetime.timedelta(weeks=week), day_type="Sunday")
+        db.session.add(event)
+        db.session.flush()
+        for role in ("Computer", "Camera 1", "Camera 2"):
+            assignment = Assignment(event_id=event.id, role=role, person=f"Member {week:03d}")
+            assignment.history = [
+                {"action": "assigned", "by": "scheduler", "ts": "2030-01-01T09:00:00"},
+                {"action": "confirm", "by": f"Member {week:03d}", "ts": "2030-01-02T09:00:00"},
+            ]
+            db.session.add(assignment)
+    db.session.commit()
+
+
+def _legacy_decoded_json(obj, column, default):
+    """The pre-memoization property body: decode on every read."""
+    try:
+        raw = getattr(obj, column)
+        return json.loads(raw) if raw else default()
+    except (ValueError, TypeError):
+        return default()
+
+
+def _workload(members, assignments):
+    # get_roster()
+    roster = {
+        m.name: {
+            "sunday_roles": m.sunday_roles,
+            "friday_roles": _default_friday_roles(m.name, m.friday_roles),
+            "role_preferences": _default_role_preferences(m.name, m.role_preferences),
+        }
+        for m in members
+    }
+    # apply_team_role_settings: old vs. submitted comparisons
+    changed = sum(
+        1 for m in members
+        if m.sunday_roles != roster[m.name]["sunday_roles"]
+        or m.friday_roles != roster[m.name]["friday_roles"]
+        or m.role_preferences != roster[m.name]["role_preferences"]
+    )
+    # Team list + schedule serialization
+    payload = [m.to_dict() for m in members] + [a.to_dict() for a in assignments]
+    return changed, len(payload)
+
+
+def _time(members, assignments, rounds):
+    samples = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        _workload(members, assignments)
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def main():
+    member_count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    temp_dir = Path(tempfile.mkdtemp(prefix="livestream-bench-json-"))
+    app = _make_app(temp_dir / "bench.db")
+    memoized = models._decoded_json
+    try:
+        with app.app_context():
+            db.create_all()
+            _populate(member_count)
+            members = TeamMember.query.order_by(TeamMember.name).all()
+            assignments = Assignment.query.order_by(Assignment.id).all()
+            print(f"{len(members)} members / {len(assignments)} assignments, {rounds} rounds each")
+            for label, decoder in (("decode every read", _legacy_decoded_json), ("memoized", memoized)):
+                models._decoded_json = decoder
+                _workload(members, assignments)  # warm up
+                samples = _time(members, assignments, rounds)
+                print(f"  {label:<18} median {statistics.median(samples):7.2f} ms   p95 "
+                      f"{sorted(samples)[int(len(samples) * 0.95) - 1]:7.2f} ms")
+    finally:
+        models._decoded_json = memoized
+        with app.app_context():
+            db.session.remove()
+            db.engine.dispose()
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
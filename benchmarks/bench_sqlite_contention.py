@@ -0,0 +1,170 @@
+"""
+SQLite write contention: stock settings vs. the "performance" storage profile.
+
+Drives concurrent /api/v2/action confirms from several threads while another
+thread runs sweep_expired_swaps() in a loop, all against one SQLite file, and
+reports request latency percentiles and "database is locked" errors per
+profile. Telegram calls are short-circuited so only database time is measured.
+
+    python benchmarks/bench_sqlite_contention.py [threads] [requests_per_thread]
+"""
+import contextlib
+import datetime
+import io
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from flask import Flask
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app import storage, telegram_v2 as tg
+from app.api_v2 import api_v2
+from app.extensions import db
+from app.models import Assignment, Event, SwapRequest
+
+
+def _make_app(db_path, profile):
+    app = Flask(__name__)
+    app.config.update(
+        SECRET_KEY="bench",
+        SQLALCHEMY_DATABASE_URI=f"sqlite:///{db_path.as_posix()}",
+        SQLALCHEMY_TRACK_MODIFICATIONS=False,
+        SQLITE_PROFILE=profile,
+        BASE_URL="https://livestream.example.test",
+    )
+    storage.configure(app)
+    db.init_app(app)
+    storage.install(app)
+    app.register_blueprint(api_v2)
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+def _seed(threads, per_thread, swaps):
+    start = datetime.date(2030, 1, 6)
+    assignment_ids = []
+    for i in range(threads * per_thread):
+        event = Event(date=start + datetime.timedelta(days=i), day_type="Sunday")
+        db.session.add(event)
+        db.session.flush()
+        assignment = Assignment(event_id=event.id, role="Computer", person="Andy", status="pending")
+        db.session.add(assignment)
+        db.session.flush()
+        assignment_ids.append(assignment.id)
+    past = datetime.datetime.utcnow() - datetime.timedelta(hours=1)
+    for assignment_id in assignment_ids[:swaps]:
+        db.session.add(SwapRequest(
+            assignment_id=assignment_id, requestor="Andy", event_date=start,
+            role="Computer", expires_at=past, status="active",
+        ))
+    db.session.commit()
+    return assignment_ids
+
+
+def _percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def _run(profile, threads, per_thread):
+    temp_dir = Path(tempfile.mkdtemp(prefix=f"livestream-bench-sqlite-{profile}-"))
+    app = _make_app(temp_dir / "bench.db", profile)
+    with app.app_context():
+        ids = _seed(threads, per_thread, swaps=threads * per_thread // 2)
+
+    latencies = []
+    errors = {"locked": 0, "other": 0}
+    lock = threading.Lock()
+    stop_sweeper = threading.Event()
+
+    def _record_error(exc):
+        with lock:
+            errors["locked" if "locked" in str(exc) else "other"] += 1
+
+    def _confirmer(chunk):
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess["manager"] = True
+        for assignment_id in chunk:
+            started = time.perf_counter()
+            try:
+                response = client.post("/api/v2/action", json={"action": "confirm", "assignment_id": assignment_id})
+                if response.status_code >= 500:
+                    _record_error(response.get_data(as_text=True))
+            except Exception as e:
+                _record_error(e)
+            with lock:
+                latencies.append((time.perf_counter() - started) * 1000)
+
+    def _sweeper():
+        while not stop_sweeper.is_set():
+            with app.app_context():
+                try:
+                    tg.sweep_expired_swaps()
+                    db.session.query(SwapRequest).filter_by(status="expired").update({"status": "active"})
+                    db.session.commit()
+                except Exception as e:
+                    db.session.rollback()
+                    _record_error(e)
+                finally:
+                    db.session.remove()
+
+    workers = [
+        threading.Thread(target=_confirmer, args=(ids[i * per_thread:(i + 1) * per_thread],))
+        for i in range(threads)
+    ]
+    sweeper = threading.Thread(target=_sweeper)
+    started = time.perf_counter()
+    sweeper.start()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    stop_sweeper.set()
+    sweeper.join()
+    elapsed = time.perf_counter() - started
+
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+    shutil.rmtree(temp_dir, ignore_errors=True)
+    return {
+        "p50": statistics.median(latencies),
+        "p99": _percentile(latencies, 99),
+        "max": max(latencies),
+        "throughput": len(latencies) / elapsed,
+        **errors,
+    }
+
+
+def main():
+    threads = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    per_thread = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+
+    # No network: every Telegram call fails fast as if the bot were unconfigured.
+    tg._api_call_result = lambda method, payload, timeout=10: (None, "benchmark")
+    tg._notify_admin = lambda *args, **kwargs: None
+    tg._notify_admin_text = lambda *args, **kwargs: None
+
+    print(f"{threads} confirm threads x {per_thread} requests + sweep_expired_swaps loop")
+    for profile in ("default", "performance"):
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = _run(profile, threads, per_thread)
+        print(
+            f"  {profile:<12} p50 {result['p50']:7.1f} ms  p99 {result['p99']:7.1f} ms  "
+            f"max {result['max']:7.1f} ms  {result['throughput']:6.1f} req/s  "
+            f"locked {result['locked']}  other errors {result['other']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
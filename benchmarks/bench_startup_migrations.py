@@ -0,0 +1,108 @@
+"""
+Boot-time schema check: legacy introspection vs. versioned migrations.
+
+Builds a large SQLite database, then times the schema work create_app() does
+on every boot — the old inspect()/ALTER/UPDATE sequence against the new
+schema_version lookup.
+
+    python benchmarks/bench_startup_migrations.py [events] [repeats]
+"""
+import datetime
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from flask import Flask
+from sqlalchemy import inspect, text
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app import migrations
+from app.extensions import db
+
+
+def _make_app(db_path):
+    app = Flask(__name__)
+    app.config.update(
+        SQLALCHEMY_DATABASE_URI=f"sqlite:///{db_path.as_posix()}",
+        SQLALCHEMY_TRACK_MODIFICATIONS=False,
+    )
+    db.init_app(app)
+    return app
+
+
+def _populate(event_count):
+    start = datetime.date(1990, 1, 1)
+    now = datetime.datetime.utcnow()
+    events = [
+        {"date": start + datetime.timedelta(days=i), "day_type": "Sunday", "cancelled": False, "updated_at": now}
+        for i in range(event_count)
+    ]
+    db.session.execute(
+        text("INSERT INTO event (date, day_type, cancelled, updated_at) VALUES (:date, :day_type, :cancelled, :updated_at)"),
+        events,
+    )
+    assignments = [
+        {"event_id": event_id, "role": role, "person": "Florian", "status": "confirmed"}
+        for event_id in range(1, event_count + 1)
+        for role in ("Computer", "Camera 1", "Camera 2")
+    ]
+    db.session.execute(
+        text("INSERT INTO assignment (event_id, role, person, status, locked) VALUES (:event_id, :role, :person, :status, 0)"),
+        assignments,
+    )
+    db.session.commit()
+
+
+def _legacy_boot():
+    """The per-boot schema work create_app() did before schema_version existed."""
+    db.create_all()
+    insp = inspect(db.engine)
+    for table in ("assignment", "team_member", "swap_request", "event"):
+        insp.get_columns(table)
+    db.session.execute(text("UPDATE event SET updated_at = CURRENT_TIMESTAMP WHERE updated_at IS NULL"))
+    db.session.commit()
+
+
+def _versioned_boot():
+    migrations.upgrade()
+
+
+def _time(fn, repeats):
+    samples = []
+    for _ in range(repeats):
+        db.session.remove()
+        db.engine.dispose()
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def main():
+    event_count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    temp_dir = Path(tempfile.mkdtemp(prefix="livestream-bench-migrations-"))
+    app = _make_app(temp_dir / "bench.db")
+    try:
+        with app.app_context():
+            migrations.upgrade()
+            _populate(event_count)
+            print(f"{event_count} events / {event_count * 3} assignments, {repeats} boots each")
+            for label, fn in (("legacy introspection", _legacy_boot), ("schema_version", _versioned_boot)):
+                samples = _time(fn, repeats)
+                print(f"  {label:<22} median {statistics.median(samples):8.2f} ms   max {max(samples):8.2f} ms")
+    finally:
+        with app.app_context():
+            db.session.remove()
+            db.engine.dispose()
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -11,6 +11,19 @@ class Config:
         _db_url = _db_url.replace('postgres://', 'postgresql://', 1)
     SQLALCHEMY_DATABASE_URI = _db_url or 'sqlite:///' + os.path.join(basedir, 'schedule.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # SQLite storage profile (see app/storage.py): "performance" enables WAL,
+    # synchronous=NORMAL, busy_timeout and in-memory caches; "default" keeps
+    # SQLite's stock settings. Ignored for PostgreSQL.
+    SQLITE_PROFILE = os.environ.get('SQLITE_PROFILE', 'performance')
+    SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', '5000'))
+    SQLITE_CACHE_SIZE_KB = int(os.environ.get('SQLITE_CACHE_SIZE_KB', '4096'))
+    SQLITE_MMAP_SIZE_MB = int(os.environ.get('SQLITE_MMAP_SIZE_MB', '64'))
+    SQLITE_POOL_SIZE = int(os.environ.get('SQLITE_POOL_SIZE', '8'))
+
+    # Apply pending schema migrations on boot. Set to false to require an
+    # explicit `flask db-upgrade` during deploys instead.
+    AUTO_MIGRATE = os.environ.get('AUTO_MIGRATE', 'true').lower() in ('1', 'true', 'yes')
     
     # Session security
     # Only enable Secure cookies when explicitly set AND using HTTPS.
@@ -34,6 +47,42 @@ class Config:
     REMINDER_HOUR = int(os.environ.get('REMINDER_HOUR', '9'))  # 9 AM Vancouver time
     WEEKLY_SCHEDULE_HOUR = int(os.environ.get('WEEKLY_SCHEDULE_HOUR', '8'))  # 8 AM Vancouver time
 
+    # Seconds a worker holds the background-job leader lease without renewing.
+    # A crashed holder is replaced by another worker after at most this long.
+    LEADER_LEASE_TTL = int(os.environ.get('LEADER_LEASE_TTL', '60'))
+
+    # Max seconds between data_version polls for in-process caches on backends
+    # without a cheaper change signal (SQLite uses PRAGMA data_version instead).
+    CACHE_POLL_INTERVAL = float(os.environ.get('CACHE_POLL_INTERVAL', '1.0'))
+
+    # Buffered audit log (app/audit_log.py): tap-only InteractionLog rows are
+    # bulk-inserted every AUDIT_LOG_BATCH_SIZE rows or AUDIT_LOG_FLUSH_MS ms.
+    # AUDIT_LOG_SYNC=true writes each row immediately instead.
+    AUDIT_LOG_SYNC = os.environ.get('AUDIT_LOG_SYNC', 'false').lower() in ('1', 'true', 'yes')
+    AUDIT_LOG_BATCH_SIZE = int(os.environ.get('AUDIT_LOG_BATCH_SIZE', '50'))
+    AUDIT_LOG_FLUSH_MS = int(os.environ.get('AUDIT_LOG_FLUSH_MS', '500'))
+    AUDIT_LOG_MAX_PENDING = int(os.environ.get('AUDIT_LOG_MAX_PENDING', '10000'))
+    # Raw interaction_log rows older than this are folded into per-day counts
+    # (interaction_log_daily) by the nightly retention job.
+    INTERACTION_LOG_RETENTION_DAYS = int(os.environ.get('INTERACTION_LOG_RETENTION_DAYS', '180'))
+
+    # SQL instrumentation (app/sqlstats.py): requests/jobs above these limits are
+    # logged with their most repeated statements.
+    SQL_QUERY_LOG_THRESHOLD = int(os.environ.get('SQL_QUERY_LOG_THRESHOLD', '50'))
+    SQL_TIME_LOG_THRESHOLD_MS = float(os.environ.get('SQL_TIME_LOG_THRESHOLD_MS', '200'))
+    SQL_REPEAT_THRESHOLD = int(os.environ.get('SQL_REPEAT_THRESHOLD', '10'))
+    SQL_SERVER_TIMING = os.environ.get('SQL_SERVER_TIMING', 'false').lower() in ('1', 'true', 'yes')
+
+    # Profiling (app/profiling.py): "1" adds a phase timing breakdown to every
+    # /generate*, /team/apply-role-settings and /scheduling-controls/* response,
+    # "cprofile" also captures cProfile. Managers can use ?profile=1 instead.
+    SCHEDULER_PROFILE = os.environ.get('SCHEDULER_PROFILE', '')
+    # Directory for .pstats dumps of cProfile captures (unset: summary only).
+    PROFILE_DUMP_DIR = os.environ.get('PROFILE_DUMP_DIR', '')
+
+    # `flask archive-events` moves events older than this into the archive tables.
+    ARCHIVE_AFTER_DAYS = int(os.environ.get('ARCHIVE_AFTER_DAYS', '730'))
+
     # External URL for generating Telegram and frontend links.
     # In live environments prefer the Oracle public domain via env var.
     BASE_URL = os.environ.get('BASE_URL', 'https://livestream.disterhoft.com')
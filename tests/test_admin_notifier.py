@@ -0,0 +1,242 @@
+import sys
+import threading
+import time
+from pathlib import Path
+
+from flask import Flask
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app import metrics
+from app.admin_notifier import AdminNotifier, Undeliverable, clip, digest
+import app.telegram_v2 as tg
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeTelegram:
+    def __init__(self):
+        self.sent = []
+        self.up = True
+
+    def __call__(self, text, silent):
+        if not self.up:
+            return False
+        self.sent.append((text, silent))
+        return True
+
+
+def run_bursts_become_one_digest():
+    clock, telegram = FakeClock(), FakeTelegram()
+    notifier = AdminNotifier(telegram, window=30, clock=clock)
+
+    notifier.notify("🔔 Confirmed - Rene", silent=False)
+    assert notifier.run_once() is None
+    assert telegram.sent == [("🔔 Confirmed - Rene", False)]
+
+    for name in ("Andy", "Marvin", "Florian", "Dennis", "Ben"):
+        clock.now += 2
+        notifier.notify(f"🔔 Expanded - {name}", silent=True)
+        assert notifier.run_once() > 0
+    assert len(telegram.sent) == 1 and notifier.pending() == 5
+
+    clock.now += 30
+    assert notifier.run_once() is None
+    text, silent = telegram.sent[-1]
+    assert text.startswith("🗂 <b>5 updates</b>") and "Expanded - Ben" in text and silent is True
+    assert (notifier.sent, notifier.merged) == (2, 5)
+
+    # A quiet period re-arms the leading edge.
+    clock.now += 60
+    notifier.notify("🔔 Declined - Rene", silent=False)
+    notifier.run_once()
+    assert telegram.sent[-1] == ("🔔 Declined - Rene", False)
+
+
+def run_outage_is_buffered_capped_and_retried():
+    clock, telegram = FakeClock(), FakeTelegram()
+    dropped_before = metrics.ADMIN_NOTIFICATIONS.value(outcome="dropped")
+    notifier = AdminNotifier(telegram, window=30, max_buffered=4, clock=clock)
+    telegram.up = False
+
+    notifier.notify("one")
+    first_wait = notifier.run_once()
+    notifier.notify("two")
+    clock.now += first_wait
+    second_wait = notifier.run_once()
+    assert second_wait == 2 * first_wait and notifier.failures == 2
+
+    for text in ("three", "four", "five", "six"):
+        notifier.notify(text)
+    assert notifier.pending() == 4 and notifier.dropped == 2
+    assert metrics.ADMIN_NOTIFICATIONS.value(outcome="dropped") == dropped_before + 2
+
+    telegram.up = True
+    clock.now += second_wait
+    notifier.run_once()
+    assert len(telegram.sent) == 1
+    assert telegram.sent[0][0] == "🗂 <b>4 updates</b>\n\nthree\n\nfour\n\nfive\n\nsix"
+    assert notifier.pending() == 0
+
+
+def run_rejected_messages_are_dropped():
+    clock, telegram = FakeClock(), FakeTelegram()
+    rejected_before = metrics.ADMIN_NOTIFICATIONS.value(outcome="rejected")
+
+    def send(text, silent):
+        if text.count("<b>") != text.count("</b>"):
+            raise Undeliverable("Bad Request: can't parse entities")
+        return telegram(text, silent)
+
+    notifier = AdminNotifier(send, window=30, clock=clock)
+    notifier.notify("🔔 <b>Declined - cut off")
+    assert notifier.run_once() is None
+    assert notifier.pending() == 0 and notifier.failures == 0 and notifier.rejected == 1
+    assert metrics.ADMIN_NOTIFICATIONS.value(outcome="rejected") == rejected_before + 1
+
+    # Later DMs aren't held up behind it.
+    clock.now += 30
+    notifier.notify("🔔 Confirmed - Rene")
+    notifier.run_once()
+    assert telegram.sent == [("🔔 Confirmed - Rene", False)]
+
+    # In a digest only the bad entry is dropped; the rest go out one by one.
+    clock.now += 60
+    for text in ("🔔 Confirmed - Andy", "🔔 <b>bad", "🔔 Confirmed - Rene", "🔔 Confirmed - Marvin"):
+        notifier.notify(text)
+        notifier.run_once()
+    clock.now += 30
+    assert notifier.run_once() is None
+    assert notifier.pending() == 0 and notifier.rejected == 2
+    assert [text for text, _silent in telegram.sent[-3:]] == [
+        "🔔 Confirmed - Andy", "🔔 Confirmed - Rene", "🔔 Confirmed - Marvin",
+    ]
+
+    # Bot API errors are classified by their description.
+    results = iter([
+        (None, "Bad Request: can't parse entities: unclosed start tag"),
+        (None, "Too Many Requests: retry after 5"),
+        (None, "Internal Server Error"),
+        (None, "HTTPSConnectionPool(host='api.telegram.org', port=443): Read timed out."),
+    ])
+    old_result, old_chat = tg._api_call_result, tg.PERSONAL_CHAT_ID
+    try:
+        tg._api_call_result = lambda method, payload, timeout=10: next(results)
+        tg.PERSONAL_CHAT_ID = "admin"
+        try:
+            tg._send_admin_dm("<b>oops")
+            raise AssertionError("expected Undeliverable")
+        except Undeliverable:
+            pass
+        assert [tg._send_admin_dm("retry me") for _ in range(3)] == [False, False, False]
+    finally:
+        tg._api_call_result, tg.PERSONAL_CHAT_ID = old_result, old_chat
+
+
+def run_wakeup_between_runs_is_not_lost():
+    notifier = AdminNotifier(lambda text, silent: True, window=0)
+    original = notifier.run_once
+
+    def run_once_then_notify():
+        wait = original()
+        if notifier.sent == 0 and not notifier.pending():
+            # Lands after run_once() saw an empty buffer but before _run waits.
+            notifier.notify("late")
+        return wait
+
+    notifier.run_once = run_once_then_notify
+    notifier.start()
+    try:
+        deadline = time.monotonic() + 2
+        while notifier.sent == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert notifier.sent == 1
+    finally:
+        notifier.stop()
+
+
+def run_digest_respects_telegram_limit():
+    entries = [("x" * 1500, True)] * 7
+    messages = digest(entries)
+    assert [count for _text, _silent, count in messages] == [2, 2, 2, 1]
+    assert sum(count for _text, _silent, count in messages) == 7
+    assert all(len(text) <= 4096 for text, _silent, _count in messages)
+
+    # Over-long entries are cut outside markup and their tags closed.
+    long_text = "🔔 <b>Renamed</b> <a href=\"https://example.test\">" + "x" * 5000 + "</a> &amp; more"
+    clipped = digest([(long_text, False)])[0][0]
+    assert len(clipped) <= 4096 and clipped.endswith("…</a>")
+    assert clip("<b>hello world</b>", 12) == "<b>hell…</b>"
+    assert clip("a &amp; b", 5) == "a …"
+    assert clip("<b>bold</b> <i>italic</i>", 15) == "<b>bold</b> …"
+    assert clip("short", 10) == "short"
+
+
+def run_notify_never_waits_for_telegram():
+    release = threading.Event()
+    delivered = []
+
+    def slow_send(text, silent):
+        release.wait(5)
+        delivered.append(text)
+        return True
+
+    notifier = AdminNotifier(slow_send, window=0.05)
+    notifier.start()
+    try:
+        started = time.perf_counter()
+        for i in range(20):
+            notifier.notify(f"tap {i}")
+        assert time.perf_counter() - started < 0.05
+    finally:
+        release.set()
+        notifier.stop()
+    assert "tap 0" in delivered[0]
+    assert sum(text.count("tap ") for text in delivered) == 20
+
+
+def run_helpers_queue_outside_tests():
+    app = Flask(__name__)
+    calls = []
+    old_result, old_notifier, old_chat = tg._api_call_result, tg._admin_notifier, tg.PERSONAL_CHAT_ID
+    try:
+        tg._api_call_result = lambda method, payload, timeout=10: calls.append(payload) or ({"message_id": 1}, None)
+        tg.PERSONAL_CHAT_ID = "admin"
+        tg._admin_notifier = AdminNotifier(tg._send_admin_dm, window=30, clock=FakeClock())
+        with app.app_context():
+            tg._notify_admin_text("👀 <b>Schedule opened</b>")
+            tg._notify_admin("expand", "Rene")
+        assert calls == [] and tg._admin_notifier.pending() == 2
+        tg._admin_notifier.run_once()
+        assert calls[0]["chat_id"] == "admin" and calls[0]["disable_notification"] is False
+
+        # TESTING keeps the old inline send.
+        app.config["TESTING"] = True
+        with app.app_context():
+            tg._notify_admin("confirm", "Andy")
+        assert len(calls) == 2 and "Andy" in calls[1]["text"]
+    finally:
+        tg._api_call_result, tg._admin_notifier, tg.PERSONAL_CHAT_ID = old_result, old_notifier, old_chat
+
+
+def main():
+    run_bursts_become_one_digest()
+    run_outage_is_buffered_capped_and_retried()
+    run_rejected_messages_are_dropped()
+    run_wakeup_between_runs_is_not_lost()
+    run_digest_respects_telegram_limit()
+    run_notify_never_waits_for_telegram()
+    run_helpers_queue_outside_tests()
+    print("admin notifier tests passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -10,10 +10,12 @@ ROOT = Path(__file__).resolve().parents[1]
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
 
+from app import sqlstats, telegram_v2 as tg
 from app.api_v2 import api_v2
 from app.extensions import db
 from app.models import (
     Assignment,
+    AssignmentHistory,
     Availability,
     Event,
     EventSuggestion,
@@ -54,6 +56,7 @@ def _clear_db():
         EventSuggestion,
         SchedulingSnapshot,
         SchedulingPreset,
+        AssignmentHistory,
         Assignment,
         Event,
         TeamMember,
@@ -205,11 +208,49 @@ def run_default_caps_and_role_order_round_trip_is_noop(app):
         assert TeamMember.query.filter_by(name="Rene").one().friday_roles == ["Computer", "Camera"]
 
 
+def run_identity_map_follows_renames(app):
+    with app.app_context():
+        _clear_db()
+        old = _member("Old Name")
+        old.telegram_user_id = "501"
+        helper = _member("Helper")
+        db.session.commit()
+
+        assert tg._resolve_person("501", "Someone") == "Old Name"
+        with sqlstats.assert_query_budget(0, "cached identity lookups"):
+            assert tg._resolve_person("501", "Someone") == "Old Name"
+            # Unknown ids and unmatched names are answered from the map too.
+            assert tg._resolve_person("999", "Stranger") == "Stranger"
+            assert tg._resolve_person("999", "Unknown") == "Unknown"
+
+        response = _client(app).post("/api/v2/team/apply-role-settings", json={
+            "members": [_member_payload(old, name="New Name"), _member_payload(helper)],
+            "removed_ids": [],
+        })
+        assert response.status_code == 200, response.get_data(as_text=True)
+        assert tg._resolve_person("501", "Someone") == "New Name"
+
+        # Auto-link drops the map as well: the next lookup sees the new link.
+        assert tg._resolve_person("502", "helper") == "Helper"
+        assert TeamMember.query.filter_by(name="Helper").one().telegram_user_id == "502"
+        assert tg._resolve_person("502", "Someone") == "Helper"
+        with sqlstats.assert_query_budget(0, "identity lookup after reload"):
+            assert tg._resolve_person("502", "Someone") == "Helper"
+
+        response = _client(app).post("/api/v2/team/apply-role-settings", json={
+            "members": [_member_payload(helper)],
+            "removed_ids": [old.id],
+        })
+        assert response.status_code == 200, response.get_data(as_text=True)
+        assert tg._resolve_person("501", "Someone") == "Someone"
+
+
 def main():
     app, temp_dir = _make_app()
     try:
         run_rename_preserves_schedule_and_updates_references(app)
         run_default_caps_and_role_order_round_trip_is_noop(app)
+        run_identity_map_follows_renames(app)
     finally:
         with app.app_context():
             db.session.remove()
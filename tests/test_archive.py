@@ -0,0 +1,253 @@
+import datetime
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+from flask import Flask
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app import archive
+from app.api_v2 import api_v2
+from app.extensions import db
+from app.models import (
+    Assignment, AssignmentArchive, AssignmentHistory, AssignmentHistoryArchive, Availability,
+    Event, EventArchive, FairnessBaseline, SwapRequest, SwapRequestArchive, TeamMember,
+)
+from app.routes import bp
+from app.scheduler_v2 import DEFAULT_ROSTER, _build_history, get_fairness_report, get_roster
+from app.utils import get_history_stats
+
+FIRST_DAY = datetime.date(2023, 1, 1)
+CUTOFF = datetime.date(2025, 1, 1)
+LAST_DAY = datetime.date(2025, 12, 31)
+SUNDAY_ROLES = ("Computer", "Camera 1", "Camera 2")
+FRIDAY_ROLES = ("Computer", "Camera")
+PEOPLE = ("Andy", "Marvin", "Patric", "Rene", "Stefan", "Viktor", "Florian", "Former Member")
+
+
+def _make_app():
+    temp_dir = Path(tempfile.mkdtemp(prefix="livestream-archive-"))
+    db_path = temp_dir / "test.db"
+    app = Flask(__name__)
+    app.config.update(
+        SECRET_KEY="test",
+        TESTING=True,
+        SQLALCHEMY_DATABASE_URI=f"sqlite:///{db_path.as_posix()}",
+        SQLALCHEMY_TRACK_MODIFICATIONS=False,
+        BASE_URL="https://livestream.example.test",
+        ARCHIVE_AFTER_DAYS=365,
+    )
+    db.init_app(app)
+    app.register_blueprint(bp)
+    app.register_blueprint(api_v2)
+    archive.init_app(app)
+    with app.app_context():
+        db.create_all()
+    return app, temp_dir
+
+
+def _seed():
+    now = datetime.datetime(2024, 1, 1)
+    day = FIRST_DAY
+    i = 0
+    while day <= LAST_DAY:
+        if day.weekday() in (4, 6):
+            event = Event(date=day, day_type="Sunday" if day.weekday() == 6 else "Friday",
+                          custom_title="New Year Service" if day.month == 1 and day.day < 8 else None)
+            db.session.add(event)
+            db.session.flush()
+            roles = SUNDAY_ROLES if day.weekday() == 6 else FRIDAY_ROLES
+            for offset, role in enumerate(roles):
+                person = PEOPLE[(i + offset * 3) % len(PEOPLE)]
+                assignment = Assignment(event_id=event.id, role=role, person=person, status="confirmed")
+                if i % 7 == 0 and offset == 0:
+                    assignment.cover = PEOPLE[(i + 1) % len(PEOPLE)]
+                if i % 11 == 0 and offset == 1:
+                    assignment.person = "TBD"
+                db.session.add(assignment)
+                db.session.flush()
+                if i % 5 == 0:
+                    assignment.add_history({"action": "confirm", "by": person, "ts": f"{day}T09:00:00-08:00"})
+                if i % 13 == 0:
+                    db.session.add(SwapRequest(
+                        assignment_id=assignment.id, requestor=person, event_date=day, role=role,
+                        created_at=now, expires_at=now, status="expired",
+                    ))
+            i += 1
+        day += datetime.timedelta(days=1)
+    db.session.add(Availability(person="Andy", start_date=datetime.date(2024, 3, 1),
+                                end_date=datetime.date(2024, 4, 30), reason="Travel"))
+    db.session.add(Availability(person="Rene", start_date=datetime.date(2025, 6, 1),
+                                end_date=datetime.date(2025, 6, 30), reason="Travel"))
+    db.session.commit()
+
+
+def _normalized(history):
+    role_tracking, overall = history
+    return (
+        {
+            key: {name: (counts["assigned"], round(counts["expected"], 9)) for name, counts in people.items()}
+            for key, people in role_tracking.items()
+        },
+        overall,
+    )
+
+
+def _snapshot(client):
+    roster = get_roster()
+    return {
+        "history": _normalized(_build_history(roster)),
+        "history_mid_archive": _normalized(_build_history(roster, end_before=datetime.date(2024, 6, 1))),
+        "history_at_cutoff": _normalized(_build_history(roster, end_before=CUTOFF)),
+        "fairness": get_fairness_report(roster),
+        "all_time": get_history_stats()[0]["All Time"],
+        "calendar": client.get("/calendar.ics?archive=1").get_data(as_text=True).count("BEGIN:VEVENT"),
+        "person_calendar": client.get("/calendar/Andy.ics?archive=1").get_data(as_text=True).count("BEGIN:VEVENT"),
+    }
+
+
+def _rows():
+    return {
+        "events": sorted((e.id, e.date) for e in Event.query.all()),
+        "assignments": sorted((a.id, a.event_id, a.role, a.person, a.cover) for a in Assignment.query.all()),
+        "history": sorted((h.id, h.assignment_id, h.to_entry()["ts"]) for h in AssignmentHistory.query.all()),
+        "swaps": sorted((s.id, s.assignment_id, s.status) for s in SwapRequest.query.all()),
+    }
+
+
+def run_archive_preserves_fairness(app):
+    client = app.test_client()
+    with app.app_context():
+        _seed()
+        before = _snapshot(client)
+        rows_before = _rows()
+        live_events = Event.query.count()
+
+        assert archive.archive_events(CUTOFF, dry_run=True) > 0
+        assert EventArchive.query.count() == 0
+        moved = archive.archive_events(CUTOFF)
+        assert Event.query.filter(Event.date < CUTOFF).count() == 0
+        assert Event.query.count() == live_events - moved
+        assert AssignmentArchive.query.count() > 0
+        assert AssignmentHistoryArchive.query.count() > 0
+        assert SwapRequestArchive.query.count() > 0
+        assert all(e.archived_at is not None for e in EventArchive.query.all())
+        baseline = db.session.get(FairnessBaseline, 1)
+        assert baseline.event_count == moved
+        assert baseline.archived_through < CUTOFF
+        # Former members stay in the baseline for a later roster change.
+        assert "Former Member" in baseline.history[1]
+
+        after = _snapshot(client)
+        for key in before:
+            assert after[key] == before[key], key
+        schedule = client.get("/api/v2/schedule").get_json()
+        assert len(schedule) == live_events - moved
+        return rows_before
+
+
+def run_restore_is_exact_inverse(app, rows_before):
+    client = app.test_client()
+    with app.app_context():
+        before = _snapshot(client)
+        assert archive.restore_events(since=datetime.date(2024, 7, 1)) > 0
+        assert db.session.get(FairnessBaseline, 1).archived_through < datetime.date(2024, 7, 1)
+        assert _snapshot(client) == before
+
+        archive.restore_events()
+        assert EventArchive.query.count() == 0
+        assert AssignmentArchive.query.count() == 0
+        assert db.session.get(FairnessBaseline, 1) is None
+        assert _rows() == rows_before
+        assert _snapshot(client) == before
+
+
+def run_referenced_events_stay_live(app):
+    with app.app_context():
+        old = Event.query.filter(Event.date < CUTOFF).order_by(Event.date).first()
+        live = Event.query.filter(Event.date >= CUTOFF).order_by(Event.date).first()
+        live.assignments[0].redeemed_for_id = old.assignments[0].id
+        db.session.commit()
+
+        archive.archive_events(CUTOFF)
+        assert db.session.get(Event, old.id) is not None
+        assert db.session.get(EventArchive, old.id) is None
+        assert Event.query.filter(Event.date < CUTOFF).count() == 1
+
+        runner = app.test_cli_runner()
+        result = runner.invoke(args=["restore-archive"])
+        assert result.exit_code == 0, result.output
+        assert EventArchive.query.count() == 0
+        result = runner.invoke(args=["archive-events", "--before", str(CUTOFF), "--dry-run"])
+        assert result.exit_code == 0, result.output
+        assert "would be archived" in result.output
+        assert EventArchive.query.count() == 0
+
+
+def _assert_baseline_matches_live_scan(client):
+    with_baseline = _snapshot(client)
+    archive.restore_events()
+    live = _snapshot(client)
+    archive.archive_events(CUTOFF)
+    for key in live:
+        assert with_baseline[key] == live[key], key
+
+
+def run_roster_changes_rebuild_baseline(app):
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess["manager"] = True
+    with app.app_context():
+        for name, config in DEFAULT_ROSTER.items():
+            member = TeamMember(name=name, active=True, active_from=FIRST_DAY)
+            member.sunday_roles = config["sunday_roles"]
+            member.friday_roles = config["friday_roles"]
+            db.session.add(member)
+        db.session.commit()
+        archive.archive_events(CUTOFF)
+        _assert_baseline_matches_live_scan(client)
+
+        andy = TeamMember.query.filter_by(name="Andy").one()
+        response = client.patch(f"/api/v2/team/{andy.id}", json={"name": "Andreas"})
+        assert response.status_code == 200, response.get_json()
+        overall = db.session.get(FairnessBaseline, 1).history[1]
+        assert "Andreas" in overall and "Andy" not in overall
+        _assert_baseline_matches_live_scan(client)
+
+        marvin = TeamMember.query.filter_by(name="Marvin").one()
+        response = client.post("/api/v2/team/apply-role-settings", json={"members": [{
+            "id": marvin.id, "name": "Marvin", "sunday_roles": ["Computer"], "friday_roles": ["Camera"],
+        }]})
+        assert response.status_code == 200, response.get_json()
+        _assert_baseline_matches_live_scan(client)
+
+        response = client.post("/api/v2/team", json={"name": "Newbie", "active_from": str(FIRST_DAY)})
+        assert response.status_code == 201, response.get_json()
+        _assert_baseline_matches_live_scan(client)
+
+        patric = TeamMember.query.filter_by(name="Patric").one()
+        assert client.delete(f"/api/v2/team/{patric.id}").status_code == 200
+        _assert_baseline_matches_live_scan(client)
+
+
+def main():
+    app, temp_dir = _make_app()
+    try:
+        rows_before = run_archive_preserves_fairness(app)
+        run_restore_is_exact_inverse(app, rows_before)
+        run_referenced_events_stay_live(app)
+        run_roster_changes_rebuild_baseline(app)
+    finally:
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+        shutil.rmtree(temp_dir, ignore_errors=True)
+    print("archive tests passed")
+
+
+if __name__ == "__main__":
+    main()
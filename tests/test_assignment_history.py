@@ -0,0 +1,123 @@
+import datetime
+import json
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+from flask import Flask
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app import migrations, sqlstats
+from app.api_v2 import api_v2
+from app.extensions import db
+from app.models import Assignment, AssignmentHistory, Event
+from app.routes import bp
+from app.utils import vancouver_now
+
+LEGACY_HISTORY = [
+    {"action": "confirm", "by": "Andy", "via": "telegram", "ts": "2026-03-01 09:15:02.123456-08:00"},
+    {"from": "Andy", "to": "Rene", "by": "Florian", "ts": "2026-03-02 18:00:00-08:00"},
+    {"action": "decline", "by": "Rene", "via": "event_reminder", "ts": "2026-07-04 10:30:00-07:00"},
+    {"action": "auto_swap_assigned", "by": "system", "to": "Marvin", "future_assignment_id": 9},
+]
+
+
+def _make_app():
+    temp_dir = Path(tempfile.mkdtemp(prefix="livestream-assignment-history-"))
+    db_path = temp_dir / "test.db"
+    app = Flask(__name__)
+    app.config.update(
+        SECRET_KEY="test",
+        TESTING=True,
+        SQLALCHEMY_DATABASE_URI=f"sqlite:///{db_path.as_posix()}",
+        SQLALCHEMY_TRACK_MODIFICATIONS=False,
+        BASE_URL="https://livestream.example.test",
+    )
+    db.init_app(app)
+    app.register_blueprint(bp)
+    app.register_blueprint(api_v2)
+    return app, temp_dir
+
+
+def run_backfill_migration_preserves_entries(app):
+    with app.app_context():
+        migrations.upgrade()
+        event = Event(date=datetime.date(2026, 7, 5), day_type="Sunday")
+        db.session.add(event)
+        db.session.flush()
+        db.session.execute(
+            Assignment.__table__.insert().values(
+                event_id=event.id, role="Computer", person="Rene", status="swap_needed",
+                _history_json=json.dumps(LEGACY_HISTORY), locked=False,
+            )
+        )
+        # Pretend the database predates assignment_history.
+        migrations._stamp(4)
+        db.session.commit()
+
+        assert migrations.upgrade() == migrations.LATEST_VERSION - 4
+        assignment = Assignment.query.one()
+        assert assignment.history == LEGACY_HISTORY
+        assert AssignmentHistory.query.count() == len(LEGACY_HISTORY)
+        assert migrations.upgrade() == 0
+
+
+def run_append_does_not_load_earlier_entries(app):
+    with app.app_context():
+        assignment = Assignment.query.one()
+        db.session.expire_all()
+        assignment = db.session.get(Assignment, assignment.id)
+        with sqlstats.track("add_history") as stats:
+            assignment.add_history({"action": "pickup", "by": "Marvin", "ts": str(vancouver_now())})
+            db.session.flush()
+        reads = [fp for fp in stats.fingerprints if fp.startswith("SELECT") and "assignment_history" in fp]
+        inserts = [fp for fp in stats.fingerprints if fp.startswith("INSERT INTO assignment_history")]
+        assert not reads, stats.summary()
+        assert len(inserts) == 1
+        db.session.commit()
+        assert assignment.history[-1]["action"] == "pickup"
+        assert len(assignment.history) == len(LEGACY_HISTORY) + 1
+
+
+def run_history_is_served_on_demand(app):
+    client = app.test_client()
+    schedule = client.get("/api/v2/schedule").get_json()
+    assignment = schedule[0]["assignments"][0]
+    assert "history" not in assignment
+
+    response = client.get(f"/api/v2/assignment/{assignment['id']}/history")
+    assert response.status_code == 200
+    history = response.get_json()["history"]
+    assert history[:len(LEGACY_HISTORY)] == LEGACY_HISTORY
+    assert history[-1]["by"] == "Marvin"
+    assert client.get("/api/v2/assignment/999/history").status_code == 404
+
+
+def run_deleting_assignment_removes_history(app):
+    with app.app_context():
+        db.session.delete(Event.query.one())
+        db.session.commit()
+        assert AssignmentHistory.query.count() == 0
+
+
+def main():
+    app, temp_dir = _make_app()
+    try:
+        run_backfill_migration_preserves_entries(app)
+        run_append_does_not_load_earlier_entries(app)
+        run_history_is_served_on_demand(app)
+        run_deleting_assignment_removes_history(app)
+    finally:
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+        shutil.rmtree(temp_dir, ignore_errors=True)
+    print("assignment history tests passed")
+
+
+if __name__ == "__main__":
+    main()
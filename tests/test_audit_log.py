@@ -0,0 +1,235 @@
+import datetime
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from flask import Flask
+from sqlalchemy import text
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app import audit_log, metrics, sqlstats
+from app.extensions import db
+from app.api_v2 import api_v2
+from app.models import InteractionLog, InteractionLogDaily, TeamMember
+import app.telegram_v2 as tg
+
+
+def _make_app():
+    temp_dir = Path(tempfile.mkdtemp(prefix="livestream-audit-log-"))
+    db_path = temp_dir / "test.db"
+    app = Flask(__name__)
+    app.config.update(
+        SECRET_KEY="test",
+        SQLALCHEMY_DATABASE_URI=f"sqlite:///{db_path.as_posix()}",
+        SQLALCHEMY_TRACK_MODIFICATIONS=False,
+    )
+    db.init_app(app)
+    app.register_blueprint(api_v2)
+    with app.app_context():
+        db.create_all()
+    return app, temp_dir
+
+
+def _count(app, action=None):
+    with app.app_context():
+        query = InteractionLog.query
+        if action:
+            query = query.filter_by(action=action)
+        count = query.count()
+        db.session.remove()
+        return count
+
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return condition()
+
+
+def run_batches_by_size_and_time(app):
+    writer = audit_log.AuditLogWriter(app, batch_size=5, flush_ms=60000)
+    writer.start()
+    try:
+        for i in range(4):
+            writer.write(action="size", person_name=f"P{i}")
+        time.sleep(0.05)
+        assert _count(app, "size") == 0 and writer.pending() == 4
+        writer.write(action="size", person_name="P4")
+        assert _wait_for(lambda: _count(app, "size") == 5)
+    finally:
+        writer.stop()
+
+    writer = audit_log.AuditLogWriter(app, batch_size=1000, flush_ms=20)
+    writer.start()
+    try:
+        writer.write(action="timer", person_name="Rene")
+        assert _wait_for(lambda: _count(app, "timer") == 1)
+        assert writer.flushed == 1
+    finally:
+        writer.stop()
+
+
+def run_stop_flushes_and_overflow_is_counted(app):
+    dropped_before = metrics.AUDIT_LOG_DROPPED.value(reason="queue_full")
+    writer = audit_log.AuditLogWriter(app, batch_size=10, flush_ms=60000, max_pending=10)
+    # Not started: nothing drains the queue until stop().
+    for i in range(12):
+        writer.write(action="shutdown", person_name=f"P{i}")
+    assert writer.dropped == 2
+    assert metrics.AUDIT_LOG_DROPPED.value(reason="queue_full") == dropped_before + 2
+    writer.stop()
+    assert _count(app, "shutdown") == 10
+    assert writer.flushed == 10 and writer.pending() == 0
+
+
+def run_failed_insert_is_dropped(app):
+    writer = audit_log.AuditLogWriter(app, flush_ms=60000)
+    writer.write(action="bad", timestamp="not a datetime")
+    assert writer.flush() == 0
+    assert writer.dropped == 1 and writer.pending() == 0
+    writer.write(action="good", person_name="Rene")
+    assert writer.flush() == 1
+    assert _count(app, "good") == 1
+
+
+def run_tap_callbacks_skip_the_request_commit(app):
+    answers = []
+    old_answer = tg.answer_callback
+    tg.answer_callback = lambda callback_id, text="", show_alert=False: answers.append(text)
+    writer = audit_log.init_app(app)
+    try:
+        assert writer.synchronous is False
+        with app.app_context():
+            with sqlstats.track("noop tap") as stats:
+                tg.handle_callback_query({
+                    "id": "cb-1", "data": "noop",
+                    "from": {"id": 11, "first_name": "Rene"},
+                    "message": {"message_id": 1, "chat": {"id": "group"}},
+                })
+            assert stats.count == 0, stats.summary()
+            assert answers
+        writer.stop()
+        assert _count(app, "noop") == 1
+
+        # Synchronous mode (tests, AUDIT_LOG_SYNC) and apps without a writer
+        # write the row before the callback returns.
+        app.config["TESTING"] = True
+        writer = audit_log.init_app(app)
+        assert writer.synchronous is True
+        with app.app_context():
+            tg._log_interaction("11", "Rene", "weekly_back", "Rene", buffered=True)
+        assert _count(app, "weekly_back") == 1
+        del app.extensions["audit_log"]
+        with app.app_context():
+            tg._log_interaction("11", "Rene", "weekly_back", "Rene", buffered=True)
+        assert _count(app, "weekly_back") == 2
+    finally:
+        tg.answer_callback = old_answer
+        app.extensions.pop("audit_log", None)
+        app.config["TESTING"] = False
+
+
+def run_retention_rolls_up_old_rows(app):
+    base = datetime.datetime(2026, 1, 1, 12)
+    with app.app_context():
+        InteractionLog.query.delete()
+        rows = []
+        for day in range(40):
+            for person in ("Rene", "Andy", None):
+                for action in ("expand", "confirm"):
+                    rows.append({"timestamp": base + datetime.timedelta(days=day, hours=day % 11),
+                                 "action": action, "person_name": person})
+        db.session.bulk_insert_mappings(InteractionLog, rows)
+        # A day that was already partly rolled up (e.g. rows written late).
+        db.session.add(InteractionLogDaily(day=datetime.date(2026, 1, 3), action="expand",
+                                           person_name="Rene", count=5))
+        db.session.commit()
+        span = (datetime.date(2026, 1, 1), datetime.date(2026, 2, 9))
+        before = audit_log.interaction_counts(*span)
+        assert before[(datetime.date(2026, 1, 3), "expand", "Rene")] == 6
+        assert before[(datetime.date(2026, 1, 3), "expand", "")] == 1
+
+        cutoff = datetime.datetime(2026, 1, 31)
+        assert audit_log.roll_up(before=cutoff, chunk_days=4) == 30 * 6
+        assert audit_log.roll_up(before=cutoff, chunk_days=4) == 0
+        assert InteractionLog.query.filter(InteractionLog.timestamp < cutoff).count() == 0
+        assert InteractionLog.query.count() == 10 * 6
+        assert InteractionLogDaily.query.count() == 30 * 6
+        assert audit_log.interaction_counts(*span) == before
+        assert audit_log.interaction_counts(*span, action="confirm", person_name="Andy") == {
+            key: count for key, count in before.items() if key[1:] == ("confirm", "Andy")
+        }
+        assert audit_log.retention_cutoff(180, today=datetime.date(2026, 7, 1)) == datetime.datetime(2026, 1, 2)
+
+        # Admin stats filters are served by the composite indexes.
+        plan = " ".join(str(row) for row in db.session.execute(text(
+            "EXPLAIN QUERY PLAN SELECT count(*) FROM interaction_log WHERE action = 'confirm' "
+            "AND timestamp >= '2026-01-01'"
+        )))
+        assert "ix_interaction_log_action_timestamp" in plan, plan
+
+    client = app.test_client()
+    assert client.get("/api/v2/stats/interactions?start=2026-01-01&end=2026-02-09").status_code == 403
+    with client.session_transaction() as sess:
+        sess["user_name"] = "Florian"
+    response = client.get("/api/v2/stats/interactions?start=2026-01-03&end=2026-01-03&person=Rene")
+    assert response.status_code == 200
+    assert response.get_json() == [
+        {"date": "2026-01-03", "action": "confirm", "person": "Rene", "count": 1},
+        {"date": "2026-01-03", "action": "expand", "person": "Rene", "count": 6},
+    ]
+    assert client.get("/api/v2/stats/interactions?start=soon").status_code == 400
+
+
+def run_rename_merges_daily_rollup_rows(app):
+    day = datetime.date(2026, 1, 5)
+    with app.app_context():
+        InteractionLogDaily.query.delete()
+        member = TeamMember(name="Jonathan", active=True)
+        db.session.add(member)
+        # "Jon" is an unlinked tapper's first-name fallback, rolled up earlier.
+        db.session.add_all([
+            InteractionLogDaily(day=day, action="expand", person_name="Jon", count=3),
+            InteractionLogDaily(day=day, action="expand", person_name="Jonathan", count=2),
+            InteractionLogDaily(day=day, action="confirm", person_name="Jonathan", count=1),
+        ])
+        db.session.commit()
+        member_id = member.id
+
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess["user_name"] = "Florian"
+    response = client.patch(f"/api/v2/team/{member_id}", json={"name": "Jon"})
+    assert response.status_code == 200, response.get_json()
+    with app.app_context():
+        rows = sorted((r.action, r.person_name, r.count) for r in InteractionLogDaily.query.all())
+        assert rows == [("confirm", "Jon", 1), ("expand", "Jon", 5)], rows
+
+
+def main():
+    app, temp_dir = _make_app()
+    try:
+        run_batches_by_size_and_time(app)
+        run_stop_flushes_and_overflow_is_counted(app)
+        run_failed_insert_is_dropped(app)
+        run_tap_callbacks_skip_the_request_commit(app)
+        run_retention_rolls_up_old_rows(app)
+        run_rename_merges_daily_rollup_rows(app)
+    finally:
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+        shutil.rmtree(temp_dir, ignore_errors=True)
+    print("audit log tests passed")
+
+
+if __name__ == "__main__":
+    main()
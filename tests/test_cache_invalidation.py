@@ -0,0 +1,130 @@
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+from flask import Flask
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app import invalidation, migrations
+from app.extensions import db
+from app.models import TeamMember
+
+
+def _make_app(db_path):
+    app = Flask(__name__)
+    app.config.update(
+        SECRET_KEY="test",
+        TESTING=True,
+        SQLALCHEMY_DATABASE_URI=f"sqlite:///{db_path.as_posix()}",
+        SQLALCHEMY_TRACK_MODIFICATIONS=False,
+    )
+    db.init_app(app)
+    with app.app_context():
+        migrations.upgrade()
+    invalidation.init_app(app)
+    return app
+
+
+def _make_apps():
+    """Two app instances (stand-ins for two gunicorn workers) sharing one DB file."""
+    temp_dir = Path(tempfile.mkdtemp(prefix="livestream-invalidation-"))
+    db_path = temp_dir / "test.db"
+    return _make_app(db_path), _make_app(db_path), temp_dir
+
+
+def _clear_db():
+    db.session.query(TeamMember).delete()
+    db.session.commit()
+
+
+def _roster_cache(app):
+    cache = invalidation.VersionedCache(app, "team_member")
+    loads = []
+
+    def _names():
+        with app.app_context():
+            loads.append(1)
+            return sorted(m.name for m in TeamMember.query.all())
+
+    return cache, (lambda: cache.get_or_set("names", _names)), loads
+
+
+def run_workers_stay_coherent_after_remote_writes(worker_a, worker_b):
+    with worker_a.app_context():
+        _clear_db()
+        db.session.add(TeamMember(name="Andy"))
+        db.session.commit()
+
+    _cache_a, names_a, loads_a = _roster_cache(worker_a)
+    _cache_b, names_b, loads_b = _roster_cache(worker_b)
+    assert names_a() == ["Andy"]
+    assert names_b() == ["Andy"]
+
+    # No writes: both serve from memory without touching the table.
+    assert names_a() == ["Andy"] and names_b() == ["Andy"]
+    assert len(loads_a) == 1 and len(loads_b) == 1
+
+    # A rename in worker A invalidates A locally and B via data_version.
+    with worker_a.app_context():
+        TeamMember.query.filter_by(name="Andy").one().name = "Andreas"
+        db.session.commit()
+    assert names_a() == ["Andreas"]
+    assert names_b() == ["Andreas"]
+
+    # Bulk statements that bypass the flush are published too.
+    with worker_b.app_context():
+        TeamMember.query.filter_by(name="Andreas").delete()
+        db.session.commit()
+    assert names_a() == []
+    assert names_b() == []
+
+
+def run_unrelated_writes_keep_cache_warm(worker_a, worker_b):
+    from app.models import Availability
+    import datetime
+
+    _cache_b, names_b, loads_b = _roster_cache(worker_b)
+    names_b()
+    with worker_a.app_context():
+        db.session.add(Availability(
+            person="Rene",
+            start_date=datetime.date(2026, 6, 1),
+            end_date=datetime.date(2026, 6, 7),
+        ))
+        db.session.commit()
+    names_b()
+    assert len(loads_b) == 1
+
+
+def run_rolled_back_writes_do_not_invalidate(worker_a, worker_b):
+    _cache_b, names_b, loads_b = _roster_cache(worker_b)
+    names_b()
+    with worker_a.app_context():
+        db.session.add(TeamMember(name="Ghost"))
+        db.session.flush()
+        db.session.rollback()
+    assert names_b() == []
+    assert len(loads_b) == 1
+
+
+def main():
+    worker_a, worker_b, temp_dir = _make_apps()
+    try:
+        run_workers_stay_coherent_after_remote_writes(worker_a, worker_b)
+        run_unrelated_writes_keep_cache_warm(worker_a, worker_b)
+        run_rolled_back_writes_do_not_invalidate(worker_a, worker_b)
+    finally:
+        for app in (worker_a, worker_b):
+            with app.app_context():
+                db.session.remove()
+                db.engine.dispose()
+        shutil.rmtree(temp_dir, ignore_errors=True)
+    print("cache invalidation tests passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -11,7 +11,7 @@ if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
 
 from app.extensions import db
-from app.models import Assignment, Event
+from app.models import Assignment, AssignmentHistory, Event
 from app.routes import bp
 from app.utils import vancouver_today
 
@@ -36,6 +36,7 @@ def _make_app():
 
 
 def _clear_db():
+    db.session.query(AssignmentHistory).delete()
     db.session.query(Assignment).delete()
     db.session.query(Event).delete()
     db.session.commit()
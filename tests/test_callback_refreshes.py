@@ -0,0 +1,205 @@
+import datetime
+import shutil
+import sys
+import tempfile
+from collections import Counter
+from pathlib import Path
+
+from flask import Flask
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app import message_refs
+from app.extensions import db
+from app.models import (
+    Assignment, AssignmentHistory, Event, InteractionLog, SwapRequest, TeamMember, TelegramMessageRef, TempChat,
+)
+import app.telegram_v2 as tg
+
+CHAT = "group"
+THIS_WEEK = datetime.date(2026, 6, 22)
+LATER_WEEK = datetime.date(2026, 7, 13)
+WEEKLY_MESSAGE = 100
+LATER_WEEKLY_MESSAGE = 101
+REMINDER_MESSAGE = 200
+FUTURE_REMINDER_MESSAGE = 201
+MEMBERS = {"Rene": 11, "Andy": 12}
+
+
+class FakeBotApi:
+    """Stands in for _api_call_result and counts calls per (method, chat, message)."""
+
+    def __init__(self):
+        self.calls = []
+        self.next_message_id = 900
+
+    def __call__(self, method, payload, timeout=10):
+        self.calls.append((method, str(payload.get("chat_id")), payload.get("message_id")))
+        if method == "sendMessage":
+            self.next_message_id += 1
+            return {"message_id": self.next_message_id}, None
+        return True, None
+
+    def edits(self):
+        return Counter(
+            (chat_id, message_id) for method, chat_id, message_id in self.calls
+            if method in ("editMessageText", "editMessageReplyMarkup")
+        )
+
+
+def _make_app():
+    temp_dir = Path(tempfile.mkdtemp(prefix="livestream-callback-refreshes-"))
+    db_path = temp_dir / "test.db"
+    app = Flask(__name__)
+    app.config.update(
+        SECRET_KEY="test",
+        TESTING=True,
+        SQLALCHEMY_DATABASE_URI=f"sqlite:///{db_path.as_posix()}",
+        SQLALCHEMY_TRACK_MODIFICATIONS=False,
+        BASE_URL="https://livestream.example.test",
+    )
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+    return app, temp_dir
+
+
+def _seed():
+    for model in (
+        TempChat, SwapRequest, InteractionLog, AssignmentHistory, Assignment, Event, TeamMember, TelegramMessageRef,
+    ):
+        db.session.query(model).delete()
+    for name, telegram_id in MEMBERS.items():
+        member = TeamMember(name=name, active=True, telegram_user_id=str(telegram_id))
+        member.sunday_roles = ["Computer"]
+        member.friday_roles = ["Computer"]
+        db.session.add(member)
+    rows = {}
+    for date_obj, person, message_id in (
+        (THIS_WEEK + datetime.timedelta(days=6), "Rene", REMINDER_MESSAGE),
+        (LATER_WEEK + datetime.timedelta(days=6), "Andy", FUTURE_REMINDER_MESSAGE),
+    ):
+        event = Event(date=date_obj, day_type="Sunday", telegram_chat_id=CHAT, telegram_message_id=message_id)
+        db.session.add(event)
+        db.session.flush()
+        assignment = Assignment(event_id=event.id, role="Computer", person=person, status="pending")
+        db.session.add(assignment)
+        db.session.flush()
+        rows[person] = assignment.id
+    message_refs.register(message_refs.WEEKLY_SCHEDULE, THIS_WEEK, CHAT, WEEKLY_MESSAGE)
+    message_refs.register(message_refs.WEEKLY_SCHEDULE, LATER_WEEK, CHAT, LATER_WEEKLY_MESSAGE)
+    db.session.commit()
+    return rows
+
+
+def _tap(handler, data, person, message_id):
+    return handler({
+        "id": f"cb-{data}",
+        "data": data,
+        "from": {"id": MEMBERS[person], "first_name": person},
+        "message": {"message_id": message_id, "chat": {"id": CHAT}},
+    })
+
+
+def _run(app, data_for, person, message_id, handler=None):
+    """Reseed, tap once against a fake Bot API; returns (api, render counts)."""
+    api = FakeBotApi()
+    renders = Counter()
+    originals = {
+        "_api_call_result": tg._api_call_result,
+        "format_weekly_schedule": tg.format_weekly_schedule,
+        "format_today_group_post": tg.format_today_group_post,
+        "vancouver_today": tg.vancouver_today,
+    }
+
+    def counted(name):
+        def render(*args, **kwargs):
+            renders[name] += 1
+            return originals[name](*args, **kwargs)
+        return render
+
+    with app.app_context():
+        ids = _seed()
+        try:
+            tg._api_call_result = api
+            tg.format_weekly_schedule = counted("format_weekly_schedule")
+            tg.format_today_group_post = counted("format_today_group_post")
+            tg.vancouver_today = lambda: THIS_WEEK
+            _tap(handler or tg.handle_callback_query, data_for(ids), person, message_id)
+        finally:
+            for name, value in originals.items():
+                setattr(tg, name, value)
+    return api, renders
+
+
+def _assert_single_edits(api, renders, expected_messages, label):
+    edits = api.edits()
+    assert all(count == 1 for count in edits.values()), (label, edits)
+    assert set(edits) == {(CHAT, message_id) for message_id in expected_messages}, (label, edits)
+    weekly = len([m for m in expected_messages if m in (WEEKLY_MESSAGE, LATER_WEEKLY_MESSAGE)])
+    assert renders["format_weekly_schedule"] == weekly, (label, renders)
+    assert renders["format_today_group_post"] == len(expected_messages) - weekly, (label, renders)
+    assert sum(1 for call in api.calls if call[0] == "answerCallbackQuery") == 1, (label, api.calls)
+
+
+def run_sequential_refreshes_edited_twice(app):
+    """Without the dirty set, a weekly confirm edits the weekly message twice."""
+    api, _renders = _run(app, lambda ids: f"weekly_confirm_shift:{ids['Rene']}", "Rene", WEEKLY_MESSAGE,
+                         handler=tg._dispatch_callback_query)
+    assert api.edits()[(CHAT, WEEKLY_MESSAGE)] == 2, api.calls
+
+
+def run_weekly_confirm(app):
+    api, renders = _run(app, lambda ids: f"weekly_confirm_shift:{ids['Rene']}", "Rene", WEEKLY_MESSAGE)
+    _assert_single_edits(api, renders, (WEEKLY_MESSAGE, REMINDER_MESSAGE), "weekly confirm")
+
+
+def run_weekly_decline_with_auto_swap(app):
+    api, renders = _run(app, lambda ids: f"weekly_decline_yes:{ids['Rene']}", "Rene", WEEKLY_MESSAGE)
+    with app.app_context():
+        assert Assignment.query.filter_by(person="Rene").one().cover == "Andy"
+    _assert_single_edits(
+        api, renders,
+        (WEEKLY_MESSAGE, REMINDER_MESSAGE, LATER_WEEKLY_MESSAGE, FUTURE_REMINDER_MESSAGE),
+        "weekly decline",
+    )
+
+
+def run_event_confirm(app):
+    api, renders = _run(
+        app, lambda ids: f"event_confirm_shift:{ids['Rene']}:{REMINDER_MESSAGE}", "Rene", REMINDER_MESSAGE,
+    )
+    _assert_single_edits(api, renders, (REMINDER_MESSAGE, WEEKLY_MESSAGE), "event confirm")
+
+
+def run_event_decline_with_auto_swap(app):
+    api, renders = _run(
+        app, lambda ids: f"event_decline_yes:{ids['Rene']}:{REMINDER_MESSAGE}", "Rene", REMINDER_MESSAGE,
+    )
+    _assert_single_edits(
+        api, renders,
+        (REMINDER_MESSAGE, WEEKLY_MESSAGE, LATER_WEEKLY_MESSAGE, FUTURE_REMINDER_MESSAGE),
+        "event decline",
+    )
+
+
+def main():
+    app, temp_dir = _make_app()
+    try:
+        run_sequential_refreshes_edited_twice(app)
+        run_weekly_confirm(app)
+        run_weekly_decline_with_auto_swap(app)
+        run_event_confirm(app)
+        run_event_decline_with_auto_swap(app)
+    finally:
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+        shutil.rmtree(temp_dir, ignore_errors=True)
+    print("callback refresh tests passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# Two apps share one 1 GB VM; keep the web process lean. Override per host
+# with IMPORT_BUDGET_MS / RSS_BUDGET_MB when running on slower hardware.
+IMPORT_BUDGET_MS = float(os.environ.get("IMPORT_BUDGET_MS", "1000"))
+RSS_BUDGET_MB = float(os.environ.get("RSS_BUDGET_MB", "120"))
+
+# Optional dependencies that must stay unloaded until a code path needs them.
+LAZY_MODULES = ("requests", "telethon", "apscheduler", "app.telegram_temp_groups")
+
+_CREATE_APP_PROBE = """
+import json, os, sys, time
+sys.path.insert(0, {root!r})
+os.environ["DISABLE_SCHEDULER"] = "1"
+from app import create_app
+from config import Config
+
+class ProbeConfig(Config):
+    SQLALCHEMY_DATABASE_URI = "sqlite:///" + {db_path!r}
+
+app = create_app(ProbeConfig)
+while app.extensions["startup_tasks"]["status"] not in ("ready", "failed"):
+    time.sleep(0.05)
+
+rss_kb = 0
+with open("/proc/self/status") as f:
+    for line in f:
+        if line.startswith("VmRSS:"):
+            rss_kb = int(line.split()[1])
+print(json.dumps({{
+    "rss_mb": rss_kb / 1024,
+    "startup": app.extensions["startup_tasks"]["status"],
+    "loaded": [name for name in {lazy!r} if name in sys.modules],
+}}))
+"""
+
+
+def _import_time_ms():
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app"],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    for line in proc.stderr.splitlines():
+        match = re.match(r"import time:\s+\d+ \|\s+(\d+) \| app$", line)
+        if match:
+            return int(match.group(1)) / 1000
+    raise AssertionError("`import app` missing from -X importtime output")
+
+
+def run_app_import_within_budget():
+    # Best of three to smooth out cold disk caches.
+    elapsed = min(_import_time_ms() for _ in range(3))
+    print(f"  import app: {elapsed:.0f} ms (budget {IMPORT_BUDGET_MS:.0f} ms)")
+    assert elapsed <= IMPORT_BUDGET_MS, f"import app took {elapsed:.0f} ms"
+
+
+def run_create_app_memory_within_budget():
+    if not os.path.exists("/proc/self/status"):
+        print("  create_app RSS: skipped (no /proc)")
+        return
+    with tempfile.TemporaryDirectory(prefix="livestream-import-budget-") as temp_dir:
+        probe = _CREATE_APP_PROBE.format(
+            root=str(ROOT),
+            db_path=os.path.join(temp_dir, "probe.db"),
+            lazy=LAZY_MODULES,
+        )
+        proc = subprocess.run([sys.executable, "-c", probe], capture_output=True, text=True, check=True)
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    print(f"  create_app RSS: {result['rss_mb']:.0f} MB (budget {RSS_BUDGET_MB:.0f} MB)")
+    assert result["startup"] == "ready"
+    assert result["loaded"] == [], f"eagerly imported: {result['loaded']}"
+    assert result["rss_mb"] <= RSS_BUDGET_MB, f"RSS {result['rss_mb']:.0f} MB"
+
+
+def main():
+    run_app_import_within_budget()
+    run_create_app_memory_within_budget()
+    print("import budget tests passed")
+
+
+if __name__ == "__main__":
+    main()
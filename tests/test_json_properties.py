@@ -0,0 +1,128 @@
+import datetime
+import json
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+from flask import Flask
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app import models
+from app.extensions import db
+from app.models import Assignment, Event, TeamMember
+
+
+def _make_app():
+    temp_dir = Path(tempfile.mkdtemp(prefix="livestream-json-properties-"))
+    db_path = temp_dir / "test.db"
+    app = Flask(__name__)
+    app.config.update(
+        SECRET_KEY="test",
+        TESTING=True,
+        SQLALCHEMY_DATABASE_URI=f"sqlite:///{db_path.as_posix()}",
+        SQLALCHEMY_TRACK_MODIFICATIONS=False,
+    )
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+    return app, temp_dir
+
+
+class _CountingJSON:
+    def __init__(self):
+        self.calls = 0
+        self._loads = json.loads
+
+    def loads(self, raw):
+        self.calls += 1
+        return self._loads(raw)
+
+    def __getattr__(self, name):
+        return getattr(json, name)
+
+
+def run_reads_decode_once_per_raw_value(app):
+    counting = _CountingJSON()
+    old_json = models.json
+    models.json = counting
+    try:
+        with app.app_context():
+            member = TeamMember(name="Andy")
+            member.sunday_roles = ["Computer", "Camera 1"]
+            member.role_preferences = {"Sunday:Computer": "prefer"}
+            db.session.add(member)
+            db.session.commit()
+
+            member = TeamMember.query.filter_by(name="Andy").one()
+            counting.calls = 0
+            for _ in range(5):
+                assert member.sunday_roles == ["Computer", "Camera 1"]
+                assert member.role_preferences == {"Sunday:Computer": "prefer"}
+            assert counting.calls == 2
+
+            # Reads hand out copies: mutating one doesn't leak into the next read.
+            roles = member.sunday_roles
+            roles.append("Camera 2")
+            assert member.sunday_roles == ["Computer", "Camera 1"]
+
+            # Setter replaces the memoized value.
+            member.sunday_roles = roles
+            assert member.sunday_roles == ["Computer", "Camera 1", "Camera 2"]
+            member.role_preferences = None
+            assert member.role_preferences == {}
+
+            # Raw column writes and expire/refresh are picked up too.
+            member._sunday_roles_json = '["Camera 2"]'
+            assert member.sunday_roles == ["Camera 2"]
+            db.session.commit()
+            db.session.execute(
+                TeamMember.__table__.update().values(_sunday_roles_json='["Computer"]')
+            )
+            db.session.commit()
+            assert member.sunday_roles == ["Computer"]
+            member._sunday_roles_json = "not json"
+            assert member.sunday_roles == []
+            db.session.rollback()
+            db.session.refresh(member)
+            assert member.sunday_roles == ["Computer"]
+    finally:
+        models.json = old_json
+
+
+def run_history_append_pattern_still_persists(app):
+    with app.app_context():
+        event = Event(date=datetime.date(2030, 1, 6), day_type="Sunday")
+        db.session.add(event)
+        db.session.flush()
+        assignment = Assignment(event_id=event.id, role="Computer", person="Andy")
+        db.session.add(assignment)
+        db.session.commit()
+
+        assert assignment.history == []
+        h = assignment.history
+        h.append({"action": "confirm", "by": "Andy"})
+        assignment.history = h
+        db.session.commit()
+        db.session.expire_all()
+        assert db.session.get(Assignment, assignment.id).history == [{"action": "confirm", "by": "Andy"}]
+
+
+def main():
+    app, temp_dir = _make_app()
+    try:
+        run_reads_decode_once_per_raw_value(app)
+        run_history_append_pattern_still_persists(app)
+    finally:
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+        shutil.rmtree(temp_dir, ignore_errors=True)
+    print("json property tests passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+import datetime
+import queue
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from flask import Flask
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app import leader, migrations
+from app.extensions import db
+from app.models import SchedulerLease
+
+# A worker process competing for the lease on a shared SQLite file.
+_WORKER = """
+import sys, time
+sys.path.insert(0, {root!r})
+from flask import Flask
+from app.extensions import db
+from app.leader import LeaderLease
+
+app = Flask(__name__)
+app.config.update(SQLALCHEMY_DATABASE_URI={uri!r}, SQLALCHEMY_TRACK_MODIFICATIONS=False)
+db.init_app(app)
+lease = LeaderLease(app, "scheduler", ttl={ttl}, on_elected=lambda: print("elected", flush=True))
+print("holder", lease.holder, flush=True)
+if not lease.start():
+    print("standby", flush=True)
+while True:
+    time.sleep(1)
+"""
+
+TTL = 1
+
+
+def _make_app():
+    temp_dir = Path(tempfile.mkdtemp(prefix="livestream-lease-"))
+    app = Flask(__name__)
+    app.config.update(
+        SECRET_KEY="test",
+        TESTING=True,
+        SQLALCHEMY_DATABASE_URI=f"sqlite:///{(temp_dir / 'test.db').as_posix()}",
+        SQLALCHEMY_TRACK_MODIFICATIONS=False,
+    )
+    db.init_app(app)
+    with app.app_context():
+        migrations.upgrade()
+    return app, temp_dir
+
+
+def _clear_db():
+    db.session.query(SchedulerLease).delete()
+    db.session.commit()
+
+
+class _Worker:
+    def __init__(self, app):
+        self.lines = queue.Queue()
+        self.proc = subprocess.Popen(
+            [sys.executable, "-c", _WORKER.format(
+                root=str(ROOT), uri=app.config["SQLALCHEMY_DATABASE_URI"], ttl=TTL,
+            )],
+            stdout=subprocess.PIPE, text=True,
+        )
+        threading.Thread(target=self._pump, daemon=True).start()
+        self.holder = self.expect("holder").split(" ", 1)[1]
+
+    def _pump(self):
+        for line in self.proc.stdout:
+            self.lines.put(line.strip())
+
+    def expect(self, prefix, timeout=10):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            try:
+                line = self.lines.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if line.startswith(prefix):
+                return line
+        raise AssertionError(f"worker never printed {prefix!r}")
+
+    def saw(self, prefix):
+        seen = False
+        while not self.lines.empty():
+            seen = seen or self.lines.get().startswith(prefix)
+        return seen
+
+    def kill(self):
+        self.proc.kill()
+        self.proc.wait()
+
+
+def run_lease_is_exclusive_until_expiry(app):
+    with app.app_context():
+        _clear_db()
+        assert leader.try_acquire("scheduler", "a", ttl=60) is True
+        assert leader.try_acquire("scheduler", "b", ttl=60) is False
+        assert leader.try_acquire("scheduler", "a", ttl=60) is True  # renewal
+        assert leader.current_holder("scheduler") == "a"
+
+        lease = db.session.get(SchedulerLease, "scheduler")
+        lease.expires_at = datetime.datetime.utcnow() - datetime.timedelta(seconds=1)
+        db.session.commit()
+
+        assert leader.current_holder("scheduler") is None
+        assert leader.try_acquire("scheduler", "b", ttl=60) is True
+        assert leader.try_acquire("scheduler", "a", ttl=60) is False
+
+        leader.release("scheduler", "b")
+        assert leader.try_acquire("scheduler", "a", ttl=60) is True
+
+
+def run_failed_election_steps_down(app):
+    with app.app_context():
+        _clear_db()
+    calls = []
+
+    def _broken_start():
+        calls.append("elected")
+        raise RuntimeError("scheduler failed to start")
+
+    lease = leader.LeaderLease(app, "scheduler", ttl=60, holder="broken",
+                               on_elected=_broken_start, on_demoted=lambda: calls.append("demoted"))
+    assert lease._heartbeat() is False
+    assert lease.is_leader is False
+    assert calls == ["elected", "demoted"]
+    with app.app_context():
+        # Released right away, so a healthy worker doesn't wait out the TTL.
+        assert leader.current_holder("scheduler") is None
+        assert leader.try_acquire("scheduler", "healthy", ttl=60) is True
+
+
+def run_standby_process_takes_over_when_holder_dies(app):
+    with app.app_context():
+        _clear_db()
+    first = _Worker(app)
+    second = None
+    try:
+        first.expect("elected")
+        second = _Worker(app)
+        second.expect("standby")
+
+        # Several heartbeats later the original holder still owns the lease.
+        time.sleep(TTL * 2)
+        assert not second.saw("elected")
+        with app.app_context():
+            assert leader.current_holder("scheduler") == first.holder
+
+        first.kill()  # no release: failover must come from lease expiry
+        second.expect("elected", timeout=TTL * 5)
+        with app.app_context():
+            assert leader.current_holder("scheduler") == second.holder
+    finally:
+        first.kill()
+        if second:
+            second.kill()
+
+
+def main():
+    app, temp_dir = _make_app()
+    try:
+        run_lease_is_exclusive_until_expiry(app)
+        run_failed_election_steps_down(app)
+        run_standby_process_takes_over_when_holder_dies(app)
+    finally:
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+        shutil.rmtree(temp_dir, ignore_errors=True)
+    print("leader lease tests passed")
+
+
+if __name__ == "__main__":
+    main()
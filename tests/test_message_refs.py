@@ -0,0 +1,189 @@
+import datetime
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+from flask import Flask
+from sqlalchemy.exc import IntegrityError
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app import message_refs, sqlstats
+from app.extensions import db
+from app.models import Assignment, Event, InteractionLog, SwapRequest, TelegramMessageRef
+import app.telegram_v2 as tg
+
+MONDAY = datetime.date(2026, 6, 8)
+
+
+def _make_app():
+    temp_dir = Path(tempfile.mkdtemp(prefix="livestream-message-refs-"))
+    db_path = temp_dir / "test.db"
+    app = Flask(__name__)
+    app.config.update(
+        SECRET_KEY="test",
+        TESTING=True,
+        SQLALCHEMY_DATABASE_URI=f"sqlite:///{db_path.as_posix()}",
+        SQLALCHEMY_TRACK_MODIFICATIONS=False,
+    )
+    db.init_app(app)
+    message_refs.init_app(app)
+    with app.app_context():
+        db.create_all()
+    return app, temp_dir
+
+
+def _refs():
+    return sorted(
+        (r.kind, r.anchor_date, r.entity_id, r.chat_id, r.message_id)
+        for r in TelegramMessageRef.query.all()
+    )
+
+
+def _event(date_obj, person="Rene"):
+    event = Event(date=date_obj, day_type="Friday")
+    db.session.add(event)
+    db.session.flush()
+    assignment = Assignment(event_id=event.id, role="Camera", person=person, status="pending")
+    db.session.add(assignment)
+    db.session.flush()
+    return event, assignment
+
+
+def _swap(assignment, **fields):
+    swap = SwapRequest(
+        assignment_id=assignment.id, requestor=assignment.person, event_date=assignment.event.date,
+        role=assignment.role, expires_at=datetime.datetime(2026, 6, 12, 18), **fields,
+    )
+    db.session.add(swap)
+    return swap
+
+
+def run_backfill_from_logs_and_pointers(app):
+    with app.app_context():
+        for message_id in (300, 323):
+            db.session.add(InteractionLog(
+                action="weekly_schedule_sent", person_name="group", event_date=MONDAY,
+                details=f"weekly_schedule:{MONDAY.isoformat()}|chat_id=chat|message_id={message_id}|reason=weekly_schedule_sent",
+            ))
+        db.session.add(InteractionLog(action="weekly_schedule_sent", person_name="group", details="garbled"))
+        event, assignment = _event(datetime.date(2026, 6, 12))
+        swap = _swap(assignment)
+        db.session.flush()
+        # Written behind the ORM's back, like rows from before the mirror existed.
+        db.session.execute(Event.__table__.update().where(Event.id == event.id)
+                           .values(telegram_chat_id="chat", telegram_message_id=401))
+        db.session.execute(SwapRequest.__table__.update().where(SwapRequest.id == swap.id)
+                           .values(telegram_chat_id="chat", telegram_message_id=402))
+        db.session.commit()
+        assert TelegramMessageRef.query.count() == 0
+
+        assert message_refs.backfill() == 3
+        db.session.commit()
+        assert _refs() == [
+            ("event_reminder", event.date, event.id, "chat", 401),
+            ("swap_notice", event.date, swap.id, "chat", 402),
+            ("weekly_schedule", MONDAY, 0, "chat", 323),
+        ]
+        assert message_refs.backfill() == 0
+
+        result = app.test_cli_runner().invoke(args=["message-refs-backfill"])
+        assert result.exit_code == 0, result.output
+
+        db.session.add(TelegramMessageRef(kind="weekly_schedule", anchor_date=MONDAY, entity_id=0,
+                                          chat_id="chat", message_id=999))
+        try:
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+        else:
+            raise AssertionError("duplicate weekly ref accepted")
+
+
+def run_weekly_lookup_uses_ref(app):
+    with app.app_context():
+        edits = []
+        old_edit = tg.edit_message_with_error
+        try:
+            tg.edit_message_with_error = lambda chat_id, message_id, text, reply_markup=None: (
+                edits.append((chat_id, message_id)) or (True, None)
+            )
+            with sqlstats.track("update_weekly_schedule_for_date") as stats:
+                assert tg.update_weekly_schedule_for_date(MONDAY + datetime.timedelta(days=4)) is True
+            assert tg.update_weekly_schedule_for_date(MONDAY + datetime.timedelta(days=7)) is False
+        finally:
+            tg.edit_message_with_error = old_edit
+        assert edits == [("chat", 323)]
+        assert not [fp for fp in stats.fingerprints if "interaction_log" in fp], stats.summary()
+
+
+def run_pointer_changes_are_mirrored(app):
+    with app.app_context():
+        event, assignment = _event(datetime.date(2026, 6, 19), person="Andy")
+        db.session.commit()
+
+        sent = []
+        old_send = tg.send_message
+        try:
+            tg.send_message = lambda text, chat_id=None, reply_markup=None, parse_mode="HTML": (
+                sent.append((text, reply_markup)) or 510
+            )
+            assert tg.send_event_reminder(event, chat_id="chat") == 510
+        finally:
+            tg.send_message = old_send
+        ref = message_refs.get(message_refs.EVENT_REMINDER, entity_id=event.id)
+        assert (ref.anchor_date, ref.chat_id, ref.message_id) == (event.date, "chat", 510)
+        assert ref.content_hash == message_refs.content_hash(*sent[-1])
+
+        swap = _swap(assignment, telegram_chat_id="chat", telegram_message_id=511)
+        db.session.commit()
+        assert message_refs.get(message_refs.SWAP_NOTICE, entity_id=swap.id).message_id == 511
+
+        swap.telegram_message_id = 512
+        db.session.commit()
+        assert message_refs.get(message_refs.SWAP_NOTICE, entity_id=swap.id).message_id == 512
+
+        # Rolled-back pointer changes never reach the table.
+        swap.telegram_message_id = 513
+        db.session.flush()
+        db.session.rollback()
+        assert message_refs.get(message_refs.SWAP_NOTICE, entity_id=swap.id).message_id == 512
+
+        swap.telegram_message_id = None
+        swap.telegram_chat_id = None
+        db.session.commit()
+        assert message_refs.get(message_refs.SWAP_NOTICE, entity_id=swap.id) is None
+
+        old_edit = tg.edit_message_with_error
+        old_update = tg.update_weekly_schedule_for_date
+        try:
+            tg.edit_message_with_error = lambda *args, **kwargs: (True, None)
+            tg.update_weekly_schedule_for_date = lambda date_obj: True
+            assert tg.delete_past_event_reminders(today=datetime.date(2026, 9, 1)) == 2
+        finally:
+            tg.edit_message_with_error = old_edit
+            tg.update_weekly_schedule_for_date = old_update
+        assert message_refs.get(message_refs.EVENT_REMINDER, entity_id=event.id) is None
+        # Older than KEEP_DAYS: the backfilled week is pruned too.
+        assert TelegramMessageRef.query.count() == 0
+
+
+def main():
+    app, temp_dir = _make_app()
+    try:
+        run_backfill_from_logs_and_pointers(app)
+        run_weekly_lookup_uses_ref(app)
+        run_pointer_changes_are_mirrored(app)
+    finally:
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+        shutil.rmtree(temp_dir, ignore_errors=True)
+    print("message ref tests passed")
+
+
+if __name__ == "__main__":
+    main()
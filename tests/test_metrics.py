@@ -0,0 +1,117 @@
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+from flask import Flask
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app import metrics, sqlstats, telegram_v2 as tg
+from app.api_v2 import api_v2
+from app.extensions import db
+from app.routes import bp
+
+
+def _make_app():
+    temp_dir = Path(tempfile.mkdtemp(prefix="livestream-metrics-"))
+    db_path = temp_dir / "test.db"
+    app = Flask(__name__)
+    app.config.update(
+        SECRET_KEY="test",
+        TESTING=True,
+        SQLALCHEMY_DATABASE_URI=f"sqlite:///{db_path.as_posix()}",
+        SQLALCHEMY_TRACK_MODIFICATIONS=False,
+        BASE_URL="https://livestream.example.test",
+    )
+    db.init_app(app)
+    app.register_blueprint(bp)
+    app.register_blueprint(api_v2)
+    sqlstats.init_app(app)
+    metrics.init_app(app)
+    with app.app_context():
+        db.create_all()
+    return app, temp_dir
+
+
+class _FakeResponse:
+    status_code = 400
+
+    def json(self):
+        return {"ok": False, "error_code": 400, "description": "Bad Request: message to edit not found"}
+
+
+class _FakeRequests:
+    RequestException = Exception
+
+    @staticmethod
+    def post(url, json=None, timeout=None):
+        return _FakeResponse()
+
+
+def run_metrics_requires_secret(app):
+    client = app.test_client()
+    old_secret = os.environ.pop("CRON_SECRET", None)
+    try:
+        assert client.get("/metrics").status_code == 401
+        os.environ["CRON_SECRET"] = "s3cret"
+        assert client.get("/metrics?secret=wrong").status_code == 401
+        assert client.get("/metrics?secret=\u00e9").status_code == 401
+        assert client.get("/metrics", headers={"Authorization": "Bearer s3cret"}).status_code == 200
+    finally:
+        os.environ.pop("CRON_SECRET", None)
+        if old_secret is not None:
+            os.environ["CRON_SECRET"] = old_secret
+
+
+def run_request_and_telegram_metrics_are_exposed(app):
+    client = app.test_client()
+    assert client.get("/api/v2/schedule").status_code == 200
+
+    old_token, old_requests = tg.TELEGRAM_BOT_TOKEN, tg.requests
+    try:
+        tg.TELEGRAM_BOT_TOKEN = "123:abc"
+        tg.requests = _FakeRequests
+        with app.app_context():
+            assert tg.edit_message_with_error("chat", 1, "hi") == (False, "Bad Request: message to edit not found")
+    finally:
+        tg.TELEGRAM_BOT_TOKEN, tg.requests = old_token, old_requests
+
+    with app.app_context():
+        with metrics.timed(metrics.SCHEDULER_PHASE_SECONDS, phase="test_phase"):
+            pass
+
+    os.environ["CRON_SECRET"] = "s3cret"
+    try:
+        response = client.get("/metrics?secret=s3cret")
+    finally:
+        os.environ.pop("CRON_SECRET", None)
+    body = response.get_data(as_text=True)
+
+    assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+    assert "# TYPE livestream_http_request_duration_seconds histogram" in body
+    assert 'livestream_http_request_duration_seconds_count{method="GET",route="/api/v2/schedule",status="200"} 1' in body
+    assert 'livestream_http_sql_queries_count{route="/api/v2/schedule"} 1' in body
+    assert 'livestream_telegram_api_duration_seconds_count{method="editMessageText"} 1' in body
+    assert 'livestream_telegram_api_errors_total{code="400",method="editMessageText"} 1' in body
+    assert 'livestream_scheduler_phase_duration_seconds_bucket{phase="test_phase",le="+Inf"} 1' in body
+
+
+def main():
+    app, temp_dir = _make_app()
+    try:
+        run_metrics_requires_secret(app)
+        run_request_and_telegram_metrics_are_exposed(app)
+    finally:
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+        shutil.rmtree(temp_dir, ignore_errors=True)
+    print("metrics tests passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+from flask import Flask
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app import profiling, sqlstats
+from app.api_v2 import api_v2
+from app.extensions import db
+from app.routes import bp
+
+
+def _make_app():
+    temp_dir = Path(tempfile.mkdtemp(prefix="livestream-profiling-"))
+    db_path = temp_dir / "test.db"
+    app = Flask(__name__)
+    app.config.update(
+        SECRET_KEY="test",
+        TESTING=True,
+        SQLALCHEMY_DATABASE_URI=f"sqlite:///{db_path.as_posix()}",
+        SQLALCHEMY_TRACK_MODIFICATIONS=False,
+        BASE_URL="https://livestream.example.test",
+    )
+    db.init_app(app)
+    app.register_blueprint(bp)
+    app.register_blueprint(api_v2)
+    sqlstats.init_app(app)
+    with app.app_context():
+        db.create_all()
+    return app, temp_dir
+
+
+def _manager_client(app, manager=True):
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess["manager"] = manager
+        sess["user_name"] = "Manager"
+    return client
+
+
+def _span_names(breakdown):
+    return {item["span"] for item in breakdown["spans"]}
+
+
+def run_profile_is_opt_in(app):
+    client = _manager_client(app)
+    response = client.post("/api/v2/generate", json={"year": 2030, "month": 3})
+    assert response.status_code == 200
+    assert "profile" not in response.get_json()
+
+    # Non-managers can't turn profiling on.
+    client = _manager_client(app, manager=False)
+    response = client.post("/api/v2/generate?profile=1", json={"year": 2030, "month": 4})
+    assert response.status_code == 403
+    assert "profile" not in response.get_json()
+
+
+def run_generate_returns_phase_breakdown(app):
+    client = _manager_client(app)
+    response = client.post("/api/v2/generate?profile=1", json={"year": 2030, "month": 5})
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data["created"] > 0
+    breakdown = data["profile"]
+    names = _span_names(breakdown)
+    assert "generate_month" in names, names
+    assert "generate_month > build_history" in names, names
+    assert any(name.endswith("select_best > is_available") for name in names), names
+    assert any(name.endswith("flush") for name in names), names
+    assert breakdown["sql"]["queries"] > 0
+    assert breakdown["total_ms"] >= max(item["total_ms"] for item in breakdown["spans"])
+    assert "cprofile" not in breakdown
+
+
+def run_config_flag_and_cprofile(app):
+    dump_dir = Path(tempfile.mkdtemp(prefix="livestream-pstats-"))
+    app.config.update(SCHEDULER_PROFILE="cprofile", PROFILE_DUMP_DIR=str(dump_dir))
+    try:
+        client = _manager_client(app)
+        response = client.post("/api/v2/generate/year", json={"year": 2031, "start_month": 11})
+        assert response.status_code == 200
+        breakdown = response.get_json()["profile"]
+        generate = next(item for item in breakdown["spans"] if item["span"] == "generate_month")
+        assert generate["calls"] == 2
+        capture = breakdown["cprofile"]
+        if "error" not in capture:  # another profiler (coverage, debugger) may own the hook
+            assert capture["top"], capture
+            assert Path(capture["dump"]).exists()
+    finally:
+        app.config.update(SCHEDULER_PROFILE="", PROFILE_DUMP_DIR="")
+        shutil.rmtree(dump_dir, ignore_errors=True)
+
+
+def run_spans_are_free_outside_a_profile():
+    assert profiling.active() is None
+    with profiling.span("ignored"):
+        pass
+    with profiling.profile("outer") as outer:
+        with profiling.profile("inner") as inner:
+            with profiling.span("phase"):
+                pass
+        assert inner is outer
+    assert profiling.active() is None
+    assert _span_names(outer.breakdown()) == {"phase"}
+
+
+def main():
+    app, temp_dir = _make_app()
+    try:
+        run_profile_is_opt_in(app)
+        run_generate_returns_phase_breakdown(app)
+        run_config_flag_and_cprofile(app)
+        with app.app_context():
+            run_spans_are_free_outside_a_profile()
+    finally:
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+        shutil.rmtree(temp_dir, ignore_errors=True)
+    print("profiling tests passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,385 @@
+import datetime
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+from flask import Flask
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app import sqlstats, telegram_v2 as tg
+from app.repository import declined_names_by_assignment, latest_swap_request, load_event_graph
+from app.scheduler_v2 import _assignment_declined_names, _build_history, get_roster
+from app.api_v2 import api_v2
+from app.extensions import db
+from app.models import Assignment, AssignmentHistory, Availability, Event, SwapRequest, TeamMember
+from app.routes import bp
+from app.utils import get_history_stats, preloaded_availability, vancouver_today
+
+EVENT_COUNT = 40
+
+# Per-endpoint SQL budgets. Event lists go through load_event_graph, so these
+# don't grow with the number of events.
+SCHEDULE_BUDGET = 3
+UPCOMING_BUDGET = 3
+MONTH_BUDGET = 3
+CALENDAR_BUDGET = 3
+# ?archive=1 also reads archived events + their assignments
+ARCHIVE_CALENDAR_BUDGET = CALENDAR_BUDGET + 2
+MONTHLY_SCHEDULE_BUDGET = 3
+# served from stats_rollup
+HISTORY_STATS_BUDGET = 1
+# events, assignments, swap requests, history rows + one grouped declined-names query
+EVENT_GRAPH_WITH_SWAPS_BUDGET = 5
+WEBHOOK_NOOP_BUDGET = 6
+# events + their assignments for the whole pool, plus the availability preload
+AUTO_SWAP_SEARCH_BUDGET = 3
+# RenderContext: events, assignments, swap requests — none per line
+WEEKLY_RENDER_BUDGET = 3
+# the event is already loaded: its assignments + the open swaps' requests
+TODAY_POST_BUDGET = 2
+
+
+def _make_app():
+    temp_dir = Path(tempfile.mkdtemp(prefix="livestream-query-budgets-"))
+    db_path = temp_dir / "test.db"
+    app = Flask(__name__)
+    app.config.update(
+        SECRET_KEY="test",
+        TESTING=True,
+        SQLALCHEMY_DATABASE_URI=f"sqlite:///{db_path.as_posix()}",
+        SQLALCHEMY_TRACK_MODIFICATIONS=False,
+        BASE_URL="https://livestream.example.test",
+        WEEKLY_SCHEDULE_HOUR=8,
+        SQL_SERVER_TIMING=True,
+    )
+    db.init_app(app)
+    app.register_blueprint(bp)
+    app.register_blueprint(api_v2)
+    sqlstats.init_app(app)
+    with app.app_context():
+        db.create_all()
+    return app, temp_dir
+
+
+def _clear_db():
+    db.session.query(SwapRequest).delete()
+    db.session.query(AssignmentHistory).delete()
+    db.session.query(Assignment).delete()
+    db.session.query(Event).delete()
+    db.session.query(TeamMember).delete()
+    db.session.commit()
+
+
+def _seed(event_count):
+    start = vancouver_today() + datetime.timedelta(days=1)
+    for i in range(event_count):
+        event = Event(date=start + datetime.timedelta(days=i), day_type="Sunday")
+        db.session.add(event)
+        db.session.flush()
+        for role, person in (("Computer", "Florian"), ("Camera 1", "Andy"), ("Camera 2", "Marvin")):
+            db.session.add(Assignment(event_id=event.id, role=role, person=person, status="pending"))
+    db.session.add(TeamMember(name="Florian", telegram_user_id="27859948"))
+    db.session.commit()
+
+
+def _add_swaps(every=5):
+    now = datetime.datetime.utcnow()
+    for i, event in enumerate(Event.query.order_by(Event.date).all()):
+        if i % every:
+            continue
+        assignment = event.assignments[0]
+        assignment.status = "swap_needed"
+        assignment.add_history({"action": "decline", "by": assignment.person, "ts": now.isoformat() + "+00:00"})
+        for status in ("cancelled", "expired"):
+            db.session.add(SwapRequest(
+                assignment_id=assignment.id, requestor=assignment.person, event_date=event.date,
+                role=assignment.role, expires_at=now - datetime.timedelta(hours=1), status=status,
+            ))
+    db.session.commit()
+
+
+def run_schedule_within_budget(app):
+    with app.app_context():
+        _clear_db()
+        _seed(EVENT_COUNT)
+
+    client = app.test_client()
+    with sqlstats.assert_query_budget(SCHEDULE_BUDGET, "GET /api/v2/schedule") as stats:
+        response = client.get("/api/v2/schedule")
+    assert response.status_code == 200
+    assert len(response.get_json()) == EVENT_COUNT
+    assert response.headers["Server-Timing"].startswith("sql;dur=")
+    assert f'desc="{stats.count} queries"' in response.headers["Server-Timing"]
+
+
+def run_upcoming_and_month_within_budget(app):
+    client = app.test_client()
+    with sqlstats.assert_query_budget(UPCOMING_BUDGET, "GET /api/v2/schedule/upcoming") as stats:
+        response = client.get("/api/v2/schedule/upcoming")
+    assert response.status_code == 200
+    events = response.get_json()
+    assert len(events) == EVENT_COUNT
+    assignments = [a for event in events for a in event["assignments"]]
+    assert len(assignments) == 3 * EVENT_COUNT and all("history" not in a for a in assignments)
+    # Full history is served by /assignment/<id>/history, never per list row.
+    assert not any("FROM assignment_history" in fp for fp in stats.fingerprints), stats.summary()
+
+    first = datetime.date.fromisoformat(events[0]["date"])
+    with sqlstats.assert_query_budget(MONTH_BUDGET, "GET /api/v2/schedule/month"):
+        response = client.get(f"/api/v2/schedule/month/{first.year}/{first.month}")
+    assert response.status_code == 200
+    assert response.get_json() and all(e["assignments"] for e in response.get_json())
+
+
+def run_person_calendar_within_budget(app):
+    client = app.test_client()
+    with sqlstats.assert_query_budget(CALENDAR_BUDGET, "GET /calendar/Florian.ics"):
+        response = client.get("/calendar/Florian.ics")
+    assert response.status_code == 200
+    with sqlstats.assert_query_budget(ARCHIVE_CALENDAR_BUDGET, "GET /calendar/Florian.ics?archive=1"):
+        response = client.get("/calendar/Florian.ics?archive=1")
+    assert response.status_code == 200
+    assert response.get_data(as_text=True).count("BEGIN:VEVENT") >= EVENT_COUNT
+    with sqlstats.assert_query_budget(ARCHIVE_CALENDAR_BUDGET, "GET /calendar.ics"):
+        response = client.get("/calendar.ics?archive=1")
+    assert response.status_code == 200
+
+
+def run_event_graph_loads_in_fixed_queries(app):
+    with app.app_context():
+        _add_swaps()
+        db.session.expire_all()
+        with sqlstats.assert_query_budget(EVENT_GRAPH_WITH_SWAPS_BUDGET, "load_event_graph(swaps, history)"):
+            events = load_event_graph(include_swaps=True, include_history=True)
+            declined = declined_names_by_assignment(a.id for event in events for a in event.assignments)
+            for event in events:
+                for assignment in event.assignments:
+                    assert assignment.event is event
+                    assignment.history
+                    _assignment_declined_names(assignment, declined)
+        assert len(events) == EVENT_COUNT
+        assert _assignment_declined_names(events[0].assignments[0], declined) == {"Florian"}
+        assert events[0].assignments[0].history[0]["action"] == "decline"
+        latest = latest_swap_request(events[0].assignments[0])
+        assert latest.status == "expired"
+
+        first = events[0].date
+        db.session.expire_all()
+        with sqlstats.assert_query_budget(MONTHLY_SCHEDULE_BUDGET, "format_monthly_schedule"):
+            text = tg.format_monthly_schedule(first.year, first.month)
+        assert "<s>Florian</s>" in text
+        db.session.rollback()
+
+
+def run_schedule_renders_load_once(app):
+    today_calls = []
+    original_today = tg.vancouver_today
+
+    def counted_today():
+        today_calls.append(1)
+        return original_today()
+
+    with app.app_context():
+        events = Event.query.order_by(Event.date).all()
+        swap_event = next(e for e in events if e.assignments[0].status == "swap_needed")
+        event_id = swap_event.id
+        week_day = swap_event.date
+        try:
+            tg.vancouver_today = counted_today
+            for label, render in (
+                ("format_weekly_schedule", tg.format_weekly_schedule),
+                ("format_weekly_schedule_rich", tg.format_weekly_schedule_rich),
+            ):
+                db.session.expire_all()
+                today_calls.clear()
+                with sqlstats.assert_query_budget(WEEKLY_RENDER_BUDGET, label):
+                    text = render(week_day)
+                assert "<s>Florian</s>" in text, (label, text)
+                assert len(today_calls) == 1, (label, today_calls)
+
+            db.session.expire_all()
+            event = db.session.get(Event, event_id)
+            event.date
+            today_calls.clear()
+            with sqlstats.assert_query_budget(TODAY_POST_BUDGET, "format_today_group_post"):
+                text = tg.format_today_group_post(event)
+            assert "<s>Florian</s>" in text, text
+            assert len(today_calls) == 1, today_calls
+
+            # A context built once serves several renders without going back to the database.
+            db.session.expire_all()
+            ctx = tg.RenderContext.for_week(week_day)
+            with sqlstats.assert_query_budget(0, "weekly renders from one RenderContext"):
+                tg.format_weekly_schedule(ctx=ctx)
+                tg.format_weekly_schedule_rich(ctx=ctx)
+
+            # The week anchor comes from the same context: no separate Monday lookup.
+            db.session.expire_all()
+            with sqlstats.assert_query_budget(WEEKLY_RENDER_BUDGET, "_weekly_assignments_for_person"):
+                rows = tg._weekly_assignments_for_person("Florian", today=week_day)
+            assert rows, rows
+            not_send_day = ctx.send_date + datetime.timedelta(days=1)
+            db.session.expire_all()
+            with sqlstats.assert_query_budget(WEEKLY_RENDER_BUDGET, "send_weekly_schedule (not due)"):
+                assert tg.send_weekly_schedule(chat_id="chat", today=not_send_day) == 0
+        finally:
+            tg.vancouver_today = original_today
+            db.session.rollback()
+
+
+def run_history_paths_do_not_lazy_load(app):
+    with app.app_context():
+        db.session.expire_all()
+        with sqlstats.assert_query_budget(HISTORY_STATS_BUDGET, "get_history_stats"):
+            stats, _ = get_history_stats()
+        assert stats["All Time"]["Florian"]["total"] == EVENT_COUNT
+
+        db.session.expire_all()
+        with sqlstats.track("_build_history") as stats:
+            _build_history(get_roster())
+        per_event = [fp for fp, n in stats.fingerprints.items() if "FROM assignment" in fp or "FROM swap_request" in fp]
+        assert len(per_event) == 1 and stats.fingerprints[per_event[0]] == 1, stats.summary()
+
+
+def run_webhook_noop_within_budget(app):
+    client = app.test_client()
+    old_answer = tg.answer_callback
+    old_secret = tg.WEBHOOK_SECRET
+    try:
+        tg.answer_callback = lambda *args, **kwargs: True
+        tg.WEBHOOK_SECRET = ""
+        with sqlstats.assert_query_budget(WEBHOOK_NOOP_BUDGET, "POST webhook noop"):
+            response = client.post("/api/v2/telegram/webhook", json={"callback_query": {
+                "id": "cb",
+                "data": "noop",
+                "from": {"id": 27859948, "first_name": "Florian"},
+                "message": {"message_id": 1, "chat": {"id": "chat"}},
+            }})
+    finally:
+        tg.answer_callback = old_answer
+        tg.WEBHOOK_SECRET = old_secret
+    assert response.status_code == 200
+
+
+def run_event_touches_are_coalesced_per_flush(app):
+    with app.app_context():
+        events = load_event_graph(include_history=True)
+        before = {event.id: event.updated_at for event in events}
+        with sqlstats.track("bulk reassign") as stats:
+            for event in events:
+                for assignment in event.assignments:
+                    assignment.person = "Stefan"
+            db.session.flush()
+        touches = [n for fp, n in stats.fingerprints.items() if fp.startswith("UPDATE event SET updated_at")]
+        assert touches == [1], stats.summary()
+        db.session.commit()
+        for event in Event.query.all():
+            assert event.updated_at > before[event.id]
+
+
+def run_auto_swap_search_is_batched(app):
+    with app.app_context():
+        _clear_db()
+        db.session.query(Availability).delete()
+        names = ["Andy", "Marvin", "Patric", "Rene", "Stefan", "Viktor", "Florian", "Member 8", "Member 9"]
+        for name in names:
+            member = TeamMember(name=name, telegram_user_id=f"tg-{name}")
+            member.sunday_roles = ["Computer", "Camera 1", "Camera 2"]
+            db.session.add(member)
+        start = vancouver_today() + datetime.timedelta(days=1)
+        for week in range(20):
+            event = Event(date=start + datetime.timedelta(weeks=week), day_type="Sunday")
+            db.session.add(event)
+            db.session.flush()
+            for offset, role in enumerate(("Computer", "Camera 1", "Camera 2")):
+                db.session.add(Assignment(event_id=event.id, role=role, status="pending",
+                                          person=names[(week * 3 + offset) % len(names)],
+                                          locked=week % 7 == 3 and offset == 1))
+        db.session.add(Availability(person="Andy", start_date=start + datetime.timedelta(weeks=3),
+                                    end_date=start + datetime.timedelta(weeks=6), reason="Travel"))
+        db.session.add(Availability(person="Marvin", start_date=start, end_date=start + datetime.timedelta(weeks=9),
+                                    reason="Away"))
+        db.session.commit()
+
+        declined = Event.query.order_by(Event.date).first().assignments[0]
+        roster = get_roster()
+        pool = [name for name in names if name != declined.person]
+        expected = {}
+        for name in pool:
+            future = tg._find_future_swap_assignment(name, "Computer", "Sunday", declined.event.date, declined.person)
+            if future:
+                expected[name] = future.id
+        assert expected and len(expected) < len(pool)
+
+        declined_date, declined_person = declined.event.date, declined.person
+        db.session.expire_all()
+        with sqlstats.assert_query_budget(AUTO_SWAP_SEARCH_BUDGET, "auto-swap future search"):
+            with preloaded_availability():
+                futures = tg._find_future_swap_assignments(
+                    pool, "Computer", "Sunday", declined_date, declined_person, roster=roster,
+                )
+        assert {name: future.id for name, future in futures.items()} == expected
+
+        db.session.expire_all()
+        declined = db.session.get(Assignment, declined.id)
+        with sqlstats.track("_auto_swap_candidate") as stats:
+            selected, future = tg._auto_swap_candidate(declined)
+        assert expected[selected] == future.id
+        availability = [n for fp, n in stats.fingerprints.items() if "FROM availability" in fp]
+        assert availability == [1], stats.summary()
+
+
+def run_failed_statements_do_not_skew_timings(app):
+    with app.app_context():
+        with sqlstats.track("failing") as failing:
+            for _ in range(3):
+                try:
+                    db.session.execute(db.text("SELECT * FROM no_such_table"))
+                except Exception:
+                    db.session.rollback()
+        assert failing.count == 0
+        connection = db.session.connection()
+        assert not connection.connection.info.get("sqlstats_started")
+        with sqlstats.track("after failures") as stats:
+            db.session.execute(db.text("SELECT 1"))
+        assert stats.count == 1 and 0 <= stats.total_ms < 1000, stats.summary()
+
+
+def run_repeated_statements_are_fingerprinted(app):
+    with app.app_context():
+        with sqlstats.track("n+1 probe") as stats:
+            for event in Event.query.all():
+                list(event.assignments)
+        repeated = stats.repeated(10)
+    assert repeated and repeated[0][1] == EVENT_COUNT
+    assert "FROM assignment" in repeated[0][0]
+
+
+def main():
+    app, temp_dir = _make_app()
+    try:
+        run_schedule_within_budget(app)
+        run_upcoming_and_month_within_budget(app)
+        run_person_calendar_within_budget(app)
+        run_webhook_noop_within_budget(app)
+        run_history_paths_do_not_lazy_load(app)
+        run_event_graph_loads_in_fixed_queries(app)
+        run_schedule_renders_load_once(app)
+        run_event_touches_are_coalesced_per_flush(app)
+        run_repeated_statements_are_fingerprinted(app)
+        run_failed_statements_do_not_skew_timings(app)
+        run_auto_swap_search_is_batched(app)
+    finally:
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+        shutil.rmtree(temp_dir, ignore_errors=True)
+    print("query budget tests passed")
+
+
+if __name__ == "__main__":
+    main()
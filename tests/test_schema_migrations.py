@@ -0,0 +1,87 @@
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+from flask import Flask
+from sqlalchemy import event as sa_event, inspect, text
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app import migrations
+from app.extensions import db
+from app.models import Event
+
+
+def _make_app():
+    temp_dir = Path(tempfile.mkdtemp(prefix="livestream-migrations-"))
+    db_path = temp_dir / "test.db"
+    app = Flask(__name__)
+    app.config.update(
+        SECRET_KEY="test",
+        TESTING=True,
+        SQLALCHEMY_DATABASE_URI=f"sqlite:///{db_path.as_posix()}",
+        SQLALCHEMY_TRACK_MODIFICATIONS=False,
+    )
+    db.init_app(app)
+    return app, temp_dir
+
+
+def _make_legacy_schema():
+    """Current tables minus the versioning row and a few later-added columns."""
+    db.create_all()
+    db.session.execute(text("DROP TABLE schema_version"))
+    db.session.execute(text("ALTER TABLE event DROP COLUMN location"))
+    db.session.execute(text("ALTER TABLE assignment DROP COLUMN orphan_dismissed_at"))
+    db.session.execute(text("INSERT INTO event (date, day_type, cancelled) VALUES ('2026-06-14', 'Sunday', 0)"))
+    db.session.commit()
+
+
+def run_legacy_database_is_upgraded_once(app):
+    with app.app_context():
+        _make_legacy_schema()
+        assert migrations.current_version() == 0
+
+        assert migrations.upgrade() == len(migrations.MIGRATIONS)
+
+        insp = inspect(db.engine)
+        assert "location" in {c["name"] for c in insp.get_columns("event")}
+        assert "orphan_dismissed_at" in {c["name"] for c in insp.get_columns("assignment")}
+        assert migrations.current_version() == migrations.LATEST_VERSION
+        event = Event.query.one()
+        assert event.updated_at is not None
+
+
+def run_current_schema_boot_is_single_select(app):
+    with app.app_context():
+        statements = []
+
+        def _record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        sa_event.listen(db.engine, "before_cursor_execute", _record)
+        try:
+            assert migrations.upgrade() == 0
+        finally:
+            sa_event.remove(db.engine, "before_cursor_execute", _record)
+
+        assert statements == ["SELECT version FROM schema_version WHERE id = 1"]
+
+
+def main():
+    app, temp_dir = _make_app()
+    try:
+        run_legacy_database_is_upgraded_once(app)
+        run_current_schema_boot_is_single_select(app)
+    finally:
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+        shutil.rmtree(temp_dir, ignore_errors=True)
+    print("schema migration tests passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+os.environ["DISABLE_SCHEDULER"] = "1"
+
+from app import create_app
+from app.extensions import db
+from app.models import Event, TeamMember
+from config import Config
+
+
+def _make_app():
+    temp_dir = Path(tempfile.mkdtemp(prefix="livestream-startup-"))
+
+    class TestConfig(Config):
+        TESTING = True
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{(temp_dir / 'test.db').as_posix()}"
+
+    return create_app(TestConfig), temp_dir
+
+
+def _wait_for_startup(app, timeout=120):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if app.extensions["startup_tasks"]["status"] in ("ready", "failed"):
+            return
+        time.sleep(0.05)
+    raise AssertionError("startup tasks did not finish")
+
+
+def run_healthz_reports_deferred_startup(app):
+    client = app.test_client()
+    response = client.get("/healthz")
+    assert response.status_code in (200, 503)
+    assert response.get_json()["startup_tasks"]["status"] in ("pending", "running", "ready")
+
+    _wait_for_startup(app)
+
+    response = client.get("/healthz")
+    body = response.get_json()
+    assert response.status_code == 200
+    assert body["status"] == "ok"
+    assert body["startup_tasks"]["finished_at"]
+    with app.app_context():
+        assert TeamMember.query.count() > 0
+        assert Event.query.count() > 0
+
+
+def main():
+    app, temp_dir = _make_app()
+    try:
+        run_healthz_reports_deferred_startup(app)
+    finally:
+        _wait_for_startup(app)
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+        shutil.rmtree(temp_dir, ignore_errors=True)
+    print("startup task tests passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+import datetime
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+from flask import Flask
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app import archive, rollup, sqlstats
+from app.api_v2 import _rename_worker_references, api_v2
+from app.extensions import db
+from app.models import Assignment, Event, StatsRollup
+from app.routes import bp
+from app.utils import ALL_NAMES, get_history_stats
+
+PEOPLE = ("Andy", "Marvin", "Patric", "Rene", "Stefan", "Viktor", "Florian")
+LEADERBOARD_BUDGET = 1
+
+
+def _make_app():
+    temp_dir = Path(tempfile.mkdtemp(prefix="livestream-stats-rollup-"))
+    db_path = temp_dir / "test.db"
+    app = Flask(__name__)
+    app.config.update(
+        SECRET_KEY="test",
+        TESTING=True,
+        SQLALCHEMY_DATABASE_URI=f"sqlite:///{db_path.as_posix()}",
+        SQLALCHEMY_TRACK_MODIFICATIONS=False,
+        BASE_URL="https://livestream.example.test",
+    )
+    db.init_app(app)
+    app.register_blueprint(bp)
+    app.register_blueprint(api_v2)
+    with app.app_context():
+        db.create_all()
+    return app, temp_dir
+
+
+def _seed():
+    day = datetime.date(2025, 1, 1)
+    i = 0
+    while day <= datetime.date(2026, 6, 30):
+        if day.weekday() in (4, 6) or (day.month, day.day) == (1, 1):
+            event = Event(
+                date=day,
+                day_type="Sunday" if day.weekday() == 6 else "Friday" if day.weekday() == 4 else "Custom",
+                custom_title="New Year Service" if (day.month, day.day) == (1, 1) else None,
+                cancelled=i % 17 == 0,
+            )
+            db.session.add(event)
+            db.session.flush()
+            roles = ("Computer", "Camera 1", "Camera 2") if day.weekday() != 4 else ("Computer", "Camera")
+            for offset, role in enumerate(roles):
+                assignment = Assignment(event_id=event.id, role=role, person=PEOPLE[(i + offset * 2) % len(PEOPLE)])
+                if i % 6 == 0 and offset == 0:
+                    assignment.cover = PEOPLE[(i + 3) % len(PEOPLE)]
+                if i % 9 == 0 and offset == 1:
+                    assignment.person = "TBD"
+                db.session.add(assignment)
+            i += 1
+        day += datetime.timedelta(days=1)
+    db.session.commit()
+
+
+def _scan_leaderboard():
+    """The pre-rollup get_history_stats: walk every event and assignment."""
+    names = [n for n in ALL_NAMES if n != "TBD"]
+    all_time = {n: {"total": 0, "sunday": 0, "friday": 0} for n in names}
+    monthly = {}
+    for event in Event.query.order_by(Event.date).all():
+        d_obj = event.date
+        month = monthly.setdefault(d_obj.strftime("%B %Y"), {n: {"total": 0, "sunday": 0, "friday": 0} for n in names})
+        is_sun = event.day_type == "Sunday" or "new year" in (event.custom_title or "").lower() or d_obj.weekday() == 6
+        is_fri = event.day_type == "Friday" or d_obj.weekday() == 4
+        for a in event.assignments:
+            worker = a.cover if a.cover else a.person
+            if worker in all_time and worker not in ("Select Helper", "TBD"):
+                for bucket in (all_time, month):
+                    bucket[worker]["total"] += 1
+                    bucket[worker]["sunday"] += int(is_sun)
+                    bucket[worker]["friday"] += int(is_fri)
+    stats = {"All Time": all_time}
+    stats.update({key: value for key, value in monthly.items() if any(c["total"] for c in value.values())})
+    return stats
+
+
+def _rollup_rows():
+    return sorted(
+        (r.year, r.month, r.person, r.tracking_role, r.total, r.friday, r.cancelled, r.last_date)
+        for r in StatsRollup.query.all()
+    )
+
+
+def _rollup_statements(stats):
+    return {fp: n for fp, n in stats.fingerprints.items() if "stats_rollup" in fp}
+
+
+def run_leaderboard_matches_full_scan(app):
+    client = app.test_client()
+    with app.app_context():
+        _seed()
+        assert StatsRollup.query.count() > 0
+        stats, last_worked = get_history_stats()
+        assert stats == _scan_leaderboard()
+        assert last_worked["Andy"] == [max(
+            e.date for e in Event.query.all() for a in e.assignments if (a.cover or a.person) == "Andy"
+        )]
+
+        incremental = _rollup_rows()
+        rollup.rebuild()
+        assert _rollup_rows() == incremental
+
+    with sqlstats.assert_query_budget(LEADERBOARD_BUDGET, "GET /api/v2/leaderboard"):
+        response = client.get("/api/v2/leaderboard")
+    assert response.status_code == 200
+    assert response.get_json()["stats"]["All Time"]["Florian"]["total"] > 0
+
+
+def run_changes_recount_only_their_month(app):
+    with app.app_context():
+        event = Event.query.filter(Event.date == datetime.date(2026, 3, 1)).one()
+        assignment = event.assignments[0]
+
+        with sqlstats.track("confirm") as stats:
+            assignment.status = "confirmed"
+            db.session.commit()
+        assert not _rollup_statements(stats), stats.summary()
+
+        with sqlstats.track("reassign") as stats:
+            assignment.cover = "Viktor"
+            assignment.add_history({"action": "pickup", "by": "Viktor"})
+            db.session.commit()
+        statements = _rollup_statements(stats)
+        deletes = [fp for fp in statements if fp.startswith("DELETE")]
+        assert len(deletes) == 1 and statements[deletes[0]] == 1, statements
+        assert get_history_stats()[0] == _scan_leaderboard()
+
+        # Moving an event recounts both months; cancelling drops it from the overview.
+        event.date = datetime.date(2026, 7, 3)
+        event.cancelled = True
+        db.session.commit()
+        assert get_history_stats()[0] == _scan_leaderboard()
+        july = rollup.year_overview(2026).get("2026-07", {})
+        assert not july, july
+
+        db.session.delete(event)
+        db.session.commit()
+        assert StatsRollup.query.filter_by(year=2026, month=7).count() == 0
+        assert get_history_stats()[0] == _scan_leaderboard()
+
+
+def run_bulk_updates_rebuild(app):
+    with app.app_context():
+        _rename_worker_references("Patric", "Patrick")
+        db.session.commit()
+        assert StatsRollup.query.filter_by(person="Patric").count() == 0
+        assert StatsRollup.query.filter_by(person="Patrick").count() > 0
+
+        before = get_history_stats()[0]
+        assert archive.archive_events(datetime.date(2025, 7, 1)) > 0
+        assert get_history_stats()[0] == before
+        rollup.rebuild()
+        assert get_history_stats()[0] == before
+        archive.restore_events()
+        assert get_history_stats()[0] == before
+
+
+def run_overview_endpoint(app):
+    client = app.test_client()
+    payload = client.get("/api/v2/stats/overview?year=2025").get_json()
+    assert payload["year"] == 2025
+    assert payload["years"] == [2025, 2026]
+    assert sorted(payload["months"]) == [f"2025-{m:02d}" for m in range(1, 13)]
+    january = payload["months"]["2025-01"]
+    assert january and all(
+        key.split(":", 1)[0] in ("Sunday", "Weekday") for cells in january.values() for key in cells
+    )
+    with app.app_context():
+        total = sum(r.total - r.cancelled for r in StatsRollup.query.filter_by(year=2025).all())
+    assert total == sum(
+        count for people in payload["months"].values() for cells in people.values() for count in cells.values()
+    )
+    assert client.get("/api/v2/stats/overview?year=abc").status_code == 400
+
+
+def main():
+    app, temp_dir = _make_app()
+    try:
+        run_leaderboard_matches_full_scan(app)
+        run_changes_recount_only_their_month(app)
+        run_bulk_updates_rebuild(app)
+        run_overview_endpoint(app)
+    finally:
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+        shutil.rmtree(temp_dir, ignore_errors=True)
+    print("stats rollup tests passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+from flask import Flask
+from sqlalchemy import text
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app import storage
+from app.extensions import db
+
+
+def _make_app(profile):
+    temp_dir = Path(tempfile.mkdtemp(prefix="livestream-storage-"))
+    app = Flask(__name__)
+    app.config.update(
+        SECRET_KEY="test",
+        TESTING=True,
+        SQLALCHEMY_DATABASE_URI=f"sqlite:///{(temp_dir / 'test.db').as_posix()}",
+        SQLALCHEMY_TRACK_MODIFICATIONS=False,
+        SQLITE_PROFILE=profile,
+        SQLITE_BUSY_TIMEOUT_MS=2500,
+    )
+    storage.configure(app)
+    db.init_app(app)
+    storage.install(app)
+    return app, temp_dir
+
+
+def _pragma(name):
+    return db.session.execute(text(f"PRAGMA {name}")).scalar()
+
+
+def run_performance_profile_applies_pragmas_and_pool():
+    app, temp_dir = _make_app("performance")
+    try:
+        with app.app_context():
+            assert _pragma("journal_mode") == "wal"
+            assert _pragma("synchronous") == 1  # NORMAL
+            assert _pragma("busy_timeout") == 2500
+            assert _pragma("temp_store") == 2  # MEMORY
+            assert _pragma("cache_size") == -4096
+            assert db.engine.pool.size() == 8
+    finally:
+        with app.app_context():
+            db.session.remove()
+            db.engine.dispose()
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def run_default_profile_keeps_sqlite_defaults():
+    app, temp_dir = _make_app("default")
+    try:
+        with app.app_context():
+            assert _pragma("journal_mode") == "delete"
+            assert _pragma("synchronous") == 2  # FULL
+    finally:
+        with app.app_context():
+            db.session.remove()
+            db.engine.dispose()
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def main():
+    run_performance_profile_applies_pragmas_and_pool()
+    run_default_profile_keeps_sqlite_defaults()
+    print("storage profile tests passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+import datetime
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from flask import Flask
+from sqlalchemy import event as sa_event
+from sqlalchemy.orm import Session
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app import message_refs, metrics, sqlstats, sweeps
+from app.extensions import db
+from app.models import Assignment, Event, SwapRequest, TempChat, TelegramMessageRef
+import app.telegram_v2 as tg
+
+BACKLOG = 24
+WORKERS = 4
+TODAY = datetime.date(2026, 8, 1)
+
+
+def _make_app():
+    temp_dir = Path(tempfile.mkdtemp(prefix="livestream-sweeps-"))
+    db_path = temp_dir / "test.db"
+    app = Flask(__name__)
+    app.config.update(
+        SECRET_KEY="test",
+        TESTING=True,
+        SQLALCHEMY_DATABASE_URI=f"sqlite:///{db_path.as_posix()}",
+        SQLALCHEMY_TRACK_MODIFICATIONS=False,
+        BASE_URL="https://livestream.example.test",
+    )
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+    return app, temp_dir
+
+
+class SlowTelegram:
+    """Fake delete/edit calls with latency; tracks peak concurrency and worker app contexts."""
+
+    def __init__(self, latency=0.02, delete_ok=True):
+        self.latency = latency
+        self.delete_ok = delete_ok
+        self.calls = []
+        self.active = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def _enter(self, call):
+        with self._lock:
+            self.calls.append(call)
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(self.latency)
+        with self._lock:
+            self.active -= 1
+
+    def edit(self, chat_id, message_id, text, reply_markup=None):
+        self._enter(("edit", message_id, reply_markup))
+        return True, None
+
+    def delete(self, chat_id, message_id):
+        self._enter(("delete", message_id, None))
+        return (True, None) if self.delete_ok else (False, "Bad Request: message can't be deleted")
+
+
+def _clear_db():
+    for model in (TempChat, SwapRequest, Assignment, Event, TelegramMessageRef):
+        db.session.query(model).delete()
+    db.session.commit()
+
+
+def _seed_backlog():
+    expires = datetime.datetime.utcnow() - datetime.timedelta(hours=1)
+    for i in range(BACKLOG):
+        event = Event(date=TODAY - datetime.timedelta(days=1 + i), day_type="Sunday",
+                      telegram_chat_id="chat", telegram_message_id=1000 + i)
+        db.session.add(event)
+        db.session.flush()
+        assignment = Assignment(event_id=event.id, role="Computer", person=f"P{i}", status="swap_needed")
+        db.session.add(assignment)
+        db.session.flush()
+        db.session.add(SwapRequest(
+            assignment_id=assignment.id, requestor=f"P{i}", event_date=event.date, role="Computer",
+            expires_at=expires, status="active", telegram_chat_id="chat", telegram_message_id=2000 + i,
+        ))
+    db.session.commit()
+
+
+def _sweep(app, fn, telegram):
+    commits = []
+    listener = lambda session: commits.append(1)
+    sa_event.listen(Session, "after_commit", listener)
+    old = (tg.edit_message_with_error, tg.delete_message_with_error, tg._notify_admin_text,
+           tg.update_weekly_schedule_for_date, sweeps.SWEEP_WORKERS)
+    try:
+        tg.edit_message_with_error = telegram.edit
+        tg.delete_message_with_error = telegram.delete
+        tg._notify_admin_text = lambda text: None
+        tg.update_weekly_schedule_for_date = lambda date_obj: True
+        sweeps.SWEEP_WORKERS = WORKERS
+        with sqlstats.track(fn.__name__) as stats:
+            started = time.perf_counter()
+            result = fn()
+            elapsed = time.perf_counter() - started
+    finally:
+        sa_event.remove(Session, "after_commit", listener)
+        (tg.edit_message_with_error, tg.delete_message_with_error, tg._notify_admin_text,
+         tg.update_weekly_schedule_for_date, sweeps.SWEEP_WORKERS) = old
+    return result, elapsed, len(commits), stats
+
+
+def run_past_reminders_sweep_in_parallel(app):
+    with app.app_context():
+        _clear_db()
+        _seed_backlog()
+        db.session.expire_all()
+        telegram = SlowTelegram()
+        runs_before = metrics.SWEEP_SECONDS.count(sweep="past_event_reminders", phase="total")
+        closed, elapsed, commits, stats = _sweep(
+            app, lambda: tg.delete_past_event_reminders(today=TODAY), telegram)
+        assert closed == BACKLOG
+        assert 1 < telegram.peak <= WORKERS, telegram.peak
+        assert elapsed < BACKLOG * telegram.latency, elapsed
+        assert commits == 1, commits
+        # One prefetch for every event: no per-event SELECTs.
+        selects = [(fp, n) for fp, n in stats.fingerprints.items() if fp.startswith("SELECT") and n > 1]
+        assert not selects, stats.summary()
+        assert metrics.SWEEP_SECONDS.count(sweep="past_event_reminders", phase="total") == runs_before + 1
+        # Rendered on the request thread, so the markup carries the app's BASE_URL.
+        assert all("livestream.example.test" in str(markup) for _kind, _id, markup in telegram.calls)
+        assert Event.query.filter(Event.telegram_message_id.isnot(None)).count() == 0
+
+
+def run_expired_swaps_sweep_in_parallel(app):
+    with app.app_context():
+        _clear_db()
+        _seed_backlog()
+        db.session.expire_all()
+        telegram = SlowTelegram(delete_ok=False)
+        processed, elapsed, commits, stats = _sweep(app, tg.sweep_expired_swaps, telegram)
+        assert processed == BACKLOG
+        assert 1 < telegram.peak <= WORKERS, telegram.peak
+        # delete fails, then the closing edit: two calls per swap
+        assert len(telegram.calls) == 2 * BACKLOG
+        assert commits == 1, commits
+        selects = [(fp, n) for fp, n in stats.fingerprints.items() if fp.startswith("SELECT") and n > 1]
+        assert not selects, stats.summary()
+        assert all("livestream.example.test" in str(markup)
+                   for kind, _id, markup in telegram.calls if kind == "edit")
+        db.session.expire_all()
+        assert SwapRequest.query.filter_by(status="expired").count() == BACKLOG
+        assert SwapRequest.query.filter(SwapRequest.telegram_message_id.isnot(None)).count() == 0
+        assert message_refs.get(message_refs.SWAP_NOTICE, entity_id=1) is None
+
+
+def run_rate_limiter_spaces_calls():
+    clock = [0.0]
+    sleeps = []
+
+    def sleep(seconds):
+        sleeps.append(seconds)
+        clock[0] += seconds
+
+    limiter = sweeps.RateLimiter(rate=10, burst=2, clock=lambda: clock[0], sleep=sleep)
+    for _ in range(6):
+        limiter.acquire()
+    # Two from the burst, then one every 0.1 s.
+    assert abs(clock[0] - 0.4) < 1e-9, clock[0]
+    assert len(sleeps) == 4
+
+    results = sweeps.run_parallel(range(5), lambda n: 10 // (n - 2), max_workers=2,
+                                  limiter=sweeps.RateLimiter(rate=0))
+    assert [item for item, _result, _error in results] == [0, 1, 2, 3, 4]
+    assert isinstance(results[2][2], ZeroDivisionError) and results[3][1] == 10
+
+
+def main():
+    app, temp_dir = _make_app()
+    try:
+        run_past_reminders_sweep_in_parallel(app)
+        run_expired_swaps_sweep_in_parallel(app)
+        run_rate_limiter_spaces_calls()
+    finally:
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+        shutil.rmtree(temp_dir, ignore_errors=True)
+    print("sweep tests passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -10,8 +10,11 @@ ROOT = Path(__file__).resolve().parents[1]
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
 
+from app import message_refs
 from app.extensions import db
-from app.models import Assignment, Event, InteractionLog, SwapRequest, TeamMember, TempChat
+from app.models import (
+    Assignment, AssignmentHistory, Event, InteractionLog, SwapRequest, TeamMember, TelegramMessageRef, TempChat,
+)
 import app.telegram_v2 as tg
 
 
@@ -35,7 +38,9 @@ def _make_app():
 
 
 def _clear_db():
-    for model in (TempChat, SwapRequest, InteractionLog, Assignment, Event, TeamMember):
+    for model in (
+        TempChat, SwapRequest, InteractionLog, AssignmentHistory, Assignment, Event, TeamMember, TelegramMessageRef,
+    ):
         db.session.query(model).delete()
     db.session.commit()
 
@@ -1102,12 +1107,7 @@ def run_past_weekly_update_closes_buttons_with_static_icons(app):
         event_date = datetime.date(2026, 6, 16)
         monday = datetime.date(2026, 6, 15)
         event, assignment = _event_with_assignment(event_date, person="Rene", status="confirmed")
-        db.session.add(InteractionLog(
-            action="weekly_schedule_sent",
-            person_name="group",
-            event_date=monday,
-            details="weekly_schedule:2026-06-15|chat_id=chat|message_id=445",
-        ))
+        message_refs.register(message_refs.WEEKLY_SCHEDULE, monday, "chat", 445)
         db.session.commit()
 
         edits = []
@@ -1155,19 +1155,14 @@ def run_weekly_force_bypasses_existing_log(app):
         today = datetime.date(2026, 6, 9)
         monday = datetime.date(2026, 6, 8)
         _event_with_assignment(datetime.date(2026, 6, 12))
-        db.session.add(InteractionLog(
-            action="weekly_schedule_sent",
-            person_name="group",
-            event_date=monday,
-            details="weekly_schedule:2026-06-08|chat_id=chat|message_id=323",
-        ))
+        message_refs.register(message_refs.WEEKLY_SCHEDULE, monday, "chat", 323)
         db.session.commit()
 
         sent = []
         old_send = tg.send_message
         try:
             tg.send_message = lambda text, chat_id=None, reply_markup=None, parse_mode="HTML": (
-                sent.append((chat_id, text)) or 500
+                sent.append((chat_id, text, reply_markup)) or 500
             )
 
             assert tg.send_weekly_schedule(chat_id="chat", today=today) == 0
@@ -1175,9 +1170,11 @@ def run_weekly_force_bypasses_existing_log(app):
         finally:
             tg.send_message = old_send
 
-        latest = tg._weekly_schedule_log(monday)
+        ref = tg._weekly_schedule_ref(monday)
         assert sent and sent[-1][0] == "chat"
-        assert "message_id=500" in latest.details
+        assert (ref.chat_id, ref.message_id) == ("chat", 500)
+        assert ref.content_hash == message_refs.content_hash(sent[-1][1], sent[-1][2])
+        latest = InteractionLog.query.filter_by(action="weekly_schedule_sent").order_by(InteractionLog.id.desc()).first()
         assert "reason=weekly_schedule_resent" in latest.details
 
 
@@ -1187,12 +1184,7 @@ def run_weekly_update_resends_missing_message(app):
         monday = datetime.date(2026, 6, 8)
         friday = datetime.date(2026, 6, 12)
         _event_with_assignment(friday)
-        db.session.add(InteractionLog(
-            action="weekly_schedule_sent",
-            person_name="group",
-            event_date=monday,
-            details="weekly_schedule:2026-06-08|chat_id=chat|message_id=323",
-        ))
+        message_refs.register(message_refs.WEEKLY_SCHEDULE, monday, "chat", 323)
         db.session.commit()
 
         edited = []
@@ -1212,10 +1204,10 @@ def run_weekly_update_resends_missing_message(app):
             tg.edit_message_with_error = old_edit
             tg.send_message = old_send
 
-        latest = tg._weekly_schedule_log(monday)
+        ref = tg._weekly_schedule_ref(monday)
         assert edited == [("chat", 323)]
         assert sent and sent[-1][0] == "chat"
-        assert "message_id=501" in latest.details
+        assert ref.message_id == 501
 
 
 def run_admin_notification_includes_source_tag(app):
@@ -1230,17 +1222,17 @@ def run_admin_notification_includes_source_tag(app):
 
         calls = []
         old_personal_chat_id = tg.PERSONAL_CHAT_ID
-        old_api_call = tg._api_call
+        old_api_call_result = tg._api_call_result
         try:
             tg.PERSONAL_CHAT_ID = "admin-chat"
-            tg._api_call = lambda method, payload: (
-                calls.append((method, payload)) or {"ok": True}
+            tg._api_call_result = lambda method, payload, timeout=10: (
+                calls.append((method, payload)) or ({"message_id": 1}, None)
             )
 
             tg._notify_admin("decline", "Marvin", assignment, event, source="web")
         finally:
             tg.PERSONAL_CHAT_ID = old_personal_chat_id
-            tg._api_call = old_api_call
+            tg._api_call_result = old_api_call_result
 
         assert len(calls) == 1
         method, payload = calls[0]
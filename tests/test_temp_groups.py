@@ -0,0 +1,310 @@
+import asyncio
+import concurrent.futures
+import datetime
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import types
+from pathlib import Path
+
+from flask import Flask
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app import telegram_temp_groups as temp_groups
+from app.extensions import db
+from app.models import TempChat
+import app.telegram_v2 as tg
+
+
+class Channel:
+    def __init__(self, channel_id):
+        self.id = channel_id
+
+
+class StubGateway:
+    """Stands in for TelethonGateway: records calls, fails on request, tracks overlap."""
+
+    def __init__(self, latency=0.0, unknown=(), invite_error=None, invite_latency=0.0):
+        self.latency = latency
+        self.unknown = set(unknown)
+        self.invite_error = invite_error
+        self.invite_latency = invite_latency
+        self.lookups = []
+        self.invites = []
+        self.promoted = []
+        self.deleted = []
+        self.active = 0
+        self.peak = 0
+        self.disconnected = False
+        self._next_channel = 500
+
+    async def _call(self):
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(self.latency)
+        finally:
+            self.active -= 1
+
+    async def get_entity(self, ref):
+        self.lookups.append(ref)
+        if ref in self.unknown:
+            raise ValueError(f"no user {ref}")
+        return f"entity:{ref}"
+
+    async def create_channel(self, title, about):
+        await self._call()
+        self._next_channel += 1
+        return Channel(self._next_channel)
+
+    async def invite(self, channel, entities):
+        await asyncio.sleep(self.invite_latency)
+        if self.invite_error:
+            raise self.invite_error
+        self.invites.append((channel.id, list(entities)))
+
+    async def promote_bot(self, channel, bot_entity):
+        self.promoted.append((channel.id, bot_entity))
+
+    async def delete_channel(self, channel_id):
+        await self._call()
+        if channel_id == 404:
+            raise RuntimeError("CHANNEL_INVALID")
+        self.deleted.append(channel_id)
+
+    async def disconnect(self):
+        self.disconnected = True
+
+
+def _service(gateway, **kwargs):
+    async def _connect():
+        return gateway
+    return temp_groups.TempGroupService(_connect, **kwargs)
+
+
+def run_operations_return_futures_without_blocking():
+    gateway = StubGateway(latency=0.2)
+    service = _service(gateway)
+    try:
+        started = time.perf_counter()
+        futures = [service.create_temp_group(f"Group {i}", [100 + i]) for i in range(3)]
+        futures.append(service.delete_group(temp_groups.channel_chat_id(77)))
+        assert time.perf_counter() - started < 0.1
+        assert not any(future.done() for future in futures)
+        chat_ids = [future.result(timeout=5) for future in futures[:3]]
+        assert futures[3].result(timeout=5) is True
+        assert chat_ids == [temp_groups.channel_chat_id(n) for n in (501, 502, 503)]
+        assert gateway.deleted == [77]
+        # Queued operations run one at a time on the client.
+        assert gateway.peak == 1
+    finally:
+        service.stop()
+    assert gateway.disconnected
+
+
+def run_entities_are_cached_and_invites_batched():
+    clock = [0.0]
+    gateway = StubGateway(unknown={13})
+    service = _service(gateway, entity_ttl=60, invite_batch=2, clock=lambda: clock[0])
+    try:
+        users = [11, 12, 13, 14]
+        chat_id = service.create_temp_group("Swap", users, bot_ref="livestream_bot").result(timeout=5)
+        assert chat_id == temp_groups.channel_chat_id(501)
+        assert sorted(gateway.lookups, key=str) == [11, 12, 13, 14, "livestream_bot"]
+        # Unresolvable user 13 is skipped; four invitees in batches of two.
+        assert gateway.invites == [
+            (501, ["entity:11", "entity:12"]),
+            (501, ["entity:14", "entity:livestream_bot"]),
+        ]
+        assert gateway.promoted == [(501, "entity:livestream_bot")]
+
+        gateway.lookups.clear()
+        service.create_temp_group("Swap 2", [11, 12], bot_ref="livestream_bot").result(timeout=5)
+        assert gateway.lookups == []
+
+        clock[0] = 61
+        service.create_temp_group("Swap 3", [11], bot_ref="livestream_bot").result(timeout=5)
+        assert sorted(gateway.lookups, key=str) == [11, "livestream_bot"]
+        assert service.resolved == 7
+    finally:
+        service.stop()
+
+
+def run_failures_resolve_futures():
+    gateway = StubGateway()
+    service = _service(gateway)
+    offline = temp_groups.TempGroupService(lambda: asyncio.sleep(0, result=None))
+    try:
+        failed = service.delete_group(temp_groups.channel_chat_id(404))
+        try:
+            failed.result(timeout=5)
+            raise AssertionError("expected the delete to fail")
+        except RuntimeError:
+            pass
+        logged = temp_groups._logged(service.delete_group(temp_groups.channel_chat_id(404)), False, "Delete")
+        assert logged.result(timeout=5) is False
+        # The worker keeps going after a failure.
+        assert service.delete_group(temp_groups.channel_chat_id(9)).result(timeout=5) is True
+
+        assert offline.available().result(timeout=5) is False
+        assert offline.create_temp_group("Nobody", [1]).result(timeout=5) is None
+        assert offline.delete_group(-1001).result(timeout=5) is False
+    finally:
+        service.stop()
+        offline.stop()
+
+
+def run_unfinished_groups_are_deleted():
+    gateway = StubGateway(invite_error=RuntimeError("USER_PRIVACY_RESTRICTED"))
+    slow = StubGateway(invite_latency=1.0)
+    service = _service(gateway)
+    timed_out = _service(slow, timeout=0.1)
+    try:
+        try:
+            service.create_temp_group("Swap", [11]).result(timeout=5)
+            raise AssertionError("expected the invite to fail")
+        except RuntimeError:
+            pass
+        assert gateway.deleted == [501]
+
+        try:
+            timed_out.create_temp_group("Swap", [11]).result(timeout=5)
+            raise AssertionError("expected a timeout")
+        except (asyncio.TimeoutError, concurrent.futures.TimeoutError):
+            pass
+        assert slow.deleted == [501]
+    finally:
+        service.stop()
+        timed_out.stop()
+
+
+def _make_app():
+    temp_dir = Path(tempfile.mkdtemp(prefix="livestream-temp-groups-"))
+    db_path = temp_dir / "test.db"
+    app = Flask(__name__)
+    app.config.update(
+        SECRET_KEY="test",
+        TESTING=True,
+        SQLALCHEMY_DATABASE_URI=f"sqlite:///{db_path.as_posix()}",
+        SQLALCHEMY_TRACK_MODIFICATIONS=False,
+    )
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+    return app, temp_dir
+
+
+def _wait_for_status(app, temp_chat_id, status, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        with app.app_context():
+            if db.session.get(TempChat, temp_chat_id).status == status:
+                return
+        time.sleep(0.01)
+    raise AssertionError(f"TempChat {temp_chat_id} never became {status}")
+
+
+def run_delete_temp_chat_does_not_wait_for_telethon(app):
+    pending = concurrent.futures.Future()
+    original = (tg.telegram_temp_groups, tg._record_temp_group_deleted)
+    settled_on = []
+
+    def _record(*args):
+        settled_on.append(threading.current_thread())
+        original[1](*args)
+
+    tg.telegram_temp_groups = types.SimpleNamespace(delete_group=lambda chat_id: pending)
+    tg._record_temp_group_deleted = _record
+    try:
+        with app.app_context():
+            temp_chat = TempChat(chat_id="-100555", kind="swap", status="active")
+            db.session.add(temp_chat)
+            db.session.commit()
+            temp_chat_id = temp_chat.id
+
+            assert tg._delete_temp_chat(temp_chat) is True
+            assert db.session.get(TempChat, temp_chat_id).status == "deleting"
+
+        # The future is settled on the service's loop thread; the DB write must not run there.
+        pending.set_result(True)
+        _wait_for_status(app, temp_chat_id, "deleted")
+        assert settled_on and settled_on[0] is not threading.current_thread()
+        with app.app_context():
+
+            # Unconfigured Telethon: the delete fails immediately, as before.
+            tg.telegram_temp_groups = types.SimpleNamespace(delete_group=lambda chat_id: temp_groups._done(False))
+            other = TempChat(chat_id="-100556", kind="swap", status="active")
+            db.session.add(other)
+            db.session.commit()
+            assert tg._delete_temp_chat(other) is False
+            assert other.status == "delete_failed"
+    finally:
+        tg.telegram_temp_groups, tg._record_temp_group_deleted = original
+
+
+def run_sweep_skips_deletes_in_flight(app):
+    pending = concurrent.futures.Future()
+    requested = []
+    original = tg.telegram_temp_groups
+
+    def _delete_group(chat_id):
+        requested.append(chat_id)
+        return pending
+
+    tg.telegram_temp_groups = types.SimpleNamespace(delete_group=_delete_group)
+    try:
+        with app.app_context():
+            expired = TempChat(
+                chat_id="-100557", kind="swap", status="active",
+                expires_at=datetime.datetime.utcnow() - datetime.timedelta(minutes=1),
+            )
+            db.session.add(expired)
+            db.session.commit()
+            temp_chat_id = expired.id
+
+            # Queued, not finished: nothing deleted yet, and the next sweep must not reissue it.
+            assert tg.sweep_expired_temp_chats() == 0
+            assert tg.sweep_expired_temp_chats() == 0
+            assert requested == ["-100557"]
+
+        pending.set_result(True)
+        _wait_for_status(app, temp_chat_id, "deleted")
+        with app.app_context():
+            assert tg.sweep_expired_temp_chats() == 0
+            assert requested == ["-100557"]
+    finally:
+        tg.telegram_temp_groups = original
+
+
+def run_wait_gives_up_after_timeout():
+    started = time.perf_counter()
+    assert temp_groups.wait(concurrent.futures.Future(), False, timeout=0.05) is False
+    assert time.perf_counter() - started < 1
+    assert temp_groups.wait(temp_groups._done(-1001), None) == -1001
+
+
+def main():
+    run_operations_return_futures_without_blocking()
+    run_entities_are_cached_and_invites_batched()
+    run_failures_resolve_futures()
+    run_unfinished_groups_are_deleted()
+    run_wait_gives_up_after_timeout()
+    app, temp_dir = _make_app()
+    try:
+        run_delete_temp_chat_does_not_wait_for_telethon(app)
+        run_sweep_skips_deletes_in_flight(app)
+    finally:
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+        shutil.rmtree(temp_dir, ignore_errors=True)
+    print("temp group service tests passed")
+
+
+if __name__ == "__main__":
+    main()